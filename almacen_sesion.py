@@ -0,0 +1,285 @@
+"""
+Almacén de Resultados por Sesión
+================================
+Guarda los resultados de análisis de cada sesión de Streamlit en formato compacto
+y con un presupuesto de memoria acotado.
+
+Características:
+- Serialización compacta: DataFrames en bloques columnares + compresión zlib
+- Presupuesto de bytes en memoria por sesión
+- Volcado automático a caché en disco al superar el presupuesto
+- Desalojo LRU (menos usado recientemente) en memoria y en disco
+- Reporte de uso de memoria y aciertos de caché
+"""
+
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+import hashlib
+import weakref
+import zlib
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+
+# Presupuestos por defecto (por sesión)
+MAX_BYTES_MEMORIA = 64 * 1024 * 1024   # 64 MB comprimidos en RAM
+MAX_BYTES_DISCO = 512 * 1024 * 1024    # 512 MB en caché de disco
+NIVEL_COMPRESION = 1                   # zlib rápido: prioriza latencia sobre ratio
+
+
+class AlmacenResultadosSesion:
+    """Almacén LRU de resultados con presupuesto de memoria y volcado a disco"""
+
+    def __init__(
+        self,
+        id_sesion: str,
+        max_bytes_memoria: int = MAX_BYTES_MEMORIA,
+        max_bytes_disco: int = MAX_BYTES_DISCO,
+        directorio_cache: str = None
+    ):
+        """
+        Inicializa el almacén de una sesión
+
+        Args:
+            id_sesion: Identificador único de la sesión (define la subcarpeta en disco)
+            max_bytes_memoria: Presupuesto de bytes comprimidos en memoria
+            max_bytes_disco: Presupuesto de bytes en la caché de disco
+            directorio_cache: Carpeta base de la caché (default: temporal del sistema)
+        """
+        self.id_sesion = id_sesion
+        self.max_bytes_memoria = max_bytes_memoria
+        self.max_bytes_disco = max_bytes_disco
+
+        if directorio_cache is None:
+            directorio_cache = os.path.join(tempfile.gettempdir(), "analizador_financiero_cache")
+        self.directorio = os.path.join(directorio_cache, id_sesion)
+
+        # clave -> bytes comprimidos (orden = uso reciente, el último es el más reciente)
+        self._memoria: "OrderedDict[str, bytes]" = OrderedDict()
+        # clave -> tamaño en bytes del archivo volcado
+        self._disco: "OrderedDict[str, int]" = OrderedDict()
+        self._bytes_memoria = 0
+        self._bytes_disco = 0
+
+        # Los trabajos en segundo plano también escriben en el almacén
+        self._lock = threading.RLock()
+
+        self.estadisticas = {
+            'aciertos_memoria': 0,
+            'aciertos_disco': 0,
+            'fallos': 0,
+            'volcados_disco': 0,
+            'desalojos': 0
+        }
+
+        # Borrar la caché en disco cuando la sesión se descarta
+        self._finalizador = weakref.finalize(self, shutil.rmtree, self.directorio, True)
+
+    # ===== API PÚBLICA =====
+
+    def guardar(self, clave: str, valor: Any):
+        """
+        Guarda un valor en el almacén (reemplaza si ya existe)
+
+        Args:
+            clave: Clave del dataset
+            valor: Cualquier objeto serializable (dict, list, DataFrame...)
+        """
+        datos = self._compactar(valor)
+
+        with self._lock:
+            self._quitar(clave)
+
+            if len(datos) > self.max_bytes_memoria:
+                # No cabe en memoria: directo a disco
+                self._volcar_a_disco(clave, datos)
+            else:
+                self._memoria[clave] = datos
+                self._bytes_memoria += len(datos)
+                self._aplicar_presupuesto_memoria()
+
+    def obtener(self, clave: str, por_defecto: Any = None) -> Any:
+        """
+        Obtiene un valor del almacén (memoria o disco)
+
+        Args:
+            clave: Clave del dataset
+            por_defecto: Valor a devolver si la clave no existe
+
+        Returns:
+            El valor almacenado o `por_defecto`
+        """
+        with self._lock:
+            if clave in self._memoria:
+                self._memoria.move_to_end(clave)
+                datos = self._memoria[clave]
+                self.estadisticas['aciertos_memoria'] += 1
+            elif clave in self._disco:
+                datos = self._leer_de_disco(clave)
+                if datos is None:
+                    self.estadisticas['fallos'] += 1
+                    return por_defecto
+                self.estadisticas['aciertos_disco'] += 1
+                # Promover a memoria: vuelve a ser el más reciente
+                self._quitar(clave)
+                if len(datos) <= self.max_bytes_memoria:
+                    self._memoria[clave] = datos
+                    self._bytes_memoria += len(datos)
+                    self._aplicar_presupuesto_memoria()
+                else:
+                    self._volcar_a_disco(clave, datos)
+            else:
+                self.estadisticas['fallos'] += 1
+                return por_defecto
+
+        return self._expandir(datos)
+
+    def contiene(self, clave: str) -> bool:
+        """Indica si la clave está en memoria o en disco"""
+        with self._lock:
+            return clave in self._memoria or clave in self._disco
+
+    def obtener_o_calcular(self, clave: str, funcion: Callable[[], Any]) -> Any:
+        """
+        Devuelve el valor almacenado o lo calcula con `funcion` y lo guarda
+
+        Args:
+            clave: Clave del dataset
+            funcion: Función sin argumentos que produce el valor
+
+        Returns:
+            Valor almacenado o recién calculado
+        """
+        centinela = object()
+        valor = self.obtener(clave, centinela)
+        if valor is centinela:
+            valor = funcion()
+            if valor is not None:
+                self.guardar(clave, valor)
+        return valor
+
+    def eliminar(self, clave: str):
+        """Elimina una clave del almacén"""
+        with self._lock:
+            self._quitar(clave)
+
+    def limpiar(self):
+        """Vacía el almacén completo (memoria y disco)"""
+        with self._lock:
+            self._memoria.clear()
+            self._disco.clear()
+            self._bytes_memoria = 0
+            self._bytes_disco = 0
+            shutil.rmtree(self.directorio, ignore_errors=True)
+
+    def reporte_memoria(self) -> Dict[str, Any]:
+        """
+        Reporta el uso actual del almacén
+
+        Returns:
+            Dict con bytes y cantidad de datasets en memoria/disco y estadísticas de acceso
+        """
+        with self._lock:
+            return {
+                'datasets_memoria': len(self._memoria),
+                'datasets_disco': len(self._disco),
+                'bytes_memoria': self._bytes_memoria,
+                'bytes_disco': self._bytes_disco,
+                'max_bytes_memoria': self.max_bytes_memoria,
+                'max_bytes_disco': self.max_bytes_disco,
+                'uso_memoria_pct': (self._bytes_memoria / self.max_bytes_memoria * 100) if self.max_bytes_memoria else 0.0,
+                **self.estadisticas
+            }
+
+    # ===== SERIALIZACIÓN COMPACTA =====
+
+    def _compactar(self, valor: Any) -> bytes:
+        """
+        Serializa y comprime un valor
+
+        Los DataFrames se guardan con pickle protocolo 5, que conserva los bloques
+        columnares de NumPy sin convertir celda por celda. Los dicts anidados
+        (resultados del extractor) comprimen muy bien porque repiten claves y textos.
+        """
+        return zlib.compress(pickle.dumps(valor, protocol=pickle.HIGHEST_PROTOCOL), NIVEL_COMPRESION)
+
+    def _expandir(self, datos: bytes) -> Any:
+        """Descomprime y deserializa un valor"""
+        return pickle.loads(zlib.decompress(datos))
+
+    # ===== GESTIÓN DE PRESUPUESTOS =====
+
+    def _aplicar_presupuesto_memoria(self):
+        """Vuelca a disco los datasets menos usados hasta respetar el presupuesto"""
+        while self._bytes_memoria > self.max_bytes_memoria and self._memoria:
+            clave_lru, datos = self._memoria.popitem(last=False)
+            self._bytes_memoria -= len(datos)
+            self._volcar_a_disco(clave_lru, datos)
+
+    def _aplicar_presupuesto_disco(self):
+        """Elimina de disco los datasets menos usados hasta respetar el presupuesto"""
+        while self._bytes_disco > self.max_bytes_disco and self._disco:
+            clave_lru, tamaño = self._disco.popitem(last=False)
+            self._bytes_disco -= tamaño
+            self._borrar_archivo(clave_lru)
+            self.estadisticas['desalojos'] += 1
+
+    def _quitar(self, clave: str):
+        """Quita una clave de memoria y de disco (sin contar como desalojo)"""
+        if clave in self._memoria:
+            self._bytes_memoria -= len(self._memoria.pop(clave))
+        if clave in self._disco:
+            self._bytes_disco -= self._disco.pop(clave)
+            self._borrar_archivo(clave)
+
+    # ===== CACHÉ EN DISCO =====
+
+    def _ruta_archivo(self, clave: str) -> str:
+        """Ruta del archivo de caché para una clave"""
+        nombre = hashlib.sha1(clave.encode('utf-8')).hexdigest()
+        return os.path.join(self.directorio, f"{nombre}.bin")
+
+    def _volcar_a_disco(self, clave: str, datos: bytes):
+        """Escribe un dataset en la caché de disco"""
+        try:
+            os.makedirs(self.directorio, exist_ok=True)
+            with open(self._ruta_archivo(clave), 'wb') as f:
+                f.write(datos)
+        except OSError as e:
+            # Sin disco disponible: el dataset se descarta (se recalculará si se pide)
+            print(f"⚠️ No se pudo volcar '{clave}' a disco: {str(e)}")
+            self.estadisticas['desalojos'] += 1
+            return
+
+        self._disco[clave] = len(datos)
+        self._bytes_disco += len(datos)
+        self.estadisticas['volcados_disco'] += 1
+        self._aplicar_presupuesto_disco()
+
+    def _leer_de_disco(self, clave: str) -> Optional[bytes]:
+        """Lee un dataset de la caché de disco"""
+        try:
+            with open(self._ruta_archivo(clave), 'rb') as f:
+                return f.read()
+        except OSError:
+            # Archivo borrado externamente: olvidar la entrada
+            self._bytes_disco -= self._disco.pop(clave, 0)
+            return None
+
+    def _borrar_archivo(self, clave: str):
+        """Elimina el archivo de caché de una clave"""
+        try:
+            os.remove(self._ruta_archivo(clave))
+        except OSError:
+            pass
+
+
+def formatear_bytes(num_bytes: float) -> str:
+    """Formatea un tamaño en bytes de forma legible (KB, MB, GB)"""
+    for unidad in ['B', 'KB', 'MB', 'GB']:
+        if abs(num_bytes) < 1024 or unidad == 'GB':
+            return f"{num_bytes:,.1f} {unidad}" if unidad != 'B' else f"{num_bytes:,.0f} B"
+        num_bytes /= 1024
@@ -13,9 +13,18 @@ Funcionalidad:
 
 import pandas as pd
 import streamlit as st
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 import plotly.graph_objects as go
 import plotly.express as px
+from exportador_excel import LibroExcelStreaming, formatos_columnas, FORMATO_VARIACION, TEXTO_NO_DISPONIBLE
+
+
+# Hojas de la exportación a Excel: (clave del consolidado, nombre de hoja)
+HOJAS_EXCEL_HORIZONTAL = [
+    ('situacion_financiera', 'Situación Financiera'),
+    ('resultados', 'Estado de Resultados'),
+    ('flujo_efectivo', 'Flujo de Efectivo')
+]
 
 
 class AnalisisHorizontalConsolidado:
@@ -315,40 +324,52 @@ class AnalisisHorizontalConsolidado:
     def exportar_consolidado_excel(
         self, 
         consolidado: Dict[str, pd.DataFrame], 
-        archivo_salida: str
+        archivo_salida: Optional[str] = None
+    ) -> bytes:
+        """
+        Exporta análisis horizontal consolidado a Excel (en memoria, formato % nativo)
+        
+        Args:
+            consolidado: Dict con DataFrames consolidados
+            archivo_salida: Nombre del archivo Excel de salida (opcional)
+        
+        Returns:
+            Contenido del libro en bytes (para st.download_button)
+        """
+        libro = LibroExcelStreaming()
+        self.escribir_hojas_consolidado(libro, consolidado)
+        contenido = libro.finalizar(archivo_salida)
+        
+        if archivo_salida:
+            print(f"✅ Análisis horizontal consolidado exportado a: {archivo_salida}")
+        return contenido
+    
+    def escribir_hojas_consolidado(
+        self,
+        libro: LibroExcelStreaming,
+        consolidado: Dict[str, pd.DataFrame],
+        prefijo: str = ''
     ):
         """
-        Exporta análisis horizontal consolidado a Excel
+        Escribe las hojas del consolidado en un libro en streaming
+        
+        Los valores se escriben como números con formato de Excel "%"
+        (los vacíos como "N/A"), sin convertir cada celda a texto.
         
         Args:
+            libro: Libro destino
             consolidado: Dict con DataFrames consolidados
-            archivo_salida: Nombre del archivo Excel de salida
+            prefijo: Texto antepuesto al nombre de cada hoja
         """
-        with pd.ExcelWriter(archivo_salida, engine='openpyxl') as writer:
-            
-            if 'situacion_financiera' in consolidado:
-                df = consolidado['situacion_financiera'].copy()
-                # Formatear valores con sufijo %
-                columnas_comp = [col for col in df.columns if col != 'Cuenta']
-                for col in columnas_comp:
-                    df[col] = df[col].apply(lambda x: f"{x:+.2f}%" if pd.notnull(x) else "N/A")
-                df.to_excel(writer, sheet_name='Situación Financiera', index=False)
-            
-            if 'resultados' in consolidado:
-                df = consolidado['resultados'].copy()
-                columnas_comp = [col for col in df.columns if col != 'Cuenta']
-                for col in columnas_comp:
-                    df[col] = df[col].apply(lambda x: f"{x:+.2f}%" if pd.notnull(x) else "N/A")
-                df.to_excel(writer, sheet_name='Estado de Resultados', index=False)
-            
-            if 'flujo_efectivo' in consolidado:
-                df = consolidado['flujo_efectivo'].copy()
-                columnas_comp = [col for col in df.columns if col != 'Cuenta']
-                for col in columnas_comp:
-                    df[col] = df[col].apply(lambda x: f"{x:+.2f}%" if pd.notnull(x) else "N/A")
-                df.to_excel(writer, sheet_name='Flujo de Efectivo', index=False)
-        
-        print(f"✅ Análisis horizontal consolidado exportado a: {archivo_salida}")
+        for clave, nombre_hoja in HOJAS_EXCEL_HORIZONTAL:
+            if clave in consolidado:
+                df = consolidado[clave]
+                libro.agregar_dataframe(
+                    f'{prefijo}{nombre_hoja}',
+                    df,
+                    formatos_columnas(df.columns, FORMATO_VARIACION),
+                    TEXTO_NO_DISPONIBLE
+                )
 
 
 # Función de prueba
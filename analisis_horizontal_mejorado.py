@@ -22,9 +22,27 @@ Ejemplo:
 - Análisis Horizontal 2024 = ((Valor 2024 - Valor 2023) / Valor 2023) × 100
 """
 
-import pandas as pd
 import re
 from typing import Dict, List, Tuple, Optional, Any
+from exportador_excel import LibroExcelStreaming, FORMATO_MILES, FORMATO_VARIACION
+
+
+# Exportación a Excel: hojas por estado, columnas de cada cuenta y sus formatos
+HOJAS_EXCEL_HORIZONTAL = [
+    ('balance', 'Situación Financiera'),
+    ('resultados', 'Resultados'),
+    ('flujo', 'Flujo Efectivo')
+]
+COLUMNAS_EXCEL_HORIZONTAL = [
+    'cuenta', 'es_total', 'valor_año_base', 'valor_año_actual',
+    'variacion_absoluta', 'analisis_horizontal', 'estado_variacion'
+]
+FORMATOS_EXCEL_HORIZONTAL = {
+    'valor_año_base': FORMATO_MILES,
+    'valor_año_actual': FORMATO_MILES,
+    'variacion_absoluta': FORMATO_MILES,
+    'analisis_horizontal': FORMATO_VARIACION
+}
 
 
 class AnalisisHorizontalMejorado:
@@ -252,62 +270,70 @@ class AnalisisHorizontalMejorado:
         
         return resumen
     
-    def exportar_a_excel(self, resultados: Dict, archivo_salida: str):
+    def exportar_a_excel(self, resultados: Dict, archivo_salida: Optional[str] = None) -> bytes:
         """
         Exporta los resultados del análisis horizontal a Excel con formato
+        
+        El libro se genera en memoria con formatos numéricos nativos (miles y %);
+        si se indica `archivo_salida` también se guarda en disco.
+        
+        Returns:
+            Contenido del libro en bytes (para st.download_button)
         """
-        with pd.ExcelWriter(archivo_salida, engine='openpyxl') as writer:
-            
-            # Hoja 1: Metadatos
-            df_meta = pd.DataFrame([{
-                'Empresa': resultados['empresa'],
-                'Año Actual': resultados['año_documento'],
-                'Tipo': resultados['tipo'],
-                'Formato': resultados['formato'].upper(),
-                'Estados Analizados': len(resultados['estados_analizados'])
-            }])
-            df_meta.to_excel(writer, sheet_name='Información', index=False)
-            
-            # Hoja 2: Estado de Situación Financiera
-            if 'balance' in resultados['estados_analizados']:
-                balance = resultados['estados_analizados']['balance']
-                if balance['cuentas_analizadas']:
-                    df_balance = pd.DataFrame(balance['cuentas_analizadas'])
-                    # Redondear columnas numéricas
-                    if 'analisis_horizontal' in df_balance.columns:
-                        df_balance['analisis_horizontal'] = df_balance['analisis_horizontal'].round(2)
-                    df_balance.to_excel(writer, sheet_name='Situación Financiera', index=False)
-            
-            # Hoja 3: Estado de Resultados
-            if 'resultados' in resultados['estados_analizados']:
-                resultados_estado = resultados['estados_analizados']['resultados']
-                if resultados_estado['cuentas_analizadas']:
-                    df_resultados = pd.DataFrame(resultados_estado['cuentas_analizadas'])
-                    if 'analisis_horizontal' in df_resultados.columns:
-                        df_resultados['analisis_horizontal'] = df_resultados['analisis_horizontal'].round(2)
-                    df_resultados.to_excel(writer, sheet_name='Resultados', index=False)
-            
-            # Hoja 4: Flujo de Efectivo
-            if 'flujo' in resultados['estados_analizados']:
-                flujo = resultados['estados_analizados']['flujo']
-                if flujo['cuentas_analizadas']:
-                    df_flujo = pd.DataFrame(flujo['cuentas_analizadas'])
-                    if 'analisis_horizontal' in df_flujo.columns:
-                        df_flujo['analisis_horizontal'] = df_flujo['analisis_horizontal'].round(2)
-                    df_flujo.to_excel(writer, sheet_name='Flujo Efectivo', index=False)
-            
-            # Hoja 5: Resumen y Estadísticas
-            resumen = resultados['resumen']
-            estadisticas = resumen['estadisticas_globales']
-            df_stats = pd.DataFrame([{
-                'Variaciones Positivas (%)': estadisticas['variaciones_positivas'],
-                'Variaciones Negativas (%)': estadisticas['variaciones_negativas'],
-                'Sin Variación': estadisticas['sin_variacion'],
-                'No Calculables': estadisticas['no_calculables']
-            }])
-            df_stats.to_excel(writer, sheet_name='Resumen', index=False)
+        libro = LibroExcelStreaming()
+        self.escribir_hojas(libro, resultados)
+        contenido = libro.finalizar(archivo_salida)
+        
+        if archivo_salida:
+            print(f"✅ Análisis horizontal exportado a: {archivo_salida}")
+        return contenido
+    
+    def escribir_hojas(self, libro: LibroExcelStreaming, resultados: Dict, prefijo: str = ''):
+        """
+        Escribe las hojas del análisis horizontal en un libro en streaming
+        
+        Args:
+            libro: Libro destino
+            resultados: Resultados de analizar_desde_extractor
+            prefijo: Texto antepuesto al nombre de cada hoja
+        """
+        # Hoja 1: Metadatos
+        libro.agregar_hoja(
+            f'{prefijo}Información',
+            ['Empresa', 'Año Actual', 'Tipo', 'Formato', 'Estados Analizados'],
+            [[
+                resultados['empresa'],
+                resultados['año_documento'],
+                resultados['tipo'],
+                resultados['formato'].upper(),
+                len(resultados['estados_analizados'])
+            ]]
+        )
+        
+        # Hojas 2-4: Situación Financiera, Resultados y Flujo de Efectivo
+        for clave_estado, nombre_hoja in HOJAS_EXCEL_HORIZONTAL:
+            if clave_estado in resultados['estados_analizados']:
+                estado = resultados['estados_analizados'][clave_estado]
+                if estado['cuentas_analizadas']:
+                    libro.agregar_hoja(
+                        f'{prefijo}{nombre_hoja}',
+                        COLUMNAS_EXCEL_HORIZONTAL,
+                        ([cuenta.get(col) for col in COLUMNAS_EXCEL_HORIZONTAL] for cuenta in estado['cuentas_analizadas']),
+                        FORMATOS_EXCEL_HORIZONTAL
+                    )
         
-        print(f"✅ Análisis horizontal exportado a: {archivo_salida}")
+        # Hoja 5: Resumen y Estadísticas
+        estadisticas = resultados['resumen']['estadisticas_globales']
+        libro.agregar_hoja(
+            f'{prefijo}Resumen',
+            ['Variaciones Positivas (%)', 'Variaciones Negativas (%)', 'Sin Variación', 'No Calculables'],
+            [[
+                estadisticas['variaciones_positivas'],
+                estadisticas['variaciones_negativas'],
+                estadisticas['sin_variacion'],
+                estadisticas['no_calculables']
+            ]]
+        )
 
 
 # Función de uso rápido
@@ -0,0 +1,358 @@
+"""
+Análisis de Ratios con IA (Groq)
+================================
+Genera el análisis financiero de los ratios en 3 fases especializadas.
+
+Características:
+- Las 3 fases (liquidez/endeudamiento, rentabilidad/actividad, conclusión) son
+  independientes y se solicitan en paralelo: la latencia total ≈ la fase más lenta
+- Tiempo máximo por fase configurable (GROQ_TIMEOUT_FASE)
+- Resultados parciales: si una fase falla, se entregan las demás con una nota
+- Construcción de prompts separada de la ejecución (prompts_ia.py: compactos y con presupuesto de tokens)
+- Caché persistente por fase (cache_ia.py): repetir un análisis ya generado es instantáneo
+- Variante en streaming: los fragmentos de cada fase se entregan a medida que llegan
+- Cliente compartido con pool de conexiones y límite de concurrencia (cliente_llm.py)
+"""
+
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List
+
+from groq import Groq
+
+from cache_ia import CacheIA, huella_solicitud, TTL_SEGUNDOS, MAX_BYTES_CACHE, MAX_ENTRADAS
+from cliente_llm import obtener_cliente_llm, obtener_proveedor_llm
+from prompts_ia import construir_fases_ia
+
+# Importar configuración de API (con valores por defecto si falta algún parámetro)
+try:
+    import config_api
+except ImportError:
+    config_api = None
+
+GROQ_MODEL = getattr(config_api, 'GROQ_MODEL', "openai/gpt-oss-20b")
+GROQ_TEMPERATURE = getattr(config_api, 'GROQ_TEMPERATURE', 0.6)
+GROQ_TOP_P = getattr(config_api, 'GROQ_TOP_P', 0.9)
+GROQ_TIMEOUT_FASE = getattr(config_api, 'GROQ_TIMEOUT_FASE', 60)  # Segundos por solicitud
+IA_CACHE_TTL_HORAS = getattr(config_api, 'IA_CACHE_TTL_HORAS', TTL_SEGUNDOS / 3600)
+IA_CACHE_MAX_MB = getattr(config_api, 'IA_CACHE_MAX_MB', MAX_BYTES_CACHE / (1024 * 1024))
+IA_CACHE_MAX_ENTRADAS = getattr(config_api, 'IA_CACHE_MAX_ENTRADAS', MAX_ENTRADAS)
+IA_CACHE_DIRECTORIO = getattr(config_api, 'IA_CACHE_DIRECTORIO', None)
+
+_cache_ia = None
+_lock_cache_ia = threading.Lock()
+
+
+def obtener_cache_ia() -> CacheIA:
+    """Caché de respuestas de IA compartida por todo el proceso (se crea al primer uso)"""
+    global _cache_ia
+    with _lock_cache_ia:
+        if _cache_ia is None:
+            _cache_ia = CacheIA(
+                directorio=IA_CACHE_DIRECTORIO,
+                ttl_segundos=IA_CACHE_TTL_HORAS * 3600,
+                max_bytes=int(IA_CACHE_MAX_MB * 1024 * 1024),
+                max_entradas=IA_CACHE_MAX_ENTRADAS
+            )
+        return _cache_ia
+
+
+def configurar_cache_ia(**parametros) -> CacheIA:
+    """
+    Reemplaza la caché compartida (p. ej. para apuntar a otra carpeta)
+    
+    Sin parámetros, vuelve a la caché definida en config_api.
+    
+    Args:
+        **parametros: Argumentos de CacheIA (directorio, ttl_segundos, max_bytes, max_entradas)
+    
+    Returns:
+        La nueva caché
+    """
+    global _cache_ia
+    with _lock_cache_ia:
+        _cache_ia = CacheIA(**parametros) if parametros else None
+    return obtener_cache_ia()
+
+
+def huella_fase(fase: Dict[str, Any]) -> str:
+    """Huella de la solicitud de una fase con la configuración actual del modelo"""
+    return huella_solicitud(
+        GROQ_MODEL, GROQ_TEMPERATURE, fase['max_tokens'], GROQ_TOP_P, fase['sistema'], fase['prompt']
+    )
+
+
+def ejecutar_fase_ia(cliente: Groq, fase: Dict[str, Any], timeout: float = GROQ_TIMEOUT_FASE) -> str:
+    """
+    Envía la solicitud de una fase y devuelve el texto generado
+    
+    Args:
+        cliente: Cliente Groq
+        fase: Fase construida por construir_fases_ia
+        timeout: Segundos máximos de la solicitud
+    
+    Returns:
+        Texto del análisis de la fase
+    """
+    with obtener_proveedor_llm().solicitud():
+        completion = cliente.chat.completions.create(
+            model=GROQ_MODEL,
+            messages=[
+                {
+                    "role": "system",
+                    "content": fase['sistema']
+                },
+                {
+                    "role": "user",
+                    "content": fase['prompt']
+                }
+            ],
+            temperature=GROQ_TEMPERATURE,
+            max_tokens=fase['max_tokens'],
+            top_p=GROQ_TOP_P,
+            timeout=timeout
+        )
+    return completion.choices[0].message.content
+
+
+def ejecutar_fase_ia_streaming(cliente: Groq, fase: Dict[str, Any], timeout: float = GROQ_TIMEOUT_FASE) -> Iterator[str]:
+    """
+    Envía la solicitud de una fase en modo streaming
+    
+    Args:
+        cliente: Cliente Groq
+        fase: Fase construida por construir_fases_ia
+        timeout: Segundos máximos de la solicitud
+    
+    Yields:
+        Fragmentos de texto a medida que el modelo los genera
+    """
+    # El cupo de concurrencia se mantiene mientras dura el stream
+    with obtener_proveedor_llm().solicitud():
+        stream = cliente.chat.completions.create(
+            model=GROQ_MODEL,
+            messages=[
+                {
+                    "role": "system",
+                    "content": fase['sistema']
+                },
+                {
+                    "role": "user",
+                    "content": fase['prompt']
+                }
+            ],
+            temperature=GROQ_TEMPERATURE,
+            max_tokens=fase['max_tokens'],
+            top_p=GROQ_TOP_P,
+            timeout=timeout,
+            stream=True
+        )
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+
+def combinar_analisis_ia(empresa: str, fases: List[Dict[str, Any]], textos: Dict[str, str], errores: Dict[str, str]) -> str:
+    """
+    Une los textos de las fases en el informe final (marcando las fases fallidas)
+    
+    Args:
+        empresa: Nombre de la empresa
+        fases: Fases en el orden del informe
+        textos: {id_fase: texto generado}
+        errores: {id_fase: mensaje de error}
+    
+    Returns:
+        Informe en Markdown
+    """
+    secciones = []
+    for fase in fases:
+        if fase['id'] in textos:
+            contenido = textos[fase['id']]
+        else:
+            contenido = f"⚠️ *Esta fase no pudo generarse: {errores.get(fase['id'], 'error desconocido')}*"
+        secciones.append(f"## {fase['titulo']}\n\n{contenido}\n\n---\n")
+    
+    nota = ""
+    if errores:
+        nota = f"\n*⚠️ Análisis parcial: {len(errores)} de {len(fases)} fases no se completaron*\n"
+    
+    return (
+        f"# ANÁLISIS FINANCIERO INTEGRAL - {empresa}\n\n"
+        + "\n".join(secciones)
+        + nota
+        + "\n*Análisis generado mediante IA (OpenAI GPT-4o-mini via Groq) en 3 fases especializadas*\n"
+    )
+
+
+def analizar_ratios_con_ia(
+    resultados_ratios: Dict[str, Any],
+    empresa: str,
+    timeout_fase: float = GROQ_TIMEOUT_FASE,
+    usar_cache: bool = True
+) -> str:
+    """
+    Analiza los ratios financieros usando el modelo de IA de Groq en 3 solicitudes especializadas
+    
+    Las fases ya generadas con la misma huella se toman de la caché; las demás
+    se envían en paralelo. Si alguna falla o excede su tiempo máximo, el informe
+    incluye las demás con una nota (las fallidas no se guardan en caché).
+    
+    Args:
+        resultados_ratios: Diccionario con los ratios calculados
+        empresa: Nombre de la empresa
+        timeout_fase: Segundos máximos por solicitud
+        usar_cache: False para ignorar la caché y regenerar (el nuevo resultado la reemplaza)
+    
+    Returns:
+        str: Análisis completo generado por la IA (combinación de 3 análisis)
+    """
+    try:
+        fases = construir_fases_ia(resultados_ratios, empresa)
+        cache = obtener_cache_ia()
+        huellas = {fase['id']: huella_fase(fase) for fase in fases}
+        
+        # ✨ Reutilizar las fases ya generadas
+        textos = {}
+        errores = {}
+        if usar_cache:
+            for fase in fases:
+                texto = cache.obtener(huellas[fase['id']])
+                if texto is not None:
+                    textos[fase['id']] = texto
+        
+        pendientes = [fase for fase in fases if fase['id'] not in textos]
+        if pendientes:
+            # Cliente compartido: reutiliza las conexiones abiertas
+            client = obtener_cliente_llm()
+            
+            # Realizar las solicitudes pendientes en paralelo
+            with ThreadPoolExecutor(max_workers=len(pendientes), thread_name_prefix="fase_ia") as pool:
+                futuros = {fase['id']: pool.submit(ejecutar_fase_ia, client, fase, timeout_fase) for fase in pendientes}
+                for id_fase, futuro in futuros.items():
+                    try:
+                        textos[id_fase] = futuro.result()
+                    except Exception as e:
+                        print(f"⚠️ Fase de IA '{id_fase}' falló: {str(e)}")
+                        errores[id_fase] = str(e)
+                        continue
+                    cache.guardar(
+                        huellas[id_fase],
+                        textos[id_fase],
+                        {'modelo': GROQ_MODEL, 'fase': id_fase, 'empresa': empresa}
+                    )
+        
+        if not textos:
+            return f"❌ Error al generar análisis con IA: {next(iter(errores.values()))}"
+        
+        # Combinar los 3 análisis
+        return combinar_analisis_ia(empresa, fases, textos, errores)
+        
+    except Exception as e:
+        return f"❌ Error al generar análisis con IA: {str(e)}"
+
+
+def analizar_ratios_con_ia_streaming(
+    resultados_ratios: Dict[str, Any],
+    empresa: str,
+    timeout_fase: float = GROQ_TIMEOUT_FASE,
+    usar_cache: bool = True
+) -> Iterator[Dict[str, Any]]:
+    """
+    Variante en streaming de analizar_ratios_con_ia
+    
+    Las fases pendientes se solicitan en paralelo y sus fragmentos se entregan
+    intercalados, en el orden en que llegan. Las fases en caché se entregan
+    completas de inmediato.
+    
+    Args:
+        resultados_ratios: Diccionario con los ratios calculados
+        empresa: Nombre de la empresa
+        timeout_fase: Segundos máximos por solicitud
+        usar_cache: False para ignorar la caché y regenerar
+    
+    Yields:
+        Eventos (dict con 'tipo'):
+        - {'tipo': 'fases', 'fases': [{'id', 'titulo'}, ...]}: primer evento
+        - {'tipo': 'fragmento', 'fase': id, 'texto': str}: nuevo texto de una fase
+        - {'tipo': 'fin_fase', 'fase': id, 'error': str | None}: la fase terminó
+        - {'tipo': 'completo', 'texto': str}: informe final (mismo formato que analizar_ratios_con_ia)
+    """
+    try:
+        fases = construir_fases_ia(resultados_ratios, empresa)
+        cache = obtener_cache_ia()
+        huellas = {fase['id']: huella_fase(fase) for fase in fases}
+    except Exception as e:
+        yield {'tipo': 'completo', 'texto': f"❌ Error al generar análisis con IA: {str(e)}"}
+        return
+    
+    yield {'tipo': 'fases', 'fases': [{'id': fase['id'], 'titulo': fase['titulo']} for fase in fases]}
+    
+    textos = {}
+    errores = {}
+    if usar_cache:
+        for fase in fases:
+            texto = cache.obtener(huellas[fase['id']])
+            if texto is not None:
+                textos[fase['id']] = texto
+                yield {'tipo': 'fragmento', 'fase': fase['id'], 'texto': texto}
+                yield {'tipo': 'fin_fase', 'fase': fase['id'], 'error': None}
+    
+    pendientes = [fase for fase in fases if fase['id'] not in textos]
+    if pendientes:
+        eventos = queue.Queue()
+        detener = threading.Event()
+        
+        def producir(cliente, fase):
+            """Hilo de una fase: vuelca sus fragmentos en la cola común"""
+            partes = []
+            try:
+                for fragmento in ejecutar_fase_ia_streaming(cliente, fase, timeout_fase):
+                    if detener.is_set():
+                        return
+                    partes.append(fragmento)
+                    eventos.put({'tipo': 'fragmento', 'fase': fase['id'], 'texto': fragmento})
+            except Exception as e:
+                eventos.put({'tipo': 'fin_fase', 'fase': fase['id'], 'error': str(e)})
+                return
+            eventos.put({'tipo': 'fin_fase', 'fase': fase['id'], 'error': None, 'completo': "".join(partes)})
+        
+        try:
+            client = obtener_cliente_llm()
+        except Exception as e:
+            yield {'tipo': 'completo', 'texto': f"❌ Error al generar análisis con IA: {str(e)}"}
+            return
+        
+        pool = ThreadPoolExecutor(max_workers=len(pendientes), thread_name_prefix="fase_ia")
+        try:
+            for fase in pendientes:
+                pool.submit(producir, client, fase)
+            
+            activas = len(pendientes)
+            while activas:
+                evento = eventos.get()
+                if evento['tipo'] == 'fin_fase':
+                    activas -= 1
+                    id_fase = evento['fase']
+                    if evento['error'] is None:
+                        textos[id_fase] = evento.pop('completo')
+                        cache.guardar(
+                            huellas[id_fase],
+                            textos[id_fase],
+                            {'modelo': GROQ_MODEL, 'fase': id_fase, 'empresa': empresa}
+                        )
+                    else:
+                        print(f"⚠️ Fase de IA '{id_fase}' falló: {evento['error']}")
+                        errores[id_fase] = evento['error']
+                yield evento
+        finally:
+            # Si el consumidor abandona el generador, las fases en curso se detienen
+            detener.set()
+            pool.shutdown(wait=False)
+    
+    if not textos:
+        yield {'tipo': 'completo', 'texto': f"❌ Error al generar análisis con IA: {next(iter(errores.values()))}"}
+        return
+    
+    yield {'tipo': 'completo', 'texto': combinar_analisis_ia(empresa, fases, textos, errores)}
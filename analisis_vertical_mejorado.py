@@ -13,9 +13,22 @@ Reglas de cálculo:
 3. PATRIMONIO: NO SE CALCULA (se ignora todo después de "Total Pasivos")
 """
 
-import pandas as pd
 import re
 from typing import Dict, List, Tuple, Optional, Any
+from exportador_excel import LibroExcelStreaming, FORMATO_MILES, FORMATO_PORCENTAJE
+
+
+# Exportación a Excel: (clave del estado, lista de cuentas, nombre de hoja) y formatos
+HOJAS_EXCEL_VERTICAL = [
+    ('balance', 'activos', 'Activos'),
+    ('balance', 'pasivos', 'Pasivos'),
+    ('resultados', 'cuentas_analizadas', 'Resultados'),
+    ('flujo', 'cuentas_analizadas', 'Flujo Efectivo')
+]
+FORMATOS_EXCEL_VERTICAL = {
+    'valor': FORMATO_MILES,
+    'analisis_vertical': FORMATO_PORCENTAJE
+}
 
 
 class AnalisisVerticalMejorado:
@@ -556,53 +569,58 @@ class AnalisisVerticalMejorado:
         
         return resumen
     
-    def exportar_a_excel(self, resultados: Dict, archivo_salida: str):
+    def exportar_a_excel(self, resultados: Dict, archivo_salida: Optional[str] = None) -> bytes:
         """
         Exporta los resultados del análisis vertical a Excel con formato
+        
+        El libro se genera en memoria con formatos numéricos nativos (miles y %);
+        si se indica `archivo_salida` también se guarda en disco.
+        
+        Returns:
+            Contenido del libro en bytes (para st.download_button)
         """
-        with pd.ExcelWriter(archivo_salida, engine='openpyxl') as writer:
-            
-            # Hoja 1: Metadatos
-            df_meta = pd.DataFrame([{
-                'Empresa': resultados['empresa'],
-                'Año': resultados['año_documento'],
-                'Tipo': resultados['tipo'],
-                'Formato': resultados['formato'].upper()
-            }])
-            df_meta.to_excel(writer, sheet_name='Información', index=False)
-            
-            # Hoja 2: Balance - Activos
-            if 'balance' in resultados['estados_analizados']:
-                balance = resultados['estados_analizados']['balance']
-                
-                if balance['activos']:
-                    df_activos = pd.DataFrame(balance['activos'])
-                    df_activos['analisis_vertical'] = df_activos['analisis_vertical'].round(2)
-                    df_activos.to_excel(writer, sheet_name='Activos', index=False)
-                
-                # Hoja 3: Balance - Pasivos
-                if balance['pasivos']:
-                    df_pasivos = pd.DataFrame(balance['pasivos'])
-                    df_pasivos['analisis_vertical'] = df_pasivos['analisis_vertical'].round(2)
-                    df_pasivos.to_excel(writer, sheet_name='Pasivos', index=False)
-            
-            # Hoja 4: Estado de Resultados
-            if 'resultados' in resultados['estados_analizados']:
-                resultados_estado = resultados['estados_analizados']['resultados']
-                if resultados_estado['cuentas_analizadas']:
-                    df_resultados = pd.DataFrame(resultados_estado['cuentas_analizadas'])
-                    df_resultados['analisis_vertical'] = df_resultados['analisis_vertical'].round(2)
-                    df_resultados.to_excel(writer, sheet_name='Resultados', index=False)
-            
-            # Hoja 5: Flujo de Efectivo
-            if 'flujo' in resultados['estados_analizados']:
-                flujo = resultados['estados_analizados']['flujo']
-                if flujo['cuentas_analizadas']:
-                    df_flujo = pd.DataFrame(flujo['cuentas_analizadas'])
-                    df_flujo['analisis_vertical'] = df_flujo['analisis_vertical'].round(2)
-                    df_flujo.to_excel(writer, sheet_name='Flujo Efectivo', index=False)
-        
-        print(f"✅ Análisis exportado a: {archivo_salida}")
+        libro = LibroExcelStreaming()
+        self.escribir_hojas(libro, resultados)
+        contenido = libro.finalizar(archivo_salida)
+        
+        if archivo_salida:
+            print(f"✅ Análisis exportado a: {archivo_salida}")
+        return contenido
+    
+    def escribir_hojas(self, libro: LibroExcelStreaming, resultados: Dict, prefijo: str = ''):
+        """
+        Escribe las hojas del análisis vertical en un libro en streaming
+        
+        Args:
+            libro: Libro destino
+            resultados: Resultados de analizar_desde_extractor
+            prefijo: Texto antepuesto al nombre de cada hoja
+        """
+        # Hoja 1: Metadatos
+        libro.agregar_hoja(
+            f'{prefijo}Información',
+            ['Empresa', 'Año', 'Tipo', 'Formato'],
+            [[
+                resultados['empresa'],
+                resultados['año_documento'],
+                resultados['tipo'],
+                resultados['formato'].upper()
+            ]]
+        )
+        
+        # Hojas 2-5: Activos, Pasivos, Resultados y Flujo de Efectivo
+        for clave_estado, clave_lista, nombre_hoja in HOJAS_EXCEL_VERTICAL:
+            estado = resultados['estados_analizados'].get(clave_estado)
+            if estado and estado.get(clave_lista):
+                cuentas = estado[clave_lista]
+                # Unión de claves en orden de aparición (como pd.DataFrame)
+                columnas = list(dict.fromkeys(clave for cuenta in cuentas for clave in cuenta))
+                libro.agregar_hoja(
+                    f'{prefijo}{nombre_hoja}',
+                    columnas,
+                    ([cuenta.get(col) for col in columnas] for cuenta in cuentas),
+                    FORMATOS_EXCEL_VERTICAL
+                )
 
 
 # Función de uso rápido
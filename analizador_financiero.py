@@ -8,7 +8,7 @@ import re
 from bs4 import BeautifulSoup
 import numpy as np
 # import chardet  # No se usa en el código
-from typing import Dict, List, Tuple, Any
+from typing import Dict, List, Tuple, Any, Optional, Callable
 from analisis_vertical_horizontal import AnalisisVerticalHorizontal
 from extractor_estados_mejorado import ExtractorEstadosFinancieros
 from analisis_vertical_mejorado import AnalisisVerticalMejorado
@@ -16,21 +16,29 @@ from analisis_horizontal_mejorado import AnalisisHorizontalMejorado
 from analisis_vertical_consolidado import AnalisisVerticalConsolidado
 from analisis_horizontal_consolidado import AnalisisHorizontalConsolidado
 from ratios_financieros import CalculadorRatiosFinancieros
-from groq import Groq
 from descargador_smv import DescargadorSMV
+from descargador_smv_http import DescargadorSMVHttp
+from descarga_paralela import DescargadorParalelo, MAX_NAVEGADORES_GLOBAL
+from catalogo_empresas import obtener_catalogo
+from manifiesto_descargas import listar_archivos_descargas, nombre_carpeta_empresa
+from pool_navegadores import obtener_pool_navegadores
+from flujo_descarga_analisis import FlujoDescargaAnalisis
+from analisis_ia import analizar_ratios_con_ia, analizar_ratios_con_ia_streaming, obtener_cache_ia
+from almacen_sesion import AlmacenResultadosSesion, formatear_bytes
+from ejecutor_tareas import (
+    EjecutorTareas, ContextoTarea, ESTADOS_FINALES,
+    PENDIENTE, EJECUTANDO, COMPLETADA, FALLIDA, CANCELADA
+)
+from exportador_excel import (
+    LibroExcelStreaming, formatos_columnas, MIME_EXCEL, TEXTO_NO_DISPONIBLE,
+    FORMATO_MILES, FORMATO_PORCENTAJE, FORMATO_VARIACION
+)
+import hashlib
+import importlib.util
+import uuid
 
-# Importar configuración de API
-try:
-    from config_api import (
-        GROQ_API_KEY,
-        GROQ_MODEL,
-        GROQ_TEMPERATURE,
-        GROQ_MAX_TOKENS_FASE1,
-        GROQ_MAX_TOKENS_FASE2,
-        GROQ_MAX_TOKENS_FASE3,
-        GROQ_TOP_P
-    )
-except ImportError:
+# Comprobar la configuración de API (los parámetros se leen en analisis_ia.py y demás módulos)
+if importlib.util.find_spec("config_api") is None:
     st.error("""
     ❌ **Error: Archivo de configuración no encontrado**
     
@@ -55,199 +63,35 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-def analizar_ratios_con_ia(resultados_ratios: Dict[str, Any], empresa: str) -> str:
+def obtener_almacen_sesion() -> AlmacenResultadosSesion:
     """
-    Analiza los ratios financieros usando el modelo de IA de Groq en 3 solicitudes especializadas
+    Devuelve el almacén de resultados de la sesión actual (lo crea si no existe)
     
-    Args:
-        resultados_ratios: Diccionario con los ratios calculados
-        empresa: Nombre de la empresa
-    
-    Returns:
-        str: Análisis completo generado por la IA (combinación de 3 análisis)
+    Los resultados pesados (datos extraídos, DataFrames derivados) viven en el almacén
+    compacto con presupuesto de memoria en lugar de guardarse crudos en session_state.
     """
-    try:
-        # Inicializar cliente Groq con API key desde configuración
-        client = Groq(api_key=GROQ_API_KEY)
-        
-        # Preparar datos de ratios
-        años = sorted(resultados_ratios['años'])
-        ratios_por_año = resultados_ratios['ratios_por_año']
-        
-        # ==================== SOLICITUD 1: LIQUIDEZ Y ENDEUDAMIENTO ====================
-        prompt1 = f"""Eres un analista financiero experto. Analiza ÚNICAMENTE los ratios de LIQUIDEZ y ENDEUDAMIENTO de {empresa}.
-
-**EMPRESA:** {empresa}
-**AÑOS:** {', '.join(map(str, años))}
-
-**DATOS DE LIQUIDEZ Y ENDEUDAMIENTO:**
-"""
-        for año in años:
-            ratios = ratios_por_año[año]
-            prompt1 += f"\n**{año}:**\n"
-            prompt1 += f"• Liquidez Corriente: {ratios.get('liquidez_corriente', 'N/A')}\n"
-            prompt1 += f"• Prueba Ácida: {ratios.get('prueba_acida', 'N/A')}\n"
-            prompt1 += f"• Razón Deuda Total: {ratios.get('razon_deuda_total', 'N/A')}\n"
-            prompt1 += f"• Razón Deuda/Patrimonio: {ratios.get('razon_deuda_patrimonio', 'N/A')}\n"
-        
-        prompt1 += """
-**INSTRUCCIONES:**
-- Analiza SOLO liquidez y endeudamiento (NO menciones rentabilidad ni actividad)
-- Sé específico con los números y proporciona análisis DETALLADO
-- Identifica tendencias, alertas y explica sus causas probables
-- Proporciona contexto comparativo entre años
-- Máximo 15-18 líneas
-
-**ESTRUCTURA:**
-1. **LIQUIDEZ** (8-9 líneas): Analiza Liquidez Corriente y Prueba Ácida. ¿Puede pagar obligaciones a corto plazo? ¿Cómo ha evolucionado? ¿Qué significa cada cambio? ¿Es saludable para la industria?
-2. **ENDEUDAMIENTO** (7-9 líneas): Analiza Razón Deuda Total y Deuda/Patrimonio. ¿Nivel de riesgo? ¿Apalancamiento adecuado? ¿Tendencia? ¿Cómo afecta la capacidad de endeudamiento futuro? ¿Alertas específicas?
-"""
-        
-        # ==================== SOLICITUD 2: RENTABILIDAD Y ACTIVIDAD ====================
-        prompt2 = f"""Eres un analista financiero experto. Analiza ÚNICAMENTE los ratios de RENTABILIDAD y ACTIVIDAD de {empresa}.
-
-**EMPRESA:** {empresa}
-**AÑOS:** {', '.join(map(str, años))}
-
-**DATOS DE RENTABILIDAD Y ACTIVIDAD:**
-"""
-        for año in años:
-            ratios = ratios_por_año[año]
-            prompt2 += f"\n**{año}:**\n"
-            prompt2 += f"• Margen Neto: {ratios.get('margen_neto', 'N/A')}\n"
-            prompt2 += f"• ROA: {ratios.get('roa', 'N/A')}\n"
-            prompt2 += f"• ROE: {ratios.get('roe', 'N/A')}\n"
-            prompt2 += f"• Rotación Activos Totales: {ratios.get('rotacion_activos_totales', 'N/A')}\n"
-            prompt2 += f"• Rotación CxC: {ratios.get('rotacion_cuentas_cobrar', 'N/A')}\n"
-            prompt2 += f"• Rotación Inventarios: {ratios.get('rotacion_inventarios', 'N/A')}\n"
-        
-        prompt2 += """
-**INSTRUCCIONES:**
-- Analiza SOLO rentabilidad y actividad (NO menciones liquidez ni endeudamiento)
-- Sé específico con los números y proporciona análisis DETALLADO
-- Identifica si genera valor para accionistas y explica por qué
-- Compara entre años y explica cambios significativos
-- Máximo 18-20 líneas
-
-**ESTRUCTURA:**
-1. **RENTABILIDAD** (9-10 líneas): Analiza Margen Neto, ROA y ROE. ¿Genera ganancias suficientes? ¿Cómo ha evolucionado cada indicador? ¿El retorno es adecuado para los accionistas? ¿Qué factores pueden estar influyendo? ¿Comparación con tendencias del sector?
-2. **EFICIENCIA OPERATIVA** (9-10 líneas): Analiza rotaciones de activos, CxC e inventarios. ¿Uso eficiente de recursos? ¿Qué indican las rotaciones sobre la gestión operativa? ¿Problemas de cobranza o inventarios obsoletos? ¿Tendencia de mejora o deterioro?
-"""
-        
-        # ==================== SOLICITUD 3: CONCLUSIÓN GENERAL ====================
-        prompt3 = f"""Eres un analista financiero experto. Genera una CONCLUSIÓN GENERAL integradora sobre {empresa}.
-
-**EMPRESA:** {empresa}
-**AÑOS:** {', '.join(map(str, años))}
-
-**RESUMEN DE TODOS LOS RATIOS:**
-"""
-        for año in años:
-            ratios = ratios_por_año[año]
-            prompt3 += f"\n**{año}:** Liquidez={ratios.get('liquidez_corriente', 'N/A')}, Deuda={ratios.get('razon_deuda_total', 'N/A')}, ROE={ratios.get('roe', 'N/A')}, Rotación={ratios.get('rotacion_activos_totales', 'N/A')}\n"
-        
-        prompt3 += """
-**INSTRUCCIONES:**
-- Integra TODOS los aspectos: liquidez, endeudamiento, rentabilidad y eficiencia
-- Identifica el PATRÓN GENERAL entre años con análisis PROFUNDO
-- Evalúa salud financiera GLOBAL y perspectivas futuras
-- Proporciona 3-4 RECOMENDACIONES específicas, accionables y priorizadas
-- Máximo 15-18 líneas
-
-**ESTRUCTURA:**
-1. **DIAGNÓSTICO INTEGRAL** (6-7 líneas): ¿Cómo está la empresa en general? ¿Fortalezas principales? ¿Debilidades críticas? ¿Balance entre liquidez, rentabilidad y eficiencia? ¿Posición competitiva probable?
-2. **TENDENCIA GLOBAL** (4-5 líneas): ¿Mejorando o deteriorándose? ¿Sostenible a mediano plazo? ¿Riesgos principales? ¿Oportunidades visibles?
-3. **RECOMENDACIONES ESTRATÉGICAS** (5-6 líneas): 3-4 acciones concretas prioritarias con justificación breve. ¿Qué hacer primero? ¿Qué evitar?
-"""
-        
-        # Realizar las 3 solicitudes
-        analisis_partes = []
-        
-        # PARTE 1: Liquidez y Endeudamiento
-        completion1 = client.chat.completions.create(
-            model=GROQ_MODEL,
-            messages=[
-                {
-                    "role": "system",
-                    "content": "Eres un analista financiero experto en análisis de liquidez y endeudamiento. Proporciona análisis DETALLADOS y específicos centrados ÚNICAMENTE en estos aspectos. Explica causas, consecuencias y contexto."
-                },
-                {
-                    "role": "user",
-                    "content": prompt1
-                }
-            ],
-            temperature=GROQ_TEMPERATURE,
-            max_tokens=GROQ_MAX_TOKENS_FASE1,
-            top_p=GROQ_TOP_P
-        )
-        analisis_partes.append(completion1.choices[0].message.content)
-        
-        # PARTE 2: Rentabilidad y Actividad
-        completion2 = client.chat.completions.create(
-            model=GROQ_MODEL,
-            messages=[
-                {
-                    "role": "system",
-                    "content": "Eres un analista financiero experto en rentabilidad y eficiencia operativa. Proporciona análisis DETALLADOS y específicos centrados ÚNICAMENTE en estos aspectos. Explica causas, impactos y comparaciones."
-                },
-                {
-                    "role": "user",
-                    "content": prompt2
-                }
-            ],
-            temperature=GROQ_TEMPERATURE,
-            max_tokens=GROQ_MAX_TOKENS_FASE2,
-            top_p=GROQ_TOP_P
-        )
-        analisis_partes.append(completion2.choices[0].message.content)
-        
-        # PARTE 3: Conclusión General
-        completion3 = client.chat.completions.create(
-            model=GROQ_MODEL,
-            messages=[
-                {
-                    "role": "system",
-                    "content": "Eres un analista financiero senior que integra todos los aspectos financieros para dar un diagnóstico completo y recomendaciones estratégicas. Proporciona análisis PROFUNDO con visión holística y recomendaciones priorizadas."
-                },
-                {
-                    "role": "user",
-                    "content": prompt3
-                }
-            ],
-            temperature=GROQ_TEMPERATURE,
-            max_tokens=GROQ_MAX_TOKENS_FASE3,
-            top_p=GROQ_TOP_P
-        )
-        analisis_partes.append(completion3.choices[0].message.content)
-        
-        # Combinar los 3 análisis
-        analisis_completo = f"""# ANÁLISIS FINANCIERO INTEGRAL - {empresa}
-
-## 📊 PARTE 1: ANÁLISIS DE LIQUIDEZ Y ENDEUDAMIENTO
-
-{analisis_partes[0]}
-
----
-
-## 💰 PARTE 2: ANÁLISIS DE RENTABILIDAD Y EFICIENCIA
+    if 'almacen_resultados' not in st.session_state:
+        st.session_state['almacen_resultados'] = AlmacenResultadosSesion(id_sesion=uuid.uuid4().hex)
+    return st.session_state['almacen_resultados']
 
-{analisis_partes[1]}
+def clave_conjunto(resultados_analisis: List[Dict]) -> str:
+    """Clave estable de un conjunto de archivos (para cachear resultados consolidados)"""
+    claves = sorted(r.get('clave_cache', r['archivo']) for r in resultados_analisis)
+    return hashlib.md5("|".join(claves).encode('utf-8')).hexdigest()
 
----
-
-## 🎯 PARTE 3: CONCLUSIÓN GENERAL Y RECOMENDACIONES
-
-{analisis_partes[2]}
-
----
-
-*Análisis generado mediante IA (OpenAI GPT-4o-mini via Groq) en 3 fases especializadas*
-"""
-        
-        return analisis_completo
-        
-    except Exception as e:
-        return f"❌ Error al generar análisis con IA: {str(e)}"
+# Hojas del reporte completo
+HOJAS_REPORTE_CONSOLIDADO = [
+    ('estado_situacion_financiera', 'EF Situación Financiera'),
+    ('estado_resultados', 'EF Resultados'),
+    ('estado_flujo_efectivo', 'EF Flujo de Efectivo'),
+    ('estado_cambios_patrimonio', 'EF Cambios en Patrimonio')
+]
+SECCIONES_REPORTE_VERTICAL = [
+    ('balance', 'activos', 'Activos'),
+    ('balance', 'pasivos', 'Pasivos'),
+    ('resultados', 'cuentas_analizadas', 'Resultados'),
+    ('flujo', 'cuentas_analizadas', 'Flujo de Efectivo')
+]
 
 class AnalizadorFinanciero:
     def __init__(self):
@@ -383,6 +227,80 @@ class AnalizadorFinanciero:
             st.error(traceback.format_exc())
             return {}, {}
     
+    def procesar_archivo_sin_ui(
+        self,
+        nombre_archivo: str,
+        contenido: bytes,
+        clave_cache: str = None,
+        callback_progreso: Callable = None
+    ) -> Dict[str, Any]:
+        """
+        Procesa un archivo XLS completo sin llamadas a Streamlit
+        
+        Apto para ejecutarse en un hilo en segundo plano: guarda el archivo en temp/,
+        lo convierte a HTML, extrae los estados y calcula el análisis horizontal.
+        
+        Args:
+            nombre_archivo: Nombre original del archivo
+            contenido: Bytes del archivo
+            clave_cache: Clave del archivo en el almacén de la sesión
+            callback_progreso: Función callback para mensajes de progreso
+        
+        Returns:
+            Dict de resultado (archivo, clave_cache, datos, datos_extractor,
+            analisis_horizontal, resumen) o {'error': ...}
+        """
+        def reportar(mensaje):
+            if callback_progreso:
+                callback_progreso(mensaje)
+        
+        try:
+            # Guardar archivo y convertir a HTML (el XLS de la SMV ya es HTML)
+            ruta_temp = os.path.join(self.temp_dir, nombre_archivo)
+            with open(ruta_temp, 'wb') as f:
+                f.write(contenido)
+            
+            archivo_html = os.path.join(self.temp_dir, f"{Path(nombre_archivo).stem}.html")
+            shutil.copy2(ruta_temp, archivo_html)
+            
+            reportar(f"🔍 Extrayendo estados de {nombre_archivo}...")
+            with open(archivo_html, 'r', encoding='utf-8', errors='ignore') as f:
+                html_content = f.read()
+            
+            resultados_extractor = self.extractor_mejorado.extraer_todos_estados(html_content)
+            datos_extraidos = self._convertir_formato_mejorado_a_legacy(resultados_extractor)
+            
+            if not datos_extraidos:
+                return {'error': f'No se pudieron extraer datos de {nombre_archivo}'}
+            
+            reportar(f"📅 Año detectado: {resultados_extractor['año_documento']} | "
+                     f"📋 Formato: {resultados_extractor['formato'].upper()} | "
+                     f"📊 Estados: {len(resultados_extractor['estados'])}")
+            for error in resultados_extractor.get('errores', []):
+                reportar(f"⚠️ {error}")
+            
+            resumen = self.generar_resumen_analisis(datos_extraidos)
+            
+            # Análisis horizontal si es POST-2010
+            analisis_horizontal = None
+            if datos_extraidos.get('año_documento', 0) >= 2010:
+                try:
+                    analisis_horizontal = self.analizador_horizontal.analizar_desde_extractor(resultados_extractor)
+                except Exception as e:
+                    reportar(f"⚠️ No se pudo realizar análisis horizontal: {str(e)}")
+            
+            return {
+                'archivo': nombre_archivo,
+                'clave_cache': clave_cache,
+                'datos': datos_extraidos,
+                'datos_extractor': resultados_extractor,
+                'analisis_horizontal': analisis_horizontal,
+                'resumen': resumen
+            }
+        
+        except Exception as e:
+            return {'error': f'Error al procesar {nombre_archivo}: {str(e)}'}
+    
     def _convertir_formato_mejorado_a_legacy(self, resultados_mejorados: Dict) -> Dict[str, Any]:
         """
         Convierte el formato del extractor mejorado al formato legacy esperado por el código existente
@@ -1047,6 +965,592 @@ class AnalizadorFinanciero:
                 consolidado[nombre_estado] = df
         
         return consolidado
+    
+    # ===== RESULTADOS INTERMEDIOS EN CACHÉ (compartidos por pestañas y reporte) =====
+    
+    def _en_cache(self, almacen: Optional[AlmacenResultadosSesion], clave: str, funcion):
+        """Calcula `funcion` una sola vez por sesión si hay almacén disponible"""
+        if almacen is None:
+            return funcion()
+        return almacen.obtener_o_calcular(clave, funcion)
+    
+    def obtener_analisis_vertical(self, resultado: Dict, almacen: Optional[AlmacenResultadosSesion] = None) -> Dict:
+        """Análisis vertical de un archivo (calculado una vez por archivo)"""
+        clave = f"analisis_vertical::{resultado.get('clave_cache', resultado['archivo'])}"
+        return self._en_cache(
+            almacen, clave,
+            lambda: self.analizador_vertical.analizar_desde_extractor(resultado['datos_extractor'])
+        )
+    
+    def obtener_consolidado_estados(self, resultados_analisis: List[Dict], almacen: Optional[AlmacenResultadosSesion] = None) -> Dict[str, pd.DataFrame]:
+        """Estados financieros consolidados POST-2010 del conjunto de archivos"""
+        clave = f"consolidado_estados::{clave_conjunto(resultados_analisis)}"
+        return self._en_cache(almacen, clave, lambda: self.consolidar_multiples_archivos_post_2010(resultados_analisis))
+    
+    def obtener_consolidado_vertical(self, analisis_vertical_list: List[Dict], resultados_analisis: List[Dict],
+                                     almacen: Optional[AlmacenResultadosSesion] = None) -> Dict[str, pd.DataFrame]:
+        """Análisis vertical consolidado del conjunto de archivos"""
+        clave = f"consolidado_vertical::{clave_conjunto(resultados_analisis)}"
+        return self._en_cache(almacen, clave, lambda: self.consolidador_vertical.consolidar_analisis_vertical(analisis_vertical_list))
+    
+    def obtener_consolidado_horizontal(self, analisis_horizontal_list: List[Dict], resultados_analisis: List[Dict],
+                                       almacen: Optional[AlmacenResultadosSesion] = None) -> Dict[str, pd.DataFrame]:
+        """Análisis horizontal consolidado del conjunto de archivos"""
+        clave = f"consolidado_horizontal::{clave_conjunto(resultados_analisis)}"
+        return self._en_cache(almacen, clave, lambda: self.consolidador_horizontal.consolidar_analisis_horizontal(analisis_horizontal_list))
+    
+    def obtener_ratios(self, extractores: List[Dict], resultados_analisis: List[Dict],
+                       almacen: Optional[AlmacenResultadosSesion] = None) -> Dict[str, Any]:
+        """Ratios financieros del conjunto de archivos"""
+        clave = f"ratios::{clave_conjunto(resultados_analisis)}"
+        return self._en_cache(almacen, clave, lambda: self.calculador_ratios.calcular_ratios_desde_extractor(extractores))
+    
+    def generar_reporte_completo(
+        self,
+        resultados_analisis: List[Dict],
+        almacen: Optional[AlmacenResultadosSesion] = None,
+        archivo_salida: Optional[str] = None
+    ) -> bytes:
+        """
+        Genera un único libro Excel con todas las vistas del análisis
+        
+        Hojas: índice de archivos, estados financieros (formato largo), análisis
+        vertical y horizontal por archivo, estados consolidados, consolidados
+        vertical/horizontal y ratios. Los resultados intermedios se toman del
+        almacén de la sesión (los mismos que usan las pestañas) y el libro se
+        escribe en streaming, fila por fila.
+        
+        Args:
+            resultados_analisis: Resultados de los archivos procesados
+            almacen: Almacén de la sesión con los resultados intermedios (opcional)
+            archivo_salida: Ruta para guardar también en disco (opcional)
+        
+        Returns:
+            Contenido del libro en bytes
+        """
+        libro = LibroExcelStreaming()
+        
+        # Mismo orden y filtros que las pestañas: así se reutilizan sus resultados en caché
+        archivos_post_2010 = [
+            r for r in resultados_analisis
+            if r.get('datos', {}).get('año_documento', 0) >= 2010 and r.get('datos_extractor')
+        ]
+        
+        # Hoja 1: Índice de archivos
+        libro.agregar_hoja(
+            'Información',
+            ['Archivo', 'Empresa', 'Año', 'Tipo', 'Estados Encontrados', 'Total Cuentas'],
+            ([
+                r['archivo'],
+                r['resumen'].get('empresa'),
+                r['resumen'].get('año_reporte'),
+                r['resumen'].get('tipo_reporte'),
+                ', '.join(r['resumen'].get('estados_encontrados', [])),
+                r['resumen'].get('total_datos_extraidos')
+            ] for r in resultados_analisis)
+        )
+        
+        # Hoja 2: Estados financieros de todos los archivos (formato largo)
+        libro.agregar_hoja(
+            'Estados Financieros',
+            ['Archivo', 'Año Documento', 'Estado', 'Cuenta', 'Es Total', 'Año', 'Valor'],
+            self._filas_estados_financieros(resultados_analisis),
+            {'Valor': FORMATO_MILES}
+        )
+        
+        # Hoja 3: Análisis vertical por archivo
+        analisis_vertical_list = [self.obtener_analisis_vertical(r, almacen) for r in archivos_post_2010]
+        libro.agregar_hoja(
+            'Análisis Vertical',
+            ['Archivo', 'Año', 'Estado', 'Sección', 'Cuenta', 'Valor', '% Vertical'],
+            self._filas_analisis_vertical(archivos_post_2010, analisis_vertical_list),
+            {'Valor': FORMATO_MILES, '% Vertical': FORMATO_PORCENTAJE}
+        )
+        
+        # Hoja 4: Análisis horizontal por archivo
+        archivos_con_ah = [r for r in archivos_post_2010 if r.get('analisis_horizontal')]
+        libro.agregar_hoja(
+            'Análisis Horizontal',
+            ['Archivo', 'Estado', 'Año Base', 'Año Actual', 'Cuenta', 'Valor Año Base',
+             'Valor Año Actual', 'Variación Absoluta', 'Análisis Horizontal (%)', 'Estado Variación'],
+            self._filas_analisis_horizontal(archivos_con_ah),
+            {'Valor Año Base': FORMATO_MILES, 'Valor Año Actual': FORMATO_MILES,
+             'Variación Absoluta': FORMATO_MILES, 'Análisis Horizontal (%)': FORMATO_VARIACION},
+            TEXTO_NO_DISPONIBLE
+        )
+        
+        # Hojas 5+: Estados consolidados (montos por año)
+        consolidado_estados = self.obtener_consolidado_estados(resultados_analisis, almacen)
+        for clave_estado, nombre_hoja in HOJAS_REPORTE_CONSOLIDADO:
+            if clave_estado in consolidado_estados:
+                df = consolidado_estados[clave_estado]
+                libro.agregar_dataframe(
+                    nombre_hoja, df,
+                    formatos_columnas(df.columns, FORMATO_MILES, excluir=('Cuenta', 'CCUENTA'))
+                )
+        
+        # Consolidados vertical y horizontal (requieren al menos 2 archivos)
+        if len(analisis_vertical_list) >= 2:
+            consolidado_av = self.obtener_consolidado_vertical(analisis_vertical_list, resultados_analisis, almacen)
+            self.consolidador_vertical.escribir_hojas_consolidado(libro, consolidado_av, prefijo='AV ')
+        
+        if len(archivos_con_ah) >= 2:
+            consolidado_ah = self.obtener_consolidado_horizontal(
+                [r['analisis_horizontal'] for r in archivos_con_ah], resultados_analisis, almacen
+            )
+            self.consolidador_horizontal.escribir_hojas_consolidado(libro, consolidado_ah, prefijo='AH ')
+        
+        # Ratios financieros
+        if archivos_post_2010:
+            resultados_ratios = self.obtener_ratios(
+                [r['datos_extractor'] for r in archivos_post_2010], resultados_analisis, almacen
+            )
+            if 'error' not in resultados_ratios and resultados_ratios.get('ratios_por_año'):
+                self.calculador_ratios.escribir_hojas_ratios(libro, resultados_ratios, prefijo='Ratios - ')
+        
+        contenido = libro.finalizar(archivo_salida)
+        print(f"✅ Reporte completo generado: {len(libro.hojas)} hojas")
+        return contenido
+    
+    def _filas_estados_financieros(self, resultados_analisis: List[Dict]):
+        """Genera filas (archivo, estado, cuenta, año, valor) de los estados en formato legacy"""
+        for resultado in resultados_analisis:
+            año_doc = resultado['datos'].get('año_documento')
+            for info_estado in resultado['datos'].get('estados_financieros', {}).values():
+                for item in info_estado.get('datos', []):
+                    for clave, valor in item.items():
+                        if isinstance(valor, dict) and str(clave).isdigit():
+                            yield [
+                                resultado['archivo'], año_doc, info_estado['nombre'],
+                                item.get('cuenta', ''), item.get('es_total', False),
+                                int(clave), valor.get('numero', 0)
+                            ]
+    
+    def _filas_analisis_vertical(self, archivos: List[Dict], analisis_vertical_list: List[Dict]):
+        """Genera filas del análisis vertical de cada archivo"""
+        for resultado, analisis in zip(archivos, analisis_vertical_list):
+            año_doc = analisis.get('año_documento')
+            for clave_estado, clave_lista, seccion in SECCIONES_REPORTE_VERTICAL:
+                estado = analisis.get('estados_analizados', {}).get(clave_estado)
+                if not estado:
+                    continue
+                for cuenta in estado.get(clave_lista, []):
+                    yield [
+                        resultado['archivo'], año_doc, estado.get('nombre_estado'), seccion,
+                        cuenta.get('cuenta'), cuenta.get('valor'), cuenta.get('analisis_vertical')
+                    ]
+    
+    def _filas_analisis_horizontal(self, archivos: List[Dict]):
+        """Genera filas del análisis horizontal de cada archivo"""
+        for resultado in archivos:
+            for estado in resultado['analisis_horizontal'].get('estados_analizados', {}).values():
+                for cuenta in estado.get('cuentas_analizadas', []):
+                    yield [
+                        resultado['archivo'], estado.get('nombre_estado'),
+                        estado.get('año_base'), estado.get('año_actual'),
+                        cuenta.get('cuenta'), cuenta.get('valor_año_base'), cuenta.get('valor_año_actual'),
+                        cuenta.get('variacion_absoluta'), cuenta.get('analisis_horizontal'),
+                        cuenta.get('estado_variacion')
+                    ]
+
+# Estados mostrados en las pestañas individuales: (clave legacy, título de pestaña, nombre)
+ESTADOS_INDIVIDUALES = [
+    ('estado_situacion_financiera', "📊 Estado de Situación Financiera", "Estado de Situación Financiera"),
+    ('estado_resultados', "💰 Estado de Resultados", "Estado de Resultados"),
+    ('estado_cambios_patrimonio', "🏛️ Estado de Cambios en el Patrimonio", "Estado de Cambios en el Patrimonio"),
+    ('estado_flujo_efectivo', "💵 Estado de Flujo de Efectivo", "Estado de Flujo de Efectivo")
+]
+
+def normalizar_columnas_miles(df: pd.DataFrame, columnas: List[Any]) -> pd.DataFrame:
+    """
+    Deja las columnas como números (NaN para ceros y vacíos, que se muestran como '-')
+    
+    Opera por columna completa; el separador de miles lo aplica estilo_miles() al mostrar.
+    """
+    df_numerico = df.copy()
+    for col in columnas:
+        valores = pd.to_numeric(df_numerico[col], errors='coerce')
+        df_numerico[col] = valores.where(valores != 0)
+    return df_numerico
+
+def estilo_miles(df: pd.DataFrame) -> Any:
+    """Styler con separador de miles en las columnas de años ('-' para vacíos)"""
+    return df.style.format({col: "{:,.0f}" for col in df.columns if col != 'Cuenta'}, na_rep="-")
+
+def construir_tabla_estado(info_estado: Dict[str, Any]) -> pd.DataFrame:
+    """
+    Construye la tabla de visualización (Cuenta + años descendentes) de un estado financiero legacy
+    
+    Args:
+        info_estado: Estado en formato legacy ({'nombre', 'datos': [...]})
+    
+    Returns:
+        DataFrame numérico (mostrar con estilo_miles)
+    """
+    datos = info_estado.get('datos', [])
+    if not datos:
+        return pd.DataFrame()
+    
+    # Detectar columnas de años una sola vez (no en cada cuenta)
+    columnas_años = {}
+    for item in datos:
+        for clave, valor in item.items():
+            if clave != 'cuenta' and clave not in columnas_años:
+                columnas_años[clave] = isinstance(valor, dict) or any(char.isdigit() for char in str(clave))
+    años_cols = sorted([clave for clave, es_año in columnas_años.items() if es_año], key=str, reverse=True)
+    
+    # Construir columnas completas en lugar de filas dict por dict
+    tabla = {'Cuenta': [item.get('cuenta', 'Sin cuenta') for item in datos]}
+    for año in años_cols:
+        columna = []
+        for item in datos:
+            valor = item.get(año, 0)
+            columna.append(valor.get('numero', 0) if isinstance(valor, dict) else (valor if valor else 0))
+        tabla[año] = columna
+    
+    return normalizar_columnas_miles(pd.DataFrame(tabla, columns=['Cuenta'] + años_cols), años_cols)
+
+def obtener_tabla_estado(almacen: AlmacenResultadosSesion, resultado: Dict[str, Any], estado_key: str) -> pd.DataFrame:
+    """Devuelve la tabla de un estado del archivo, construyéndola solo la primera vez"""
+    clave = f"tabla_estado::{resultado.get('clave_cache', resultado['archivo'])}::{estado_key}"
+    info_estado = resultado['datos'].get('estados_financieros', {}).get(estado_key, {})
+    return almacen.obtener_o_calcular(clave, lambda: construir_tabla_estado(info_estado))
+
+# ===== TAREAS EN SEGUNDO PLANO =====
+
+INTERVALO_SONDEO_TAREAS = 2   # Segundos entre consultas del panel de tareas
+MAX_TAREAS_PANEL = 5          # Tareas recientes mostradas por sesión
+PREFIJO_ANALIZADO = "📊 Analizado"  # Mensaje de la tarea de descarga cuando un año ya tiene resultados
+
+ICONOS_ESTADO_TAREA = {
+    PENDIENTE: "🕒",
+    EJECUTANDO: "⏳",
+    COMPLETADA: "✅",
+    FALLIDA: "❌",
+    CANCELADA: "🛑"
+}
+
+@st.cache_resource
+def obtener_ejecutor() -> EjecutorTareas:
+    """Ejecutor de tareas compartido por todo el proceso (sobrevive a los reruns)"""
+    return EjecutorTareas()
+
+def clave_archivo_analisis(nombre_archivo: str, contenido: bytes) -> str:
+    """Clave de un archivo en el almacén de la sesión (cambia si cambia el contenido)"""
+    return f"archivo::{nombre_archivo}::{hashlib.md5(contenido).hexdigest()}"
+
+def tarea_descarga_smv(contexto: ContextoTarea, nombre_empresa: str, año_inicio: int, año_fin: int, headless: bool,
+                       http_directo: bool = False, sesiones: int = 1, refrescar_recientes: int = 0,
+                       almacen: AlmacenResultadosSesion = None) -> Dict:
+    """
+    Tarea: descarga automática desde la SMV (navegador o HTTP directo, con una o varias sesiones)
+    
+    Si se recibe el almacén de la sesión, cada archivo se extrae en cuanto llega a disco
+    (flujo descarga → análisis) y su resultado queda listo antes de que termine la descarga.
+    """
+    contexto.reportar(f"🏢 Empresa: {nombre_empresa}")
+    contexto.reportar(f"📅 Años: {año_inicio} → {año_fin}")
+    if http_directo:
+        contexto.reportar("🚀 Modo: HTTP directo (sin navegador)")
+    else:
+        contexto.reportar(f"🚀 Modo: {'Rápido (headless)' if headless else 'Visible'}")
+    if sesiones > 1:
+        contexto.reportar(f"🧵 {sesiones} sesiones en paralelo")
+    
+    def callback_progreso(mensaje: str):
+        # El descargador anuncia cada año como "Procesando año X (i/n)"
+        coincidencia = re.search(r'\((\d+)/(\d+)\)', mensaje)
+        progreso = (int(coincidencia.group(1)) - 1) / int(coincidencia.group(2)) if coincidencia else None
+        contexto.reportar(mensaje.strip(), progreso)
+    
+    def descargar(callback_archivo: Callable = None) -> Dict:
+        parametros = dict(
+            nombre_empresa=nombre_empresa,
+            año_inicio=año_inicio,
+            año_fin=año_fin,
+            callback_progreso=callback_progreso,
+            debe_cancelar=contexto.debe_cancelar,
+            refrescar_recientes=refrescar_recientes,
+            callback_archivo=callback_archivo
+        )
+        
+        if http_directo:
+            # ✨ Sin navegador: reproduce los postbacks del formulario por HTTP
+            if sesiones > 1:
+                descargador_http = DescargadorParalelo(num_sesiones=sesiones, fabrica=DescargadorSMVHttp)
+            else:
+                descargador_http = DescargadorSMVHttp(download_dir=os.path.join(os.getcwd(), "descargas"))
+            resultado = descargador_http.proceso_completo(**parametros)
+            if 'error' not in resultado:
+                return resultado
+            contexto.reportar(f"⚠️ HTTP directo falló ({resultado['error']}). Reintentando con navegador...")
+        
+        if sesiones > 1:
+            # ✨ Varios navegadores aislados se reparten los años
+            pool = obtener_pool_navegadores() if headless else None
+            return DescargadorParalelo(num_sesiones=sesiones, headless=headless, pool=pool).proceso_completo(**parametros)
+        if headless:
+            # ✨ Navegador caliente del pool compartido: sin arranque de Chrome en cada descarga
+            with obtener_pool_navegadores().arrendar(os.path.join(os.getcwd(), "descargas")) as descargador:
+                return descargador.proceso_completo(**parametros)
+        descargador = DescargadorSMV(
+            download_dir=os.path.join(os.getcwd(), "descargas"),
+            driver_path=None,
+            headless=headless
+        )
+        return descargador.proceso_completo(**parametros)
+    
+    if almacen is None:
+        return descargar()
+    
+    # ✨ Flujo descarga → análisis: la extracción de cada año se solapa con la descarga de los siguientes
+    analizador = AnalizadorFinanciero()
+    
+    def procesar(archivo: Dict[str, Any]) -> Dict[str, Any]:
+        nombre_archivo = os.path.basename(archivo['ruta'])
+        with open(archivo['ruta'], 'rb') as f:
+            contenido = f.read()
+        clave_archivo = clave_archivo_analisis(nombre_archivo, contenido)
+        resultado = almacen.obtener(clave_archivo)
+        if resultado is not None:
+            return resultado  # Ya analizado (p. ej. reintento con navegador tras fallar HTTP)
+        resultado = analizador.procesar_archivo_sin_ui(nombre_archivo, contenido, clave_archivo)
+        if 'error' in resultado:
+            almacen.guardar(f"error::{clave_archivo}", resultado['error'])
+        else:
+            almacen.guardar(clave_archivo, resultado)
+        return resultado
+    
+    def al_procesar(archivo: Dict[str, Any], resultado: Dict[str, Any]):
+        if 'error' in resultado:
+            contexto.reportar(f"❌ Análisis de {archivo['año']}: {resultado['error']}")
+        else:
+            contexto.reportar(f"{PREFIJO_ANALIZADO} {archivo['año']}: {os.path.basename(archivo['ruta'])}")
+    
+    resultado = FlujoDescargaAnalisis(procesar, callback_resultado=al_procesar).ejecutar(descargar, contexto.debe_cancelar)
+    analisis = resultado['analisis']
+    if analisis['primer_resultado_s'] is not None:
+        contexto.reportar(f"✅ {analisis['procesados']} archivo(s) analizados; el primero a los "
+                          f"{analisis['primer_resultado_s']:.1f} s de {analisis['total_s']:.1f} s")
+    return resultado
+
+def tarea_extraccion_archivos(contexto: ContextoTarea, archivos: List[Tuple[str, bytes, str]],
+                              almacen: AlmacenResultadosSesion) -> Dict:
+    """Tarea: procesa archivos (nombre, contenido, clave) y guarda cada resultado en el almacén de la sesión"""
+    analizador = AnalizadorFinanciero()
+    procesados = 0
+    errores = []
+    
+    for idx, (nombre_archivo, contenido, clave_archivo) in enumerate(archivos):
+        if contexto.debe_cancelar():
+            # Los archivos restantes quedan marcados para que no se reencolen solos
+            for nombre_restante, _, clave_restante in archivos[idx:]:
+                almacen.guardar(f"error::{clave_restante}", "Procesamiento cancelado")
+            break
+        
+        contexto.reportar(f"📄 Procesando {nombre_archivo} ({idx + 1}/{len(archivos)})", idx / len(archivos))
+        resultado = analizador.procesar_archivo_sin_ui(nombre_archivo, contenido, clave_archivo, contexto.reportar)
+        
+        if 'error' in resultado:
+            errores.append(resultado['error'])
+            almacen.guardar(f"error::{clave_archivo}", resultado['error'])
+            contexto.reportar(f"❌ {resultado['error']}")
+        else:
+            almacen.guardar(clave_archivo, resultado)
+            procesados += 1
+    
+    return {'procesados': procesados, 'errores': errores}
+
+def tarea_analisis_ia(contexto: ContextoTarea, resultados_ratios: Dict[str, Any], empresa: str, clave: str, usar_cache: bool = True) -> Dict:
+    """Tarea: análisis de ratios con IA (3 fases, con caché persistente)"""
+    contexto.reportar("⏳ Generando análisis con IA (3 fases)...", 0.1)
+    texto = analizar_ratios_con_ia(resultados_ratios, empresa, usar_cache=usar_cache)
+    return {'clave': clave, 'empresa': empresa, 'texto': texto}
+
+def mostrar_analisis_ia_streaming(resultados_ratios: Dict[str, Any], empresa: str, usar_cache: bool = True) -> str:
+    """
+    Genera el análisis con IA mostrando cada fase a medida que llegan los fragmentos
+    
+    Al terminar, la vista provisional se borra: el informe final se muestra
+    con el mismo expander que el análisis en segundo plano.
+    
+    Returns:
+        Informe final (mismo formato que analizar_ratios_con_ia)
+    """
+    zona = st.empty()
+    texto_final = ""
+    with zona.container():
+        st.info("⚡ Recibiendo análisis de IA en tiempo real...")
+        marcadores = {}
+        textos = {}
+        for evento in analizar_ratios_con_ia_streaming(resultados_ratios, empresa, usar_cache=usar_cache):
+            if evento['tipo'] == 'fases':
+                for fase in evento['fases']:
+                    st.markdown(f"#### {fase['titulo']}")
+                    marcadores[fase['id']] = st.empty()
+                    marcadores[fase['id']].caption("⏳ Esperando respuesta...")
+                    textos[fase['id']] = ""
+            elif evento['tipo'] == 'fragmento':
+                textos[evento['fase']] += evento['texto']
+                marcadores[evento['fase']].markdown(textos[evento['fase']] + " ▌")
+            elif evento['tipo'] == 'fin_fase':
+                if evento['error']:
+                    marcadores[evento['fase']].warning(f"⚠️ Esta fase no pudo generarse: {evento['error']}")
+                else:
+                    marcadores[evento['fase']].markdown(textos[evento['fase']])
+            elif evento['tipo'] == 'completo':
+                texto_final = evento['texto']
+    zona.empty()
+    return texto_final
+
+def archivos_esperados_descarga(nombre_empresa: str, año_inicio: int, año_fin: int) -> List[str]:
+    """
+    Nombres (sin extensión) de los archivos que entregará una descarga: <EMPRESA>_<año>
+    
+    La empresa se resuelve con el mismo índice que usa el descargador, para obtener el
+    nombre oficial con el que se guardan los archivos.
+    """
+    try:
+        empresa = obtener_catalogo().indice().mejor(nombre_empresa)
+    except Exception:
+        empresa = None
+    carpeta_empresa = nombre_carpeta_empresa(empresa['text'] if empresa else nombre_empresa)
+    return [f"{carpeta_empresa}_{año}" for año in range(año_inicio, año_fin - 1, -1)]
+
+def archivos_en_espera_descarga() -> set:
+    """Archivos que extraerá una descarga en curso de esta sesión (flujo descarga → análisis)"""
+    ejecutor = obtener_ejecutor()
+    en_curso = st.session_state.setdefault('descargas_con_analisis', {})
+    
+    # Olvidar las descargas ya finalizadas
+    for id_tarea in list(en_curso):
+        tarea = ejecutor.estado(id_tarea)
+        if tarea is None or tarea['estado'] in ESTADOS_FINALES:
+            del en_curso[id_tarea]
+    
+    return {nombre for nombres in en_curso.values() for nombre in nombres}
+
+def encolar_extraccion(archivos_pendientes: List[Tuple[str, bytes, str]], almacen: AlmacenResultadosSesion):
+    """Envía a segundo plano los archivos que no están ya en proceso"""
+    ejecutor = obtener_ejecutor()
+    en_curso = st.session_state.setdefault('extracciones_en_curso', {})
+    
+    # Olvidar las claves de tareas ya finalizadas
+    for clave, id_tarea in list(en_curso.items()):
+        tarea = ejecutor.estado(id_tarea)
+        if tarea is None or tarea['estado'] in ESTADOS_FINALES:
+            del en_curso[clave]
+    
+    nuevos = [archivo for archivo in archivos_pendientes if archivo[2] not in en_curso]
+    if not nuevos:
+        return
+    
+    id_tarea = ejecutor.enviar(
+        tarea_extraccion_archivos, nuevos, almacen,
+        tipo='extraccion',
+        descripcion=f"Extracción de {len(nuevos)} archivo(s)",
+        id_sesion=almacen.id_sesion
+    )
+    for _, _, clave in nuevos:
+        en_curso[clave] = id_tarea
+
+def atender_tarea_finalizada(tarea: Dict[str, Any], ejecutor: EjecutorTareas) -> bool:
+    """
+    Aplica en la sesión el resultado de una tarea recién finalizada
+    
+    Returns:
+        True si la aplicación completa debe volver a ejecutarse para mostrarlo
+    """
+    resultado = ejecutor.resultado(tarea['id'])
+    
+    if tarea['tipo'] == 'descarga':
+        if resultado is None:
+            return False
+        st.session_state['ultimo_resultado_descarga'] = resultado
+        if 'error' not in resultado and resultado.get('total_exitosos', 0) > 0:
+            # Mismo flujo que la descarga síncrona: cargar y analizar los archivos descargados
+            st.session_state['archivos_descargados'] = resultado
+            st.session_state['analizar_descargados'] = True
+        return True
+    
+    if tarea['tipo'] == 'extraccion':
+        return True
+    
+    if tarea['tipo'] == 'ia':
+        if resultado is not None:
+            st.session_state['resultado_analisis_ia'] = resultado
+        return True
+    
+    return False
+
+@st.fragment(run_every=INTERVALO_SONDEO_TAREAS)
+def mostrar_panel_tareas():
+    """Panel de tareas en segundo plano de la sesión (se refresca solo, sin rerun completo)"""
+    ejecutor = obtener_ejecutor()
+    tareas = ejecutor.listar(obtener_almacen_sesion().id_sesion)[:MAX_TAREAS_PANEL]
+    if not tareas:
+        return
+    
+    st.markdown("**🧵 Tareas en segundo plano**")
+    atendidas = st.session_state.setdefault('tareas_atendidas', set())
+    recargar_app = False
+    
+    for tarea in tareas:
+        st.caption(f"{ICONOS_ESTADO_TAREA.get(tarea['estado'], '•')} {tarea['descripcion']} — {tarea['estado']}")
+        
+        if tarea['estado'] not in ESTADOS_FINALES:
+            st.progress(tarea['progreso'])
+            if tarea['mensajes']:
+                st.caption(tarea['mensajes'][-1])
+            # ✨ Un año recién analizado por el flujo descarga → análisis: mostrarlo sin esperar al final
+            analizados = [m for m in tarea['mensajes'] if m.startswith(PREFIJO_ANALIZADO)]
+            vistos = st.session_state.setdefault('analizados_vistos', {})
+            if analizados and vistos.get(tarea['id']) != analizados[-1]:
+                vistos[tarea['id']] = analizados[-1]
+                recargar_app = True
+            if st.button("🛑 Cancelar", key=f"cancelar_tarea_{tarea['id']}"):
+                ejecutor.cancelar(tarea['id'])
+        else:
+            if tarea['estado'] == FALLIDA and tarea['error']:
+                st.caption(f"❌ {tarea['error'].splitlines()[0]}")
+            if tarea['id'] not in atendidas:
+                atendidas.add(tarea['id'])
+                recargar_app = atender_tarea_finalizada(tarea, ejecutor) or recargar_app
+                if tarea['estado'] != FALLIDA:
+                    # ✨ Resultado ya aplicado en la sesión: se liberan sus archivos (los fallos se ven hasta caducar)
+                    ejecutor.eliminar(tarea['id'])
+    
+    if recargar_app:
+        st.rerun(scope="app")
+
+def mostrar_resumen_archivo(resumen: Dict[str, Any]):
+    """Muestra las métricas básicas y los estados detectados de un archivo procesado"""
+    col1, col2, col3 = st.columns(3)
+    
+    with col1:
+        st.metric("Empresa", resumen['empresa'])
+    
+    with col2:
+        st.metric("Año", resumen['año_reporte'])
+    
+    with col3:
+        st.metric("Datos extraídos", resumen['total_datos_extraidos'])
+    
+    # Mostrar estados encontrados
+    if resumen['estados_encontrados']:
+        st.write("**Estados financieros detectados:**")
+        for estado in resumen['estados_encontrados']:
+            st.write(f"- {estado}")
+    
+    # Mostrar años disponibles
+    if resumen['años_disponibles']:
+        st.write("**Años disponibles:**")
+        st.write(", ".join(str(año) for año in resumen['años_disponibles']))
+    
+    # Mostrar cabeceras disponibles
+    if resumen['cabeceras_disponibles']:
+        st.write("**Cabeceras de columnas detectadas:**")
+        st.write(", ".join(str(cabecera) for cabecera in resumen['cabeceras_disponibles'][:10]))  # Mostrar solo las primeras 10
 
 def main():
     st.title("📊 Analizador Financiero con Streamlit")
@@ -1099,24 +1603,14 @@ def main():
         if boton_buscar and nombre_empresa_busqueda and len(nombre_empresa_busqueda) >= 3:
             with st.spinner("🔎 Buscando empresas..."):
                 try:
-                    # Crear instancia temporal para obtener empresas
-                    download_dir = os.path.join(os.getcwd(), "descargas")
-                    descargador_temp = DescargadorSMV(download_dir, headless=True)
+                    # ✨ Catálogo local con índice: sin abrir el navegador en cada búsqueda
+                    # (la lista solo se vuelve a pedir a la SMV cuando caduca)
+                    empresas_coincidentes = obtener_catalogo().buscar(nombre_empresa_busqueda, limite=50)
+                    # ✨ Mientras el usuario elige, se deja un navegador listo para la descarga
+                    obtener_pool_navegadores().precalentar(1)
                     
-                    # Iniciar navegador y obtener empresas
-                    if descargador_temp.iniciar_navegador():
-                        empresas_disponibles = descargador_temp.obtener_empresas_disponibles()
-                        descargador_temp.cerrar_navegador()
-                        
-                        # Filtrar empresas que coincidan con la búsqueda
-                        busqueda_lower = nombre_empresa_busqueda.lower()
-                        empresas_coincidentes = [
-                            emp for emp in empresas_disponibles
-                            if busqueda_lower in emp['text'].lower()
-                        ]
-                        
-                        # Guardar resultados en session_state
-                        st.session_state['empresas_encontradas'] = empresas_coincidentes
+                    # Guardar resultados en session_state
+                    st.session_state['empresas_encontradas'] = empresas_coincidentes
                         
                 except Exception as e:
                     st.error(f"❌ Error en búsqueda: {str(e)}")
@@ -1127,6 +1621,9 @@ def main():
             
             if empresas_coincidentes:
                 st.success(f"✅ {len(empresas_coincidentes)} empresa(s) encontrada(s)")
+                estado_catalogo = obtener_catalogo().estado()
+                if estado_catalogo['antiguedad_horas'] is not None:
+                    st.caption(f"📇 Catálogo de {estado_catalogo['empresas']} empresas, actualizado hace {estado_catalogo['antiguedad_horas']:.1f} h")
                 
                 # Crear lista de nombres para el selectbox
                 nombres_empresas = [emp['text'] for emp in empresas_coincidentes]
@@ -1173,90 +1670,97 @@ def main():
             help="Si activas esto, verás el navegador Chrome. Desactivado = más rápido"
         )
         
-        # Botón de descarga
+        http_directo = st.checkbox(
+            "⚡ Descarga directa HTTP (sin navegador)",
+            value=False,
+            help="Reproduce el formulario de la SMV sin abrir Chrome: mucho más rápido. Si falla, se reintenta con el navegador"
+        )
+        
+        sesiones_paralelas = st.slider(
+            "🧵 Sesiones en paralelo",
+            min_value=1,
+            max_value=MAX_NAVEGADORES_GLOBAL,
+            value=min(3, MAX_NAVEGADORES_GLOBAL),
+            help="Cada sesión descarga años distintos con su propio navegador y carpeta. Más sesiones = más rápido, pero más memoria"
+        )
+        
+        # ✨ Los años ya descargados (según el manifiesto) se omiten salvo que se fuerce
+        forzar_descarga = st.checkbox(
+            "🔁 Volver a descargar los años ya guardados",
+            value=False,
+            help="Por defecto solo se descargan los años que faltan en la carpeta descargas/"
+        )
+        
+        # ✨ Flujo descarga → análisis: cada año se extrae apenas llega, sin esperar al resto
+        analizar_al_descargar = st.checkbox(
+            "📊 Analizar cada año en cuanto se descargue",
+            value=True,
+            help="Los resultados de los primeros años aparecen mientras los siguientes aún se descargan"
+        )
+        
+        # Botón de descarga: ✨ se ejecuta en segundo plano (la interfaz no se congela)
         if st.button("🚀 Iniciar Descarga Automática", disabled=(año_inicio < año_fin)):
             if not nombre_empresa_final:
                 st.error("❌ Por favor, ingresa el nombre de la empresa")
             else:
-                st.info("🔄 Proceso de descarga iniciado...")
+                almacen_sesion = obtener_almacen_sesion()
+                id_tarea = obtener_ejecutor().enviar(
+                    tarea_descarga_smv,
+                    nombre_empresa_final, int(año_inicio), int(año_fin), not modo_visible,
+                    http_directo=http_directo,
+                    sesiones=sesiones_paralelas,
+                    refrescar_recientes=(int(año_inicio) - int(año_fin) + 1) if forzar_descarga else 0,
+                    almacen=almacen_sesion if analizar_al_descargar else None,
+                    tipo='descarga',
+                    descripcion=f"Descarga SMV: {nombre_empresa_final} ({int(año_inicio)} → {int(año_fin)})",
+                    id_sesion=almacen_sesion.id_sesion
+                )
+                if analizar_al_descargar:
+                    # Solo los archivos de esta empresa y rango los extrae la propia descarga
+                    st.session_state.setdefault('descargas_con_analisis', {})[id_tarea] = archivos_esperados_descarga(
+                        nombre_empresa_final, int(año_inicio), int(año_fin)
+                    )
+                    # Mostrar la carpeta de descargas desde ya: los años analizados aparecen a medida que llegan
+                    st.session_state['usando_descarga_automatica'] = True
+                    st.session_state['carpeta_descargas_activa'] = os.path.join(os.getcwd(), "descargas")
+                st.info("🔄 Descarga iniciada en segundo plano. Sigue el progreso en el panel de tareas.")
+        
+        # Resultado de la última descarga finalizada
+        resultado = st.session_state.get('ultimo_resultado_descarga')
+        if resultado:
+            if 'error' in resultado:
+                st.error(f"❌ {resultado['error']}")
+            else:
+                st.success("✅ Descarga completada!" if not resultado.get('cancelado') else "🛑 Descarga cancelada")
                 
-                # Crear contenedor para progreso
-                contenedor_progreso = st.container()
+                col_res1, col_res2, col_res3 = st.columns(3)
+                with col_res1:
+                    st.metric("Empresa", resultado['empresa'])
+                with col_res2:
+                    st.metric("Archivos descargados", resultado['total_exitosos'])
+                with col_res3:
+                    st.metric("Errores", resultado['total_fallidos'])
                 
-                with contenedor_progreso:
-                    # Crear área de texto para mensajes de progreso
-                    area_mensajes = st.empty()
-                    mensajes_acumulados = []
-                    
-                    def callback_streamlit(mensaje):
-                        """Callback para actualizar progreso en Streamlit"""
-                        mensajes_acumulados.append(mensaje)
-                        # Mostrar últimos 15 mensajes
-                        texto_mostrar = "\n".join(mensajes_acumulados[-15:])
-                        area_mensajes.text_area(
-                            "📋 Registro de Progreso",
-                            value=texto_mostrar,
-                            height=300,
-                            key=f"progreso_{len(mensajes_acumulados)}"
-                        )
-                    
-                    # Crear descargador con modo headless configurable
-                    try:
-                        callback_streamlit(f"🏢 Empresa: {nombre_empresa_final}")
-                        callback_streamlit(f"📅 Años: {año_inicio} → {año_fin}")
-                        callback_streamlit(f"🚀 Modo: {'Visible' if modo_visible else 'Rápido (headless)'}")
-                        
-                        descargador = DescargadorSMV(
-                            download_dir=os.path.join(os.getcwd(), "descargas"),
-                            driver_path=None,  # ✨ Usar webdriver-manager automático
-                            headless=not modo_visible  # ✨ Modo headless por defecto
-                        )
-                        
-                        # Ejecutar proceso completo
-                        resultado = descargador.proceso_completo(
-                            nombre_empresa=nombre_empresa_final,
-                            año_inicio=int(año_inicio),
-                            año_fin=int(año_fin),
-                            callback_progreso=callback_streamlit
-                        )
-                        
-                        # Mostrar resultados
-                        if 'error' in resultado:
-                            st.error(f"❌ {resultado['error']}")
-                        else:
-                            st.success("✅ Descarga completada!")
-                            
-                            col_res1, col_res2, col_res3 = st.columns(3)
-                            with col_res1:
-                                st.metric("Empresa", resultado['empresa'])
-                            with col_res2:
-                                st.metric("Archivos descargados", resultado['total_exitosos'])
-                            with col_res3:
-                                st.metric("Errores", resultado['total_fallidos'])
-                            
-                            if resultado['años_exitosos']:
-                                st.info(f"✅ Años descargados: {', '.join(map(str, resultado['años_exitosos']))}")
-                            
-                            if resultado['años_fallidos']:
-                                st.warning(f"⚠️ Años con error: {', '.join(map(str, resultado['años_fallidos']))}")
-                            
-                            st.markdown(f"📂 **Carpeta de descargas:** `{resultado['carpeta_descargas']}`")
-                            
-                            # ✨ NUEVA FUNCIONALIDAD: Cargar y analizar archivos automáticamente
-                            if resultado['total_exitosos'] > 0:
-                                st.info("� Cargando archivos descargados automáticamente para análisis...")
-                                
-                                # Guardar resultado en session_state para análisis posterior
-                                st.session_state['archivos_descargados'] = resultado
-                                st.session_state['analizar_descargados'] = True
-                                
-                                # Recargar página para procesar archivos
-                                st.rerun()
-                    
-                    except Exception as e:
-                        st.error(f"❌ Error en descarga automática: {str(e)}")
-                        import traceback
-                        st.code(traceback.format_exc())
+                if resultado['años_exitosos']:
+                    st.info(f"✅ Años descargados: {', '.join(map(str, resultado['años_exitosos']))}")
+                
+                if resultado.get('años_omitidos'):
+                    st.caption(f"⏭️ Ya estaban descargados (omitidos): {', '.join(map(str, resultado['años_omitidos']))}")
+                
+                if resultado['años_fallidos']:
+                    st.warning(f"⚠️ Años con error: {', '.join(map(str, resultado['años_fallidos']))}")
+                
+                if resultado.get('años_no_disponibles'):
+                    st.caption(f"➖ Sin estados financieros publicados en la SMV: {', '.join(map(str, resultado['años_no_disponibles']))}")
+                
+                if resultado.get('años_pendientes'):
+                    st.warning(f"🛑 Años no descargados: {', '.join(map(str, resultado['años_pendientes']))}")
+                
+                st.markdown(f"📂 **Carpeta de descargas:** `{resultado['carpeta_descargas']}`")
+    
+    # ✨ Panel de tareas en segundo plano (se actualiza solo)
+    with st.sidebar:
+        mostrar_panel_tareas()
     
     st.sidebar.markdown("---")
     st.sidebar.markdown("**O sube archivos manualmente:**")
@@ -1296,10 +1800,8 @@ def main():
         
         # Cargar archivos actuales de la carpeta
         if os.path.exists(carpeta_descargas):
-            archivos_en_descargas = [
-                f for f in os.listdir(carpeta_descargas)
-                if f.endswith(('.xls', '.xlsx'))
-            ]
+            # Incluye las subcarpetas por empresa (descargas/<EMPRESA>/<EMPRESA>_<año>.xls)
+            archivos_en_descargas = listar_archivos_descargas(carpeta_descargas)
             
             if archivos_en_descargas:
                 # Mostrar información de archivos con opción de eliminar
@@ -1349,7 +1851,8 @@ def main():
                         try:
                             with open(ruta_archivo, 'rb') as f:
                                 contenido = f.read()
-                                archivos_subidos.append(ArchivoSimulado(nombre_archivo, contenido, ruta_archivo))
+                                # Nombre sin subcarpeta: los nombres canónicos (<EMPRESA>_<año>.xls) ya son únicos
+                                archivos_subidos.append(ArchivoSimulado(os.path.basename(nombre_archivo), contenido, ruta_archivo))
                         except Exception as e:
                             st.warning(f"⚠️ Error al cargar {nombre_archivo}: {str(e)}")
                     
@@ -1378,10 +1881,7 @@ def main():
     # No mostrar esta opción si ya estamos en modo descarga automática
     if not st.session_state.get('usando_descarga_automatica', False):
         if os.path.exists(os.path.join(os.getcwd(), "descargas")):
-            archivos_en_descargas = [
-                f for f in os.listdir(os.path.join(os.getcwd(), "descargas"))
-                if f.endswith(('.xls', '.xlsx'))
-            ]
+            archivos_en_descargas = listar_archivos_descargas(os.path.join(os.getcwd(), "descargas"))
             
             if archivos_en_descargas:
                 st.sidebar.success(f"📂 {len(archivos_en_descargas)} archivo(s) en carpeta descargas")
@@ -1397,87 +1897,83 @@ def main():
         
         # Procesar cada archivo
         resultados_analisis = []
+        almacen = obtener_almacen_sesion()
+        
+        # ✨ Extracción en segundo plano: la interfaz no se bloquea y un rerun no la interrumpe
+        procesar_en_segundo_plano = st.sidebar.checkbox(
+            "⚙️ Procesar archivos en segundo plano",
+            value=True,
+            key="procesar_segundo_plano",
+            help="Extrae los archivos en un hilo aparte; los resultados aparecen al terminar"
+        )
+        archivos_pendientes = []
+        en_espera_descarga = archivos_en_espera_descarga() if st.session_state.get('usando_descarga_automatica', False) else set()
         
         for archivo in archivos_subidos:
             with st.expander(f"📄 Analizando: {archivo.name}"):
                 try:
-                    # Guardar archivo en directorio temporal
-                    ruta_temp = os.path.join(analizador.temp_dir, archivo.name)
-                    with open(ruta_temp, 'wb') as f:
-                        f.write(archivo.getbuffer())
+                    # ✨ Reutilizar el resultado de la sesión si el archivo no cambió (evita re-extraer en cada rerun)
+                    clave_archivo = clave_archivo_analisis(archivo.name, archivo.getbuffer())
+                    ruta_html_previa = os.path.join(analizador.temp_dir, f"{Path(archivo.name).stem}.html")
+                    resultado_cache = almacen.obtener(clave_archivo)
                     
-                    st.info("⏳ Convirtiendo XLS a HTML...")
+                    if resultado_cache is not None and os.path.exists(ruta_html_previa):
+                        st.success("♻️ Resultados reutilizados desde la caché de la sesión")
+                        resultados_analisis.append(resultado_cache)
+                        mostrar_resumen_archivo(resultado_cache['resumen'])
+                        continue
                     
-                    # Convertir a HTML
-                    archivo_html = analizador.convertir_xls_a_html(ruta_temp)
+                    # Error registrado por una tarea en segundo plano: no reencolar automáticamente
+                    error_previo = almacen.obtener(f"error::{clave_archivo}")
+                    if error_previo:
+                        st.error(f"❌ {error_previo}")
+                        if st.button("🔁 Reintentar", key=f"reintentar_{clave_archivo}"):
+                            almacen.eliminar(f"error::{clave_archivo}")
+                            st.rerun()
+                        continue
                     
-                    if archivo_html:
-                        st.success("✅ Conversión a HTML completada")
-                        
-                        st.info("⏳ Extrayendo datos financieros...")
-                        
-                        # Extraer datos (retorna tupla: datos_legacy, resultados_extractor)
-                        datos_extraidos, resultados_extractor = analizador.extraer_datos_html(archivo_html)
-                        
-                        if datos_extraidos:
-                            st.success("✅ Extracción de datos completada")
-                            
-                            # Generar resumen
-                            resumen = analizador.generar_resumen_analisis(datos_extraidos)
-                            
-                            # Realizar análisis horizontal si es POST-2010
-                            analisis_horizontal = None
-                            if datos_extraidos.get('año_documento', 0) >= 2010:
-                                try:
-                                    analisis_horizontal = analizador.analizador_horizontal.analizar_desde_extractor(resultados_extractor)
-                                except Exception as e:
-                                    st.warning(f"⚠️ No se pudo realizar análisis horizontal: {str(e)}")
-                            
-                            resultados_analisis.append({
-                                'archivo': archivo.name,
-                                'datos': datos_extraidos,
-                                'datos_extractor': resultados_extractor,  # ✨ Formato extractor para análisis horizontal/vertical
-                                'analisis_horizontal': analisis_horizontal,  # ✨ Análisis horizontal ya calculado
-                                'resumen': resumen
-                            })
-                            
-                            # Mostrar información básica
-                            col1, col2, col3 = st.columns(3)
-                            
-                            with col1:
-                                st.metric("Empresa", resumen['empresa'])
-                            
-                            with col2:
-                                st.metric("Año", resumen['año_reporte'])
-                            
-                            with col3:
-                                st.metric("Datos extraídos", resumen['total_datos_extraidos'])
-                            
-                            # Mostrar estados encontrados
-                            if resumen['estados_encontrados']:
-                                st.write("**Estados financieros detectados:**")
-                                for estado in resumen['estados_encontrados']:
-                                    st.write(f"- {estado}")
-                            
-                            # Mostrar años disponibles
-                            if resumen['años_disponibles']:
-                                st.write("**Años disponibles:**")
-                                st.write(", ".join(str(año) for año in resumen['años_disponibles']))
-                            
-                            # Mostrar cabeceras disponibles
-                            if resumen['cabeceras_disponibles']:
-                                st.write("**Cabeceras de columnas detectadas:**")
-                                st.write(", ".join(resumen['cabeceras_disponibles'][:10]))  # Mostrar solo las primeras 10
-                        
-                        else:
-                            st.error("❌ Error al extraer datos del archivo")
+                    if Path(archivo.name).stem in en_espera_descarga:
+                        # Lo extrae la propia tarea de descarga (flujo descarga → análisis)
+                        st.info("⏳ Se analizará junto con la descarga en curso...")
+                        continue
+                    
+                    if procesar_en_segundo_plano:
+                        archivos_pendientes.append((archivo.name, bytes(archivo.getbuffer()), clave_archivo))
+                        st.info("⏳ Procesando en segundo plano... los resultados aparecerán al terminar")
+                        continue
+                    
+                    st.info("⏳ Extrayendo datos financieros...")
+                    resultado = analizador.procesar_archivo_sin_ui(
+                        archivo.name, archivo.getbuffer(), clave_archivo, callback_progreso=st.write
+                    )
                     
+                    if 'error' in resultado:
+                        st.error(f"❌ {resultado['error']}")
                     else:
-                        st.error("❌ Error al convertir archivo a HTML")
+                        st.success("✅ Extracción de datos completada")
+                        resultados_analisis.append(resultado)
+                        
+                        # Guardar en el almacén compacto de la sesión
+                        almacen.guardar(clave_archivo, resultado)
+                        
+                        # Mostrar información básica
+                        mostrar_resumen_archivo(resultado['resumen'])
                 
                 except Exception as e:
                     st.error(f"❌ Error al procesar {archivo.name}: {str(e)}")
         
+        if archivos_pendientes:
+            encolar_extraccion(archivos_pendientes, almacen)
+        
+        # ✨ Uso de memoria del almacén de la sesión
+        reporte_almacen = almacen.reporte_memoria()
+        st.sidebar.caption(
+            f"🧠 Memoria de sesión: {formatear_bytes(reporte_almacen['bytes_memoria'])} / "
+            f"{formatear_bytes(reporte_almacen['max_bytes_memoria'])} · "
+            f"💾 Disco: {formatear_bytes(reporte_almacen['bytes_disco'])} · "
+            f"{reporte_almacen['datasets_memoria'] + reporte_almacen['datasets_disco']} dataset(s)"
+        )
+        
         # Mostrar análisis consolidado
         if resultados_analisis:
             st.header("📈 Análisis Consolidado")
@@ -1534,7 +2030,7 @@ def main():
                     
                     # Consolidar datos
                     with st.spinner("Consolidando datos de múltiples archivos..."):
-                        consolidado = analizador.consolidar_multiples_archivos_post_2010(resultados_analisis)
+                        consolidado = analizador.obtener_consolidado_estados(resultados_analisis, obtener_almacen_sesion())
                     
                     if consolidado:
                         # Crear sub-tabs por cada bloque
@@ -1609,7 +2105,7 @@ def main():
                         
                         if len(extractores_post_2010) > 0:
                             with st.spinner("Calculando ratios financieros..."):
-                                resultados_ratios = analizador.calculador_ratios.calcular_ratios_desde_extractor(extractores_post_2010)
+                                resultados_ratios = analizador.obtener_ratios(extractores_post_2010, resultados_analisis, obtener_almacen_sesion())
                             
                             if 'error' not in resultados_ratios and resultados_ratios.get('ratios_por_año'):
                                 st.success(f"✅ Ratios calculados para {len(resultados_ratios['años'])} años")
@@ -1750,25 +2246,56 @@ def main():
                                 st.markdown("##### 🤖 Análisis Inteligente con IA")
                                 st.caption("Análisis generado por IA en 3 fases especializadas (OpenAI GPT-4o-mini via Groq)")
                                 
-                                if st.button("🔍 Generar Análisis con IA (3 Fases)", key="btn_analisis_ia"):
-                                    # Contenedor para el progreso
-                                    progress_text = st.empty()
-                                    progress_bar = st.progress(0)
-                                    
-                                    progress_text.text("⏳ Fase 1/3: Analizando Liquidez y Endeudamiento...")
-                                    progress_bar.progress(0)
-                                    
-                                    # Generar análisis (internamente hace 3 solicitudes)
-                                    analisis_ia = analizar_ratios_con_ia(resultados_ratios, empresa)
-                                    
-                                    progress_bar.progress(100)
-                                    progress_text.text("✅ Análisis completado!")
-                                    
-                                    # Limpiar indicadores de progreso después de 1 segundo
-                                    import time
-                                    time.sleep(1)
-                                    progress_text.empty()
-                                    progress_bar.empty()
+                                # ✨ El análisis corre en segundo plano; el resultado queda en la sesión
+                                clave_ia = clave_conjunto(resultados_analisis)
+                                tarea_ia = obtener_ejecutor().estado(st.session_state.get('tarea_ia_id', ''))
+                                ia_en_curso = tarea_ia is not None and tarea_ia['estado'] not in ESTADOS_FINALES
+                                
+                                forzar_ia = st.checkbox(
+                                    "🔄 Forzar nuevo análisis (ignorar caché)",
+                                    value=False,
+                                    key="forzar_analisis_ia",
+                                    help="Por defecto se reutilizan las respuestas ya generadas para los mismos ratios y configuración del modelo"
+                                )
+                                
+                                ia_tiempo_real = st.checkbox(
+                                    "⚡ Mostrar el análisis en tiempo real",
+                                    value=True,
+                                    key="analisis_ia_tiempo_real",
+                                    help="Muestra cada fase a medida que la IA la escribe. Desactívalo para generar el análisis en segundo plano"
+                                )
+                                
+                                if st.button("🔍 Generar Análisis con IA (3 Fases)", key="btn_analisis_ia", disabled=ia_en_curso):
+                                    if ia_tiempo_real:
+                                        # ✨ Streaming: el primer texto aparece en cuanto el modelo empieza a responder
+                                        st.session_state['resultado_analisis_ia'] = {
+                                            'clave': clave_ia,
+                                            'empresa': empresa,
+                                            'texto': mostrar_analisis_ia_streaming(resultados_ratios, empresa, usar_cache=not forzar_ia)
+                                        }
+                                    else:
+                                        st.session_state['tarea_ia_id'] = obtener_ejecutor().enviar(
+                                            tarea_analisis_ia, resultados_ratios, empresa, clave_ia,
+                                            usar_cache=not forzar_ia,
+                                            tipo='ia',
+                                            descripcion=f"Análisis IA: {empresa}",
+                                            id_sesion=obtener_almacen_sesion().id_sesion
+                                        )
+                                        ia_en_curso = True
+                                
+                                if ia_en_curso:
+                                    st.info("⏳ Generando análisis con IA en segundo plano (3 fases)... Puedes seguir usando la aplicación.")
+                                
+                                reporte_cache_ia = obtener_cache_ia().reporte()
+                                st.caption(
+                                    f"💾 Caché de IA: {reporte_cache_ia['entradas']} respuesta(s), "
+                                    f"{formatear_bytes(reporte_cache_ia['bytes'])} · "
+                                    f"aciertos {reporte_cache_ia['aciertos']} / fallos {reporte_cache_ia['fallos']}"
+                                )
+                                
+                                resultado_ia = st.session_state.get('resultado_analisis_ia')
+                                if resultado_ia and resultado_ia.get('clave') == clave_ia:
+                                    analisis_ia = resultado_ia['texto']
                                     
                                     # Mostrar el análisis en un expander
                                     with st.expander("📄 Ver Análisis Completo de IA (3 Fases)", expanded=True):
@@ -1786,9 +2313,19 @@ def main():
                                 # Botón de exportación
                                 st.markdown("---")
                                 if st.button("📥 Exportar Ratios a Excel", key="export_ratios"):
-                                    archivo_salida = f"ratios_financieros_{empresa.replace(' ', '_')}.xlsx"
-                                    analizador.calculador_ratios.exportar_ratios_excel(resultados_ratios, archivo_salida)
-                                    st.success(f"✅ Ratios exportados a: {archivo_salida}")
+                                    # ✨ Libro generado en memoria: los bytes van directo al botón de descarga
+                                    contenido_ratios = analizador.calculador_ratios.exportar_ratios_excel(resultados_ratios)
+                                    if contenido_ratios is None:
+                                        st.warning("⚠️ No hay ratios por año para exportar")
+                                    else:
+                                        st.download_button(
+                                            label="💾 Descargar Ratios (Excel)",
+                                            data=contenido_ratios,
+                                            file_name=f"ratios_financieros_{empresa.replace(' ', '_')}.xlsx",
+                                            mime=MIME_EXCEL,
+                                            key="download_ratios_excel",
+                                            on_click="ignore"
+                                        )
                             
                             else:
                                 st.warning("⚠️ No se pudieron calcular los ratios financieros")
@@ -1847,212 +2384,25 @@ def main():
                         if not estados_financieros:
                             st.warning("⚠️ No se detectaron estados financieros en este archivo")
                         else:
-                            # Crear sub-tabs para cada estado financiero
-                            tab_situacion, tab_resultados, tab_patrimonio, tab_flujo = st.tabs([
-                                "📊 Estado de Situación Financiera",
-                                "💰 Estado de Resultados",
-                                "🏛️ Estado de Cambios en el Patrimonio",
-                                "💵 Estado de Flujo de Efectivo"
-                            ])
+                            # ✨ Crear sub-tabs para cada estado financiero (tablas construidas una vez por archivo)
+                            almacen = obtener_almacen_sesion()
+                            tabs_estados_individuales = st.tabs([titulo for _, titulo, _ in ESTADOS_INDIVIDUALES])
                             
-                            # Tab: Estado de Situación Financiera
-                            with tab_situacion:
-                                estado_key = 'estado_situacion_financiera'
-                                if estado_key in estados_financieros and estados_financieros[estado_key].get('datos'):
-                                    info_estado = estados_financieros[estado_key]
-                                    st.write(f"### {info_estado['nombre']}")
-                                    
-                                    # Convertir datos a DataFrame
-                                    datos_estado = []
-                                    for item in info_estado['datos']:
-                                        fila = {'Cuenta': item.get('cuenta', 'Sin cuenta')}
+                            for tab_estado, (estado_key, _, nombre_estado) in zip(tabs_estados_individuales, ESTADOS_INDIVIDUALES):
+                                with tab_estado:
+                                    info_estado = estados_financieros.get(estado_key)
+                                    if info_estado and info_estado.get('datos'):
+                                        st.write(f"### {info_estado['nombre']}")
                                         
-                                        # Agregar solo las columnas numéricas (años)
-                                        for clave, valor in item.items():
-                                            if clave != 'cuenta':
-                                                if isinstance(valor, dict):
-                                                    numero_convertido = valor.get('numero', 0)
-                                                    fila[clave] = numero_convertido
-                                                else:
-                                                    if clave.isdigit() or any(char.isdigit() for char in str(clave)):
-                                                        fila[clave] = valor if valor else 0
-                                        
-                                        datos_estado.append(fila)
-                                    
-                                    if datos_estado:
-                                        df_estado = pd.DataFrame(datos_estado)
-                                        
-                                        # Ordenar columnas: primero 'Cuenta', luego años en orden descendente
-                                        columnas = ['Cuenta']
-                                        años_cols = [col for col in df_estado.columns if col != 'Cuenta']
-                                        años_cols_sorted = sorted(años_cols, reverse=True)
-                                        columnas.extend(años_cols_sorted)
-                                        
-                                        df_estado = df_estado[columnas]
-                                        
-                                        # Formatear números para mejor visualización
-                                        for col in df_estado.columns:
-                                            if col != 'Cuenta':
-                                                try:
-                                                    df_estado[col] = df_estado[col].apply(
-                                                        lambda x: f"{x:,.0f}" if isinstance(x, (int, float)) and x != 0 else '-'
-                                                    )
-                                                except:
-                                                    pass
-                                        
-                                        st.dataframe(df_estado, use_container_width=True)
-                                        st.write(f"**Total de cuentas:** {len(datos_estado)}")
-                                    else:
-                                        st.info("No se encontraron datos para este estado financiero")
-                                else:
-                                    st.info("📭 No hay datos disponibles para Estado de Situación Financiera")
-                            
-                            # Tab: Estado de Resultados
-                            with tab_resultados:
-                                estado_key = 'estado_resultados'
-                                if estado_key in estados_financieros and estados_financieros[estado_key].get('datos'):
-                                    info_estado = estados_financieros[estado_key]
-                                    st.write(f"### {info_estado['nombre']}")
-                                    
-                                    # Convertir datos a DataFrame
-                                    datos_estado = []
-                                    for item in info_estado['datos']:
-                                        fila = {'Cuenta': item.get('cuenta', 'Sin cuenta')}
+                                        df_estado = obtener_tabla_estado(almacen, resultado_sel, estado_key)
                                         
-                                        for clave, valor in item.items():
-                                            if clave != 'cuenta':
-                                                if isinstance(valor, dict):
-                                                    numero_convertido = valor.get('numero', 0)
-                                                    fila[clave] = numero_convertido
-                                                else:
-                                                    if clave.isdigit() or any(char.isdigit() for char in str(clave)):
-                                                        fila[clave] = valor if valor else 0
-                                        
-                                        datos_estado.append(fila)
-                                    
-                                    if datos_estado:
-                                        df_estado = pd.DataFrame(datos_estado)
-                                        
-                                        columnas = ['Cuenta']
-                                        años_cols = [col for col in df_estado.columns if col != 'Cuenta']
-                                        años_cols_sorted = sorted(años_cols, reverse=True)
-                                        columnas.extend(años_cols_sorted)
-                                        
-                                        df_estado = df_estado[columnas]
-                                        
-                                        for col in df_estado.columns:
-                                            if col != 'Cuenta':
-                                                try:
-                                                    df_estado[col] = df_estado[col].apply(
-                                                        lambda x: f"{x:,.0f}" if isinstance(x, (int, float)) and x != 0 else '-'
-                                                    )
-                                                except:
-                                                    pass
-                                        
-                                        st.dataframe(df_estado, use_container_width=True)
-                                        st.write(f"**Total de cuentas:** {len(datos_estado)}")
-                                    else:
-                                        st.info("No se encontraron datos para este estado financiero")
-                                else:
-                                    st.info("📭 No hay datos disponibles para Estado de Resultados")
-                            
-                            # Tab: Estado de Cambios en el Patrimonio
-                            with tab_patrimonio:
-                                estado_key = 'estado_cambios_patrimonio'
-                                if estado_key in estados_financieros and estados_financieros[estado_key].get('datos'):
-                                    info_estado = estados_financieros[estado_key]
-                                    st.write(f"### {info_estado['nombre']}")
-                                    
-                                    # Convertir datos a DataFrame
-                                    datos_estado = []
-                                    for item in info_estado['datos']:
-                                        fila = {'Cuenta': item.get('cuenta', 'Sin cuenta')}
-                                        
-                                        for clave, valor in item.items():
-                                            if clave != 'cuenta':
-                                                if isinstance(valor, dict):
-                                                    numero_convertido = valor.get('numero', 0)
-                                                    fila[clave] = numero_convertido
-                                                else:
-                                                    if clave.isdigit() or any(char.isdigit() for char in str(clave)):
-                                                        fila[clave] = valor if valor else 0
-                                        
-                                        datos_estado.append(fila)
-                                    
-                                    if datos_estado:
-                                        df_estado = pd.DataFrame(datos_estado)
-                                        
-                                        columnas = ['Cuenta']
-                                        años_cols = [col for col in df_estado.columns if col != 'Cuenta']
-                                        años_cols_sorted = sorted(años_cols, reverse=True)
-                                        columnas.extend(años_cols_sorted)
-                                        
-                                        df_estado = df_estado[columnas]
-                                        
-                                        for col in df_estado.columns:
-                                            if col != 'Cuenta':
-                                                try:
-                                                    df_estado[col] = df_estado[col].apply(
-                                                        lambda x: f"{x:,.0f}" if isinstance(x, (int, float)) and x != 0 else '-'
-                                                    )
-                                                except:
-                                                    pass
-                                        
-                                        st.dataframe(df_estado, use_container_width=True)
-                                        st.write(f"**Total de cuentas:** {len(datos_estado)}")
-                                    else:
-                                        st.info("No se encontraron datos para este estado financiero")
-                                else:
-                                    st.info("📭 No hay datos disponibles para Estado de Cambios en el Patrimonio")
-                            
-                            # Tab: Estado de Flujo de Efectivo
-                            with tab_flujo:
-                                estado_key = 'estado_flujo_efectivo'
-                                if estado_key in estados_financieros and estados_financieros[estado_key].get('datos'):
-                                    info_estado = estados_financieros[estado_key]
-                                    st.write(f"### {info_estado['nombre']}")
-                                    
-                                    # Convertir datos a DataFrame
-                                    datos_estado = []
-                                    for item in info_estado['datos']:
-                                        fila = {'Cuenta': item.get('cuenta', 'Sin cuenta')}
-                                        
-                                        for clave, valor in item.items():
-                                            if clave != 'cuenta':
-                                                if isinstance(valor, dict):
-                                                    numero_convertido = valor.get('numero', 0)
-                                                    fila[clave] = numero_convertido
-                                                else:
-                                                    if clave.isdigit() or any(char.isdigit() for char in str(clave)):
-                                                        fila[clave] = valor if valor else 0
-                                        
-                                        datos_estado.append(fila)
-                                    
-                                    if datos_estado:
-                                        df_estado = pd.DataFrame(datos_estado)
-                                        
-                                        columnas = ['Cuenta']
-                                        años_cols = [col for col in df_estado.columns if col != 'Cuenta']
-                                        años_cols_sorted = sorted(años_cols, reverse=True)
-                                        columnas.extend(años_cols_sorted)
-                                        
-                                        df_estado = df_estado[columnas]
-                                        
-                                        for col in df_estado.columns:
-                                            if col != 'Cuenta':
-                                                try:
-                                                    df_estado[col] = df_estado[col].apply(
-                                                        lambda x: f"{x:,.0f}" if isinstance(x, (int, float)) and x != 0 else '-'
-                                                    )
-                                                except:
-                                                    pass
-                                        
-                                        st.dataframe(df_estado, use_container_width=True)
-                                        st.write(f"**Total de cuentas:** {len(datos_estado)}")
+                                        if not df_estado.empty:
+                                            st.dataframe(estilo_miles(df_estado), use_container_width=True)
+                                            st.write(f"**Total de cuentas:** {len(df_estado)}")
+                                        else:
+                                            st.info("No se encontraron datos para este estado financiero")
                                     else:
-                                        st.info("No se encontraron datos para este estado financiero")
-                                else:
-                                    st.info("📭 No hay datos disponibles para Estado de Flujo de Efectivo")
+                                        st.info(f"📭 No hay datos disponibles para {nombre_estado}")
                 
                 except Exception as e:
                     st.error(f"❌ Error al mostrar estados financieros: {str(e)}")
@@ -2093,12 +2443,16 @@ def main():
                         ruta_html = os.path.join(analizador.temp_dir, resultado['archivo'].replace('.xls', '.html').replace('.xlsx', '.html'))
                         
                         if os.path.exists(ruta_html):
-                            with open(ruta_html, 'r', encoding='utf-8', errors='ignore') as f:
-                                html_content = f.read()
+                            # ✨ Reutilizar la extracción hecha al procesar el archivo
+                            resultados_extractor = resultado.get('datos_extractor')
                             
-                            # Extraer estados con el extractor mejorado
-                            with st.spinner("Extrayendo estados financieros..."):
-                                resultados_extractor = analizador.extractor_mejorado.extraer_todos_estados(html_content)
+                            if not resultados_extractor:
+                                with open(ruta_html, 'r', encoding='utf-8', errors='ignore') as f:
+                                    html_content = f.read()
+                                
+                                # Extraer estados con el extractor mejorado
+                                with st.spinner("Extrayendo estados financieros..."):
+                                    resultados_extractor = analizador.extractor_mejorado.extraer_todos_estados(html_content)
                             
                             # Mostrar metadatos
                             metadatos = resultados_extractor.get('metadatos', {})
@@ -2116,7 +2470,10 @@ def main():
                             
                             # Realizar análisis vertical
                             with st.spinner("Realizando análisis vertical..."):
-                                analisis_vertical = analizador.analizador_vertical.analizar_desde_extractor(resultados_extractor)
+                                if resultado.get('datos_extractor'):
+                                    analisis_vertical = analizador.obtener_analisis_vertical(resultado, obtener_almacen_sesion())
+                                else:
+                                    analisis_vertical = analizador.analizador_vertical.analizar_desde_extractor(resultados_extractor)
                             
                             st.success("✅ Análisis vertical completado")
                             
@@ -2255,8 +2612,8 @@ def main():
                             # Extraer datos del extractor
                             datos_extractor = resultado.get('datos_extractor')
                             if datos_extractor:
-                                # Realizar análisis vertical
-                                analisis_vert = analizador.analizador_vertical.analizar_desde_extractor(datos_extractor)
+                                # Realizar análisis vertical (en caché por archivo)
+                                analisis_vert = analizador.obtener_analisis_vertical(resultado, obtener_almacen_sesion())
                                 analisis_vertical_list.append(analisis_vert)
                     
                     if not analisis_vertical_list:
@@ -2270,7 +2627,9 @@ def main():
                         
                         # Realizar consolidación
                         with st.spinner("Consolidando análisis vertical..."):
-                            consolidado = analizador.consolidador_vertical.consolidar_analisis_vertical(analisis_vertical_list)
+                            consolidado = analizador.obtener_consolidado_vertical(
+                                analisis_vertical_list, resultados_analisis, obtener_almacen_sesion()
+                            )
                         
                         if not consolidado:
                             st.error("❌ No se pudo consolidar el análisis vertical")
@@ -2565,9 +2924,14 @@ def main():
                             # Botón de descarga Excel
                             st.divider()
                             if st.button("📥 Exportar Análisis Vertical Consolidado a Excel", key="btn_export_av_consolidado"):
-                                archivo_salida = "analisis_vertical_consolidado.xlsx"
-                                analizador.consolidador_vertical.exportar_consolidado_excel(consolidado, archivo_salida)
-                                st.success(f"✅ Archivo exportado: {archivo_salida}")
+                                st.download_button(
+                                    label="💾 Descargar Análisis Vertical Consolidado (Excel)",
+                                    data=analizador.consolidador_vertical.exportar_consolidado_excel(consolidado),
+                                    file_name="analisis_vertical_consolidado.xlsx",
+                                    mime=MIME_EXCEL,
+                                    key="download_av_consolidado",
+                                    on_click="ignore"
+                                )
                 
                 except Exception as e:
                     st.error(f"❌ Error en análisis vertical consolidado: {str(e)}")
@@ -2597,8 +2961,8 @@ def main():
                         
                         # Consolidar análisis horizontal
                         with st.spinner("Consolidando análisis horizontal..."):
-                            consolidado_ah = analizador.consolidador_horizontal.consolidar_analisis_horizontal(
-                                analisis_horizontal_list
+                            consolidado_ah = analizador.obtener_consolidado_horizontal(
+                                analisis_horizontal_list, resultados_analisis, obtener_almacen_sesion()
                             )
                         
                         if not consolidado_ah:
@@ -2706,12 +3070,14 @@ def main():
                             st.markdown("#### 💾 Exportar Consolidado")
                             
                             if st.button("📥 Descargar Excel - Análisis Horizontal Consolidado"):
-                                archivo_salida = "analisis_horizontal_consolidado.xlsx"
-                                analizador.consolidador_horizontal.exportar_consolidado_excel(
-                                    consolidado_ah,
-                                    archivo_salida
+                                st.download_button(
+                                    label="💾 Descargar Análisis Horizontal Consolidado (Excel)",
+                                    data=analizador.consolidador_horizontal.exportar_consolidado_excel(consolidado_ah),
+                                    file_name="analisis_horizontal_consolidado.xlsx",
+                                    mime=MIME_EXCEL,
+                                    key="download_ah_consolidado",
+                                    on_click="ignore"
                                 )
-                                st.success(f"✅ Archivo exportado: {archivo_salida}")
                 
                 except Exception as e:
                     st.error(f"❌ Error en análisis horizontal consolidado: {str(e)}")
@@ -2760,7 +3126,11 @@ def main():
                         if datos_extractor and datos_extractor.get('estados'):
                             # Realizar análisis horizontal
                             with st.spinner("Realizando análisis horizontal..."):
-                                analisis_horizontal_resultados = analizador.analizador_horizontal.analizar_desde_extractor(datos_extractor)
+                                # ✨ Ya calculado al procesar el archivo
+                                analisis_horizontal_resultados = (
+                                    resultado_sel.get('analisis_horizontal')
+                                    or analizador.analizador_horizontal.analizar_desde_extractor(datos_extractor)
+                                )
                             
                             if 'error' in analisis_horizontal_resultados:
                                 st.error(f"❌ {analisis_horizontal_resultados['error']}")
@@ -2950,9 +3320,14 @@ def main():
                                 
                                 # Botón de descarga Excel
                                 if st.button("📥 Exportar Análisis Horizontal a Excel", key="btn_export_horizontal"):
-                                    nombre_archivo = f"analisis_horizontal_{archivo_seleccionado.split('.')[0]}.xlsx"
-                                    analizador.analizador_horizontal.exportar_a_excel(analisis_horizontal_resultados, nombre_archivo)
-                                    st.success(f"✅ Archivo exportado: {nombre_archivo}")
+                                    st.download_button(
+                                        label="💾 Descargar Análisis Horizontal (Excel)",
+                                        data=analizador.analizador_horizontal.exportar_a_excel(analisis_horizontal_resultados),
+                                        file_name=f"analisis_horizontal_{archivo_seleccionado.split('.')[0]}.xlsx",
+                                        mime=MIME_EXCEL,
+                                        key="download_horizontal_excel",
+                                        on_click="ignore"
+                                    )
                         
                         else:
                             st.warning("⚠️ No hay datos extraídos disponibles para este archivo")
@@ -3014,6 +3389,20 @@ def main():
                     file_name=f"analisis_financiero_{pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')}.csv",
                     mime="text/csv"
                 )
+            
+            # ✨ Reporte completo: estados, vertical, horizontal, consolidados y ratios en un solo libro
+            if st.button("📊 Generar Reporte Completo (Excel)", key="btn_reporte_completo"):
+                with st.spinner("Generando reporte completo..."):
+                    reporte_completo = analizador.generar_reporte_completo(resultados_analisis, obtener_almacen_sesion())
+                
+                st.download_button(
+                    label="💾 Descargar Reporte Completo (Excel)",
+                    data=reporte_completo,
+                    file_name=f"reporte_completo_{pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
+                    mime=MIME_EXCEL,
+                    key="download_reporte_completo",
+                    on_click="ignore"
+                )
     
     else:
         st.info("👆 Sube uno o más archivos XLS para comenzar el análisis")
@@ -0,0 +1,202 @@
+"""
+Benchmark del Descargador SMV
+=============================
+Mide cuánto tarda cada paso de una descarga desde la SMV con el perfil completo de
+Chrome y con el perfil ligero (recursos bloqueados, carga "eager"), y lo compara
+con el backend HTTP directo.
+
+Características:
+- Pasos medidos: resolución del driver, arranque de Chrome, carga del formulario,
+  selección de empresa/periodo y descarga de cada año
+- Varias repeticiones por perfil (mediana), con carpetas temporales aisladas
+- Funciona contra la SMV real, contra otra URL con el mismo formulario o contra el
+  servidor SMV simulado (sin red, latencia controlada)
+- Si Chrome no está disponible, los escenarios de navegador se marcan como omitidos
+- Resultado como diccionario + resumen impreso; opcionalmente guardado en JSON
+"""
+
+import json
+import os
+import shutil
+import statistics
+import tempfile
+import time
+from typing import Any, Dict, List
+
+from descargador_smv import DescargadorSMV
+from descargador_smv_http import DescargadorSMVHttp
+from servidor_smv_simulado import ServidorSMVSimulado
+
+
+def _mediana(valores: List[float]) -> float:
+    return statistics.median(valores) if valores else 0.0
+
+
+def _medir_descargador(descargador: Any, empresa: str, años: List[int]) -> Dict[str, Any]:
+    """Recorre una descarga completa midiendo cada paso (el descargador ya está creado)"""
+    pasos: Dict[str, Any] = {}
+    inicio = time.perf_counter()
+    if not descargador.iniciar_navegador():
+        return {'error': "No se pudo iniciar el navegador / la sesión"}
+    pasos['inicio_s'] = time.perf_counter() - inicio
+    pasos.update({f"{fase}_s": segundos for fase, segundos in getattr(descargador, 'tiempos_arranque', {}).items()})
+
+    try:
+        inicio = time.perf_counter()
+        descargador.obtener_empresas_disponibles()
+        encontrada = descargador.buscar_empresa(empresa)
+        if not encontrada or not descargador.seleccionar_empresa(encontrada) or not descargador.seleccionar_periodo_anual():
+            return {'error': f"No se pudo seleccionar la empresa '{empresa}'"}
+        pasos['seleccion_s'] = time.perf_counter() - inicio
+
+        por_año = []
+        exitosos = 0
+        for año in años:
+            inicio = time.perf_counter()
+            exitosos += bool(descargador.descargar_año(año))
+            por_año.append(time.perf_counter() - inicio)
+        pasos['años_s'] = por_año
+        pasos['año_medio_s'] = statistics.mean(por_año) if por_año else 0.0
+        pasos['exitosos'] = exitosos
+    finally:
+        descargador.cerrar_navegador()
+
+    pasos['total_s'] = pasos['inicio_s'] + pasos['seleccion_s'] + sum(pasos['años_s'])
+    return pasos
+
+
+def _escenario(crear, empresa: str, años: List[int], repeticiones: int) -> Dict[str, Any]:
+    """Repite una medición y resume cada paso con la mediana"""
+    mediciones = []
+    for _ in range(repeticiones):
+        carpeta = tempfile.mkdtemp(prefix="benchmark_descargador_")
+        try:
+            medicion = _medir_descargador(crear(carpeta), empresa, años)
+        finally:
+            shutil.rmtree(carpeta, ignore_errors=True)
+        if 'error' in medicion:
+            return {'omitido': medicion['error']}
+        mediciones.append(medicion)
+
+    claves = [clave for clave in mediciones[0] if clave.endswith('_s') and clave != 'años_s']
+    return {
+        **{clave: _mediana([m[clave] for m in mediciones]) for clave in claves},
+        'exitosos': min(m['exitosos'] for m in mediciones),
+        'repeticiones': repeticiones
+    }
+
+
+def ejecutar_benchmark(
+    empresa: str = None,
+    años: List[int] = None,
+    repeticiones: int = 3,
+    url: str = None,
+    incluir_http: bool = True,
+    verificar: bool = False,
+    simulado: bool = False,
+    latencia_simulada: float = 0.2
+) -> Dict[str, Any]:
+    """
+    Ejecuta los escenarios del benchmark
+
+    Args:
+        empresa: Empresa a descargar (default: SAN JUAN en la SMV, PACASMAYO en el simulado)
+        años: Años a descargar en cada repetición
+        repeticiones: Repeticiones por escenario (se reporta la mediana)
+        url: URL del formulario (default: la SMV real)
+        incluir_http: Medir también el backend HTTP directo
+        verificar: Si es True, lanza AssertionError si el perfil ligero no es más rápido
+        simulado: Medir contra un ServidorSMVSimulado local (ignora `url`)
+        latencia_simulada: Latencia por página del servidor simulado (segundos)
+
+    Returns:
+        Dict con los resultados de cada escenario
+    """
+    if simulado:
+        with ServidorSMVSimulado(latencia=latencia_simulada, latencia_descarga=latencia_simulada) as servidor:
+            resultados = ejecutar_benchmark(
+                empresa or "PACASMAYO", años, repeticiones, servidor.url, incluir_http, verificar
+            )
+            resultados['servidor_simulado'] = servidor.reporte()
+            return resultados
+
+    empresa = empresa or "SAN JUAN"
+    años = años or [2024, 2023, 2022]
+    resultados: Dict[str, Any] = {'parametros': {
+        'empresa': empresa, 'años': años, 'repeticiones': repeticiones, 'url': url or DescargadorSMV.URL_SMV
+    }}
+
+    def navegador(perfil_ligero: bool):
+        def crear(carpeta):
+            descargador = DescargadorSMV(download_dir=carpeta, headless=True, usar_manifiesto=False, perfil_ligero=perfil_ligero)
+            if url:
+                descargador.URL_SMV = url
+            return descargador
+        return crear
+
+    print("\n⏱️ Escenario 1: navegador con perfil completo")
+    resultados['completo'] = _escenario(navegador(False), empresa, años, repeticiones)
+    print("⏱️ Escenario 2: navegador con perfil ligero")
+    resultados['ligero'] = _escenario(navegador(True), empresa, años, repeticiones)
+    if incluir_http:
+        print("⏱️ Escenario 3: HTTP directo (sin navegador)")
+        resultados['http'] = _escenario(
+            lambda carpeta: DescargadorSMVHttp(download_dir=carpeta, url_smv=url, usar_manifiesto=False),
+            empresa, años, repeticiones
+        )
+
+    completo, ligero = resultados['completo'], resultados['ligero']
+    if 'omitido' not in completo and 'omitido' not in ligero:
+        resultados['mejora'] = {
+            clave: 1 - ligero[clave] / completo[clave]
+            for clave in ('pagina_s', 'seleccion_s', 'año_medio_s', 'total_s')
+            if completo.get(clave)
+        }
+
+    if verificar:
+        assert 'mejora' in resultados, "Los escenarios de navegador no se pudieron ejecutar"
+        assert ligero['exitosos'] == len(años), "El perfil ligero no descargó todos los años"
+        assert resultados['mejora']['total_s'] > 0, "El perfil ligero no fue más rápido"
+
+    return resultados
+
+
+def imprimir_resultados(resultados: Dict[str, Any]):
+    """Imprime un resumen legible del benchmark"""
+    print("\n" + "=" * 70)
+    print("RESULTADOS (mediana por paso)")
+    print("=" * 70)
+    nombres = {'completo': "🐢 Perfil completo", 'ligero': "🪶 Perfil ligero", 'http': "⚡ HTTP directo"}
+    for clave, nombre in nombres.items():
+        escenario = resultados.get(clave)
+        if escenario is None:
+            continue
+        if 'omitido' in escenario:
+            print(f"{nombre:<20} omitido: {escenario['omitido']}")
+            continue
+        detalle_arranque = ", ".join(
+            f"{fase} {escenario[f'{fase}_s']:.2f} s" for fase in ('driver', 'chrome', 'pagina') if f"{fase}_s" in escenario
+        )
+        print(f"{nombre:<20} inicio {escenario['inicio_s']:.2f} s{f' ({detalle_arranque})' if detalle_arranque else ''}, "
+              f"selección {escenario['seleccion_s']:.2f} s, año {escenario['año_medio_s']:.2f} s, "
+              f"total {escenario['total_s']:.2f} s ({escenario['exitosos']} años)")
+    if 'mejora' in resultados:
+        print("📉 Perfil ligero vs completo: " + ", ".join(
+            f"{clave[:-2]} {-valor:+.0%}" for clave, valor in resultados['mejora'].items()
+        ))
+
+
+if __name__ == "__main__":
+    print("=" * 70)
+    print("BENCHMARK DEL DESCARGADOR SMV (SERVIDOR SIMULADO)")
+    print("=" * 70)
+
+    # ✨ Sin red: el servidor simulado entrega los reportes de ejemplos/ (simulado=False mide la SMV real)
+    resultados = ejecutar_benchmark(simulado=True)
+    imprimir_resultados(resultados)
+
+    # Fuera del repositorio: los resultados dependen de la máquina y no se versionan
+    archivo_resultados = os.path.join(tempfile.gettempdir(), "benchmark_descargador_resultados.json")
+    with open(archivo_resultados, "w", encoding="utf-8") as f:
+        json.dump(resultados, f, ensure_ascii=False, indent=2)
+    print(f"\n✅ Resultados guardados en {archivo_resultados}")
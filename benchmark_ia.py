@@ -0,0 +1,232 @@
+"""
+Benchmark de la Etapa de IA
+===========================
+Mide latencia, concurrencia, caché y throughput de analizar_ratios_con_ia contra
+el servidor LLM simulado (sin consumir tokens ni depender de la API real).
+
+Características:
+- Escenarios: análisis en frío, análisis repetido (caché), streaming (tiempo al
+  primer contenido), cartera de empresas en paralelo y límite de solicitudes (429)
+- Caché aislada en una carpeta temporal (no toca la caché real de la app)
+- Resultado como diccionario + resumen impreso; opcionalmente guardado en JSON
+- Verificaciones básicas para usarlo como prueba de regresión (`verificar=True`)
+"""
+
+import json
+import os
+import shutil
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+import analisis_ia
+from analisis_ia import analizar_ratios_con_ia, analizar_ratios_con_ia_streaming, configurar_cache_ia
+from cliente_llm import configurar_proveedor_llm
+from servidor_llm_simulado import ServidorLLMSimulado
+
+
+def generar_ratios_sinteticos(empresa: str, años: List[int]) -> Dict[str, Any]:
+    """
+    Genera resultados de ratios con la misma estructura que CalculadorRatiosFinancieros
+
+    Los valores dependen del nombre de la empresa, así cada empresa produce
+    prompts distintos (sin aciertos de caché entre empresas).
+    """
+    base = (sum(ord(c) for c in empresa) % 50) / 100
+    ratios_por_año = {}
+    for i, año in enumerate(años):
+        ratios_por_año[año] = {
+            'liquidez_corriente': round(1.2 + base + i * 0.05, 4),
+            'prueba_acida': round(0.8 + base + i * 0.03, 4),
+            'razon_deuda_total': round(0.45 + base / 4, 4),
+            'razon_deuda_patrimonio': round(0.9 + base / 2, 4),
+            'margen_neto': round(0.08 + base / 10, 4),
+            'roa': round(0.05 + base / 20, 4),
+            'roe': round(0.12 + base / 10, 4),
+            'rotacion_activos_totales': round(0.9 + i * 0.02, 4),
+            'rotacion_cuentas_cobrar': round(6.5 + base, 4),
+            'rotacion_inventarios': round(4.2 + base, 4)
+        }
+    return {'años': años, 'ratios_por_año': ratios_por_año}
+
+
+def _cronometrar(funcion, *args, **kwargs):
+    """Ejecuta una función y devuelve (resultado, segundos)"""
+    inicio = time.perf_counter()
+    resultado = funcion(*args, **kwargs)
+    return resultado, time.perf_counter() - inicio
+
+
+def _tiempo_primer_contenido(resultados_ratios: Dict[str, Any], empresa: str) -> Dict[str, float]:
+    """Mide el tiempo al primer fragmento y el total de la variante en streaming"""
+    inicio = time.perf_counter()
+    primer_fragmento = None
+    for evento in analizar_ratios_con_ia_streaming(resultados_ratios, empresa, usar_cache=False):
+        if evento['tipo'] == 'fragmento' and primer_fragmento is None:
+            primer_fragmento = time.perf_counter() - inicio
+    return {'primer_contenido_s': primer_fragmento, 'total_s': time.perf_counter() - inicio}
+
+
+def ejecutar_benchmark(
+    latencia: float = 0.5,
+    jitter: float = 0.1,
+    empresas_cartera: int = 12,
+    trabajadores_cartera: int = 4,
+    tasa_limite: float = 0.2,
+    años: List[int] = None,
+    verificar: bool = False
+) -> Dict[str, Any]:
+    """
+    Ejecuta todos los escenarios del benchmark
+
+    Args:
+        latencia: Latencia simulada por solicitud (segundos)
+        jitter: Variación de la latencia (segundos)
+        empresas_cartera: Empresas del escenario de cartera
+        trabajadores_cartera: Análisis simultáneos en el escenario de cartera
+        tasa_limite: Probabilidad de 429 en el escenario de límite de solicitudes
+        años: Años de los ratios sintéticos
+        verificar: Si es True, lanza AssertionError ante una regresión evidente
+
+    Returns:
+        Dict con los resultados de cada escenario
+    """
+    años = años or [2024, 2023, 2022, 2021]
+    directorio_cache = tempfile.mkdtemp(prefix="benchmark_ia_")
+    resultados: Dict[str, Any] = {'parametros': {
+        'latencia': latencia, 'jitter': jitter, 'empresas_cartera': empresas_cartera,
+        'trabajadores_cartera': trabajadores_cartera, 'tasa_limite': tasa_limite
+    }}
+
+    try:
+        with ServidorLLMSimulado(latencia=latencia, jitter=jitter) as servidor:
+            configurar_proveedor_llm(api_key="simulado", base_url=servidor.url, max_reintentos=0)
+            configurar_cache_ia(directorio=directorio_cache)
+            ratios = generar_ratios_sinteticos("EMPRESA BENCHMARK", años)
+
+            # 1. Análisis en frío: las 3 fases en paralelo
+            print("\n⏱️ Escenario 1: análisis en frío (sin caché)")
+            texto, segundos = _cronometrar(analizar_ratios_con_ia, ratios, "EMPRESA BENCHMARK", usar_cache=False)
+            resultados['frio'] = {
+                'segundos': segundos,
+                'secuencial_estimado_s': 3 * latencia,
+                'max_concurrentes': servidor.reporte()['max_concurrentes'],
+                'ok': not texto.startswith("❌")
+            }
+
+            # 2. Análisis repetido: debe salir de la caché sin tocar el servidor
+            print("⏱️ Escenario 2: análisis repetido (caché)")
+            servidor.reiniciar_estadisticas()
+            texto_cache, segundos = _cronometrar(analizar_ratios_con_ia, ratios, "EMPRESA BENCHMARK")
+            resultados['cache'] = {
+                'segundos': segundos,
+                'solicitudes_servidor': servidor.reporte()['solicitudes'],
+                'identico': texto_cache == texto,
+                **{clave: valor for clave, valor in analisis_ia.obtener_cache_ia().reporte().items()
+                   if clave in ('aciertos', 'fallos', 'entradas')}
+            }
+
+            # 3. Streaming: tiempo al primer contenido
+            print("⏱️ Escenario 3: streaming (tiempo al primer contenido)")
+            resultados['streaming'] = _tiempo_primer_contenido(ratios, "EMPRESA BENCHMARK")
+
+            # 4. Cartera: varias empresas en paralelo con el cliente compartido
+            print(f"⏱️ Escenario 4: cartera de {empresas_cartera} empresas ({trabajadores_cartera} en paralelo)")
+            servidor.reiniciar_estadisticas()
+            empresas = [f"EMPRESA {i:03d}" for i in range(empresas_cartera)]
+            duraciones = []
+
+            def analizar_empresa(empresa):
+                _, segundos_empresa = _cronometrar(
+                    analizar_ratios_con_ia, generar_ratios_sinteticos(empresa, años), empresa, usar_cache=False
+                )
+                duraciones.append(segundos_empresa)
+
+            inicio = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=trabajadores_cartera) as pool:
+                list(pool.map(analizar_empresa, empresas))
+            total = time.perf_counter() - inicio
+            reporte_servidor = servidor.reporte()
+            resultados['cartera'] = {
+                'segundos': total,
+                'analisis_por_minuto': empresas_cartera / total * 60 if total else 0.0,
+                'latencia_media_s': statistics.mean(duraciones),
+                'latencia_max_s': max(duraciones),
+                'solicitudes': reporte_servidor['solicitudes'],
+                'conexiones_nuevas': reporte_servidor['conexiones'],
+                'max_concurrentes': reporte_servidor['max_concurrentes']
+            }
+
+            # 5. Límite de solicitudes: resultados parciales en lugar de fallos totales
+            print(f"⏱️ Escenario 5: límite de solicitudes ({tasa_limite:.0%} de respuestas 429)")
+            servidor.reiniciar_estadisticas()
+            servidor.tasa_limite = tasa_limite
+            parciales = fallidos = completos = 0
+            for empresa in empresas[:6]:
+                texto = analizar_ratios_con_ia(generar_ratios_sinteticos(empresa, años), empresa, usar_cache=False)
+                if texto.startswith("❌"):
+                    fallidos += 1
+                elif "Análisis parcial" in texto:
+                    parciales += 1
+                else:
+                    completos += 1
+            servidor.tasa_limite = 0.0
+            resultados['limite'] = {
+                'completos': completos,
+                'parciales': parciales,
+                'fallidos': fallidos,
+                'respuestas_429': servidor.reporte()['limitadas']
+            }
+    finally:
+        configurar_proveedor_llm()
+        configurar_cache_ia()
+        shutil.rmtree(directorio_cache, ignore_errors=True)
+
+    if verificar:
+        assert resultados['frio']['ok'], "El análisis en frío falló"
+        assert resultados['frio']['max_concurrentes'] >= 2, "Las fases no se solicitaron en paralelo"
+        assert resultados['cache']['solicitudes_servidor'] == 0, "El análisis repetido no usó la caché"
+        assert resultados['cache']['identico'], "La caché devolvió un texto distinto"
+        assert resultados['streaming']['primer_contenido_s'] < resultados['streaming']['total_s'], "El streaming no entregó contenido antes del final"
+        assert resultados['cartera']['conexiones_nuevas'] < resultados['cartera']['solicitudes'], "No se reutilizaron conexiones"
+
+    return resultados
+
+
+def imprimir_resultados(resultados: Dict[str, Any]):
+    """Imprime un resumen legible del benchmark"""
+    frio = resultados['frio']
+    cache = resultados['cache']
+    streaming = resultados['streaming']
+    cartera = resultados['cartera']
+    limite = resultados['limite']
+
+    print("\n" + "=" * 70)
+    print("RESULTADOS")
+    print("=" * 70)
+    print(f"🧊 En frío:      {frio['segundos']:.2f} s (secuencial ≈ {frio['secuencial_estimado_s']:.2f} s), "
+          f"{frio['max_concurrentes']} solicitudes simultáneas")
+    print(f"💾 Caché:        {cache['segundos'] * 1000:.1f} ms, {cache['solicitudes_servidor']} solicitudes al servidor, "
+          f"idéntico: {'sí' if cache['identico'] else 'no'}")
+    print(f"⚡ Streaming:    primer contenido {streaming['primer_contenido_s']:.2f} s, total {streaming['total_s']:.2f} s")
+    print(f"🏢 Cartera:      {cartera['analisis_por_minuto']:.1f} análisis/min, latencia media {cartera['latencia_media_s']:.2f} s "
+          f"(máx {cartera['latencia_max_s']:.2f} s), {cartera['conexiones_nuevas']} conexiones para {cartera['solicitudes']} solicitudes")
+    print(f"🚦 Límite (429): {limite['completos']} completos, {limite['parciales']} parciales, {limite['fallidos']} fallidos "
+          f"({limite['respuestas_429']} respuestas 429)")
+
+
+if __name__ == "__main__":
+    print("=" * 70)
+    print("BENCHMARK DE LA ETAPA DE IA (SERVIDOR SIMULADO)")
+    print("=" * 70)
+
+    resultados = ejecutar_benchmark(verificar=True)
+    imprimir_resultados(resultados)
+
+    # Fuera del repositorio: los resultados dependen de la máquina y no se versionan
+    archivo_resultados = os.path.join(tempfile.gettempdir(), "benchmark_ia_resultados.json")
+    with open(archivo_resultados, "w", encoding="utf-8") as f:
+        json.dump(resultados, f, ensure_ascii=False, indent=2)
+    print(f"\n✅ Resultados guardados en {archivo_resultados}")
@@ -0,0 +1,247 @@
+"""
+Caché Persistente de Análisis con IA
+====================================
+Guarda en disco las respuestas del modelo de IA para no pagar de nuevo la latencia
+ni los tokens cuando se repite una solicitud idéntica.
+
+Características:
+- Clave = huella SHA-256 de modelo, temperatura, max_tokens, top_p, mensaje de sistema y prompt
+  (si cambia cualquier dato de los ratios, la empresa o la configuración, cambia la clave)
+- Una entrada por fase: una fase fallida no invalida las que sí se generaron
+- Caducidad (TTL) configurable
+- Límite de tamaño total y de número de entradas con desalojo LRU (menos usada recientemente)
+- Contadores de aciertos, fallos, escrituras, expiradas y desalojos
+- Sobrevive a reinicios del servidor (un archivo JSON por entrada)
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+
+# Valores por defecto
+TTL_SEGUNDOS = 7 * 24 * 3600           # Una semana
+MAX_BYTES_CACHE = 50 * 1024 * 1024     # 50 MB de respuestas en disco
+MAX_ENTRADAS = 2000
+
+
+def huella_solicitud(
+    modelo: str,
+    temperatura: float,
+    max_tokens: int,
+    top_p: float,
+    sistema: str,
+    prompt: str
+) -> str:
+    """
+    Calcula la huella de una solicitud al modelo
+
+    Args:
+        modelo: Nombre del modelo
+        temperatura: Temperatura de muestreo
+        max_tokens: Máximo de tokens de la respuesta
+        top_p: Parámetro top_p
+        sistema: Mensaje de sistema
+        prompt: Mensaje del usuario
+
+    Returns:
+        Hash SHA-256 en hexadecimal
+    """
+    contenido = json.dumps(
+        {
+            'modelo': modelo,
+            'temperatura': temperatura,
+            'max_tokens': max_tokens,
+            'top_p': top_p,
+            'sistema': sistema,
+            'prompt': prompt
+        },
+        ensure_ascii=False,
+        sort_keys=True
+    )
+    return hashlib.sha256(contenido.encode('utf-8')).hexdigest()
+
+
+class CacheIA:
+    """Caché en disco de respuestas del modelo con TTL y desalojo LRU"""
+
+    def __init__(
+        self,
+        directorio: str = None,
+        ttl_segundos: float = TTL_SEGUNDOS,
+        max_bytes: int = MAX_BYTES_CACHE,
+        max_entradas: int = MAX_ENTRADAS
+    ):
+        """
+        Inicializa la caché (recupera las entradas existentes en disco)
+
+        Args:
+            directorio: Carpeta de la caché (default: temporal del sistema)
+            ttl_segundos: Antigüedad máxima de una entrada (0 o None = sin caducidad)
+            max_bytes: Tamaño total máximo de las entradas
+            max_entradas: Número máximo de entradas
+        """
+        if directorio is None:
+            directorio = os.path.join(tempfile.gettempdir(), "analizador_financiero_ia")
+        self.directorio = directorio
+        self.ttl_segundos = ttl_segundos
+        self.max_bytes = max_bytes
+        self.max_entradas = max_entradas
+        os.makedirs(self.directorio, exist_ok=True)
+
+        # huella -> tamaño en bytes (orden = uso reciente, el último es el más reciente)
+        self._indice: "OrderedDict[str, int]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.RLock()
+
+        self.estadisticas = {
+            'aciertos': 0,
+            'fallos': 0,
+            'escrituras': 0,
+            'expiradas': 0,
+            'desalojos': 0
+        }
+
+        self._cargar_indice()
+
+    # ===== API PÚBLICA =====
+
+    def obtener(self, huella: str) -> Optional[str]:
+        """
+        Devuelve el texto guardado para una huella (None si no existe o caducó)
+
+        Args:
+            huella: Huella de la solicitud (ver huella_solicitud)
+        """
+        with self._lock:
+            if huella not in self._indice:
+                self.estadisticas['fallos'] += 1
+                return None
+
+            entrada = self._leer(huella)
+            if entrada is None:
+                self._quitar(huella)
+                self.estadisticas['fallos'] += 1
+                return None
+
+            if self._caducada(entrada.get('creada', 0)):
+                self._quitar(huella)
+                self.estadisticas['expiradas'] += 1
+                self.estadisticas['fallos'] += 1
+                return None
+
+            # Marcar como usada recientemente (también en disco, para próximos arranques)
+            self._indice.move_to_end(huella)
+            try:
+                os.utime(self._ruta(huella))
+            except OSError:
+                pass
+            self.estadisticas['aciertos'] += 1
+            return entrada['texto']
+
+    def guardar(self, huella: str, texto: str, metadatos: Dict[str, Any] = None):
+        """
+        Guarda la respuesta de una solicitud
+
+        Args:
+            huella: Huella de la solicitud
+            texto: Respuesta del modelo
+            metadatos: Datos informativos (modelo, fase, empresa...)
+        """
+        entrada = {'huella': huella, 'creada': time.time(), 'texto': texto, **(metadatos or {})}
+        contenido = json.dumps(entrada, ensure_ascii=False).encode('utf-8')
+
+        with self._lock:
+            self._quitar(huella)
+            try:
+                with open(self._ruta(huella), 'wb') as f:
+                    f.write(contenido)
+            except OSError as e:
+                print(f"⚠️ No se pudo guardar la respuesta de IA en caché: {str(e)}")
+                return
+            self._indice[huella] = len(contenido)
+            self._bytes += len(contenido)
+            self.estadisticas['escrituras'] += 1
+            self._aplicar_limites()
+
+    def limpiar(self):
+        """Elimina todas las entradas de la caché"""
+        with self._lock:
+            for huella in list(self._indice):
+                self._quitar(huella)
+
+    def reporte(self) -> Dict[str, Any]:
+        """
+        Reporta el uso de la caché
+
+        Returns:
+            Dict con entradas, bytes, límites, tasa de aciertos y contadores
+        """
+        with self._lock:
+            consultas = self.estadisticas['aciertos'] + self.estadisticas['fallos']
+            return {
+                'entradas': len(self._indice),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'max_entradas': self.max_entradas,
+                'tasa_aciertos_pct': (self.estadisticas['aciertos'] / consultas * 100) if consultas else 0.0,
+                **self.estadisticas
+            }
+
+    # ===== GESTIÓN INTERNA =====
+
+    def _ruta(self, huella: str) -> str:
+        """Ruta del archivo de una entrada"""
+        return os.path.join(self.directorio, f"{huella}.json")
+
+    def _caducada(self, creada: float) -> bool:
+        """Indica si una entrada superó el TTL"""
+        return bool(self.ttl_segundos) and (time.time() - creada) > self.ttl_segundos
+
+    def _leer(self, huella: str) -> Optional[Dict[str, Any]]:
+        """Lee una entrada de disco"""
+        try:
+            with open(self._ruta(huella), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _quitar(self, huella: str):
+        """Quita una entrada del índice y de disco"""
+        if huella in self._indice:
+            self._bytes -= self._indice.pop(huella)
+        try:
+            os.remove(self._ruta(huella))
+        except OSError:
+            pass
+
+    def _aplicar_limites(self):
+        """Desaloja las entradas menos usadas hasta respetar los límites"""
+        while self._indice and (len(self._indice) > self.max_entradas or self._bytes > self.max_bytes):
+            huella_lru = next(iter(self._indice))
+            self._quitar(huella_lru)
+            self.estadisticas['desalojos'] += 1
+
+    def _cargar_indice(self):
+        """Reconstruye el índice desde disco (orden LRU según la fecha de último uso)"""
+        entradas = []
+        for nombre in os.listdir(self.directorio):
+            if not nombre.endswith('.json'):
+                continue
+            try:
+                info = os.stat(os.path.join(self.directorio, nombre))
+            except OSError:
+                continue
+            entradas.append((info.st_mtime, nombre[:-5], info.st_size))
+
+        for _, huella, tamaño in sorted(entradas):
+            self._indice[huella] = tamaño
+            self._bytes += tamaño
+
+        with self._lock:
+            self._aplicar_limites()
@@ -0,0 +1,335 @@
+"""
+Catálogo de Empresas SMV (caché local + índice de búsqueda)
+===========================================================
+Guarda localmente la lista de empresas de la SMV y la consulta con un índice en
+memoria, para que buscar una empresa no requiera abrir un navegador.
+
+Características:
+- Lista persistida en JSON con TTL: solo se vuelve a consultar la SMV cuando caduca
+  (por HTTP directo, sin navegador; con navegador solo como respaldo)
+- Si la SMV no responde se usa la última lista guardada aunque haya caducado
+- Índice de prefijos de palabras y de trigramas sobre nombres normalizados
+  (minúsculas, sin acentos ni puntuación)
+- Resultados ordenados por relevancia: exacto > empieza por > palabras > contiene > parecido
+- Búsqueda en milisegundos incluso con miles de empresas
+"""
+
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import unicodedata
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional
+
+# Importar configuración de API (con valores por defecto si falta algún parámetro)
+try:
+    import config_api
+except ImportError:
+    config_api = None
+
+CATALOGO_TTL_HORAS = getattr(config_api, 'CATALOGO_TTL_HORAS', 24)
+CATALOGO_ARCHIVO = getattr(
+    config_api, 'CATALOGO_ARCHIVO',
+    os.path.join(tempfile.gettempdir(), "analizador_financiero_empresas.json")
+)
+
+LONGITUD_MAX_PREFIJO = 12
+SIMILITUD_MINIMA = 0.3          # Jaccard de trigramas para aparecer en resultados
+SIMILITUD_MEJOR = 0.5           # Jaccard de trigramas para aceptar como "la" empresa buscada
+
+
+def normalizar_texto(texto: str) -> str:
+    """Normaliza texto removiendo acentos y convirtiendo a minúsculas"""
+    texto = unicodedata.normalize('NFKD', texto.lower())
+    return ''.join(c for c in texto if not unicodedata.combining(c))
+
+
+def clave_busqueda(texto: str) -> str:
+    """Texto normalizado y sin puntuación ("S.A.A." → "s a a"), con espacios simples"""
+    return ' '.join(re.sub(r'[^a-z0-9]+', ' ', normalizar_texto(texto)).split())
+
+
+def palabras_significativas(texto: str) -> List[str]:
+    """Palabras de un texto ya normalizado, sin letras sueltas ("s a a" de S.A.A. no aporta)"""
+    return [palabra for palabra in texto.split() if len(palabra) > 1]
+
+
+def trigramas(palabra: str) -> set:
+    """Trigramas de una palabra (con bordes, para premiar el inicio)"""
+    palabra = f"  {palabra} "
+    return {palabra[i:i + 3] for i in range(len(palabra) - 2)}
+
+
+def similitud_palabras(consulta: List[set], nombre: List[set]) -> float:
+    """Promedio, por palabra de la consulta, del mejor Jaccard de trigramas contra las palabras del nombre"""
+    if not consulta or not nombre:
+        return 0.0
+    return sum(max(len(q & n) / len(q | n) for n in nombre) for q in consulta) / len(consulta)
+
+
+class IndiceEmpresas:
+    """Índice en memoria (prefijos + trigramas) sobre una lista de empresas"""
+
+    def __init__(self, empresas: List[Dict[str, str]]):
+        """
+        Construye el índice
+
+        Args:
+            empresas: Lista de dicts con 'value' y 'text' (como obtener_empresas_disponibles)
+        """
+        self.empresas = list(empresas)
+        self._claves = [clave_busqueda(empresa['text']) for empresa in self.empresas]
+        self._palabras = [palabras_significativas(clave) for clave in self._claves]
+        self._trigramas = [[trigramas(palabra) for palabra in palabras] for palabras in self._palabras]
+        self._por_prefijo: Dict[str, set] = defaultdict(set)
+        self._por_trigrama: Dict[str, set] = defaultdict(set)
+
+        for i, clave in enumerate(self._claves):
+            for palabra in clave.split():
+                for largo in range(1, min(len(palabra), LONGITUD_MAX_PREFIJO) + 1):
+                    self._por_prefijo[palabra[:largo]].add(i)
+            for trigramas_palabra in self._trigramas[i]:
+                for trigrama in trigramas_palabra:
+                    self._por_trigrama[trigrama].add(i)
+
+    def __len__(self) -> int:
+        return len(self.empresas)
+
+    def _con_prefijo(self, palabra: str) -> set:
+        """Empresas con alguna palabra que empieza por `palabra`"""
+        candidatos = self._por_prefijo.get(palabra[:LONGITUD_MAX_PREFIJO], set())
+        if len(palabra) <= LONGITUD_MAX_PREFIJO:
+            return candidatos
+        return {i for i in candidatos if any(p.startswith(palabra) for p in self._claves[i].split())}
+
+    def buscar(self, consulta: str, limite: int = 20) -> List[Dict[str, Any]]:
+        """
+        Busca empresas por nombre (exacto, parcial o aproximado)
+
+        Args:
+            consulta: Texto a buscar
+            limite: Máximo de resultados
+
+        Returns:
+            Lista de dicts con 'value', 'text' y 'puntaje' (0-100), de mayor a menor relevancia
+        """
+        clave = clave_busqueda(consulta)
+        if not clave:
+            return []
+        palabras = clave.split()
+        puntajes: Dict[int, float] = {}
+
+        # Todas las palabras de la consulta como prefijos de palabras del nombre
+        conjuntos = [self._con_prefijo(palabra) for palabra in palabras]
+        todas = set.intersection(*conjuntos) if conjuntos else set()
+        for i in todas:
+            nombre = self._claves[i]
+            if nombre == clave:
+                puntajes[i] = 100
+            elif nombre.startswith(clave):
+                puntajes[i] = 90
+            else:
+                puntajes[i] = 80
+
+        # Candidatos restantes: los que comparten algún trigrama con la consulta
+        palabras_consulta = palabras_significativas(clave)
+        trigramas_consulta = [trigramas(palabra) for palabra in palabras_consulta]
+        candidatos = set()
+        for trigramas_palabra in trigramas_consulta:
+            for trigrama in trigramas_palabra:
+                candidatos.update(self._por_trigrama.get(trigrama, ()))
+
+        for i in candidatos - set(puntajes):
+            # Subcadena en cualquier parte (p. ej. "juan s" dentro de "san juan s a")
+            if clave in self._claves[i]:
+                puntajes[i] = 70
+                continue
+            similitud = similitud_palabras(trigramas_consulta, self._trigramas[i])
+            # Alguna palabra completa coincide (la antigua búsqueda por palabras clave)
+            coincidencias = sum(1 for palabra in palabras_consulta if palabra in self._palabras[i])
+            if coincidencias:
+                puntajes[i] = 50 + 10 * coincidencias / len(palabras_consulta) + 10 * similitud
+            elif similitud >= SIMILITUD_MINIMA:
+                puntajes[i] = 50 * similitud
+
+        orden = sorted(puntajes, key=lambda i: (-puntajes[i], len(self._claves[i]), self._claves[i]))
+        return [{**self.empresas[i], 'puntaje': round(puntajes[i], 1)} for i in orden[:limite]]
+
+    def mejor(self, consulta: str) -> Optional[Dict[str, str]]:
+        """
+        Empresa más relevante para la consulta, o None si ninguna se parece lo suficiente
+
+        Returns:
+            Dict con 'value' y 'text' (igual que DescargadorSMV.buscar_empresa)
+        """
+        resultados = self.buscar(consulta, limite=1)
+        if not resultados or resultados[0]['puntaje'] < 50 * SIMILITUD_MEJOR:
+            return None
+        return {clave: valor for clave, valor in resultados[0].items() if clave != 'puntaje'}
+
+
+def cargar_empresas_smv() -> List[Dict[str, str]]:
+    """Descarga la lista de empresas de la SMV (HTTP directo; navegador como respaldo)"""
+    from descargador_smv_http import DescargadorSMVHttp
+
+    descargador = DescargadorSMVHttp()
+    try:
+        if descargador.iniciar_navegador():
+            empresas = descargador.obtener_empresas_disponibles()
+            if empresas:
+                return empresas
+    finally:
+        descargador.cerrar_navegador()
+
+    # Navegador del pool compartido: queda caliente para la descarga que suele seguir
+    from pool_navegadores import obtener_pool_navegadores
+
+    try:
+        with obtener_pool_navegadores().arrendar(usar_manifiesto=False) as descargador:
+            return descargador.empresas_disponibles or descargador.obtener_empresas_disponibles()
+    except (RuntimeError, TimeoutError) as e:
+        print(f"⚠️ No se pudo obtener la lista de empresas: {str(e)}")
+    return []
+
+
+class CatalogoEmpresas:
+    """Lista de empresas de la SMV persistida en disco con TTL e índice de búsqueda"""
+
+    def __init__(
+        self,
+        archivo: str = CATALOGO_ARCHIVO,
+        ttl_horas: float = CATALOGO_TTL_HORAS,
+        cargador: Callable[[], List[Dict[str, str]]] = cargar_empresas_smv
+    ):
+        """
+        Configura el catálogo (no consulta la SMV hasta que se necesite)
+
+        Args:
+            archivo: Ruta del JSON con la lista de empresas
+            ttl_horas: Horas de validez de la lista guardada
+            cargador: Función que obtiene la lista actual desde la SMV
+        """
+        self.archivo = archivo
+        self.ttl_segundos = ttl_horas * 3600
+        self.cargador = cargador
+        self._lock = threading.Lock()
+        self._indice: Optional[IndiceEmpresas] = None
+        self._actualizado: Optional[float] = None   # time.time() de la última descarga de la lista
+
+    # ===== PERSISTENCIA =====
+
+    def _leer_archivo(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self.archivo, 'r', encoding='utf-8') as f:
+                datos = json.load(f)
+            if isinstance(datos.get('empresas'), list):
+                return datos
+        except (OSError, ValueError):
+            pass
+        return None
+
+    def _escribir_archivo(self, empresas: List[Dict[str, str]], actualizado: float):
+        directorio = os.path.dirname(self.archivo)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        temporal = f"{self.archivo}.tmp"
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump({'actualizado': actualizado, 'empresas': empresas}, f, ensure_ascii=False)
+        os.replace(temporal, self.archivo)
+
+    def _vigente(self) -> bool:
+        return self._actualizado is not None and time.time() - self._actualizado < self.ttl_segundos
+
+    # ===== API PÚBLICA =====
+
+    def registrar(self, empresas: List[Dict[str, str]]):
+        """Guarda una lista recién obtenida de la SMV (p. ej. por un descargador ya abierto)"""
+        if not empresas:
+            return
+        with self._lock:
+            self._actualizado = time.time()
+            self._indice = IndiceEmpresas(empresas)
+            try:
+                self._escribir_archivo(self._indice.empresas, self._actualizado)
+            except OSError as e:
+                print(f"⚠️ No se pudo guardar el catálogo de empresas: {str(e)}")
+
+    def indice(self, forzar: bool = False) -> IndiceEmpresas:
+        """
+        Índice de búsqueda, actualizando la lista si caducó
+
+        Args:
+            forzar: Si es True, vuelve a consultar la SMV aunque la lista esté vigente
+
+        Returns:
+            IndiceEmpresas (vacío si nunca se pudo obtener la lista)
+        """
+        with self._lock:
+            if self._indice is None:
+                datos = self._leer_archivo()
+                if datos:
+                    self._indice = IndiceEmpresas(datos['empresas'])
+                    self._actualizado = datos.get('actualizado', 0)
+            if self._indice is not None and self._vigente() and not forzar:
+                return self._indice
+
+        try:
+            empresas = self.cargador()
+        except Exception as e:
+            print(f"⚠️ No se pudo actualizar el catálogo de empresas: {str(e)}")
+            empresas = []
+
+        if empresas:
+            self.registrar(empresas)
+        elif self._indice is not None:
+            print("⚠️ Usando la lista de empresas guardada (caducada)")
+        return self._indice or IndiceEmpresas([])
+
+    def buscar(self, consulta: str, limite: int = 20, forzar: bool = False) -> List[Dict[str, Any]]:
+        """Empresas que coinciden con la consulta, ordenadas por relevancia"""
+        return self.indice(forzar).buscar(consulta, limite)
+
+    def estado(self) -> Dict[str, Any]:
+        """Resumen del catálogo: empresas, antigüedad y vigencia"""
+        with self._lock:
+            return {
+                'empresas': len(self._indice) if self._indice else 0,
+                'antiguedad_horas': (time.time() - self._actualizado) / 3600 if self._actualizado else None,
+                'vigente': self._vigente(),
+                'archivo': self.archivo
+            }
+
+
+_catalogo: Optional[CatalogoEmpresas] = None
+_lock_catalogo = threading.Lock()
+
+
+def obtener_catalogo() -> CatalogoEmpresas:
+    """Catálogo compartido por la app y los descargadores (se crea al primer uso)"""
+    global _catalogo
+    with _lock_catalogo:
+        if _catalogo is None:
+            _catalogo = CatalogoEmpresas()
+        return _catalogo
+
+
+if __name__ == "__main__":
+    print("=" * 70)
+    print("CATÁLOGO DE EMPRESAS SMV")
+    print("=" * 70)
+
+    catalogo = obtener_catalogo()
+    inicio = time.perf_counter()
+    indice = catalogo.indice()
+    print(f"📇 {len(indice)} empresas cargadas en {time.perf_counter() - inicio:.2f} s")
+
+    for consulta in ["san juan", "BACKUS", "alicorp saa", "cementos pacasmayo", "Ferreycorp"]:
+        inicio = time.perf_counter()
+        resultados = catalogo.buscar(consulta, limite=3)
+        milisegundos = (time.perf_counter() - inicio) * 1000
+        print(f"\n🔎 '{consulta}' ({milisegundos:.2f} ms)")
+        for resultado in resultados:
+            print(f"   {resultado['puntaje']:>5}  {resultado['text']}")
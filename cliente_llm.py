@@ -0,0 +1,176 @@
+"""
+Cliente LLM Compartido
+======================
+Proveedor único (por proceso) del cliente Groq usado por el análisis con IA.
+
+Características:
+- Un solo cliente reutilizado por todas las sesiones, tareas y fases: sin un nuevo
+  handshake TLS ni conexión por cada análisis
+- Pool de conexiones httpx con keep-alive y límites configurables
+- Límite de solicitudes simultáneas al modelo (semáforo compartido)
+- URL base configurable (permite apuntar a un servidor compatible, p. ej. uno local de pruebas)
+- Reintentos del SDK configurables
+"""
+
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+import httpx
+from groq import Groq
+
+# Importar configuración de API (con valores por defecto si falta algún parámetro)
+try:
+    import config_api
+except ImportError:
+    config_api = None
+
+GROQ_API_KEY = getattr(config_api, 'GROQ_API_KEY', '')
+GROQ_BASE_URL = getattr(config_api, 'GROQ_BASE_URL', None)                       # None = API oficial
+LLM_MAX_CONEXIONES = getattr(config_api, 'LLM_MAX_CONEXIONES', 20)              # Conexiones abiertas en total
+LLM_MAX_KEEPALIVE = getattr(config_api, 'LLM_MAX_KEEPALIVE', 10)                # Conexiones ociosas retenidas
+LLM_KEEPALIVE_SEGUNDOS = getattr(config_api, 'LLM_KEEPALIVE_SEGUNDOS', 120)     # Vida de una conexión ociosa
+LLM_MAX_SOLICITUDES = getattr(config_api, 'LLM_MAX_SOLICITUDES', 6)             # Solicitudes simultáneas al modelo
+LLM_MAX_REINTENTOS = getattr(config_api, 'LLM_MAX_REINTENTOS', 2)
+LLM_TIMEOUT_CONEXION = getattr(config_api, 'LLM_TIMEOUT_CONEXION', 10)          # Segundos para abrir la conexión
+
+
+class ProveedorClienteLLM:
+    """Crea bajo demanda y comparte un cliente Groq con pool de conexiones"""
+
+    def __init__(
+        self,
+        api_key: str = GROQ_API_KEY,
+        base_url: Optional[str] = GROQ_BASE_URL,
+        max_conexiones: int = LLM_MAX_CONEXIONES,
+        max_keepalive: int = LLM_MAX_KEEPALIVE,
+        keepalive_segundos: float = LLM_KEEPALIVE_SEGUNDOS,
+        max_solicitudes: int = LLM_MAX_SOLICITUDES,
+        max_reintentos: int = LLM_MAX_REINTENTOS
+    ):
+        """
+        Configura el proveedor (el cliente se crea en el primer uso)
+
+        Args:
+            api_key: API key de Groq
+            base_url: URL base de la API (None = la oficial)
+            max_conexiones: Máximo de conexiones abiertas
+            max_keepalive: Máximo de conexiones ociosas que se mantienen abiertas
+            keepalive_segundos: Tiempo que una conexión ociosa permanece abierta
+            max_solicitudes: Máximo de solicitudes simultáneas al modelo
+            max_reintentos: Reintentos automáticos del SDK ante errores transitorios
+        """
+        self.api_key = api_key
+        self.base_url = base_url
+        self.max_conexiones = max_conexiones
+        self.max_keepalive = max_keepalive
+        self.keepalive_segundos = keepalive_segundos
+        self.max_solicitudes = max_solicitudes
+        self.max_reintentos = max_reintentos
+
+        self._cliente: Optional[Groq] = None
+        self._http: Optional[httpx.Client] = None
+        self._lock = threading.Lock()
+        self._semaforo = threading.BoundedSemaphore(max_solicitudes)
+
+        self.estadisticas = {
+            'clientes_creados': 0,
+            'solicitudes': 0,
+            'solicitudes_activas': 0
+        }
+
+    def cliente(self) -> Groq:
+        """Cliente Groq compartido (se crea una sola vez)"""
+        with self._lock:
+            if self._cliente is None:
+                self._http = httpx.Client(
+                    limits=httpx.Limits(
+                        max_connections=self.max_conexiones,
+                        max_keepalive_connections=self.max_keepalive,
+                        keepalive_expiry=self.keepalive_segundos
+                    ),
+                    timeout=httpx.Timeout(None, connect=LLM_TIMEOUT_CONEXION)
+                )
+                self._cliente = Groq(
+                    api_key=self.api_key,
+                    base_url=self.base_url,
+                    max_retries=self.max_reintentos,
+                    http_client=self._http
+                )
+                self.estadisticas['clientes_creados'] += 1
+            return self._cliente
+
+    @contextmanager
+    def solicitud(self):
+        """
+        Reserva un cupo de solicitud simultánea
+
+        Uso:
+            with proveedor.solicitud():
+                cliente.chat.completions.create(...)
+        """
+        self._semaforo.acquire()
+        with self._lock:
+            self.estadisticas['solicitudes'] += 1
+            self.estadisticas['solicitudes_activas'] += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.estadisticas['solicitudes_activas'] -= 1
+            self._semaforo.release()
+
+    def cerrar(self):
+        """Cierra las conexiones del pool (el próximo uso crea un cliente nuevo)"""
+        with self._lock:
+            if self._http is not None:
+                self._http.close()
+            self._http = None
+            self._cliente = None
+
+    def reporte(self) -> Dict[str, Any]:
+        """Configuración y contadores del proveedor"""
+        with self._lock:
+            return {
+                'base_url': self.base_url or 'https://api.groq.com',
+                'max_conexiones': self.max_conexiones,
+                'max_keepalive': self.max_keepalive,
+                'max_solicitudes': self.max_solicitudes,
+                **self.estadisticas
+            }
+
+
+_proveedor: Optional[ProveedorClienteLLM] = None
+_lock_proveedor = threading.Lock()
+
+
+def obtener_proveedor_llm() -> ProveedorClienteLLM:
+    """Proveedor compartido por todo el proceso (se crea al primer uso)"""
+    global _proveedor
+    with _lock_proveedor:
+        if _proveedor is None:
+            _proveedor = ProveedorClienteLLM()
+        return _proveedor
+
+
+def configurar_proveedor_llm(**parametros) -> ProveedorClienteLLM:
+    """
+    Reemplaza el proveedor compartido (cierra las conexiones del anterior)
+
+    Args:
+        **parametros: Argumentos de ProveedorClienteLLM (api_key, base_url, límites...)
+
+    Returns:
+        El nuevo proveedor
+    """
+    global _proveedor
+    with _lock_proveedor:
+        if _proveedor is not None:
+            _proveedor.cerrar()
+        _proveedor = ProveedorClienteLLM(**parametros)
+        return _proveedor
+
+
+def obtener_cliente_llm() -> Groq:
+    """Atajo: cliente Groq compartido"""
+    return obtener_proveedor_llm().cliente()
@@ -34,3 +34,54 @@ GROQ_MAX_TOKENS_FASE1 = 2500
 GROQ_MAX_TOKENS_FASE2 = 2800
 GROQ_MAX_TOKENS_FASE3 = 2500
 GROQ_TOP_P = 0.9
+GROQ_TIMEOUT_FASE = 60  # Segundos máximos por cada una de las 3 solicitudes (se ejecutan en paralelo)
+
+# Caché persistente de análisis con IA (repetir un análisis idéntico no consume tokens)
+IA_CACHE_TTL_HORAS = 168       # Antigüedad máxima de una respuesta guardada (168 h = 1 semana)
+IA_CACHE_MAX_MB = 50           # Tamaño máximo de la caché en disco
+IA_CACHE_MAX_ENTRADAS = 2000   # Número máximo de respuestas guardadas
+
+# Cliente compartido del modelo de IA (pool de conexiones reutilizadas)
+GROQ_BASE_URL = None           # None = API oficial de Groq (otra URL para un servidor compatible)
+LLM_MAX_CONEXIONES = 20        # Conexiones HTTP abiertas como máximo
+LLM_MAX_KEEPALIVE = 10         # Conexiones ociosas que se mantienen abiertas (keep-alive)
+LLM_KEEPALIVE_SEGUNDOS = 120   # Tiempo que una conexión ociosa permanece abierta
+LLM_MAX_SOLICITUDES = 6        # Solicitudes simultáneas al modelo (todas las sesiones)
+LLM_MAX_REINTENTOS = 2         # Reintentos automáticos ante errores transitorios
+
+# Análisis con IA por lotes (planificador_ia.py) - ajustar a los límites de tu plan en Groq
+IA_LIMITE_RPM = 30             # Solicitudes por minuto
+IA_LIMITE_TPM = 60000          # Tokens por minuto (entrada + máximo de salida de cada solicitud)
+IA_LOTE_CONCURRENCIA = 3       # Solicitudes simultáneas del lote
+IA_LOTE_REINTENTOS = 5         # Reintentos por solicitud ante 429 / 5xx / timeouts
+
+# Presupuesto de los prompts de IA (prompts_ia.py)
+IA_PRESUPUESTO_PROMPT = 550    # Tokens de entrada estimados por fase; si se supera, los años antiguos se resumen
+IA_MIN_AÑOS_DETALLE = 5        # Años más recientes que siempre se envían con detalle
+
+# Catálogo local de empresas de la SMV (catalogo_empresas.py)
+CATALOGO_TTL_HORAS = 24        # Horas antes de volver a pedir la lista de empresas a la SMV
+
+# Pool de navegadores calientes para las descargas de la SMV (pool_navegadores.py)
+POOL_NAVEGADORES_MAX = 4                # Navegadores abiertos como máximo (todas las sesiones)
+POOL_NAVEGADORES_MIN_CALIENTES = 1      # Navegadores que se mantienen abiertos aunque estén ociosos
+POOL_NAVEGADORES_INACTIVIDAD_MIN = 10   # Minutos sin uso antes de cerrar un navegador sobrante
+
+# Resolución de ChromeDriver (resolver_driver.py)
+DRIVER_PERMITIR_DESCARGA = True         # Si no hay driver local válido, usar webdriver-manager (requiere red la primera vez)
+DRIVER_TTL_NEGATIVO_S = 600             # Segundos que se recuerda que no hay driver local (no se vuelve a buscar)
+
+# Perfil ligero de Chrome para la SMV (descargador_smv.py)
+SMV_PERFIL_LIGERO = False      # Bloquear imágenes, fuentes y analítica; carga "eager". Activar solo tras medir con benchmark_descargador.py
+SMV_BLOQUEAR_CSS = False       # Bloquear también las hojas de estilo (probar antes: la espera de carga usa #myLoading)
+
+# Tareas en segundo plano (ejecutor_tareas.py)
+TAREAS_RETENCION_HORAS = 24         # Horas que se conserva una tarea finalizada cuyo resultado nadie consumió
+
+# Descarga masiva reanudable (descarga_masiva.py)
+DESCARGA_MASIVA_INTERVALO_S = 2.0   # Segundos mínimos entre estados financieros pedidos a un mismo host
+DESCARGA_MASIVA_REINTENTOS = 2      # Reintentos por año (reiniciando el navegador si no responde)
+DESCARGA_MASIVA_SESIONES = 1        # Navegadores simultáneos del lote
+
+# Ratios financieros (ratios_financieros.py)
+RATIOS_CONCILIACION = "reciente"   # Año presente en dos archivos: "reciente" (cifras reexpresadas) u "original"
@@ -0,0 +1,453 @@
+"""
+Descarga Masiva de Estados Financieros (lotes reanudables)
+==========================================================
+Descarga un rango de años para cientos de empresas de la SMV sin tener que empezar
+de cero ante un corte: cada estado financiero terminado queda anotado en un
+checkpoint y al relanzar el lote solo se procesa lo que falta.
+
+Características:
+- Checkpoint JSON (escritura atómica) después de cada estado financiero: un corte del
+  proceso o del navegador pierde como mucho el año en curso
+- Reanudación: empresas/años completos o inexistentes se omiten sin abrir el navegador;
+  los años ya presentes en el manifiesto de descargas se marcan sin volver a pedirlos
+- Años sin estados financieros publicados: estado terminal NO_DISPONIBLE, distinto de un
+  fallo de transporte; no se reintentan ni se vuelven a pedir al reanudar
+- Navegador caído o colgado: se detecta, se reinicia y se reintenta el año
+- Pool de navegadores opcional: las sesiones se arriendan del pool compartido y
+  respetan su límite global de navegadores
+- Limitador de cortesía por host: separación mínima entre solicitudes de estados
+  financieros al mismo servidor, compartida por todas las sesiones del lote
+- Reporte de throughput (estados/min) y de fallos por motivo
+"""
+
+import json
+import os
+import queue
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import urlparse
+
+from catalogo_empresas import clave_busqueda
+from descargador_smv import DescargadorSMV
+from manifiesto_descargas import ManifiestoDescargas
+from pool_navegadores import obtener_pool_navegadores
+
+# Importar configuración de API (con valores por defecto si falta algún parámetro)
+try:
+    import config_api
+except ImportError:
+    config_api = None
+
+DESCARGA_MASIVA_INTERVALO_S = getattr(config_api, 'DESCARGA_MASIVA_INTERVALO_S', 2.0)  # Segundos entre estados financieros por host
+DESCARGA_MASIVA_REINTENTOS = getattr(config_api, 'DESCARGA_MASIVA_REINTENTOS', 2)      # Reintentos por año (con el navegador reiniciado)
+DESCARGA_MASIVA_SESIONES = getattr(config_api, 'DESCARGA_MASIVA_SESIONES', 1)          # Navegadores simultáneos
+
+ARCHIVO_CHECKPOINT = "checkpoint_descarga_masiva.json"
+
+# Estados de un año en el checkpoint
+COMPLETO = 'completo'
+FALLIDO = 'fallido'                 # Fallo de transporte: se vuelve a intentar al reanudar
+NO_ENCONTRADA = 'no_encontrada'
+NO_DISPONIBLE = 'no_disponible'     # La SMV no publicó estados financieros para ese año (terminal)
+
+
+class LimitadorCortesia:
+    """Separación mínima entre solicitudes al mismo host (compartida entre hilos)"""
+
+    def __init__(self, intervalo: float):
+        """
+        Args:
+            intervalo: Segundos mínimos entre dos solicitudes al mismo host
+        """
+        self.intervalo = intervalo
+        self._proximo: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def esperar(self, host: str) -> float:
+        """
+        Reserva el siguiente turno del host y espera hasta que llegue
+
+        Returns:
+            Segundos esperados
+        """
+        with self._lock:
+            ahora = time.monotonic()
+            turno = max(ahora, self._proximo.get(host, 0.0))
+            self._proximo[host] = turno + self.intervalo
+        espera = turno - ahora
+        if espera > 0:
+            time.sleep(espera)
+        return espera
+
+
+class DescargaMasiva:
+    """Lote de descargas SMV (empresas × años) con checkpoint, reanudación y cortesía por host"""
+
+    def __init__(
+        self,
+        download_dir: str = None,
+        archivo_checkpoint: str = None,
+        sesiones: int = DESCARGA_MASIVA_SESIONES,
+        intervalo_host: float = DESCARGA_MASIVA_INTERVALO_S,
+        reintentos: int = DESCARGA_MASIVA_REINTENTOS,
+        headless: bool = True,
+        driver_path: str = None,
+        fabrica: Callable[..., Any] = DescargadorSMV,
+        pool: Any = None
+    ):
+        """
+        Configura el lote
+
+        Args:
+            download_dir: Carpeta de descargas (default: ./descargas)
+            archivo_checkpoint: JSON de progreso (default: <download_dir>/checkpoint_descarga_masiva.json)
+            sesiones: Navegadores simultáneos (cada uno atiende empresas completas)
+            intervalo_host: Segundos mínimos entre estados financieros pedidos al mismo host
+            reintentos: Reintentos por año ante un fallo
+            headless: Navegadores sin ventana
+            driver_path: Ruta del ChromeDriver (None = automático)
+            fabrica: Clase/función que crea cada descargador (DescargadorSMV por defecto)
+            pool: PoolNavegadores del que tomar navegadores calientes (None = crear y cerrar los propios)
+        """
+        self.download_dir = os.path.abspath(download_dir or os.path.join(os.getcwd(), "descargas"))
+        self.archivo_checkpoint = archivo_checkpoint or os.path.join(self.download_dir, ARCHIVO_CHECKPOINT)
+        self.sesiones = max(1, sesiones)
+        self.reintentos = reintentos
+        self.headless = headless
+        self.driver_path = driver_path
+        self.fabrica = fabrica
+        self.pool = pool
+        self.limitador = LimitadorCortesia(intervalo_host)
+        self.manifiesto = ManifiestoDescargas(self.download_dir)
+
+        self._lock = threading.Lock()
+        self._checkpoint: Dict[str, Dict[str, Any]] = self._cargar_checkpoint()
+        self.estadisticas: Dict[str, Any] = {}
+
+    # ===== API PÚBLICA =====
+
+    def ejecutar(
+        self,
+        empresas: List[str],
+        año_inicio: int,
+        año_fin: int,
+        callback_progreso: Callable[[str], None] = None,
+        debe_cancelar: Callable[[], bool] = None
+    ) -> Dict[str, Any]:
+        """
+        Descarga (o continúa descargando) un rango de años de varias empresas
+
+        Args:
+            empresas: Nombres (o parte del nombre) de las empresas
+            año_inicio: Año inicial (más reciente)
+            año_fin: Año final (más antiguo)
+            callback_progreso: Función para reportar progreso
+            debe_cancelar: Función que indica si hay que detener el lote
+                (lo pendiente queda para la próxima ejecución)
+
+        Returns:
+            Dict con 'resultados' {empresa: {año: estado}} y 'reporte'
+        """
+        def reportar(mensaje):
+            if callback_progreso:
+                callback_progreso(mensaje)
+            else:
+                print(mensaje)
+
+        años = list(range(año_inicio, año_fin - 1, -1))
+        self.estadisticas = {
+            'empresas': len(empresas),
+            'estados_solicitados': len(empresas) * len(años),
+            'descargados': 0,
+            'ya_descargados': 0,
+            'omitidos_checkpoint': 0,
+            'fallidos': 0,
+            'no_encontradas': 0,
+            'no_disponibles': 0,
+            'pendientes': 0,
+            'reintentos': 0,
+            'reinicios_navegador': 0,
+            'espera_cortesia_s': 0.0,
+            'motivos_fallo': Counter()
+        }
+        inicio = time.perf_counter()
+
+        cola: "queue.Queue[str]" = queue.Queue()
+        for empresa in empresas:
+            faltantes = self._faltantes(empresa, años)
+            self.estadisticas['omitidos_checkpoint'] += len(años) - len(faltantes)
+            if faltantes:
+                cola.put(empresa)
+        if self.estadisticas['omitidos_checkpoint']:
+            reportar(f"⏭️ {self.estadisticas['omitidos_checkpoint']} estado(s) financiero(s) ya resueltos en el checkpoint")
+        reportar(f"🚀 {cola.qsize()} empresa(s) con años pendientes, {min(self.sesiones, cola.qsize())} sesión(es)")
+
+        def trabajar(indice: int):
+            descargador = None
+            try:
+                while True:
+                    try:
+                        empresa = cola.get_nowait()
+                    except queue.Empty:
+                        return
+                    if debe_cancelar and debe_cancelar():
+                        continue
+                    descargador = self._procesar_empresa(descargador, indice, empresa, años, reportar, debe_cancelar)
+            finally:
+                self._soltar(descargador)
+
+        hilos = [
+            threading.Thread(target=trabajar, args=(i,), name=f"descarga_masiva_{i}", daemon=True)
+            for i in range(min(self.sesiones, cola.qsize()))
+        ]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+        resultados = {empresa: {año: self._estado(empresa, año) for año in años} for empresa in empresas}
+        self.estadisticas['pendientes'] = sum(
+            1 for por_año in resultados.values() for estado in por_año.values() if estado is None
+        )
+        segundos = time.perf_counter() - inicio
+        reporte = {
+            **self.estadisticas,
+            'motivos_fallo': dict(self.estadisticas['motivos_fallo']),
+            'segundos': segundos,
+            'estados_por_minuto': self.estadisticas['descargados'] / segundos * 60 if segundos else 0.0
+        }
+        return {'resultados': resultados, 'reporte': reporte}
+
+    def limpiar_checkpoint(self):
+        """Olvida el progreso guardado (los archivos y el manifiesto se conservan)"""
+        with self._lock:
+            self._checkpoint = {}
+            if os.path.exists(self.archivo_checkpoint):
+                os.remove(self.archivo_checkpoint)
+
+    # ===== TRABAJO DE UNA SESIÓN =====
+
+    def _abrir(self, indice: int, reportar: Callable[[str], None]) -> Optional[Any]:
+        """Crea e inicia un descargador, o lo toma del pool (el manifiesto lo lleva el lote)"""
+        if self.pool is not None:
+            # ✨ Navegador del pool compartido: respeta el límite global de navegadores
+            try:
+                return self.pool.tomar(self.download_dir, usar_manifiesto=False)
+            except (RuntimeError, TimeoutError) as e:
+                reportar(f"⚠️ Sesión {indice}: {str(e)}")
+                return None
+        reportar(f"🌐 Sesión {indice}: iniciando navegador...")
+        descargador = self.fabrica(
+            download_dir=self.download_dir, driver_path=self.driver_path, headless=self.headless, usar_manifiesto=False
+        )
+        if not descargador.iniciar_navegador():
+            descargador.cerrar_navegador()
+            return None
+        descargador.obtener_empresas_disponibles()
+        return descargador
+
+    def _reiniciar(self, descargador: Any, indice: int, reportar: Callable[[str], None]) -> Optional[Any]:
+        """Devuelve el formulario a su estado inicial; si el navegador no responde, lo reemplaza"""
+        if descargador is not None and descargador.saludable() and descargador.reiniciar_pagina():
+            return descargador
+        self._soltar(descargador, descartar=True)
+        with self._lock:
+            self.estadisticas['reinicios_navegador'] += 1
+        return self._abrir(indice, reportar)
+
+    def _soltar(self, descargador: Optional[Any], descartar: bool = False):
+        """Cierra el navegador de la sesión (o lo devuelve al pool; descartar=True si quedó en mal estado)"""
+        if descargador is None:
+            return
+        if self.pool is not None:
+            self.pool.devolver(descargador, descartar=descartar)
+        else:
+            descargador.cerrar_navegador()
+
+    def _procesar_empresa(
+        self,
+        descargador: Optional[Any],
+        indice: int,
+        empresa: str,
+        años: List[int],
+        reportar: Callable[[str], None],
+        debe_cancelar: Callable[[], bool]
+    ) -> Optional[Any]:
+        """
+        Descarga los años pendientes de una empresa
+
+        Returns:
+            El descargador (posiblemente reemplazado) para la siguiente empresa
+        """
+        pendientes = self._faltantes(empresa, años)
+        empresa_smv = None
+        intentos: Counter = Counter()
+
+        while pendientes:
+            if debe_cancelar and debe_cancelar():
+                return descargador
+            año = pendientes[0]
+
+            try:
+                if descargador is None:
+                    descargador = self._abrir(indice, reportar)
+                    empresa_smv = None
+                    if descargador is None:
+                        raise RuntimeError("No se pudo iniciar el navegador")
+
+                if empresa_smv is None:
+                    empresa_smv = descargador.buscar_empresa(empresa)
+                    if empresa_smv is None:
+                        if not descargador.empresas_disponibles:
+                            # Lista vacía = la SMV no respondió, no que la empresa no exista
+                            raise RuntimeError("No se pudo leer la lista de empresas de la SMV")
+                        self._anotar(empresa, años, NO_ENCONTRADA, error="Empresa no encontrada")
+                        reportar(f"❌ {empresa}: no se encontró en la SMV")
+                        return descargador
+                    if not descargador.seleccionar_empresa(empresa_smv) or not descargador.seleccionar_periodo_anual():
+                        raise RuntimeError(f"No se pudo seleccionar {empresa_smv['text']}")
+
+                if self.manifiesto.vigente(empresa_smv['value'], año):
+                    entrada = self.manifiesto.obtener(empresa_smv['value'], año)
+                    self._anotar(empresa, [año], COMPLETO, empresa_smv=empresa_smv['text'], archivo=entrada['ruta'], previo=True)
+                    pendientes.pop(0)
+                    continue
+
+                espera = self.limitador.esperar(self._host(descargador))
+                with self._lock:
+                    self.estadisticas['espera_cortesia_s'] += espera
+                descargador.ultima_descarga = None
+                descargador.sin_reporte = None
+                if not descargador.descargar_año(año) or not descargador.ultima_descarga:
+                    if getattr(descargador, 'sin_reporte', None) == año:
+                        # No publicado: no es un fallo y no se reintenta (el formulario sigue válido)
+                        self._anotar(empresa, [año], NO_DISPONIBLE, empresa_smv=empresa_smv['text'])
+                        reportar(f"➖ {empresa_smv['text']} {año}: sin estados financieros publicados")
+                        pendientes.pop(0)
+                        continue
+                    raise RuntimeError("La descarga no se completó")
+
+                entrada = self.manifiesto.registrar(
+                    descargador.ultima_descarga['ruta'], empresa_smv['value'], empresa_smv['text'], año
+                )
+                self._anotar(empresa, [año], COMPLETO, empresa_smv=empresa_smv['text'], archivo=entrada['ruta'])
+                reportar(f"✅ {empresa_smv['text']} {año} ({self._resumen_avance()})")
+                pendientes.pop(0)
+
+            except Exception as e:
+                intentos[año] += 1
+                if intentos[año] > self.reintentos:
+                    self._anotar(empresa, [año], FALLIDO, error=str(e))
+                    reportar(f"❌ {empresa} {año}: {str(e)}")
+                    pendientes.pop(0)
+                else:
+                    with self._lock:
+                        self.estadisticas['reintentos'] += 1
+                    reportar(f"🔁 {empresa} {año}: {str(e)} (intento {intentos[año] + 1} de {self.reintentos + 1})")
+                # El formulario (o el navegador) puede haber quedado en un estado inválido
+                descargador = self._reiniciar(descargador, indice, reportar)
+                empresa_smv = None
+
+        return descargador
+
+    @staticmethod
+    def _host(descargador: Any) -> str:
+        return urlparse(getattr(descargador, 'url_smv', None) or descargador.URL_SMV).netloc
+
+    def _resumen_avance(self) -> str:
+        with self._lock:
+            hechos = self.estadisticas['descargados'] + self.estadisticas['ya_descargados'] + self.estadisticas['omitidos_checkpoint']
+            return f"{hechos}/{self.estadisticas['estados_solicitados']}"
+
+    # ===== CHECKPOINT =====
+
+    @staticmethod
+    def _clave(empresa: str, año: int) -> str:
+        return f"{clave_busqueda(empresa)}|{año}"
+
+    def _estado(self, empresa: str, año: int) -> Optional[str]:
+        with self._lock:
+            entrada = self._checkpoint.get(self._clave(empresa, año))
+            return entrada['estado'] if entrada else None
+
+    def _faltantes(self, empresa: str, años: List[int]) -> List[int]:
+        """Años sin resolver (los fallidos de ejecuciones anteriores se vuelven a intentar)"""
+        return [año for año in años if self._estado(empresa, año) in (None, FALLIDO)]
+
+    def _anotar(self, empresa: str, años: List[int], estado: str, error: str = None,
+                empresa_smv: str = None, archivo: str = None, previo: bool = False):
+        """Registra el resultado de uno o más años y guarda el checkpoint"""
+        with self._lock:
+            for año in años:
+                self._checkpoint[self._clave(empresa, año)] = {
+                    'empresa': empresa,
+                    'empresa_smv': empresa_smv,
+                    'año': año,
+                    'estado': estado,
+                    'archivo': archivo,
+                    'error': error,
+                    'fecha': time.time()
+                }
+            if estado == COMPLETO:
+                self.estadisticas['ya_descargados' if previo else 'descargados'] += len(años)
+            elif estado == NO_ENCONTRADA:
+                self.estadisticas['no_encontradas'] += 1
+                self.estadisticas['motivos_fallo'][error] += len(años)
+            elif estado == NO_DISPONIBLE:
+                self.estadisticas['no_disponibles'] += len(años)
+            else:
+                self.estadisticas['fallidos'] += len(años)
+                self.estadisticas['motivos_fallo'][error] += len(años)
+            self._guardar_checkpoint()
+
+    def _cargar_checkpoint(self) -> Dict[str, Dict[str, Any]]:
+        """Lee el progreso de ejecuciones anteriores"""
+        if not os.path.exists(self.archivo_checkpoint):
+            return {}
+        try:
+            with open(self.archivo_checkpoint, 'r', encoding='utf-8') as f:
+                return json.load(f).get('estados', {})
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Checkpoint ilegible, se ignora: {str(e)}")
+            return {}
+
+    def _guardar_checkpoint(self):
+        """Escribe el checkpoint de forma atómica (un corte no deja el archivo a medias)"""
+        temporal = f"{self.archivo_checkpoint}.tmp"
+        try:
+            with open(temporal, 'w', encoding='utf-8') as f:
+                json.dump({'version': 1, 'estados': self._checkpoint}, f, ensure_ascii=False)
+            os.replace(temporal, self.archivo_checkpoint)
+        except OSError as e:
+            print(f"⚠️ No se pudo guardar el checkpoint: {str(e)}")
+
+
+def imprimir_reporte(reporte: Dict[str, Any]):
+    """Imprime el reporte de throughput y fallos de un lote"""
+    print("\n" + "=" * 70)
+    print("REPORTE DE LA DESCARGA MASIVA")
+    print("=" * 70)
+    print(f"🏢 Empresas: {reporte['empresas']} ({reporte['no_encontradas']} no encontradas)")
+    print(f"📄 Estados financieros: {reporte['estados_solicitados']} "
+          f"(✅ {reporte['descargados']} descargados, 📂 {reporte['ya_descargados']} ya en disco, "
+          f"⏭️ {reporte['omitidos_checkpoint']} del checkpoint, ➖ {reporte['no_disponibles']} no publicados, "
+          f"❌ {reporte['fallidos']} fallidos, "
+          f"⏸️ {reporte['pendientes']} pendientes)")
+    print(f"🔁 Reintentos: {reporte['reintentos']} · reinicios de navegador: {reporte['reinicios_navegador']}")
+    print(f"⏱️ Duración: {reporte['segundos']:.1f} s · espera de cortesía: {reporte['espera_cortesia_s']:.1f} s")
+    print(f"🚀 Throughput: {reporte['estados_por_minuto']:.1f} estados/min")
+    for motivo, cantidad in sorted(reporte['motivos_fallo'].items(), key=lambda item: -item[1]):
+        print(f"   ❌ {cantidad} × {motivo}")
+
+
+if __name__ == "__main__":
+    print("=" * 70)
+    print("DESCARGA MASIVA DE ESTADOS FINANCIEROS - SMV")
+    print("=" * 70)
+
+    lote = DescargaMasiva(sesiones=2, pool=obtener_pool_navegadores())
+    salida = lote.ejecutar(["SAN JUAN", "ALICORP", "BACKUS"], 2024, 2020)
+    imprimir_reporte(salida['reporte'])
+    print(f"\n💾 Progreso guardado en {lote.archivo_checkpoint} (relanzar continúa donde quedó)")
@@ -0,0 +1,389 @@
+"""
+Descarga Paralela de Estados Financieros (pool de sesiones)
+===========================================================
+Reparte los años (y empresas) a descargar entre varias sesiones de navegador
+independientes que trabajan a la vez.
+
+Características:
+- N sesiones aisladas, cada una con su propia carpeta de descargas (sin confundir
+  archivos entre sesiones); al terminar, cada archivo se mueve a la carpeta final
+- Cola compartida de trabajos (empresa, año): la sesión libre toma el siguiente
+- Reintentos por trabajo; si la sesión falla se reinicia su navegador antes de reintentar
+- Un año sin estados financieros publicados es un resultado final ('no disponible'):
+  no se reintenta ni se descarta la sesión
+- Tope global de navegadores abiertos en todo el proceso (todas las descargas en curso)
+- Misma interfaz de resultados que DescargadorSMV.proceso_completo
+- Manifiesto compartido: los años ya descargados se omiten y cada archivo se guarda
+  en la carpeta canónica de su empresa
+- Funciona con cualquier backend con la interfaz de DescargadorSMV (p. ej. DescargadorSMVHttp)
+"""
+
+import os
+import queue
+import shutil
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from descargador_smv import DescargadorSMV
+from manifiesto_descargas import ManifiestoDescargas
+
+
+MAX_NAVEGADORES_GLOBAL = 4     # Navegadores abiertos a la vez en todo el proceso
+SESIONES_POR_DEFECTO = 3
+REINTENTOS_POR_AÑO = 2
+
+# Tope compartido por todas las descargas paralelas del proceso
+_semaforo_global = threading.BoundedSemaphore(MAX_NAVEGADORES_GLOBAL)
+
+
+class SesionDescarga:
+    """Una sesión de navegador con carpeta propia, reutilizada para varios trabajos"""
+
+    def __init__(self, indice: int, carpeta: str, fabrica: Callable[..., Any], headless: bool, driver_path: Optional[str],
+                 pool: Any = None):
+        self.indice = indice
+        self.carpeta = carpeta
+        self._fabrica = fabrica
+        self._headless = headless
+        self._driver_path = driver_path
+        self._pool = pool
+        self.descargador = None
+        self.empresa_actual: Optional[str] = None
+
+    def abrir(self) -> bool:
+        """Inicia el navegador de la sesión"""
+        os.makedirs(self.carpeta, exist_ok=True)
+        self.empresa_actual = None
+        if self._pool is not None:
+            # ✨ Navegador ya caliente del pool (el manifiesto lo lleva el planificador)
+            try:
+                self.descargador = self._pool.tomar(self.carpeta, usar_manifiesto=False)
+                return True
+            except (RuntimeError, TimeoutError) as e:
+                print(f"⚠️ Sesión {self.indice}: {str(e)}")
+                return False
+        # El manifiesto lo lleva el planificador (carpeta final), no cada sesión
+        self.descargador = self._fabrica(
+            download_dir=self.carpeta, driver_path=self._driver_path, headless=self._headless, usar_manifiesto=False
+        )
+        if not self.descargador.iniciar_navegador():
+            self.descargador = None
+            return False
+        self.descargador.obtener_empresas_disponibles()
+        return True
+
+    def cerrar(self, descartar: bool = False):
+        """Cierra el navegador de la sesión (o lo devuelve al pool; descartar=True si quedó en mal estado)"""
+        if self.descargador is not None:
+            if self._pool is not None:
+                self._pool.devolver(self.descargador, descartar=descartar)
+            else:
+                self.descargador.cerrar_navegador()
+        self.descargador = None
+        self.empresa_actual = None
+
+    def preparar_empresa(self, nombre_empresa: str) -> Optional[Dict[str, str]]:
+        """Deja el formulario con la empresa y el periodo anual seleccionados"""
+        empresa = self.descargador.buscar_empresa(nombre_empresa)
+        if empresa is None:
+            return None
+        if self.empresa_actual != empresa['text']:
+            if not self.descargador.seleccionar_empresa(empresa) or not self.descargador.seleccionar_periodo_anual():
+                raise RuntimeError(f"No se pudo seleccionar {empresa['text']}")
+            self.empresa_actual = empresa['text']
+        return empresa
+
+
+class DescargadorParalelo:
+    """Planificador de descargas SMV con varias sesiones simultáneas"""
+
+    def __init__(
+        self,
+        download_dir: str = None,
+        num_sesiones: int = SESIONES_POR_DEFECTO,
+        headless: bool = True,
+        driver_path: str = None,
+        reintentos: int = REINTENTOS_POR_AÑO,
+        fabrica: Callable[..., Any] = DescargadorSMV,
+        pool: Any = None
+    ):
+        """
+        Configura el planificador
+
+        Args:
+            download_dir: Carpeta final de descargas (default: ./descargas)
+            num_sesiones: Sesiones de navegador en paralelo
+            headless: Navegadores sin ventana
+            driver_path: Ruta del ChromeDriver (None = automático)
+            reintentos: Reintentos por año ante un fallo
+            fabrica: Clase/función que crea cada descargador (DescargadorSMV por defecto)
+            pool: PoolNavegadores del que tomar navegadores calientes (None = crear y cerrar los propios)
+        """
+        self.download_dir = download_dir or os.path.join(os.getcwd(), "descargas")
+        os.makedirs(self.download_dir, exist_ok=True)
+        self.num_sesiones = max(1, num_sesiones)
+        self.headless = headless
+        self.driver_path = driver_path
+        self.reintentos = reintentos
+        self.fabrica = fabrica
+        self.pool = pool
+        self.manifiesto = ManifiestoDescargas(self.download_dir)
+        self._lock = threading.Lock()
+
+    # ===== API PÚBLICA =====
+
+    def descargar(
+        self,
+        empresas: List[str],
+        año_inicio: int,
+        año_fin: int,
+        callback_progreso: Callable = None,
+        debe_cancelar: Callable[[], bool] = None,
+        refrescar_recientes: int = 0,
+        callback_archivo: Callable[[Dict], None] = None
+    ) -> Dict[str, Dict]:
+        """
+        Descarga un rango de años de varias empresas repartiendo el trabajo entre sesiones
+
+        Args:
+            empresas: Nombres (o parte del nombre) de las empresas
+            año_inicio: Año inicial (más reciente)
+            año_fin: Año final (más antiguo)
+            callback_progreso: Función callback para actualizar progreso
+            debe_cancelar: Función que devuelve True para dejar de tomar trabajos
+            refrescar_recientes: Años más recientes que se vuelven a pedir aunque ya estén descargados
+            callback_archivo: Recibe {'ruta', 'empresa', 'año', 'estado'} en cuanto cada archivo está en
+                              la carpeta final (desde el hilo de la sesión que lo descargó)
+
+        Returns:
+            Dict {nombre_buscado: resultado con las claves de DescargadorSMV.proceso_completo}
+        """
+        años = list(range(año_inicio, año_fin - 1, -1))
+        trabajos: "queue.Queue[Tuple[str, int, int]]" = queue.Queue()
+        for empresa in empresas:
+            for año in años:
+                trabajos.put((empresa, año, 0))
+        total = trabajos.qsize()
+        años_refrescar = set(años[:refrescar_recientes])
+
+        estado = {
+            empresa: {'empresa': None, 'exitosos': [], 'fallidos': [], 'pendientes': [], 'omitidos': [],
+                      'no_disponibles': [], 'error': None}
+            for empresa in empresas
+        }
+        completados = [0]
+        inicio = time.perf_counter()
+
+        def reportar(mensaje: str):
+            if callback_progreso:
+                callback_progreso(mensaje)
+
+        def registrar(empresa: str, año: int, clave: str):
+            with self._lock:
+                estado[empresa][clave].append(año)
+                if clave != 'pendientes':
+                    completados[0] += 1
+                    return completados[0]
+            return None
+
+        def trabajar(indice: int):
+            sesion = SesionDescarga(
+                indice,
+                os.path.join(self.download_dir, f".sesion_{os.getpid()}_{id(self)}_{indice}"),
+                self.fabrica, self.headless, self.driver_path, self.pool
+            )
+            with _semaforo_global:
+                try:
+                    while True:
+                        try:
+                            empresa, año, intento = trabajos.get_nowait()
+                        except queue.Empty:
+                            return
+
+                        if debe_cancelar and debe_cancelar():
+                            registrar(empresa, año, 'pendientes')
+                            continue
+                        if estado[empresa]['error']:
+                            registrar(empresa, año, 'fallidos')
+                            continue
+
+                        resultado, error_empresa, archivo = self._procesar(sesion, empresa, año, año in años_refrescar, reportar)
+                        exito = resultado is not None
+                        if archivo and callback_archivo:
+                            callback_archivo(archivo)
+                        if error_empresa:
+                            with self._lock:
+                                estado[empresa]['error'] = error_empresa
+                            numero = registrar(empresa, año, 'fallidos')
+                        elif resultado == 'no_disponible':
+                            # La SMV respondió sin estados publicados: reintentar no cambiaría nada
+                            with self._lock:
+                                estado[empresa]['empresa'] = sesion.empresa_actual
+                            numero = registrar(empresa, año, 'no_disponibles')
+                        elif exito:
+                            with self._lock:
+                                estado[empresa]['empresa'] = sesion.empresa_actual
+                                if resultado == 'omitido':
+                                    estado[empresa]['omitidos'].append(año)
+                            numero = registrar(empresa, año, 'exitosos')
+                        elif intento < self.reintentos:
+                            # Reintento con el navegador reiniciado (puede estar en un estado inválido)
+                            reportar(f"🔁 Sesión {indice}: reintentando {empresa} {año} (intento {intento + 1} de {self.reintentos})")
+                            sesion.cerrar(descartar=True)
+                            trabajos.put((empresa, año, intento + 1))
+                            continue
+                        else:
+                            numero = registrar(empresa, año, 'fallidos')
+
+                        iconos = {'omitido': '⏭️ ya descargado', 'no_disponible': '➖ no publicado', 'descargado': '✅'}
+                        icono = iconos.get(resultado, '❌')
+                        reportar(f"🔄 {empresa} {año}: {icono} ({numero}/{total})")
+                finally:
+                    sesion.cerrar()
+                    shutil.rmtree(sesion.carpeta, ignore_errors=True)
+
+        num_hilos = min(self.num_sesiones, total) if total else 0
+        reportar(f"🚀 {total} descarga(s) repartidas en {num_hilos} sesión(es) en paralelo")
+        hilos = [threading.Thread(target=trabajar, args=(i,), name=f"sesion_descarga_{i}", daemon=True) for i in range(num_hilos)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        reportar(f"⏱️ Descargas completadas en {time.perf_counter() - inicio:.1f} s")
+
+        resultados = {}
+        for empresa, datos in estado.items():
+            if datos['error'] and not datos['exitosos']:
+                resultados[empresa] = {'error': datos['error']}
+                continue
+            exitosos = sorted(datos['exitosos'], reverse=True)
+            fallidos = sorted(datos['fallidos'], reverse=True)
+            pendientes = sorted(datos['pendientes'], reverse=True)
+            resultados[empresa] = {
+                'empresa': datos['empresa'] or empresa,
+                'años_exitosos': exitosos,
+                'años_fallidos': fallidos,
+                'total_exitosos': len(exitosos),
+                'total_fallidos': len(fallidos),
+                'años_pendientes': pendientes,
+                'años_omitidos': sorted(datos['omitidos'], reverse=True),
+                'años_no_disponibles': sorted(datos['no_disponibles'], reverse=True),
+                'cancelado': bool(pendientes),
+                'carpeta_descargas': self.download_dir
+            }
+        return resultados
+
+    def proceso_completo(
+        self,
+        nombre_empresa: str,
+        año_inicio: int,
+        año_fin: int,
+        callback_progreso: Callable = None,
+        debe_cancelar: Callable[[], bool] = None,
+        refrescar_recientes: int = 0,
+        callback_archivo: Callable[[Dict], None] = None
+    ) -> Dict:
+        """Misma interfaz que DescargadorSMV.proceso_completo, con los años repartidos entre sesiones"""
+        return self.descargar(
+            [nombre_empresa], año_inicio, año_fin, callback_progreso, debe_cancelar, refrescar_recientes, callback_archivo
+        )[nombre_empresa]
+
+    # ===== TRABAJO DE UNA SESIÓN =====
+
+    def _procesar(
+        self, sesion: SesionDescarga, empresa: str, año: int, refrescar: bool, reportar: Callable[[str], None]
+    ) -> Tuple[Optional[str], Optional[str], Optional[Dict]]:
+        """
+        Descarga un año en la sesión (abriéndola si hace falta)
+
+        Returns:
+            ('descargado' | 'omitido' | 'no_disponible' | None si falló, error que invalida a toda la empresa,
+             archivo {'ruta', 'empresa', 'año', 'estado'} en la carpeta final o None)
+        """
+        try:
+            if sesion.descargador is None:
+                reportar(f"🌐 Sesión {sesion.indice}: iniciando navegador...")
+                if not sesion.abrir():
+                    return None, None, None
+
+            empresa_smv = sesion.preparar_empresa(empresa)
+            if empresa_smv is None:
+                return None, f"No se encontró la empresa: {empresa}", None
+
+            def archivo(ruta_relativa: str, estado: str) -> Dict:
+                ruta = os.path.join(self.download_dir, ruta_relativa)
+                return {'ruta': ruta, 'empresa': empresa_smv['text'], 'año': año, 'estado': estado}
+
+            if not refrescar and self.manifiesto.vigente(empresa_smv['value'], año):
+                return 'omitido', None, archivo(self.manifiesto.obtener(empresa_smv['value'], año)['ruta'], 'omitido')
+
+            self._vaciar_carpeta(sesion.carpeta)
+            sesion.descargador.sin_reporte = None
+            if not sesion.descargador.descargar_año(año):
+                if getattr(sesion.descargador, 'sin_reporte', None) == año:
+                    return 'no_disponible', None, None
+                return None, None, None
+
+            descarga = sesion.descargador.ultima_descarga
+            if descarga and os.path.exists(descarga['ruta']):
+                entrada = self.manifiesto.registrar(descarga['ruta'], empresa_smv['value'], empresa_smv['text'], año)
+                return 'descargado', None, archivo(entrada['ruta'], 'descargado')
+            nombre = self._mover_descarga(sesion.carpeta)
+            if nombre is None:
+                return None, None, None
+            return 'descargado', None, archivo(nombre, 'descargado')
+        except Exception as e:
+            reportar(f"⚠️ Sesión {sesion.indice}: {empresa} {año} falló: {str(e)}")
+            return None, None, None
+
+    def _vaciar_carpeta(self, carpeta: str):
+        """Elimina restos de intentos anteriores en la carpeta de la sesión"""
+        for nombre in os.listdir(carpeta):
+            try:
+                os.remove(os.path.join(carpeta, nombre))
+            except OSError:
+                pass
+
+    def _mover_descarga(self, carpeta: str) -> Optional[str]:
+        """Respaldo sin archivo identificado: mueve el más reciente de la sesión a la carpeta final"""
+        archivos = [f for f in os.listdir(carpeta) if f.endswith(('.xls', '.xlsx'))]
+        if not archivos:
+            return None
+        nombre = max(archivos, key=lambda f: os.path.getmtime(os.path.join(carpeta, f)))
+        base, extension = os.path.splitext(nombre)
+
+        with self._lock:
+            destino = os.path.join(self.download_dir, nombre)
+            contador = 1
+            while os.path.exists(destino):
+                destino = os.path.join(self.download_dir, f"{base} ({contador}){extension}")
+                contador += 1
+            shutil.move(os.path.join(carpeta, nombre), destino)
+        return os.path.basename(destino)
+
+
+if __name__ == "__main__":
+    print("=" * 70)
+    print("DESCARGA PARALELA DE ESTADOS FINANCIEROS - SMV")
+    print("=" * 70)
+
+    planificador = DescargadorParalelo(num_sesiones=3, headless=True)
+    inicio = time.perf_counter()
+    resultados = planificador.descargar(
+        empresas=["SAN JUAN"],
+        año_inicio=2024,
+        año_fin=2015,
+        callback_progreso=lambda mensaje: print(f"  {mensaje}")
+    )
+
+    print("\n" + "=" * 70)
+    print(f"RESUMEN ({time.perf_counter() - inicio:.1f} s)")
+    print("=" * 70)
+    for nombre, resultado in resultados.items():
+        if 'error' in resultado:
+            print(f"❌ {nombre}: {resultado['error']}")
+        else:
+            print(f"✅ {resultado['empresa']}: {resultado['total_exitosos']} año(s) {resultado['años_exitosos']}")
+            if resultado['años_fallidos']:
+                print(f"⚠️ Fallidos: {resultado['años_fallidos']}")
@@ -0,0 +1,351 @@
+"""
+Base Común de los Descargadores SMV
+===================================
+Lógica compartida por DescargadorSMV (Selenium) y DescargadorSMVHttp (HTTP directo):
+todo lo que no depende de cómo se habla con el formulario de la SMV.
+
+Características:
+- proceso_completo y descargar_rango_años: mismo flujo y mismas claves de resultado
+  en ambos backends
+- Manifiesto de descargas: omite los años ya descargados y mueve cada archivo nuevo
+  a su carpeta de empresa
+- Entrega de cada archivo en cuanto está en disco (callback_archivo)
+- Lista y búsqueda de empresas con el índice normalizado de catalogo_empresas; solo la
+  lista leída de la SMV oficial actualiza el catálogo compartido (no la de una réplica)
+- Cada backend implementa solo el transporte: iniciar_navegador, cerrar_navegador,
+  reiniciar_pagina, cambiar_carpeta_descargas, seleccionar_*, descargar_año y
+  la lectura de las opciones del combo de empresas
+"""
+
+import os
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from catalogo_empresas import IndiceEmpresas, normalizar_texto, obtener_catalogo
+from manifiesto_descargas import ManifiestoDescargas
+
+
+class DescargadorSMVBase:
+    """Flujo de descarga común; las subclases implementan el transporte"""
+
+    # URL base de la SMV
+    URL_SMV = "https://www.smv.gob.pe/SIMV/Frm_InformacionFinanciera?data=A70181B60967D74090DCD93C4920AA1D769614EC12"
+    HOST_OFICIAL = urlparse(URL_SMV).netloc   # Fijo aunque se reemplace URL_SMV (pruebas, servidor simulado)
+
+    # Mensajes y pausas propios de cada backend
+    PAUSA_ENTRE_AÑOS = 0.0
+    MENSAJE_INICIO = "🚀 Iniciando navegador..."
+    MENSAJE_CIERRE = None
+    ERROR_INICIO = 'No se pudo iniciar el navegador'
+
+    def __init__(self, download_dir: str = None, usar_manifiesto: bool = True):
+        """
+        Prepara la carpeta de descargas y el estado común
+
+        Args:
+            download_dir: Ruta de la carpeta de descargas (default: ./descargas)
+            usar_manifiesto: Si True, omite los años ya descargados y ordena los archivos por empresa
+        """
+        if download_dir is None:
+            self.download_dir = os.path.join(os.getcwd(), "descargas")
+        else:
+            self.download_dir = download_dir
+        os.makedirs(self.download_dir, exist_ok=True)
+
+        self.empresas_disponibles = []
+        self._indice_empresas = None
+        self.empresa_actual = None
+        self.codigo_empresa = None
+        self.ultima_descarga = None  # Último archivo descargado, con su empresa y año
+        self.sin_reporte = None      # Año cuyo último intento no encontró estados financieros publicados
+
+        # ✨ Manifiesto: qué años de qué empresa ya están en disco
+        self.manifiesto = ManifiestoDescargas(self.download_dir) if usar_manifiesto else None
+
+    # ===== TRANSPORTE (cada backend) =====
+
+    def _conectado(self) -> bool:
+        """True si ya hay un navegador/sesión abierto (p. ej. arrendado del pool)"""
+        raise NotImplementedError
+
+    def _opciones_empresas(self) -> List[Tuple[str, str]]:
+        """Pares (value, texto) de las opciones del combo de empresas de la página actual"""
+        raise NotImplementedError
+
+    def iniciar_navegador(self) -> bool:
+        raise NotImplementedError
+
+    def cerrar_navegador(self):
+        raise NotImplementedError
+
+    def seleccionar_empresa(self, empresa: Dict[str, str]) -> bool:
+        raise NotImplementedError
+
+    def seleccionar_periodo_anual(self) -> bool:
+        raise NotImplementedError
+
+    def descargar_año(self, año: int, callback_progreso: Callable = None) -> bool:
+        raise NotImplementedError
+
+    # ===== EMPRESAS =====
+
+    def obtener_empresas_disponibles(self) -> List[Dict[str, str]]:
+        """
+        Obtiene la lista de empresas disponibles en el combo
+
+        Returns:
+            List[Dict]: Lista de diccionarios con 'value' y 'text' de cada empresa
+        """
+        try:
+            empresas = []
+            for value, text in self._opciones_empresas():
+                # Filtrar opción vacía o "Seleccione"
+                if value and value != "0" and text.lower() != "seleccione":
+                    empresas.append({'value': value, 'text': text})
+
+            self.empresas_disponibles = empresas
+            self._indice_empresas = IndiceEmpresas(empresas)
+            if empresas and self.es_smv_oficial():
+                obtener_catalogo().registrar(empresas)  # La lista recién leída mantiene el catálogo al día
+            return empresas
+
+        except Exception as e:
+            print(f"❌ Error al obtener empresas: {str(e)}")
+            return []
+
+    def url_formulario(self) -> str:
+        """URL del formulario que usa este descargador (url_smv del backend HTTP o URL_SMV)"""
+        return getattr(self, 'url_smv', None) or self.URL_SMV
+
+    def es_smv_oficial(self) -> bool:
+        """True si el formulario es el de la SMV real (y no una réplica o el servidor simulado)"""
+        return urlparse(self.url_formulario()).netloc == self.HOST_OFICIAL
+
+    def buscar_empresa(self, nombre_busqueda: str) -> Optional[Dict[str, str]]:
+        """
+        Busca una empresa por nombre (búsqueda parcial)
+
+        Args:
+            nombre_busqueda: Texto a buscar en el nombre de la empresa
+
+        Returns:
+            Dict con 'value' y 'text' de la primera empresa encontrada, o None
+        """
+        if not self.empresas_disponibles:
+            self.obtener_empresas_disponibles()
+
+        # ✨ Índice normalizado (sin acentos ni puntuación) en lugar de recorrer la lista tres veces:
+        # exacto > empieza por > palabras > contiene > parecido
+        if self._indice_empresas is None:
+            self._indice_empresas = IndiceEmpresas(self.empresas_disponibles)
+        return self._indice_empresas.mejor(nombre_busqueda)
+
+    def _normalizar_texto(self, texto: str) -> str:
+        """Normaliza texto removiendo acentos y convirtiendo a minúsculas"""
+        return normalizar_texto(texto)
+
+    # ===== DESCARGAS =====
+
+    def descargar_rango_años(
+        self,
+        año_inicio: int,
+        año_fin: int,
+        callback_progreso: Callable = None,
+        debe_cancelar: Callable[[], bool] = None,
+        refrescar_recientes: int = 0,
+        callback_archivo: Callable[[Dict], None] = None
+    ) -> Dict[str, List[int]]:
+        """
+        Descarga estados financieros de un rango de años
+
+        Args:
+            año_inicio: Año inicial (más reciente, ej: 2024)
+            año_fin: Año final (más antiguo, ej: 2020)
+            callback_progreso: Función callback para actualizar progreso
+            debe_cancelar: Función que devuelve True para detener antes del siguiente año
+            refrescar_recientes: Años más recientes que se vuelven a pedir aunque ya estén descargados
+            callback_archivo: Recibe {'ruta', 'empresa', 'año', 'estado'} en cuanto el archivo de cada año
+                              está en disco (también los omitidos), para procesarlo sin esperar al resto
+
+        Returns:
+            Dict con listas de años 'exitosos', 'fallidos', 'pendientes' (no intentados por cancelación),
+            'omitidos' (ya descargados; también cuentan como exitosos) y 'no_disponibles'
+            (sin estados financieros publicados en la SMV; no son fallos)
+        """
+        resultados = {
+            'exitosos': [],
+            'fallidos': [],
+            'pendientes': [],
+            'omitidos': [],
+            'no_disponibles': []
+        }
+
+        # Generar lista de años (descendente)
+        años = list(range(año_inicio, año_fin - 1, -1))
+        total_años = len(años)
+
+        # ✨ Solo se piden a la SMV los años que faltan (o los recientes que pueden haber cambiado)
+        if self.manifiesto is not None and self.codigo_empresa:
+            años_a_descargar = set(self.manifiesto.faltantes(self.codigo_empresa, años, refrescar_recientes=refrescar_recientes))
+        else:
+            años_a_descargar = set(años)
+        ultimo_descargable = min(años_a_descargar) if años_a_descargar else None
+
+        for idx, año in enumerate(años, 1):
+            # ✨ Cancelación cooperativa entre años
+            if debe_cancelar and debe_cancelar():
+                resultados['pendientes'] = años[idx - 1:]
+                if callback_progreso:
+                    callback_progreso(f"🛑 Descarga cancelada. Años sin descargar: {', '.join(map(str, resultados['pendientes']))}")
+                break
+
+            if año not in años_a_descargar:
+                resultados['exitosos'].append(año)
+                resultados['omitidos'].append(año)
+                self._entregar_archivo(callback_archivo, año, 'omitido')
+                if callback_progreso:
+                    callback_progreso(f"⏭️ Año {año} ya descargado, se omite ({idx}/{total_años})")
+                continue
+
+            if callback_progreso:
+                callback_progreso(f"\n🔄 Procesando año {año} ({idx}/{total_años})...")
+
+            self.sin_reporte = None
+            if self.descargar_año(año, callback_progreso):
+                resultados['exitosos'].append(año)
+                self._registrar_en_manifiesto(año, callback_progreso)
+                self._entregar_archivo(callback_archivo, año, 'descargado')
+            elif self.sin_reporte == año:
+                resultados['no_disponibles'].append(año)
+            else:
+                resultados['fallidos'].append(año)
+
+            # Pequeña pausa entre descargas (solo si el backend la necesita)
+            if self.PAUSA_ENTRE_AÑOS and año != ultimo_descargable:
+                time.sleep(self.PAUSA_ENTRE_AÑOS)
+
+        return resultados
+
+    def _registrar_en_manifiesto(self, año: int, callback_progreso: Callable = None):
+        """Mueve el archivo recién descargado a su carpeta de empresa y lo anota en el manifiesto"""
+        if self.manifiesto is None or not self.ultima_descarga or not self.codigo_empresa:
+            return
+        entrada = self.manifiesto.registrar(
+            self.ultima_descarga['ruta'], self.codigo_empresa, self.empresa_actual, año
+        )
+        self.ultima_descarga = {**self.ultima_descarga, 'ruta': os.path.join(self.manifiesto.carpeta, entrada['ruta'])}
+        if callback_progreso:
+            estados = {'nuevo': '🆕 Guardado', 'actualizado': '♻️ Actualizado', 'sin_cambios': '✔️ Sin cambios'}
+            callback_progreso(f"{estados[entrada['estado']]}: {entrada['ruta']}")
+
+    def _entregar_archivo(self, callback_archivo: Optional[Callable[[Dict], None]], año: int, estado: str):
+        """Avisa que el archivo de un año ya está en su ruta definitiva ('descargado' u 'omitido')"""
+        if not callback_archivo:
+            return
+        if estado == 'omitido':
+            entrada = self.manifiesto.obtener(self.codigo_empresa, año)
+            ruta = os.path.join(self.manifiesto.carpeta, entrada['ruta']) if entrada else None
+        else:
+            ruta = self.ultima_descarga['ruta'] if self.ultima_descarga else None
+        if ruta:
+            callback_archivo({'ruta': ruta, 'empresa': self.empresa_actual, 'año': año, 'estado': estado})
+
+    def proceso_completo(
+        self,
+        nombre_empresa: str,
+        año_inicio: int,
+        año_fin: int,
+        callback_progreso: Callable = None,
+        debe_cancelar: Callable[[], bool] = None,
+        refrescar_recientes: int = 0,
+        callback_archivo: Callable[[Dict], None] = None
+    ) -> Dict:
+        """
+        Proceso completo: buscar empresa y descargar rango de años
+
+        Args:
+            nombre_empresa: Nombre de la empresa a buscar
+            año_inicio: Año inicial (más reciente)
+            año_fin: Año final (más antiguo)
+            callback_progreso: Función callback para actualizar progreso
+            debe_cancelar: Función que devuelve True para detener el proceso (ej: tarea en segundo plano)
+            refrescar_recientes: Años más recientes que se vuelven a pedir aunque ya estén descargados
+            callback_archivo: Recibe {'ruta', 'empresa', 'año', 'estado'} en cuanto el archivo de cada año
+                              está en disco (también los omitidos), para procesarlo sin esperar al resto
+
+        Returns:
+            Dict con resultados del proceso
+        """
+        # ✨ Un navegador/sesión ya abierto (p. ej. arrendado del pool) se reutiliza y no se cierra al terminar
+        propio = not self._conectado()
+        cerrar = self.cerrar_navegador if propio else (lambda: None)
+
+        try:
+            inicio = time.perf_counter()
+            if propio:
+                if callback_progreso:
+                    callback_progreso(self.MENSAJE_INICIO)
+
+                if not self.iniciar_navegador():
+                    return {'error': self.ERROR_INICIO}
+
+            if not self.empresas_disponibles:
+                if callback_progreso:
+                    callback_progreso("📋 Obteniendo lista de empresas...")
+
+                self.obtener_empresas_disponibles()
+
+            if callback_progreso:
+                callback_progreso(f"🔍 Buscando empresa: {nombre_empresa}")
+
+            empresa = self.buscar_empresa(nombre_empresa)
+
+            if not empresa:
+                cerrar()
+                return {'error': f'No se encontró la empresa: {nombre_empresa}'}
+
+            if callback_progreso:
+                callback_progreso(f"✅ Empresa encontrada: {empresa['text']}")
+
+            if not self.seleccionar_empresa(empresa):
+                cerrar()
+                return {'error': 'No se pudo seleccionar la empresa'}
+
+            if callback_progreso:
+                callback_progreso("📅 Seleccionando periodo anual...")
+
+            if not self.seleccionar_periodo_anual():
+                cerrar()
+                return {'error': 'No se pudo seleccionar periodo anual'}
+
+            if callback_progreso:
+                callback_progreso(f"📥 Iniciando descargas de {año_inicio} a {año_fin}...")
+
+            resultados = self.descargar_rango_años(
+                año_inicio, año_fin, callback_progreso, debe_cancelar, refrescar_recientes, callback_archivo
+            )
+
+            if propio and self.MENSAJE_CIERRE and callback_progreso:
+                callback_progreso(self.MENSAJE_CIERRE)
+
+            cerrar()
+            if callback_progreso:
+                callback_progreso(f"⏱️ Descarga completada en {time.perf_counter() - inicio:.1f} s")
+
+            return {
+                'empresa': empresa['text'],
+                'años_exitosos': resultados['exitosos'],
+                'años_fallidos': resultados['fallidos'],
+                'total_exitosos': len(resultados['exitosos']),
+                'total_fallidos': len(resultados['fallidos']),
+                'años_pendientes': resultados['pendientes'],
+                'años_omitidos': resultados['omitidos'],
+                'años_no_disponibles': resultados['no_disponibles'],
+                'cancelado': bool(resultados['pendientes']),
+                'carpeta_descargas': self.download_dir
+            }
+
+        except Exception as e:
+            cerrar()
+            return {'error': f'Error en proceso completo: {str(e)}'}
@@ -6,6 +6,8 @@ Automatiza la descarga de estados financieros desde la web de la SMV (Superinten
 Características:
 - Búsqueda automática de empresas por nombre
 - Descarga consecutiva de múltiples años
+- Detección de descargas por eventos del sistema de archivos (sin esperas fijas)
+- Descargas incrementales: manifiesto por empresa/año y carpetas canónicas por empresa
 - Barra de progreso en tiempo real
 - Configuración de carpeta de descargas personalizada
 - Manejo de errores robusto
@@ -22,44 +24,66 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
-from webdriver_manager.chrome import ChromeDriverManager  # ✨ Gestión automática de ChromeDriver
 import time
 import os
-from typing import List, Dict, Callable, Optional
+from typing import List, Dict, Callable, Tuple
 from pathlib import Path
 import streamlit as st
+from vigilante_descargas import VigilanteDescargas
+from manifiesto_descargas import ManifiestoDescargas
+from descargador_base import DescargadorSMVBase  # ✨ Flujo común con DescargadorSMVHttp
+from resolver_driver import obtener_resolvedor_driver  # ✨ ChromeDriver resuelto una vez y fijado por versión
 
+# Importar configuración de API (con valores por defecto si falta algún parámetro)
+try:
+    import config_api
+except ImportError:
+    config_api = None
 
-class DescargadorSMV:
+SMV_PERFIL_LIGERO = getattr(config_api, 'SMV_PERFIL_LIGERO', False)  # Bloquear recursos que el formulario no necesita (medir antes con benchmark_descargador.py)
+SMV_BLOQUEAR_CSS = getattr(config_api, 'SMV_BLOQUEAR_CSS', False)    # La animación de carga (myLoading) puede depender de estilos
+
+# ✨ Recursos que no hacen falta para rellenar el formulario ni exportar el Excel
+RECURSOS_BLOQUEADOS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.svg", "*.ico", "*.webp",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*", "*facebook.net*"
+]
+RECURSOS_CSS = ["*.css", "*fonts.googleapis.com*"]
+
+
+class DescargadorSMV(DescargadorSMVBase):
     """Clase para automatizar descargas de estados financieros desde la SMV"""
     
-    # URL base de la SMV
-    URL_SMV = "https://www.smv.gob.pe/SIMV/Frm_InformacionFinanciera?data=A70181B60967D74090DCD93C4920AA1D769614EC12"
+    PAUSA_ENTRE_AÑOS = 2.0
+    MENSAJE_INICIO = "🚀 Iniciando navegador..."
+    MENSAJE_CIERRE = "🔒 Cerrando navegador..."
+    ERROR_INICIO = 'No se pudo iniciar el navegador'
     
-    def __init__(self, download_dir: str = None, driver_path: str = None, headless: bool = True):
+    def __init__(self, download_dir: str = None, driver_path: str = None, headless: bool = True,
+                 usar_manifiesto: bool = True, perfil_ligero: bool = None):
         """
         Inicializa el descargador
         
         Args:
             download_dir: Ruta de la carpeta de descargas (default: ./descargas)
-            driver_path: Ruta del ChromeDriver (default: gestión automática con webdriver-manager)
+            driver_path: Ruta del ChromeDriver (default: caché local → drivers/ → webdriver-manager)
             headless: Si True, ejecuta sin mostrar ventana de Chrome (más rápido)
+            usar_manifiesto: Si True, omite los años ya descargados y ordena los archivos por empresa
+            perfil_ligero: Bloquear imágenes/fuentes/analítica y cargar páginas en modo "eager"
+                           (default: SMV_PERFIL_LIGERO de config_api)
         """
-        # Configurar carpeta de descargas
-        if download_dir is None:
-            self.download_dir = os.path.join(os.getcwd(), "descargas")
-        else:
-            self.download_dir = download_dir
-        
-        # Crear carpeta si no existe
-        os.makedirs(self.download_dir, exist_ok=True)
+        # Carpeta de descargas, manifiesto y estado de la empresa actual
+        super().__init__(download_dir, usar_manifiesto)
         
-        # Configurar ruta del driver (None = usar webdriver-manager automático)
+        # Configurar ruta del driver (None = resolución automática, ver resolver_driver.py)
         self.driver_path = driver_path
         self.headless = headless
+        self.perfil_ligero = SMV_PERFIL_LIGERO if perfil_ligero is None else perfil_ligero
         
         self.driver = None
-        self.empresas_disponibles = []
+        self.vigilante = None
+        self.tiempos_arranque = {}  # ✨ Segundos de cada fase del último arranque (driver, Chrome, página)
     
     def _configurar_chrome(self) -> webdriver.Chrome:
         """
@@ -92,16 +116,44 @@ class DescargadorSMV:
             options.add_argument("--headless=new")  # Nuevo modo headless de Chrome
             options.add_argument("--window-size=1920,1080")  # Tamaño de ventana virtual
         
-        # ✨ Usar webdriver-manager para gestión automática de ChromeDriver
-        if self.driver_path is None:
-            # Gestión automática - descarga la versión correcta automáticamente
-            service = Service(ChromeDriverManager().install())
-        else:
-            # Usar ruta manual si se especificó
-            service = Service(executable_path=self.driver_path)
+        # ✨ PERFIL LIGERO - Solo se necesitan los controles del formulario y la exportación a Excel
+        if self.perfil_ligero:
+            options.page_load_strategy = "eager"  # No esperar imágenes ni subrecursos: basta con el DOM
+            options.add_experimental_option("prefs", {
+                **prefs,
+                "profile.managed_default_content_settings.images": 2,
+                "profile.default_content_setting_values.notifications": 2
+            })
+            options.add_argument("--blink-settings=imagesEnabled=false")
+            options.add_argument("--disable-extensions")
+            options.add_argument("--disable-background-networking")
+            options.add_argument("--disable-component-update")
+            options.add_argument("--disable-default-apps")
+            options.add_argument("--disable-sync")
+            options.add_argument("--no-first-run")
+            options.add_argument("--mute-audio")
+            options.add_argument("--disable-features=Translate,OptimizationHints,MediaRouter")
+        
+        # ✨ Ruta del ChromeDriver desde la caché local (sin consultas por red en cada arranque)
+        inicio = time.perf_counter()
+        ruta_driver = obtener_resolvedor_driver().resolver(self.driver_path)
+        self.tiempos_arranque['driver'] = time.perf_counter() - inicio
+        service = Service(executable_path=ruta_driver) if ruta_driver else Service()
         
         # Inicializar driver
+        inicio = time.perf_counter()
         driver = webdriver.Chrome(service=service, options=options)
+        self.tiempos_arranque['chrome'] = time.perf_counter() - inicio
+        
+        if self.perfil_ligero:
+            # Fuentes, analítica (y opcionalmente CSS) se cortan antes de pedirse
+            try:
+                driver.execute_cdp_cmd("Network.enable", {})
+                driver.execute_cdp_cmd("Network.setBlockedURLs", {
+                    "urls": RECURSOS_BLOQUEADOS + (RECURSOS_CSS if SMV_BLOQUEAR_CSS else [])
+                })
+            except Exception as e:
+                print(f"⚠️ No se pudo activar el bloqueo de recursos: {str(e)}")
         
         if not self.headless:
             driver.maximize_window()
@@ -115,18 +167,31 @@ class DescargadorSMV:
         Returns:
             bool: True si se inició correctamente, False en caso contrario
         """
+        self.tiempos_arranque = {}
         try:
             self.driver = self._configurar_chrome()
+            inicio = time.perf_counter()
             self.driver.get(self.URL_SMV)
             
             # Esperar a que cargue la página
             WebDriverWait(self.driver, 10).until(
                 EC.presence_of_element_located((By.ID, "MainContent_cboDenominacionSocial"))
             )
+            self.tiempos_arranque['pagina'] = time.perf_counter() - inicio
+            print(f"⏱️ Navegador listo en {sum(self.tiempos_arranque.values()):.2f} s "
+                  f"(driver {self.tiempos_arranque['driver']:.2f} s, Chrome {self.tiempos_arranque['chrome']:.2f} s, "
+                  f"página {self.tiempos_arranque['pagina']:.2f} s)")
+            
+            # ✨ Observar la carpeta de descargas desde ya (los archivos previos no se asignan)
+            self.vigilante = VigilanteDescargas(self.download_dir).iniciar()
             
             return True
         except Exception as e:
             print(f"❌ Error al iniciar navegador: {str(e)}")
+            if self.driver is None:
+                # Chrome no arrancó con ese driver (¿Chrome se actualizó?): se resolverá de nuevo
+                # solo con caché y drivers/ (sin webdriver-manager); si no hay, decide Selenium Manager
+                obtener_resolvedor_driver().olvidar()
             return False
     
     def cerrar_navegador(self):
@@ -137,70 +202,66 @@ class DescargadorSMV:
             except:
                 pass
             self.driver = None
+        if self.vigilante:
+            self.vigilante.detener()
+            self.vigilante = None
     
-    def obtener_empresas_disponibles(self) -> List[Dict[str, str]]:
+    def saludable(self) -> bool:
+        """True si el navegador responde y muestra el formulario de la SMV"""
+        if not self.driver:
+            return False
+        try:
+            self.driver.find_element(By.ID, "MainContent_cboDenominacionSocial")
+            return True
+        except Exception:
+            return False
+    
+    def reiniciar_pagina(self) -> bool:
         """
-        Obtiene la lista de empresas disponibles en el combo
+        Deja el navegador como recién iniciado (una sola pestaña y el formulario vacío)
+        para reutilizarlo en otra tarea sin pagar de nuevo el arranque de Chrome
         
         Returns:
-            List[Dict]: Lista de diccionarios con 'value' y 'text' de cada empresa
+            bool: True si el formulario volvió a cargar
         """
         try:
-            select_element = self.driver.find_element(By.ID, "MainContent_cboDenominacionSocial")
-            combo = Select(select_element)
-            
-            empresas = []
-            for option in combo.options:
-                value = option.get_attribute("value")
-                text = option.text.strip()
-                
-                # Filtrar opción vacía o "Seleccione"
-                if value and value != "0" and text.lower() != "seleccione":
-                    empresas.append({
-                        'value': value,
-                        'text': text
-                    })
-            
-            self.empresas_disponibles = empresas
-            return empresas
-        
+            ventanas = self.driver.window_handles
+            for ventana in ventanas[1:]:
+                self.driver.switch_to.window(ventana)
+                self.driver.close()
+            self.driver.switch_to.window(ventanas[0])
+            self.driver.get(self.URL_SMV)
+            WebDriverWait(self.driver, 10).until(
+                EC.presence_of_element_located((By.ID, "MainContent_cboDenominacionSocial"))
+            )
+            self.empresa_actual = None
+            self.codigo_empresa = None
+            self.ultima_descarga = None
+            return True
         except Exception as e:
-            print(f"❌ Error al obtener empresas: {str(e)}")
-            return []
+            print(f"⚠️ No se pudo reiniciar la página: {str(e)}")
+            return False
     
-    def buscar_empresa(self, nombre_busqueda: str) -> Optional[Dict[str, str]]:
-        """
-        Busca una empresa por nombre (búsqueda parcial)
-        
-        Args:
-            nombre_busqueda: Texto a buscar en el nombre de la empresa
-        
-        Returns:
-            Dict con 'value' y 'text' de la primera empresa encontrada, o None
-        """
-        if not self.empresas_disponibles:
-            self.obtener_empresas_disponibles()
-        
-        nombre_busqueda_lower = nombre_busqueda.lower()
-        
-        # Búsqueda exacta primero
-        for empresa in self.empresas_disponibles:
-            if empresa['text'].lower() == nombre_busqueda_lower:
-                return empresa
-        
-        # Búsqueda parcial (contiene)
-        for empresa in self.empresas_disponibles:
-            if nombre_busqueda_lower in empresa['text'].lower():
-                return empresa
-        
-        # Búsqueda por palabras clave (cualquier palabra coincide)
-        palabras_busqueda = nombre_busqueda_lower.split()
-        for empresa in self.empresas_disponibles:
-            texto_empresa_lower = empresa['text'].lower()
-            if any(palabra in texto_empresa_lower for palabra in palabras_busqueda):
-                return empresa
-        
-        return None
+    def cambiar_carpeta_descargas(self, carpeta: str, usar_manifiesto: bool = True):
+        """Redirige las descargas del navegador ya abierto a otra carpeta (vía DevTools)"""
+        carpeta = os.path.abspath(carpeta)
+        os.makedirs(carpeta, exist_ok=True)
+        if self.driver:
+            self.driver.execute_cdp_cmd("Page.setDownloadBehavior", {"behavior": "allow", "downloadPath": carpeta})
+        self.download_dir = carpeta
+        if self.vigilante:
+            self.vigilante.detener()
+            self.vigilante = VigilanteDescargas(carpeta).iniciar()
+        self.manifiesto = ManifiestoDescargas(carpeta) if usar_manifiesto else None
+    
+    def _conectado(self) -> bool:
+        """True si ya hay un navegador abierto"""
+        return self.driver is not None
+    
+    def _opciones_empresas(self) -> List[Tuple[str, str]]:
+        """Pares (value, texto) de las opciones del combo de empresas"""
+        select_element = self.driver.find_element(By.ID, "MainContent_cboDenominacionSocial")
+        return [(option.get_attribute("value"), option.text.strip()) for option in Select(select_element).options]
     
     def seleccionar_empresa(self, empresa: Dict[str, str]) -> bool:
         """
@@ -218,6 +279,8 @@ class DescargadorSMV:
             combo.select_by_value(empresa['value'])
             
             time.sleep(1)  # Esperar recarga
+            self.empresa_actual = empresa['text']
+            self.codigo_empresa = empresa['value']
             return True
         
         except Exception as e:
@@ -304,6 +367,8 @@ class DescargadorSMV:
                             continue
             
             if not link:
+                # La SMV respondió, pero no hay estados financieros publicados para ese año
+                self.sin_reporte = año
                 if callback_progreso:
                     callback_progreso(f"⚠️ No se encontró 'Estados Financieros' para el año {año}")
                 return False
@@ -342,13 +407,20 @@ class DescargadorSMV:
                 EC.element_to_be_clickable((By.ID, "cbExcel"))
             )
             self.driver.execute_script("arguments[0].scrollIntoView(true);", excel_btn)
-            excel_btn.click()
             
-            # Esperar descarga
-            time.sleep(3)  # Ajustar según velocidad de red
+            # ✨ La espera se arma antes del clic: el archivo que aparezca queda ligado a esta empresa y año
+            if self.vigilante is None:
+                self.vigilante = VigilanteDescargas(self.download_dir).iniciar()
+            espera = self.vigilante.esperar(self.empresa_actual, año)
+            try:
+                excel_btn.click()
+            except Exception:
+                espera.cancelar()
+                raise
             
-            # Verificar descarga
-            archivo_descargado = self._verificar_descarga_reciente()
+            # Esperar descarga: termina en cuanto el archivo se completa (sin esperas fijas)
+            self.ultima_descarga = espera.resultado()
+            archivo_descargado = self.ultima_descarga['archivo'] if self.ultima_descarga else None
             
             # Cerrar pestaña y volver a principal
             self.driver.close()
@@ -371,168 +443,6 @@ class DescargadorSMV:
             if callback_progreso:
                 callback_progreso(f"❌ Error al descargar año {año}: {str(e)}")
             return False
-    
-    def descargar_rango_años(
-        self, 
-        año_inicio: int, 
-        año_fin: int, 
-        callback_progreso: Callable = None
-    ) -> Dict[str, List[int]]:
-        """
-        Descarga estados financieros de un rango de años
-        
-        Args:
-            año_inicio: Año inicial (más reciente, ej: 2024)
-            año_fin: Año final (más antiguo, ej: 2020)
-            callback_progreso: Función callback para actualizar progreso
-        
-        Returns:
-            Dict con listas de años 'exitosos' y 'fallidos'
-        """
-        resultados = {
-            'exitosos': [],
-            'fallidos': []
-        }
-        
-        # Generar lista de años (descendente)
-        años = list(range(año_inicio, año_fin - 1, -1))
-        total_años = len(años)
-        
-        for idx, año in enumerate(años, 1):
-            if callback_progreso:
-                callback_progreso(f"\n🔄 Procesando año {año} ({idx}/{total_años})...")
-            
-            exito = self.descargar_año(año, callback_progreso)
-            
-            if exito:
-                resultados['exitosos'].append(año)
-            else:
-                resultados['fallidos'].append(año)
-            
-            # Pequeña pausa entre descargas
-            time.sleep(2)
-        
-        return resultados
-    
-    def _normalizar_texto(self, texto: str) -> str:
-        """Normaliza texto removiendo acentos y convirtiendo a minúsculas"""
-        texto = texto.lower()
-        reemplazos = {'á': 'a', 'é': 'e', 'í': 'i', 'ó': 'o', 'ú': 'u', 'ñ': 'n'}
-        for original, reemplazo in reemplazos.items():
-            texto = texto.replace(original, reemplazo)
-        return texto
-    
-    def _verificar_descarga_reciente(self, timeout: int = 10) -> Optional[str]:
-        """
-        Verifica si se descargó un archivo recientemente
-        
-        Args:
-            timeout: Segundos a esperar por el archivo
-        
-        Returns:
-            Nombre del archivo descargado o None
-        """
-        tiempo_inicio = time.time()
-        
-        while time.time() - tiempo_inicio < timeout:
-            try:
-                archivos = os.listdir(self.download_dir)
-                excel_files = [f for f in archivos if f.endswith((".xls", ".xlsx"))]
-                
-                if excel_files:
-                    # Obtener el archivo más reciente
-                    archivos_con_tiempo = [
-                        (f, os.path.getmtime(os.path.join(self.download_dir, f)))
-                        for f in excel_files
-                    ]
-                    archivo_mas_reciente = max(archivos_con_tiempo, key=lambda x: x[1])
-                    
-                    # Verificar que se descargó hace menos de 10 segundos
-                    if time.time() - archivo_mas_reciente[1] < 10:
-                        return archivo_mas_reciente[0]
-            except:
-                pass
-            
-            time.sleep(0.5)
-        
-        return None
-    
-    def proceso_completo(
-        self, 
-        nombre_empresa: str, 
-        año_inicio: int, 
-        año_fin: int,
-        callback_progreso: Callable = None
-    ) -> Dict:
-        """
-        Proceso completo: buscar empresa y descargar rango de años
-        
-        Args:
-            nombre_empresa: Nombre de la empresa a buscar
-            año_inicio: Año inicial (más reciente)
-            año_fin: Año final (más antiguo)
-            callback_progreso: Función callback para actualizar progreso
-        
-        Returns:
-            Dict con resultados del proceso
-        """
-        try:
-            if callback_progreso:
-                callback_progreso("🚀 Iniciando navegador...")
-            
-            if not self.iniciar_navegador():
-                return {'error': 'No se pudo iniciar el navegador'}
-            
-            if callback_progreso:
-                callback_progreso("📋 Obteniendo lista de empresas...")
-            
-            self.obtener_empresas_disponibles()
-            
-            if callback_progreso:
-                callback_progreso(f"🔍 Buscando empresa: {nombre_empresa}")
-            
-            empresa = self.buscar_empresa(nombre_empresa)
-            
-            if not empresa:
-                self.cerrar_navegador()
-                return {'error': f'No se encontró la empresa: {nombre_empresa}'}
-            
-            if callback_progreso:
-                callback_progreso(f"✅ Empresa encontrada: {empresa['text']}")
-            
-            if not self.seleccionar_empresa(empresa):
-                self.cerrar_navegador()
-                return {'error': 'No se pudo seleccionar la empresa'}
-            
-            if callback_progreso:
-                callback_progreso("📅 Seleccionando periodo anual...")
-            
-            if not self.seleccionar_periodo_anual():
-                self.cerrar_navegador()
-                return {'error': 'No se pudo seleccionar periodo anual'}
-            
-            if callback_progreso:
-                callback_progreso(f"📥 Iniciando descargas de {año_inicio} a {año_fin}...")
-            
-            resultados = self.descargar_rango_años(año_inicio, año_fin, callback_progreso)
-            
-            if callback_progreso:
-                callback_progreso("🔒 Cerrando navegador...")
-            
-            self.cerrar_navegador()
-            
-            return {
-                'empresa': empresa['text'],
-                'años_exitosos': resultados['exitosos'],
-                'años_fallidos': resultados['fallidos'],
-                'total_exitosos': len(resultados['exitosos']),
-                'total_fallidos': len(resultados['fallidos']),
-                'carpeta_descargas': self.download_dir
-            }
-        
-        except Exception as e:
-            self.cerrar_navegador()
-            return {'error': f'Error en proceso completo: {str(e)}'}
 
 
 # ===== FUNCIÓN DE PRUEBA =====
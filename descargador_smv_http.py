@@ -0,0 +1,496 @@
+"""
+Descargador SMV por HTTP Directo (sin navegador)
+================================================
+Alternativa a DescargadorSMV que reproduce los postbacks ASP.NET del formulario de la
+SMV (__VIEWSTATE / __EVENTVALIDATION) sobre una sesión HTTP, sin Chrome ni Selenium.
+
+Características:
+- Misma interfaz que DescargadorSMV: proceso_completo, descargar_rango_años, descargar_año,
+  obtener_empresas_disponibles, buscar_empresa (se puede usar como reemplazo directo);
+  el flujo común vive en DescargadorSMVBase (descargador_base.py)
+- Sin arranque de navegador ni pausas fijas: cada paso espera solo la respuesta del servidor
+- Sesión HTTP con pool de conexiones keep-alive y reintentos ante errores 5xx
+- Reproduce el formulario como lo haría el navegador: campos ocultos, selects, radios
+  y controles con AutoPostBack (detectados por su __doPostBack)
+- Descarga la exportación Excel directamente a la carpeta de descargas
+- URL configurable: se puede probar contra una réplica local de las páginas de la SMV
+"""
+
+import os
+import re
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urljoin, unquote
+
+import requests
+from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from descargador_base import DescargadorSMVBase
+from manifiesto_descargas import ManifiestoDescargas
+
+
+# IDs de los controles del formulario de la SMV (los mismos que usa DescargadorSMV)
+ID_COMBO_EMPRESA = "MainContent_cboDenominacionSocial"
+ID_RADIO_ANUAL = "MainContent_cboPeriodo_1"
+ID_COMBO_AÑO = "MainContent_cboAnio"
+ID_BOTON_BUSCAR = "MainContent_cbBuscar"
+ID_GRILLA = "MainContent_grdInfoFinanciera"
+ID_BOTON_EXCEL = "cbExcel"
+
+NOMBRE_ARCHIVO_DEFECTO = "ReporteDetalleInformacionFinanciero.xls"
+PATRON_POSTBACK = re.compile(r"__doPostBack\(\\?['\"]([^'\"\\]*)\\?['\"]\s*,\s*\\?['\"]([^'\"\\]*)\\?['\"]\)")
+PATRON_VENTANA = re.compile(r"window\.open\(\s*['\"]([^'\"]+)['\"]")
+
+
+class DescargadorSMVHttp(DescargadorSMVBase):
+    """Descarga estados financieros de la SMV reproduciendo los postbacks del formulario"""
+
+    MENSAJE_INICIO = "🌐 Conectando con la SMV (HTTP directo)..."
+    ERROR_INICIO = 'No se pudo cargar el formulario de la SMV'
+
+    def __init__(
+        self,
+        download_dir: str = None,
+        driver_path: str = None,
+        headless: bool = True,
+        url_smv: str = None,
+        timeout: float = 30,
+        max_conexiones: int = 4,
+        usar_manifiesto: bool = True
+    ):
+        """
+        Inicializa el descargador
+
+        Args:
+            download_dir: Ruta de la carpeta de descargas (default: ./descargas)
+            driver_path: Ignorado (se acepta por compatibilidad con DescargadorSMV)
+            headless: Ignorado (no hay navegador)
+            url_smv: URL del formulario (default: la página oficial de la SMV)
+            timeout: Segundos máximos por solicitud HTTP
+            max_conexiones: Conexiones keep-alive del pool
+            usar_manifiesto: Si True, omite los años ya descargados y ordena los archivos por empresa
+        """
+        super().__init__(download_dir, usar_manifiesto)
+
+        self.url_smv = url_smv or self.URL_SMV
+        self.timeout = timeout
+        self.max_conexiones = max_conexiones
+
+        self.sesion: Optional[requests.Session] = None
+
+        # Página actual del formulario y cambios aún no enviados
+        self._url_actual = None
+        self._pagina: Optional[BeautifulSoup] = None
+        self._cambios: Dict[str, str] = {}
+
+    # ===== SESIÓN =====
+
+    def _crear_sesion(self) -> requests.Session:
+        """Sesión HTTP con pool de conexiones y reintentos ante errores transitorios"""
+        sesion = requests.Session()
+        reintentos = Retry(
+            total=2,
+            backoff_factor=0.5,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=None   # También POST: los postbacks son idempotentes para la consulta
+        )
+        adaptador = HTTPAdapter(pool_connections=self.max_conexiones, pool_maxsize=self.max_conexiones, max_retries=reintentos)
+        sesion.mount("http://", adaptador)
+        sesion.mount("https://", adaptador)
+        sesion.headers.update({
+            'User-Agent': "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36",
+            'Accept-Language': "es-PE,es;q=0.9"
+        })
+        return sesion
+
+    def iniciar_navegador(self) -> bool:
+        """
+        Abre la sesión HTTP y carga el formulario de la SMV
+
+        (Conserva el nombre de DescargadorSMV para ser intercambiable.)
+
+        Returns:
+            bool: True si el formulario se cargó correctamente
+        """
+        try:
+            self.sesion = self._crear_sesion()
+            respuesta = self.sesion.get(self.url_smv, timeout=self.timeout)
+            respuesta.raise_for_status()
+            self._cargar_pagina(respuesta)
+            if self._pagina.find(id=ID_COMBO_EMPRESA) is None:
+                print("❌ El formulario de la SMV no contiene el combo de empresas")
+                return False
+            return True
+        except Exception as e:
+            print(f"❌ Error al cargar el formulario de la SMV: {str(e)}")
+            return False
+
+    def cerrar_navegador(self):
+        """Cierra la sesión HTTP y libera sus conexiones"""
+        if self.sesion:
+            try:
+                self.sesion.close()
+            except Exception:
+                pass
+            self.sesion = None
+        self._pagina = None
+        self._cambios = {}
+
+    def saludable(self) -> bool:
+        """True si la sesión está abierta y la página actual es el formulario de la SMV"""
+        return self.sesion is not None and self._pagina is not None and self._pagina.find(id=ID_COMBO_EMPRESA) is not None
+
+    def reiniciar_pagina(self) -> bool:
+        """Vuelve a cargar el formulario vacío conservando las conexiones abiertas"""
+        try:
+            respuesta = self.sesion.get(self.url_smv, timeout=self.timeout)
+            respuesta.raise_for_status()
+            self._cargar_pagina(respuesta)
+            self.empresa_actual = None
+            self.codigo_empresa = None
+            self.ultima_descarga = None
+            return self.saludable()
+        except Exception as e:
+            print(f"⚠️ No se pudo reiniciar el formulario: {str(e)}")
+            return False
+
+    def cambiar_carpeta_descargas(self, carpeta: str, usar_manifiesto: bool = True):
+        """Guarda las siguientes descargas en otra carpeta"""
+        self.download_dir = os.path.abspath(carpeta)
+        os.makedirs(self.download_dir, exist_ok=True)
+        self.manifiesto = ManifiestoDescargas(self.download_dir) if usar_manifiesto else None
+
+    # ===== FORMULARIO ASP.NET =====
+
+    def _cargar_pagina(self, respuesta: requests.Response):
+        """Toma una respuesta HTML como página actual del formulario"""
+        self._url_actual = respuesta.url
+        self._pagina = BeautifulSoup(respuesta.text, 'html.parser')
+        self._cambios = {}
+
+    def _estado_formulario(self, pagina: BeautifulSoup) -> Dict[str, str]:
+        """
+        Campos que el navegador enviaría al hacer submit del formulario
+
+        Incluye campos ocultos (__VIEWSTATE, __EVENTVALIDATION...), textos, radios y
+        checkboxes marcados y la opción seleccionada de cada select. Los botones
+        solo se envían cuando son los que disparan el submit.
+        """
+        formulario = pagina.find('form') or pagina
+        datos = {}
+        for campo in formulario.find_all('input'):
+            nombre = campo.get('name')
+            if not nombre:
+                continue
+            tipo = (campo.get('type') or 'text').lower()
+            if tipo in ('submit', 'button', 'image', 'reset', 'file'):
+                continue
+            if tipo in ('radio', 'checkbox'):
+                if campo.has_attr('checked'):
+                    datos[nombre] = campo.get('value', 'on')
+                continue
+            datos[nombre] = campo.get('value', '')
+
+        for combo in formulario.find_all('select'):
+            nombre = combo.get('name')
+            if not nombre:
+                continue
+            opcion = combo.find('option', selected=True) or combo.find('option')
+            if opcion is not None:
+                datos[nombre] = opcion.get('value', opcion.get_text(strip=True))
+
+        for area in formulario.find_all('textarea'):
+            if area.get('name'):
+                datos[area['name']] = area.get_text()
+
+        return datos
+
+    def _url_formulario(self, pagina: BeautifulSoup) -> str:
+        """URL a la que se envía el formulario"""
+        formulario = pagina.find('form')
+        accion = formulario.get('action') if formulario else None
+        return urljoin(self._url_actual, accion) if accion else self._url_actual
+
+    def _enviar(self, extra: Dict[str, str], evento: Tuple[str, str] = None) -> requests.Response:
+        """
+        Envía el formulario actual (postback)
+
+        Args:
+            extra: Campos adicionales (p. ej. el botón pulsado)
+            evento: (__EVENTTARGET, __EVENTARGUMENT) para controles con AutoPostBack
+        """
+        datos = self._estado_formulario(self._pagina)
+        datos.update(self._cambios)
+        datos.update(extra)
+        if evento:
+            datos['__EVENTTARGET'], datos['__EVENTARGUMENT'] = evento
+        respuesta = self.sesion.post(
+            self._url_formulario(self._pagina),
+            data=datos,
+            timeout=self.timeout,
+            headers={'Referer': self._url_actual}
+        )
+        respuesta.raise_for_status()
+        return respuesta
+
+    def _evento_postback(self, control) -> Optional[Tuple[str, str]]:
+        """(target, argumento) del __doPostBack de un control con AutoPostBack (None si no tiene)"""
+        for atributo in ('onchange', 'onclick', 'href'):
+            coincidencia = PATRON_POSTBACK.search(control.get(atributo) or '')
+            if coincidencia:
+                return coincidencia.group(1), coincidencia.group(2)
+        return None
+
+    def _cambiar_control(self, id_control: str, valor: str = None):
+        """
+        Cambia un select o marca un radio, con postback si el control lo dispara
+
+        Args:
+            id_control: ID del control en la página
+            valor: Valor a seleccionar (para radios se usa su propio value)
+        """
+        control = self._pagina.find(id=id_control)
+        if control is None:
+            raise ValueError(f"No se encontró el control '{id_control}' en la página")
+
+        if control.name == 'input':
+            valor = control.get('value', 'on')
+        self._cambios[control['name']] = valor
+
+        evento = self._evento_postback(control)
+        if evento:
+            cambios = dict(self._cambios)
+            respuesta = self._enviar({}, evento)
+            self._cargar_pagina(respuesta)
+            # El servidor ya refleja los cambios; se conservan por si no los devolviera marcados
+            for nombre, valor_cambio in cambios.items():
+                self._cambios.setdefault(nombre, valor_cambio)
+
+    # ===== PASOS DEL PROCESO =====
+
+    def _conectado(self) -> bool:
+        """True si ya hay una sesión HTTP abierta"""
+        return self.sesion is not None
+
+    def _opciones_empresas(self) -> List[Tuple[str, str]]:
+        """Pares (value, texto) de las opciones del combo de empresas"""
+        combo = self._pagina.find(id=ID_COMBO_EMPRESA)
+        return [(opcion.get('value'), opcion.get_text(strip=True)) for opcion in combo.find_all('option')]
+
+    def seleccionar_empresa(self, empresa: Dict[str, str]) -> bool:
+        """
+        Selecciona una empresa del combo (postback si el combo lo dispara)
+
+        Returns:
+            bool: True si se seleccionó correctamente
+        """
+        try:
+            self._cambiar_control(ID_COMBO_EMPRESA, empresa['value'])
+            self.empresa_actual = empresa['text']
+            self.codigo_empresa = empresa['value']
+            return True
+        except Exception as e:
+            print(f"❌ Error al seleccionar empresa: {str(e)}")
+            return False
+
+    def seleccionar_periodo_anual(self) -> bool:
+        """
+        Selecciona el periodo 'Anual'
+
+        Returns:
+            bool: True si se seleccionó correctamente
+        """
+        try:
+            self._cambiar_control(ID_RADIO_ANUAL)
+            return True
+        except Exception as e:
+            print(f"❌ Error al seleccionar periodo anual: {str(e)}")
+            return False
+
+    def _buscar_enlace_estados(self, pagina: BeautifulSoup):
+        """Enlace al detalle de 'Estados Financieros' en la grilla de resultados"""
+        grilla = pagina.find(id=ID_GRILLA)
+        if grilla is None:
+            return None, 0
+
+        filas = grilla.select("tr.item-grid")
+        for fila in filas:
+            columnas = fila.find_all('td')
+            if len(columnas) > 1 and "estado financiero" in self._normalizar_texto(columnas[1].get_text(strip=True)):
+                for enlace in fila.find_all('a'):
+                    titulo = enlace.get('title') or ''
+                    if 'detalle' in titulo and 'Financieros' in titulo:
+                        return enlace, len(filas)
+        return None, len(filas)
+
+    def _abrir_detalle(self, enlace) -> requests.Response:
+        """Abre la página de detalle (enlace directo, window.open o postback de la grilla)"""
+        href = enlace.get('href') or ''
+        evento = self._evento_postback(enlace)
+
+        if evento:
+            respuesta = self._enviar({}, evento)
+            # El postback puede responder con un script que abre la ventana de detalle
+            ventana = PATRON_VENTANA.search(respuesta.text)
+            if ventana:
+                respuesta = self.sesion.get(urljoin(respuesta.url, ventana.group(1)), timeout=self.timeout)
+        else:
+            ventana = PATRON_VENTANA.search(enlace.get('onclick') or '')
+            destino = ventana.group(1) if ventana else href
+            respuesta = self.sesion.get(urljoin(self._url_actual, destino), timeout=self.timeout, headers={'Referer': self._url_actual})
+
+        respuesta.raise_for_status()
+        return respuesta
+
+    def _exportar_excel(self, respuesta_detalle: requests.Response) -> requests.Response:
+        """Pulsa el botón Excel de la página de detalle"""
+        detalle = BeautifulSoup(respuesta_detalle.text, 'html.parser')
+        boton = detalle.find(id=ID_BOTON_EXCEL)
+        if boton is None:
+            raise ValueError("La página de detalle no tiene botón de exportación Excel")
+
+        datos = self._estado_formulario(detalle)
+        evento = self._evento_postback(boton)
+        if evento:
+            datos['__EVENTTARGET'], datos['__EVENTARGUMENT'] = evento
+        elif boton.name == 'a' and boton.get('href') and not boton['href'].startswith('javascript'):
+            respuesta = self.sesion.get(urljoin(respuesta_detalle.url, boton['href']), timeout=self.timeout)
+            respuesta.raise_for_status()
+            return respuesta
+        elif boton.get('name'):
+            datos[boton['name']] = boton.get('value', '')
+
+        formulario = detalle.find('form')
+        accion = formulario.get('action') if formulario else None
+        respuesta = self.sesion.post(
+            urljoin(respuesta_detalle.url, accion) if accion else respuesta_detalle.url,
+            data=datos,
+            timeout=self.timeout,
+            headers={'Referer': respuesta_detalle.url}
+        )
+        respuesta.raise_for_status()
+        return respuesta
+
+    def _guardar_archivo(self, respuesta: requests.Response) -> str:
+        """Guarda la exportación con el nombre sugerido por el servidor (sin sobrescribir)"""
+        nombre = NOMBRE_ARCHIVO_DEFECTO
+        disposicion = respuesta.headers.get('Content-Disposition', '')
+        coincidencia = re.search(r"filename\*=(?:UTF-8'')?([^;]+)|filename=\"?([^\";]+)\"?", disposicion, re.IGNORECASE)
+        if coincidencia:
+            nombre = unquote((coincidencia.group(1) or coincidencia.group(2)).strip())
+        nombre = os.path.basename(nombre)
+
+        # Igual que el navegador: "archivo (1).xls", "archivo (2).xls"...
+        base, extension = os.path.splitext(nombre)
+        ruta = os.path.join(self.download_dir, nombre)
+        contador = 1
+        while os.path.exists(ruta):
+            ruta = os.path.join(self.download_dir, f"{base} ({contador}){extension}")
+            contador += 1
+
+        with open(ruta, 'wb') as f:
+            f.write(respuesta.content)
+        return ruta
+
+    def descargar_año(self, año: int, callback_progreso: Callable = None) -> bool:
+        """
+        Descarga los estados financieros de un año específico
+
+        Args:
+            año: Año a descargar (ej: 2024)
+            callback_progreso: Función callback para actualizar progreso
+
+        Returns:
+            bool: True si se descargó correctamente
+        """
+        try:
+            if callback_progreso:
+                callback_progreso(f"📅 Seleccionando año {año}...")
+
+            self._cambiar_control(ID_COMBO_AÑO, str(año))
+
+            if callback_progreso:
+                callback_progreso(f"🔍 Buscando registros del año {año}...")
+
+            boton_buscar = self._pagina.find(id=ID_BOTON_BUSCAR)
+            if boton_buscar is None:
+                raise ValueError("No se encontró el botón Buscar")
+            evento = self._evento_postback(boton_buscar)
+            extra = {} if evento or not boton_buscar.get('name') else {boton_buscar['name']: boton_buscar.get('value', '')}
+            respuesta = self._enviar(extra, evento)
+            self._cargar_pagina(respuesta)
+
+            enlace, total_filas = self._buscar_enlace_estados(self._pagina)
+            if callback_progreso:
+                callback_progreso(f"✅ {total_filas} registros encontrados para {año}")
+
+            if enlace is None:
+                # La SMV respondió, pero no hay estados financieros publicados para ese año
+                self.sin_reporte = año
+                if callback_progreso:
+                    callback_progreso(f"⚠️ No se encontró 'Estados Financieros' para el año {año}")
+                return False
+
+            if callback_progreso:
+                callback_progreso(f"🔗 Abriendo detalle de Estados Financieros {año}...")
+            respuesta_detalle = self._abrir_detalle(enlace)
+
+            if callback_progreso:
+                callback_progreso(f"📥 Descargando archivo Excel del año {año}...")
+            respuesta_excel = self._exportar_excel(respuesta_detalle)
+
+            tipo = respuesta_excel.headers.get('Content-Type', '')
+            if 'attachment' not in respuesta_excel.headers.get('Content-Disposition', '').lower() and 'text/html' in tipo:
+                if callback_progreso:
+                    callback_progreso(f"⚠️ La SMV no devolvió un archivo para {año}")
+                return False
+
+            # La respuesta ya es el archivo completo: se liga directamente a su empresa y año
+            ruta = self._guardar_archivo(respuesta_excel)
+            archivo_descargado = os.path.basename(ruta)
+            self.ultima_descarga = {
+                'archivo': archivo_descargado,
+                'ruta': ruta,
+                'empresa': self.empresa_actual,
+                'año': año,
+                'bytes': len(respuesta_excel.content)
+            }
+            if callback_progreso:
+                callback_progreso(f"✅ Archivo {año} descargado: {archivo_descargado}")
+            return True
+
+        except requests.Timeout:
+            if callback_progreso:
+                callback_progreso(f"⏱️ Timeout al procesar año {año}")
+            return False
+        except Exception as e:
+            if callback_progreso:
+                callback_progreso(f"❌ Error al descargar año {año}: {str(e)}")
+            return False
+
+
+# ===== FUNCIÓN DE PRUEBA =====
+if __name__ == "__main__":
+    print("=" * 80)
+    print("DESCARGADOR SMV - HTTP DIRECTO (SIN NAVEGADOR)")
+    print("=" * 80)
+
+    descargador = DescargadorSMVHttp(download_dir=os.path.join(os.getcwd(), "descargas"))
+    print(f"\n📂 Carpeta de descargas: {descargador.download_dir}\n")
+
+    resultado = descargador.proceso_completo(
+        nombre_empresa="SAN JUAN",
+        año_inicio=2024,
+        año_fin=2022,
+        callback_progreso=lambda mensaje: print(f"  {mensaje}")
+    )
+
+    print("\n" + "=" * 80)
+    if 'error' in resultado:
+        print(f"❌ ERROR: {resultado['error']}")
+    else:
+        print(f"✅ Empresa: {resultado['empresa']}")
+        print(f"✅ Años exitosos: {resultado['total_exitosos']} - {resultado['años_exitosos']}")
+        if resultado['años_fallidos']:
+            print(f"⚠️ Años fallidos: {resultado['total_fallidos']} - {resultado['años_fallidos']}")
@@ -0,0 +1,336 @@
+"""
+Ejecutor de Tareas en Segundo Plano
+===================================
+Ejecuta trabajos largos (descargas SMV, extracción de archivos, análisis con IA)
+fuera del hilo del script de Streamlit, para que la interfaz no se congele y
+los reruns no interrumpan el trabajo a la mitad.
+
+Características:
+- Pool de hilos compartido por el proceso (trabajo dominado por E/S: navegador, red, disco)
+- Cada tarea tiene ID, estado, progreso y registro de mensajes
+- Cancelación cooperativa: la tarea consulta `contexto.debe_cancelar()`
+- Resultados en disco, no en memoria (sobreviven reruns); se borran al consumirse
+  (eliminar) o al caducar tras TAREAS_RETENCION_HORAS
+- Consulta por sesión: varias tareas en cola por sesión
+- Las sesiones no sobreviven a un reinicio del servidor: al iniciar no se recuperan
+  tareas anteriores, solo se purgan sus archivos caducados
+"""
+
+import json
+import os
+import pickle
+import tempfile
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+# Importar configuración de API (con valores por defecto si falta algún parámetro)
+try:
+    import config_api
+except ImportError:
+    config_api = None
+
+
+# Estados de una tarea
+PENDIENTE = 'pendiente'
+EJECUTANDO = 'ejecutando'
+COMPLETADA = 'completada'
+FALLIDA = 'fallida'
+CANCELADA = 'cancelada'
+
+ESTADOS_FINALES = (COMPLETADA, FALLIDA, CANCELADA)
+
+MAX_TRABAJADORES = 2         # Tareas simultáneas (cada descarga abre un navegador)
+MAX_MENSAJES = 200           # Mensajes de progreso retenidos por tarea
+TAREAS_RETENCION_HORAS = getattr(config_api, 'TAREAS_RETENCION_HORAS', 24)  # Vida de una tarea finalizada no consumida
+
+
+class TareaCancelada(Exception):
+    """Se lanza dentro de una tarea para abortarla tras una solicitud de cancelación"""
+
+
+class ContextoTarea:
+    """Interfaz que recibe la función de la tarea para reportar progreso y consultar cancelación"""
+
+    def __init__(self, ejecutor: "EjecutorTareas", id_tarea: str):
+        self._ejecutor = ejecutor
+        self.id_tarea = id_tarea
+        self._evento_cancelar = threading.Event()
+
+    def reportar(self, mensaje: str = None, progreso: float = None):
+        """
+        Registra un mensaje y/o el avance de la tarea
+
+        Args:
+            mensaje: Texto a agregar al registro de la tarea
+            progreso: Avance entre 0.0 y 1.0
+        """
+        self._ejecutor._actualizar(self.id_tarea, mensaje, progreso)
+
+    def debe_cancelar(self) -> bool:
+        """Indica si se solicitó cancelar la tarea"""
+        return self._evento_cancelar.is_set()
+
+    def verificar_cancelacion(self):
+        """Lanza TareaCancelada si se solicitó cancelar la tarea"""
+        if self.debe_cancelar():
+            raise TareaCancelada()
+
+
+class EjecutorTareas:
+    """Pool de tareas en segundo plano con estado consultable y resultados persistidos"""
+
+    def __init__(self, max_trabajadores: int = MAX_TRABAJADORES, directorio: str = None,
+                 retencion_horas: float = TAREAS_RETENCION_HORAS):
+        """
+        Inicializa el ejecutor
+
+        Args:
+            max_trabajadores: Número de tareas que se ejecutan a la vez
+            directorio: Carpeta donde se persisten estado y resultados (default: temporal del sistema)
+            retencion_horas: Horas que se conserva una tarea finalizada que nadie eliminó
+        """
+        if directorio is None:
+            directorio = os.path.join(tempfile.gettempdir(), "analizador_financiero_tareas")
+        self.directorio = directorio
+        self.retencion_s = retencion_horas * 3600
+        os.makedirs(self.directorio, exist_ok=True)
+
+        self._pool = ThreadPoolExecutor(max_workers=max_trabajadores, thread_name_prefix="tarea")
+        self._lock = threading.RLock()
+        self._tareas: Dict[str, Dict[str, Any]] = {}
+        self._contextos: Dict[str, ContextoTarea] = {}
+        self._futuros = {}
+
+        self._purgar_archivos_caducados()
+
+    # ===== API PÚBLICA =====
+
+    def enviar(
+        self,
+        funcion: Callable[..., Any],
+        *args,
+        tipo: str = 'general',
+        descripcion: str = '',
+        id_sesion: str = None,
+        **kwargs
+    ) -> str:
+        """
+        Encola una tarea
+
+        La función recibe un ContextoTarea como primer argumento:
+        `funcion(contexto, *args, **kwargs)`.
+
+        Args:
+            funcion: Función a ejecutar
+            tipo: Tipo de tarea ('descarga', 'extraccion', 'ia', ...)
+            descripcion: Texto descriptivo para la interfaz
+            id_sesion: Sesión propietaria (para listar sus tareas)
+
+        Returns:
+            ID de la tarea
+        """
+        self._purgar_caducadas()
+        id_tarea = uuid.uuid4().hex[:12]
+        contexto = ContextoTarea(self, id_tarea)
+
+        with self._lock:
+            self._tareas[id_tarea] = {
+                'id': id_tarea,
+                'tipo': tipo,
+                'descripcion': descripcion,
+                'id_sesion': id_sesion,
+                'estado': PENDIENTE,
+                'progreso': 0.0,
+                'mensajes': [],
+                'error': None,
+                'creada': time.time(),
+                'iniciada': None,
+                'finalizada': None,
+                'tiene_resultado': False
+            }
+            self._contextos[id_tarea] = contexto
+            self._futuros[id_tarea] = self._pool.submit(self._ejecutar, id_tarea, funcion, args, kwargs)
+
+        return id_tarea
+
+    def estado(self, id_tarea: str) -> Optional[Dict[str, Any]]:
+        """Copia del estado actual de una tarea (None si no existe)"""
+        with self._lock:
+            tarea = self._tareas.get(id_tarea)
+            if tarea is None:
+                return None
+            return {**tarea, 'mensajes': list(tarea['mensajes'])}
+
+    def resultado(self, id_tarea: str, por_defecto: Any = None) -> Any:
+        """
+        Resultado de una tarea completada (leído desde disco)
+
+        Args:
+            id_tarea: ID de la tarea
+            por_defecto: Valor si la tarea no terminó o no tiene resultado
+        """
+        tarea = self.estado(id_tarea)
+        if not tarea or tarea['estado'] != COMPLETADA or not tarea['tiene_resultado']:
+            return por_defecto
+        try:
+            with open(self._ruta(id_tarea, 'pkl'), 'rb') as f:
+                return pickle.load(f)
+        except (OSError, pickle.UnpicklingError):
+            return por_defecto
+
+    def cancelar(self, id_tarea: str) -> bool:
+        """
+        Solicita cancelar una tarea
+
+        Si aún no empezó se descarta de la cola; si está en ejecución se
+        activa la señal que consulta `contexto.debe_cancelar()`.
+
+        Returns:
+            True si la solicitud se registró
+        """
+        with self._lock:
+            tarea = self._tareas.get(id_tarea)
+            if tarea is None or tarea['estado'] in ESTADOS_FINALES:
+                return False
+
+            self._contextos[id_tarea]._evento_cancelar.set()
+            futuro = self._futuros.get(id_tarea)
+            if futuro is not None and futuro.cancel():
+                self._finalizar(id_tarea, CANCELADA)
+            else:
+                tarea['mensajes'].append("🛑 Cancelación solicitada...")
+            return True
+
+    def listar(self, id_sesion: str = None) -> List[Dict[str, Any]]:
+        """Tareas (de una sesión o todas), de la más reciente a la más antigua"""
+        with self._lock:
+            tareas = [
+                {**t, 'mensajes': list(t['mensajes'])}
+                for t in self._tareas.values()
+                if id_sesion is None or t['id_sesion'] == id_sesion
+            ]
+        return sorted(tareas, key=lambda t: t['creada'], reverse=True)
+
+    def eliminar(self, id_tarea: str):
+        """Olvida una tarea finalizada y borra sus archivos persistidos (llamar tras consumir su resultado)"""
+        with self._lock:
+            tarea = self._tareas.get(id_tarea)
+            if tarea is None or tarea['estado'] not in ESTADOS_FINALES:
+                return
+            del self._tareas[id_tarea]
+            self._contextos.pop(id_tarea, None)
+            self._futuros.pop(id_tarea, None)
+        for extension in ('json', 'pkl'):
+            try:
+                os.remove(self._ruta(id_tarea, extension))
+            except OSError:
+                pass
+
+    # ===== EJECUCIÓN =====
+
+    def _ejecutar(self, id_tarea: str, funcion: Callable, args: tuple, kwargs: dict):
+        """Cuerpo que corre en el hilo del pool"""
+        contexto = self._contextos[id_tarea]
+        with self._lock:
+            if contexto.debe_cancelar():
+                self._finalizar(id_tarea, CANCELADA)
+                return
+            self._tareas[id_tarea]['estado'] = EJECUTANDO
+            self._tareas[id_tarea]['iniciada'] = time.time()
+
+        try:
+            valor = funcion(contexto, *args, **kwargs)
+        except TareaCancelada:
+            self._finalizar(id_tarea, CANCELADA)
+            return
+        except Exception as e:
+            print(f"❌ Tarea {id_tarea} falló: {str(e)}")
+            self._finalizar(id_tarea, FALLIDA, error=f"{str(e)}\n{traceback.format_exc()}")
+            return
+
+        if contexto.debe_cancelar():
+            self._finalizar(id_tarea, CANCELADA)
+            return
+
+        tiene_resultado = self._guardar_resultado(id_tarea, valor)
+        with self._lock:
+            self._tareas[id_tarea]['tiene_resultado'] = tiene_resultado
+            self._tareas[id_tarea]['progreso'] = 1.0
+        self._finalizar(id_tarea, COMPLETADA)
+
+    def _actualizar(self, id_tarea: str, mensaje: Optional[str], progreso: Optional[float]):
+        """Registra mensaje/progreso de una tarea"""
+        with self._lock:
+            tarea = self._tareas.get(id_tarea)
+            if tarea is None:
+                return
+            if mensaje:
+                tarea['mensajes'].append(mensaje)
+                del tarea['mensajes'][:-MAX_MENSAJES]
+            if progreso is not None:
+                tarea['progreso'] = max(0.0, min(1.0, float(progreso)))
+
+    def _finalizar(self, id_tarea: str, estado: str, error: str = None):
+        """Marca una tarea como terminada y persiste su estado"""
+        with self._lock:
+            tarea = self._tareas[id_tarea]
+            tarea['estado'] = estado
+            tarea['error'] = error
+            tarea['finalizada'] = time.time()
+            if estado == CANCELADA:
+                tarea['mensajes'].append("🛑 Tarea cancelada")
+            self._persistir_estado(tarea)
+
+    # ===== PERSISTENCIA =====
+
+    def _ruta(self, id_tarea: str, extension: str) -> str:
+        """Ruta del archivo persistido de una tarea"""
+        return os.path.join(self.directorio, f"{id_tarea}.{extension}")
+
+    def _guardar_resultado(self, id_tarea: str, valor: Any) -> bool:
+        """Guarda el resultado en disco (la tarea no lo retiene en memoria)"""
+        if valor is None:
+            return False
+        try:
+            with open(self._ruta(id_tarea, 'pkl'), 'wb') as f:
+                pickle.dump(valor, f, protocol=pickle.HIGHEST_PROTOCOL)
+            return True
+        except Exception as e:
+            print(f"⚠️ No se pudo guardar el resultado de la tarea {id_tarea}: {str(e)}")
+            return False
+
+    def _persistir_estado(self, tarea: Dict[str, Any]):
+        """Guarda el estado final de una tarea en JSON"""
+        try:
+            with open(self._ruta(tarea['id'], 'json'), 'w', encoding='utf-8') as f:
+                json.dump(tarea, f, ensure_ascii=False)
+        except OSError as e:
+            print(f"⚠️ No se pudo persistir la tarea {tarea['id']}: {str(e)}")
+
+    def _purgar_caducadas(self):
+        """Elimina las tareas finalizadas hace más de la retención (nadie consumió su resultado)"""
+        limite = time.time() - self.retencion_s
+        with self._lock:
+            caducadas = [
+                id_tarea for id_tarea, tarea in self._tareas.items()
+                if tarea['estado'] in ESTADOS_FINALES and (tarea['finalizada'] or 0) < limite
+            ]
+        for id_tarea in caducadas:
+            self.eliminar(id_tarea)
+
+    def _purgar_archivos_caducados(self):
+        """Borra los archivos caducados de ejecuciones anteriores (sus sesiones ya no existen)"""
+        limite = time.time() - self.retencion_s
+        for nombre in os.listdir(self.directorio):
+            if not nombre.endswith(('.json', '.pkl')):
+                continue
+            ruta = os.path.join(self.directorio, nombre)
+            try:
+                if os.path.getmtime(ruta) < limite:
+                    os.remove(ruta)
+            except OSError:
+                continue
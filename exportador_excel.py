@@ -0,0 +1,202 @@
+"""
+Exportador Excel en Streaming
+=============================
+Genera libros Excel directamente en memoria para los botones de descarga.
+
+Características:
+- Escritura en modo write_only de openpyxl: las filas se vuelcan al archivo a medida
+  que se agregan, así la memoria no crece con el número de filas
+- Formatos numéricos nativos de Excel (%, miles, ratios) en lugar de convertir
+  cada celda a texto con .apply()
+- Salida como bytes, lista para st.download_button (sin pasar por disco)
+- Guardado opcional en disco para los usos por script
+"""
+
+import io
+import math
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+
+
+# Formatos numéricos de Excel
+FORMATO_PORCENTAJE = '0.00"%"'                          # Valor ya expresado en % (análisis vertical)
+FORMATO_VARIACION = '+0.00"%";-0.00"%";0.00"%"'          # Variación con signo (análisis horizontal)
+FORMATO_RATIO = '0.00'                                  # Ratios en veces (liquidez, rotaciones)
+FORMATO_RATIO_PORCENTAJE = '0.00%'                      # Ratios expresados como fracción (ROA, ROE)
+FORMATO_RATIO_PRECISO = '0.0000'                        # Estadísticos que mezclan ambos tipos de ratio
+FORMATO_MILES = '#,##0'                                 # Montos en miles
+FORMATO_DECIMAL = '#,##0.00'
+
+TEXTO_NO_DISPONIBLE = "N/A"
+MIME_EXCEL = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+FUENTE_ENCABEZADO = Font(bold=True)
+
+
+class LibroExcelStreaming:
+    """Libro Excel de escritura secuencial (memoria constante) con salida a bytes"""
+
+    def __init__(self):
+        self.libro = Workbook(write_only=True)
+        self.hojas: List[str] = []
+        self._contenido: Optional[bytes] = None
+
+    def agregar_hoja(
+        self,
+        nombre: str,
+        columnas: Sequence[Any],
+        filas: Iterable[Sequence[Any]],
+        formatos: Optional[Dict[Any, str]] = None,
+        texto_vacio: Optional[str] = None
+    ) -> int:
+        """
+        Escribe una hoja fila por fila
+
+        Args:
+            nombre: Nombre de la hoja (se recorta a 31 caracteres, límite de Excel)
+            columnas: Encabezados de la hoja
+            filas: Iterable de filas (secuencias alineadas con `columnas`)
+            formatos: Dict {columna: formato numérico de Excel}
+            texto_vacio: Texto para valores nulos/NaN (None deja la celda vacía)
+
+        Returns:
+            Número de filas de datos escritas
+        """
+        hoja = self.libro.create_sheet(title=self._nombre_unico(nombre))
+
+        encabezados = []
+        for columna in columnas:
+            celda = WriteOnlyCell(hoja, value=str(columna))
+            celda.font = FUENTE_ENCABEZADO
+            encabezados.append(celda)
+        hoja.append(encabezados)
+
+        # Resolver el formato por posición una sola vez (no por celda)
+        formatos = formatos or {}
+        formatos_por_columna = [formatos.get(columna) for columna in columnas]
+
+        total_filas = 0
+        for fila in filas:
+            valores = []
+            for valor, formato in zip(fila, formatos_por_columna):
+                valor = _valor_excel(valor)
+                if valor is None:
+                    valores.append(texto_vacio)
+                elif formato and isinstance(valor, (int, float)) and not isinstance(valor, bool):
+                    celda = WriteOnlyCell(hoja, value=valor)
+                    celda.number_format = formato
+                    valores.append(celda)
+                else:
+                    valores.append(valor)
+            hoja.append(valores)
+            total_filas += 1
+
+        return total_filas
+
+    def agregar_dataframe(
+        self,
+        nombre: str,
+        df: pd.DataFrame,
+        formatos: Optional[Dict[Any, str]] = None,
+        texto_vacio: Optional[str] = None
+    ) -> int:
+        """
+        Escribe un DataFrame como hoja (sin índice)
+
+        Args:
+            nombre: Nombre de la hoja
+            df: DataFrame a escribir
+            formatos: Dict {columna: formato numérico de Excel}
+            texto_vacio: Texto para valores nulos/NaN
+
+        Returns:
+            Número de filas escritas
+        """
+        return self.agregar_hoja(
+            nombre,
+            list(df.columns),
+            df.itertuples(index=False, name=None),
+            formatos,
+            texto_vacio
+        )
+
+    def a_bytes(self) -> bytes:
+        """
+        Cierra el libro y devuelve su contenido
+
+        Un libro write_only solo puede guardarse una vez, por eso el contenido
+        queda memorizado para llamadas posteriores.
+        """
+        if self._contenido is None:
+            if not self.hojas:
+                self.agregar_hoja('Información', ['Mensaje'], [["No hay datos para exportar"]])
+            buffer = io.BytesIO()
+            self.libro.save(buffer)
+            self._contenido = buffer.getvalue()
+        return self._contenido
+
+    def guardar(self, archivo_salida: str) -> bytes:
+        """
+        Guarda el libro en disco
+
+        Args:
+            archivo_salida: Ruta del archivo .xlsx
+
+        Returns:
+            Contenido del libro en bytes
+        """
+        contenido = self.a_bytes()
+        with open(archivo_salida, 'wb') as f:
+            f.write(contenido)
+        return contenido
+
+    def finalizar(self, archivo_salida: Optional[str] = None) -> bytes:
+        """Devuelve los bytes del libro y, si se indica, también lo guarda en disco"""
+        if archivo_salida:
+            return self.guardar(archivo_salida)
+        return self.a_bytes()
+
+    def _nombre_unico(self, nombre: str) -> str:
+        """Recorta el nombre al límite de Excel y evita duplicados"""
+        base = nombre[:31]
+        candidato = base
+        sufijo = 2
+        while candidato in self.hojas:
+            marca = f" ({sufijo})"
+            candidato = base[:31 - len(marca)] + marca
+            sufijo += 1
+        self.hojas.append(candidato)
+        return candidato
+
+
+def _valor_excel(valor: Any) -> Any:
+    """Convierte tipos de NumPy/pandas a tipos nativos; NaN/NaT pasan a None"""
+    if valor is None:
+        return None
+    if isinstance(valor, np.generic):
+        valor = valor.item()
+    if isinstance(valor, float) and math.isnan(valor):
+        return None
+    if valor is pd.NaT:
+        return None
+    return valor
+
+
+def formatos_columnas(columnas: Iterable[Any], formato: str, excluir: Sequence[Any] = ('Cuenta',)) -> Dict[Any, str]:
+    """
+    Asigna el mismo formato a todas las columnas excepto las excluidas
+
+    Args:
+        columnas: Columnas del DataFrame
+        formato: Formato numérico de Excel
+        excluir: Columnas de texto a omitir
+
+    Returns:
+        Dict {columna: formato}
+    """
+    return {columna: formato for columna in columnas if columna not in excluir}
@@ -0,0 +1,143 @@
+"""
+Flujo Descarga → Análisis (cada archivo se procesa apenas llega)
+================================================================
+Conecta el descargador de la SMV con la extracción de estados financieros para que
+el análisis de un año empiece mientras los años siguientes aún se descargan, en vez
+de esperar a que termine toda la descarga.
+
+Características:
+- Cola acotada entre el descargador (productor) y los extractores (consumidores):
+  si la extracción se atrasa, el descargador espera en lugar de acumular archivos
+- La extracción se solapa con el tiempo de red y de navegador
+- Funciona con cualquier descargador que acepte `callback_archivo` en proceso_completo
+  (navegador, HTTP directo o descarga paralela)
+- Un error al procesar un archivo no detiene la descarga
+- Métricas: tiempo al primer resultado, espera del productor por la cola llena y total
+"""
+
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+CAPACIDAD_COLA = 4     # Archivos descargados esperando extracción como máximo
+EXTRACTORES = 1        # La extracción es CPU (BeautifulSoup/pandas) y comparte el GIL: un hilo basta para solaparla con la red
+
+
+class FlujoDescargaAnalisis:
+    """Productor (descarga) y consumidores (extracción) unidos por una cola acotada"""
+
+    def __init__(
+        self,
+        procesar: Callable[[Dict[str, Any]], Dict[str, Any]],
+        extractores: int = EXTRACTORES,
+        capacidad: int = CAPACIDAD_COLA,
+        callback_resultado: Callable[[Dict[str, Any], Dict[str, Any]], None] = None
+    ):
+        """
+        Configura el flujo
+
+        Args:
+            procesar: Recibe {'ruta', 'empresa', 'año', 'estado'} y devuelve el resultado del
+                      análisis o {'error': ...}
+            extractores: Hilos consumidores
+            capacidad: Tamaño máximo de la cola entre descarga y extracción
+            callback_resultado: Recibe (archivo, resultado) al terminar cada archivo
+        """
+        self.procesar = procesar
+        self.extractores = max(1, extractores)
+        self.capacidad = max(1, capacidad)
+        self.callback_resultado = callback_resultado
+
+    def ejecutar(
+        self,
+        descargar: Callable[[Callable[[Dict[str, Any]], None]], Dict[str, Any]],
+        debe_cancelar: Callable[[], bool] = None
+    ) -> Dict[str, Any]:
+        """
+        Ejecuta la descarga en el hilo actual y la extracción en paralelo
+
+        Args:
+            descargar: Función que recibe `callback_archivo` y ejecuta la descarga
+                       (p. ej. `lambda cb: descargador.proceso_completo(..., callback_archivo=cb)`)
+            debe_cancelar: Función que devuelve True para dejar de extraer los archivos pendientes
+
+        Returns:
+            Resultado de la descarga con una clave 'analisis': procesados, errores,
+            primer_resultado_s, espera_cola_s y total_s
+        """
+        cola: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue(maxsize=self.capacidad)
+        lock = threading.Lock()
+        inicio = time.perf_counter()
+        metricas = {'procesados': 0, 'errores': [], 'primer_resultado_s': None, 'espera_cola_s': 0.0}
+
+        def consumir():
+            while True:
+                archivo = cola.get()
+                if archivo is None:
+                    return
+                if debe_cancelar and debe_cancelar():
+                    continue  # Se vacía la cola sin procesar para que el productor no quede bloqueado
+                try:
+                    resultado = self.procesar(archivo)
+                except Exception as e:
+                    resultado = {'error': f"{archivo['ruta']}: {str(e)}"}
+
+                with lock:
+                    if 'error' in resultado:
+                        metricas['errores'].append(resultado['error'])
+                    else:
+                        metricas['procesados'] += 1
+                        if metricas['primer_resultado_s'] is None:
+                            metricas['primer_resultado_s'] = time.perf_counter() - inicio
+                if self.callback_resultado:
+                    # Un fallo del callback no debe matar al extractor: la cola dejaría de vaciarse
+                    # y la descarga quedaría bloqueada en cola.put()
+                    try:
+                        self.callback_resultado(archivo, resultado)
+                    except Exception as e:
+                        with lock:
+                            metricas['errores'].append(f"{archivo['ruta']}: callback_resultado falló: {str(e)}")
+
+        def entregar(archivo: Dict[str, Any]):
+            espera = time.perf_counter()
+            cola.put(archivo)  # Bloquea si la extracción va atrasada (contrapresión)
+            with lock:
+                metricas['espera_cola_s'] += time.perf_counter() - espera
+
+        hilos: List[threading.Thread] = [
+            threading.Thread(target=consumir, name=f"extractor_flujo_{i}", daemon=True)
+            for i in range(self.extractores)
+        ]
+        for hilo in hilos:
+            hilo.start()
+        try:
+            resultado_descarga = descargar(entregar)
+        finally:
+            for _ in hilos:
+                cola.put(None)
+            for hilo in hilos:
+                hilo.join()
+
+        return {**resultado_descarga, 'analisis': {**metricas, 'total_s': time.perf_counter() - inicio}}
+
+
+if __name__ == "__main__":
+    import os
+    from descargador_smv_http import DescargadorSMVHttp
+
+    print("=" * 70)
+    print("FLUJO DESCARGA → ANÁLISIS")
+    print("=" * 70)
+
+    def procesar(archivo):
+        print(f"📊 {archivo['año']}: {os.path.basename(archivo['ruta'])} ({archivo['estado']})")
+        return {'archivo': archivo['ruta']}
+
+    descargador = DescargadorSMVHttp(download_dir=os.path.join(os.getcwd(), "descargas"))
+    resultado = FlujoDescargaAnalisis(procesar).ejecutar(
+        lambda callback_archivo: descargador.proceso_completo("SAN JUAN", 2024, 2022, callback_archivo=callback_archivo)
+    )
+    analisis = resultado['analisis']
+    print(f"\n✅ {analisis['procesados']} archivo(s) procesados; primer resultado a los "
+          f"{analisis['primer_resultado_s'] or 0:.2f} s de {analisis['total_s']:.2f} s")
@@ -19,7 +19,32 @@ archivos_esenciales = {
     'analisis_vertical_consolidado.py',
     'analisis_horizontal_consolidado.py',
     'ratios_financieros.py',
+    'motor_ratios.py',
     'descargador_smv.py',
+    'descargador_smv_http.py',
+    'descargador_base.py',
+    'descarga_paralela.py',
+    'vigilante_descargas.py',
+    'catalogo_empresas.py',
+    'manifiesto_descargas.py',
+    'pool_navegadores.py',
+    'resolver_driver.py',
+    'flujo_descarga_analisis.py',
+    'descarga_masiva.py',
+    'almacen_sesion.py',
+    'exportador_excel.py',
+    'ejecutor_tareas.py',
+    'analisis_ia.py',
+    'cache_ia.py',
+    'cliente_llm.py',
+    'prompts_ia.py',
+    'planificador_ia.py',
+    
+    # Herramientas de medición (servidor simulado y benchmarks)
+    'servidor_llm_simulado.py',
+    'servidor_smv_simulado.py',
+    'benchmark_ia.py',
+    'benchmark_descargador.py',
     
     # Este script de limpieza
     'limpiar_archivos.py'
@@ -0,0 +1,287 @@
+"""
+Manifiesto de Descargas SMV (descargas incrementales)
+=====================================================
+Registra cada estado financiero descargado para no volver a pedir a la SMV lo que
+ya está en disco.
+
+Características:
+- Una entrada por (código de empresa, año, periodo) con ruta, tamaño, hash SHA-256 y fecha
+- Organización canónica: descargas/<EMPRESA>/<EMPRESA>_<año>.xls (sin "(N)" genéricos)
+- Un año se omite si su archivo sigue en disco con el mismo tamaño (y hash, si se verifica)
+- Los años recientes se pueden volver a pedir siempre (reexpresiones de la SMV); si el
+  contenido no cambió, el archivo existente se conserva tal cual
+- Guardado atómico en JSON, seguro entre hilos (descargas paralelas)
+- Varias instancias sobre la misma carpeta (o varios procesos): cada guardado relee el
+  archivo y fusiona sus cambios bajo un bloqueo de archivo, sin pisar los de las demás
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, Optional
+
+from catalogo_empresas import clave_busqueda
+
+
+ARCHIVO_MANIFIESTO = "manifiesto_descargas.json"
+PERIODO_ANUAL = "anual"
+ESPERA_BLOQUEO_S = 10.0      # Máximo esperando el bloqueo del manifiesto
+BLOQUEO_ABANDONADO_S = 30.0  # Un bloqueo más antiguo quedó de un proceso caído
+
+
+def calcular_hash(ruta: str) -> str:
+    """SHA-256 del contenido de un archivo"""
+    sha = hashlib.sha256()
+    with open(ruta, 'rb') as f:
+        for bloque in iter(lambda: f.read(1024 * 1024), b''):
+            sha.update(bloque)
+    return sha.hexdigest()
+
+
+@contextmanager
+def bloqueo_archivo(ruta: str, espera: float = ESPERA_BLOQUEO_S):
+    """
+    Bloqueo entre procesos basado en un archivo <ruta>.lock (creación exclusiva)
+
+    Args:
+        ruta: Archivo a proteger
+        espera: Segundos máximos esperando; después se toma el bloqueo de todos modos
+    """
+    candado = f"{ruta}.lock"
+    limite = time.time() + espera
+    descriptor = None
+    while descriptor is None:
+        try:
+            descriptor = os.open(candado, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            try:
+                abandonado = time.time() - os.path.getmtime(candado) > BLOQUEO_ABANDONADO_S
+            except OSError:
+                continue  # Se liberó entre ambos pasos
+            if abandonado or time.time() > limite:
+                # Bloqueo de un proceso caído (o demasiada espera): se reemplaza
+                try:
+                    os.remove(candado)
+                except OSError:
+                    pass
+                continue
+            time.sleep(0.02)
+    try:
+        yield
+    finally:
+        os.close(descriptor)
+        try:
+            os.remove(candado)
+        except OSError:
+            pass
+
+
+def nombre_carpeta_empresa(empresa: str) -> str:
+    """Nombre de carpeta estable para una empresa ("SAN JUAN S.A." → "SAN_JUAN_S_A")"""
+    return clave_busqueda(empresa).upper().replace(' ', '_')[:80] or "EMPRESA"
+
+
+class ManifiestoDescargas:
+    """Índice persistente de los estados financieros ya descargados"""
+
+    def __init__(self, carpeta: str = None, archivo: str = None):
+        """
+        Carga (o crea) el manifiesto de una carpeta de descargas
+
+        Args:
+            carpeta: Carpeta raíz de descargas (default: ./descargas)
+            archivo: Ruta del JSON (default: <carpeta>/manifiesto_descargas.json)
+        """
+        self.carpeta = os.path.abspath(carpeta or os.path.join(os.getcwd(), "descargas"))
+        self.archivo = archivo or os.path.join(self.carpeta, ARCHIVO_MANIFIESTO)
+        self._lock = threading.RLock()
+        self._entradas: Dict[str, Dict[str, Any]] = {}
+        self._modificadas: set = set()  # Claves cambiadas por esta instancia desde el último guardado
+        self._eliminadas: set = set()
+        os.makedirs(self.carpeta, exist_ok=True)
+        self._cargar()
+
+    # ===== PERSISTENCIA =====
+
+    def _leer(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.archivo, 'r', encoding='utf-8') as f:
+                return json.load(f).get('entradas', {})
+        except (OSError, ValueError):
+            return {}
+
+    def _cargar(self):
+        self._entradas = self._leer()
+
+    def _guardar(self):
+        # ✨ Releer y fusionar bajo bloqueo: otra instancia (u otro proceso) pudo guardar
+        # entradas nuevas desde que esta cargó el archivo
+        with bloqueo_archivo(self.archivo):
+            entradas = self._leer()
+            for clave in self._eliminadas:
+                entradas.pop(clave, None)
+            for clave in self._modificadas:
+                entradas[clave] = self._entradas[clave]
+
+            temporal = f"{self.archivo}.{os.getpid()}.tmp"
+            with open(temporal, 'w', encoding='utf-8') as f:
+                json.dump({'version': 1, 'entradas': entradas}, f, ensure_ascii=False, indent=1)
+            os.replace(temporal, self.archivo)
+
+        self._entradas = entradas
+        self._modificadas.clear()
+        self._eliminadas.clear()
+
+    @staticmethod
+    def clave(codigo: str, año: int, periodo: str = PERIODO_ANUAL) -> str:
+        return f"{codigo}|{año}|{periodo}"
+
+    def ruta_canonica(self, empresa: str, año: int, periodo: str = PERIODO_ANUAL, extension: str = ".xls") -> str:
+        """Ruta definitiva de un estado financiero: <carpeta>/<EMPRESA>/<EMPRESA>_<año>[_<periodo>].xls"""
+        carpeta_empresa = nombre_carpeta_empresa(empresa)
+        sufijo = "" if periodo == PERIODO_ANUAL else f"_{re.sub(r'[^a-z0-9]+', '', periodo.lower())}"
+        return os.path.join(self.carpeta, carpeta_empresa, f"{carpeta_empresa}_{año}{sufijo}{extension}")
+
+    # ===== CONSULTAS =====
+
+    def obtener(self, codigo: str, año: int, periodo: str = PERIODO_ANUAL) -> Optional[Dict[str, Any]]:
+        """Entrada registrada (o None)"""
+        with self._lock:
+            entrada = self._entradas.get(self.clave(codigo, año, periodo))
+            return dict(entrada) if entrada else None
+
+    def vigente(self, codigo: str, año: int, periodo: str = PERIODO_ANUAL, verificar_hash: bool = False) -> bool:
+        """
+        True si el año ya está descargado y su archivo sigue intacto
+
+        Args:
+            codigo: Código de la empresa en la SMV (value del combo)
+            año: Año del estado financiero
+            periodo: Periodo ('anual')
+            verificar_hash: Recalcular el SHA-256 (más lento); si no, basta con el tamaño
+        """
+        entrada = self.obtener(codigo, año, periodo)
+        if not entrada:
+            return False
+        ruta = os.path.join(self.carpeta, entrada['ruta'])
+        try:
+            if os.path.getsize(ruta) != entrada['bytes']:
+                return False
+        except OSError:
+            return False
+        return not verificar_hash or calcular_hash(ruta) == entrada['sha256']
+
+    def faltantes(
+        self,
+        codigo: str,
+        años: Iterable[int],
+        periodo: str = PERIODO_ANUAL,
+        refrescar_recientes: int = 0,
+        verificar_hash: bool = False
+    ) -> List[int]:
+        """
+        Años que hay que (volver a) pedir a la SMV
+
+        Args:
+            codigo: Código de la empresa en la SMV
+            años: Años solicitados
+            periodo: Periodo ('anual')
+            refrescar_recientes: Los N años más recientes se piden siempre (pueden reexpresarse)
+            verificar_hash: Comprobar el contenido de los archivos existentes
+
+        Returns:
+            Lista de años (en el mismo orden recibido)
+        """
+        años = list(años)
+        recientes = set(sorted(años, reverse=True)[:refrescar_recientes])
+        return [año for año in años if año in recientes or not self.vigente(codigo, año, periodo, verificar_hash)]
+
+    def entradas(self, codigo: str = None) -> List[Dict[str, Any]]:
+        """Entradas registradas (de una empresa o de todas)"""
+        with self._lock:
+            return [dict(e) for e in self._entradas.values() if codigo is None or e['codigo'] == codigo]
+
+    # ===== REGISTRO =====
+
+    def registrar(
+        self,
+        ruta_descargada: str,
+        codigo: str,
+        empresa: str,
+        año: int,
+        periodo: str = PERIODO_ANUAL
+    ) -> Dict[str, Any]:
+        """
+        Mueve un archivo recién descargado a su ruta canónica y lo anota en el manifiesto
+
+        Args:
+            ruta_descargada: Archivo tal como lo dejó el navegador / la descarga HTTP
+            codigo: Código de la empresa en la SMV
+            empresa: Nombre de la empresa
+            año: Año del estado financiero
+            periodo: Periodo ('anual')
+
+        Returns:
+            Entrada del manifiesto con 'estado': 'nuevo', 'actualizado' o 'sin_cambios'
+        """
+        sha256 = calcular_hash(ruta_descargada)
+        extension = os.path.splitext(ruta_descargada)[1].lower() or ".xls"
+
+        with self._lock:
+            clave = self.clave(codigo, año, periodo)
+            anterior = self._entradas.get(clave)
+            destino = self.ruta_canonica(empresa, año, periodo, extension)
+            os.makedirs(os.path.dirname(destino), exist_ok=True)
+
+            if anterior and anterior['sha256'] == sha256 and os.path.exists(os.path.join(self.carpeta, anterior['ruta'])):
+                # Mismo contenido: se descarta la copia nueva y se conserva el archivo registrado
+                estado = 'sin_cambios'
+                if os.path.abspath(ruta_descargada) != os.path.join(self.carpeta, anterior['ruta']):
+                    os.remove(ruta_descargada)
+                destino = os.path.join(self.carpeta, anterior['ruta'])
+            else:
+                estado = 'actualizado' if anterior else 'nuevo'
+                if os.path.abspath(ruta_descargada) != destino:
+                    shutil.move(ruta_descargada, destino)
+
+            entrada = {
+                'codigo': codigo,
+                'empresa': empresa,
+                'año': año,
+                'periodo': periodo,
+                'ruta': os.path.relpath(destino, self.carpeta),
+                'bytes': os.path.getsize(destino),
+                'sha256': sha256,
+                'descargado': anterior['descargado'] if estado == 'sin_cambios' else time.time(),
+                'verificado': time.time()
+            }
+            self._entradas[clave] = entrada
+            self._modificadas.add(clave)
+            self._eliminadas.discard(clave)
+            self._guardar()
+            return {**entrada, 'estado': estado}
+
+    def olvidar(self, codigo: str, año: int, periodo: str = PERIODO_ANUAL):
+        """Quita una entrada (el archivo se conserva)"""
+        with self._lock:
+            clave = self.clave(codigo, año, periodo)
+            if self._entradas.pop(clave, None) is not None:
+                self._eliminadas.add(clave)
+                self._modificadas.discard(clave)
+                self._guardar()
+
+
+def listar_archivos_descargas(carpeta: str) -> List[str]:
+    """Archivos Excel de la carpeta de descargas (incluidas las subcarpetas por empresa), como rutas relativas"""
+    archivos = []
+    for raiz, subcarpetas, nombres in os.walk(carpeta):
+        subcarpetas[:] = [c for c in subcarpetas if not c.startswith('.')]  # Carpetas de sesiones en curso
+        for nombre in nombres:
+            if nombre.endswith(('.xls', '.xlsx')) and not nombre.startswith('.'):
+                archivos.append(os.path.relpath(os.path.join(raiz, nombre), carpeta))
+    return sorted(archivos)
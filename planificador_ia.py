@@ -0,0 +1,415 @@
+"""
+Planificador de Análisis con IA por Lotes
+=========================================
+Ejecuta el análisis de ratios con IA sobre una cartera completa de empresas sin
+chocar con los límites de la API.
+
+Características:
+- Límite de solicitudes por minuto (RPM) y tokens por minuto (TPM) con cubos de tokens
+- Reintentos con espera exponencial (+ jitter) ante 429, errores 5xx, timeouts y caídas de conexión;
+  respeta la cabecera retry-after cuando el proveedor la envía
+- Concurrencia acotada: un pool de solicitudes de fase compartido por todas las empresas
+- Progreso reanudable: cada empresa terminada se guarda en un archivo de checkpoint;
+  al relanzar el lote, las empresas ya completas (con los mismos datos) se omiten
+- Reutiliza la caché de IA: las fases ya generadas no consumen cupo
+- Reporte de throughput (empresas/min, solicitudes/min, reintentos, espera por límites)
+"""
+
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from groq import APIConnectionError, APIStatusError, APITimeoutError, RateLimitError
+
+from analisis_ia import (
+    GROQ_TIMEOUT_FASE, GROQ_MODEL, construir_fases_ia, combinar_analisis_ia,
+    ejecutar_fase_ia, huella_fase, obtener_cache_ia
+)
+from cliente_llm import obtener_cliente_llm
+
+# Importar configuración de API (con valores por defecto si falta algún parámetro)
+try:
+    import config_api
+except ImportError:
+    config_api = None
+
+IA_LIMITE_RPM = getattr(config_api, 'IA_LIMITE_RPM', 30)              # Solicitudes por minuto
+IA_LIMITE_TPM = getattr(config_api, 'IA_LIMITE_TPM', 60000)           # Tokens (entrada + salida) por minuto
+IA_LOTE_CONCURRENCIA = getattr(config_api, 'IA_LOTE_CONCURRENCIA', 3)  # Solicitudes simultáneas del lote
+IA_LOTE_REINTENTOS = getattr(config_api, 'IA_LOTE_REINTENTOS', 5)
+ESPERA_BASE = 1.0      # Segundos antes del primer reintento
+ESPERA_MAXIMA = 60.0   # Tope de la espera exponencial
+
+
+def estimar_tokens_fase(fase: Dict[str, Any]) -> int:
+    """Tokens que una fase puede consumir del cupo TPM (entrada estimada + máximo de salida)"""
+    return fase['tokens_estimados'] + fase['max_tokens']
+
+
+class CuboTokens:
+    """Cubo de tokens: permite ráfagas hasta `capacidad` y se rellena a ritmo constante"""
+
+    def __init__(self, capacidad: float, por_segundo: float):
+        """
+        Args:
+            capacidad: Máximo acumulable (tamaño de ráfaga)
+            por_segundo: Ritmo de recarga
+        """
+        self.capacidad = capacidad
+        self.por_segundo = por_segundo
+        self._disponible = capacidad
+        self._ultimo = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _recargar(self):
+        """Suma lo recargado desde la última consulta"""
+        ahora = time.monotonic()
+        self._disponible = min(self.capacidad, self._disponible + (ahora - self._ultimo) * self.por_segundo)
+        self._ultimo = ahora
+
+    def consumir(self, cantidad: float) -> float:
+        """
+        Toma `cantidad` del cubo esperando lo necesario
+
+        Una cantidad mayor que la capacidad se recorta a la capacidad
+        (si no, nunca podría atenderse).
+
+        Returns:
+            Segundos esperados
+        """
+        cantidad = min(cantidad, self.capacidad)
+        esperado = 0.0
+        while True:
+            with self._lock:
+                self._recargar()
+                if self._disponible >= cantidad:
+                    self._disponible -= cantidad
+                    return esperado
+                espera = (cantidad - self._disponible) / self.por_segundo
+            time.sleep(espera)
+            esperado += espera
+
+
+class PlanificadorIA:
+    """Ejecuta análisis con IA de muchas empresas respetando límites de la API"""
+
+    def __init__(
+        self,
+        limite_rpm: float = IA_LIMITE_RPM,
+        limite_tpm: float = IA_LIMITE_TPM,
+        max_concurrencia: int = IA_LOTE_CONCURRENCIA,
+        max_reintentos: int = IA_LOTE_REINTENTOS,
+        archivo_checkpoint: Optional[str] = None,
+        timeout_fase: float = GROQ_TIMEOUT_FASE
+    ):
+        """
+        Configura el planificador
+
+        Args:
+            limite_rpm: Solicitudes por minuto permitidas
+            limite_tpm: Tokens por minuto permitidos
+            max_concurrencia: Solicitudes simultáneas
+            max_reintentos: Reintentos por solicitud ante errores transitorios
+            archivo_checkpoint: JSON donde se guarda el progreso (None = sin reanudación)
+            timeout_fase: Segundos máximos por solicitud
+        """
+        self.max_concurrencia = max_concurrencia
+        self.max_reintentos = max_reintentos
+        self.archivo_checkpoint = archivo_checkpoint
+        self.timeout_fase = timeout_fase
+
+        self._cubo_solicitudes = CuboTokens(max(1.0, limite_rpm / 6), limite_rpm / 60)
+        self._cubo_tokens = CuboTokens(max(1.0, limite_tpm / 6), limite_tpm / 60)
+        self._lock = threading.Lock()
+        self._checkpoint: Dict[str, Dict[str, Any]] = self._cargar_checkpoint()
+        self.estadisticas: Dict[str, Any] = {}
+
+    # ===== API PÚBLICA =====
+
+    def ejecutar(
+        self,
+        trabajos: List[Dict[str, Any]],
+        callback_progreso: Callable[[str], None] = None,
+        debe_cancelar: Callable[[], bool] = None
+    ) -> Dict[str, Any]:
+        """
+        Analiza una cartera de empresas
+
+        Args:
+            trabajos: Lista de {'empresa': str, 'resultados_ratios': dict}
+            callback_progreso: Función para reportar progreso
+            debe_cancelar: Función que indica si hay que detener el lote
+                (las empresas pendientes quedan para la próxima ejecución)
+
+        Returns:
+            Dict con 'resultados' {empresa: {'estado', 'texto', 'fases_fallidas'}} y 'reporte'
+        """
+        def reportar(mensaje):
+            if callback_progreso:
+                callback_progreso(mensaje)
+            else:
+                print(mensaje)
+
+        self.estadisticas = {
+            'empresas': len(trabajos),
+            'completas': 0,
+            'parciales': 0,
+            'fallidas': 0,
+            'omitidas_checkpoint': 0,
+            'pendientes': 0,
+            'solicitudes': 0,
+            'aciertos_cache': 0,
+            'reintentos': 0,
+            'errores_429': 0,
+            'errores_5xx': 0,
+            'tokens_estimados': 0,
+            'espera_limites_s': 0.0
+        }
+        inicio = time.perf_counter()
+        cliente = obtener_cliente_llm().with_options(max_retries=0)   # Los reintentos los gestiona el planificador
+        cache = obtener_cache_ia()
+        resultados: Dict[str, Dict[str, Any]] = {}
+
+        # Preparar fases; omitir empresas ya completas con los mismos datos
+        pendientes_por_empresa: Dict[str, Dict[str, Any]] = {}
+        for trabajo in trabajos:
+            empresa = trabajo['empresa']
+            fases = construir_fases_ia(trabajo['resultados_ratios'], empresa)
+            huellas = {fase['id']: huella_fase(fase) for fase in fases}
+            huella_empresa = hashlib.sha256("".join(huellas[f['id']] for f in fases).encode('utf-8')).hexdigest()
+
+            guardado = self._checkpoint.get(empresa)
+            if guardado and guardado.get('huella') == huella_empresa and guardado.get('estado') == 'completo':
+                resultados[empresa] = guardado
+                self.estadisticas['omitidas_checkpoint'] += 1
+                continue
+
+            textos = {}
+            for fase in fases:
+                texto = cache.obtener(huellas[fase['id']])
+                if texto is not None:
+                    textos[fase['id']] = texto
+                    self.estadisticas['aciertos_cache'] += 1
+
+            pendientes_por_empresa[empresa] = {
+                'fases': fases,
+                'huellas': huellas,
+                'huella': huella_empresa,
+                'textos': textos,
+                'errores': {},
+                'restantes': len(fases) - len(textos)
+            }
+
+        if self.estadisticas['omitidas_checkpoint']:
+            reportar(f"⏭️ {self.estadisticas['omitidas_checkpoint']} empresa(s) ya analizadas (checkpoint)")
+
+        # Empresas resueltas solo con la caché
+        for empresa, estado in list(pendientes_por_empresa.items()):
+            if estado['restantes'] == 0:
+                resultados[empresa] = self._cerrar_empresa(empresa, estado, reportar)
+
+        solicitudes = [
+            (empresa, fase)
+            for empresa, estado in pendientes_por_empresa.items() if estado['restantes']
+            for fase in estado['fases'] if fase['id'] not in estado['textos']
+        ]
+        reportar(f"🚀 {len(solicitudes)} solicitud(es) para {len(pendientes_por_empresa)} empresa(s)")
+
+        def atender(empresa_fase):
+            empresa, fase = empresa_fase
+            if debe_cancelar and debe_cancelar():
+                return
+            estado = pendientes_por_empresa[empresa]
+            try:
+                texto = self._solicitar_con_reintentos(cliente, fase)
+                with self._lock:
+                    estado['textos'][fase['id']] = texto
+                cache.guardar(estado['huellas'][fase['id']], texto, {'modelo': GROQ_MODEL, 'fase': fase['id'], 'empresa': empresa})
+            except Exception as e:
+                with self._lock:
+                    estado['errores'][fase['id']] = str(e)
+                reportar(f"⚠️ {empresa} - fase '{fase['id']}' falló: {str(e)}")
+
+            with self._lock:
+                estado['restantes'] -= 1
+                terminada = estado['restantes'] == 0
+            if terminada:
+                resultado = self._cerrar_empresa(empresa, estado, reportar)
+                with self._lock:
+                    resultados[empresa] = resultado
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrencia, thread_name_prefix="lote_ia") as pool:
+            list(pool.map(atender, solicitudes))
+
+        self.estadisticas['pendientes'] = len(trabajos) - len(resultados)
+        segundos = time.perf_counter() - inicio
+        procesadas = self.estadisticas['completas'] + self.estadisticas['parciales'] + self.estadisticas['fallidas']
+        reporte = {
+            **self.estadisticas,
+            'segundos': segundos,
+            'empresas_por_minuto': procesadas / segundos * 60 if segundos else 0.0,
+            'solicitudes_por_minuto': self.estadisticas['solicitudes'] / segundos * 60 if segundos else 0.0
+        }
+        return {'resultados': resultados, 'reporte': reporte}
+
+    def limpiar_checkpoint(self):
+        """Olvida el progreso guardado (el próximo lote analiza todas las empresas)"""
+        with self._lock:
+            self._checkpoint = {}
+            if self.archivo_checkpoint and os.path.exists(self.archivo_checkpoint):
+                os.remove(self.archivo_checkpoint)
+
+    # ===== SOLICITUDES =====
+
+    def _solicitar_con_reintentos(self, cliente, fase: Dict[str, Any]) -> str:
+        """Envía una fase respetando los límites y reintentando errores transitorios"""
+        tokens = estimar_tokens_fase(fase)
+        intento = 0
+        while True:
+            espera = self._cubo_solicitudes.consumir(1) + self._cubo_tokens.consumir(tokens)
+            with self._lock:
+                self.estadisticas['solicitudes'] += 1
+                self.estadisticas['tokens_estimados'] += tokens
+                self.estadisticas['espera_limites_s'] += espera
+
+            try:
+                return ejecutar_fase_ia(cliente, fase, self.timeout_fase)
+            except (RateLimitError, APIStatusError, APITimeoutError, APIConnectionError) as e:
+                codigo = getattr(e, 'status_code', None)
+                if codigo is not None and codigo != 429 and codigo < 500:
+                    raise   # Errores de la solicitud (400, 401...): reintentar no sirve
+                intento += 1
+                with self._lock:
+                    if codigo == 429:
+                        self.estadisticas['errores_429'] += 1
+                    elif codigo is not None:
+                        self.estadisticas['errores_5xx'] += 1
+                if intento > self.max_reintentos:
+                    raise
+                with self._lock:
+                    self.estadisticas['reintentos'] += 1
+                time.sleep(self._espera_reintento(e, intento))
+
+    def _espera_reintento(self, error: Exception, intento: int) -> float:
+        """Espera antes del reintento: retry-after si existe, si no exponencial con jitter"""
+        respuesta = getattr(error, 'response', None)
+        if respuesta is not None:
+            try:
+                return min(ESPERA_MAXIMA, float(respuesta.headers.get('retry-after')))
+            except (TypeError, ValueError):
+                pass
+        exponencial = min(ESPERA_MAXIMA, ESPERA_BASE * (2 ** (intento - 1)))
+        return exponencial * random.uniform(0.5, 1.0)
+
+    # ===== RESULTADOS Y CHECKPOINT =====
+
+    def _cerrar_empresa(self, empresa: str, estado: Dict[str, Any], reportar: Callable[[str], None]) -> Dict[str, Any]:
+        """Combina las fases de una empresa terminada y guarda el checkpoint"""
+        textos, errores = estado['textos'], estado['errores']
+        if not textos:
+            resultado_estado = 'fallido'
+            texto = f"❌ Error al generar análisis con IA: {next(iter(errores.values()))}"
+        else:
+            resultado_estado = 'parcial' if errores else 'completo'
+            texto = combinar_analisis_ia(empresa, estado['fases'], textos, errores)
+
+        resultado = {
+            'empresa': empresa,
+            'estado': resultado_estado,
+            'huella': estado['huella'],
+            'texto': texto,
+            'fases_fallidas': sorted(errores),
+            'completado': time.time()
+        }
+
+        with self._lock:
+            clave_contador = {'completo': 'completas', 'parcial': 'parciales', 'fallido': 'fallidas'}[resultado_estado]
+            self.estadisticas[clave_contador] += 1
+            self._checkpoint[empresa] = resultado
+            self._guardar_checkpoint()
+
+        icono = {'completo': '✅', 'parcial': '⚠️', 'fallido': '❌'}[resultado_estado]
+        reportar(f"{icono} {empresa}: análisis {resultado_estado}")
+        return resultado
+
+    def _cargar_checkpoint(self) -> Dict[str, Dict[str, Any]]:
+        """Lee el progreso de ejecuciones anteriores"""
+        if not self.archivo_checkpoint or not os.path.exists(self.archivo_checkpoint):
+            return {}
+        try:
+            with open(self.archivo_checkpoint, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Checkpoint ilegible, se ignora: {str(e)}")
+            return {}
+
+    def _guardar_checkpoint(self):
+        """Escribe el checkpoint de forma atómica (un corte no deja el archivo a medias)"""
+        if not self.archivo_checkpoint:
+            return
+        temporal = f"{self.archivo_checkpoint}.tmp"
+        try:
+            with open(temporal, 'w', encoding='utf-8') as f:
+                json.dump(self._checkpoint, f, ensure_ascii=False)
+            os.replace(temporal, self.archivo_checkpoint)
+        except OSError as e:
+            print(f"⚠️ No se pudo guardar el checkpoint: {str(e)}")
+
+
+def imprimir_reporte(reporte: Dict[str, Any]):
+    """Imprime el reporte de throughput de un lote"""
+    print("\n" + "=" * 70)
+    print("REPORTE DEL LOTE DE IA")
+    print("=" * 70)
+    print(f"🏢 Empresas: {reporte['empresas']} "
+          f"(✅ {reporte['completas']} completas, ⚠️ {reporte['parciales']} parciales, "
+          f"❌ {reporte['fallidas']} fallidas, ⏭️ {reporte['omitidas_checkpoint']} del checkpoint, "
+          f"⏸️ {reporte['pendientes']} pendientes)")
+    print(f"📨 Solicitudes: {reporte['solicitudes']} ({reporte['aciertos_cache']} fases desde caché, "
+          f"{reporte['reintentos']} reintentos, {reporte['errores_429']} respuestas 429, {reporte['errores_5xx']} errores 5xx)")
+    print(f"🔢 Tokens estimados: {reporte['tokens_estimados']:,}")
+    print(f"⏱️ Duración: {reporte['segundos']:.1f} s · espera por límites: {reporte['espera_limites_s']:.1f} s")
+    print(f"🚀 Throughput: {reporte['empresas_por_minuto']:.1f} empresas/min · {reporte['solicitudes_por_minuto']:.1f} solicitudes/min")
+
+
+if __name__ == "__main__":
+    import shutil
+    import tempfile
+
+    from analisis_ia import configurar_cache_ia
+    from benchmark_ia import generar_ratios_sinteticos
+    from cliente_llm import configurar_proveedor_llm
+    from servidor_llm_simulado import ServidorLLMSimulado
+
+    print("=" * 70)
+    print("PLANIFICADOR DE IA POR LOTES - DEMO (SERVIDOR SIMULADO)")
+    print("=" * 70)
+
+    directorio = tempfile.mkdtemp(prefix="planificador_ia_")
+    try:
+        with ServidorLLMSimulado(latencia=0.2, tasa_limite=0.15) as servidor:
+            configurar_proveedor_llm(api_key="simulado", base_url=servidor.url)
+            configurar_cache_ia(directorio=os.path.join(directorio, "cache"))
+            trabajos = [
+                {'empresa': f"EMPRESA {i:02d}", 'resultados_ratios': generar_ratios_sinteticos(f"EMPRESA {i:02d}", [2024, 2023, 2022])}
+                for i in range(10)
+            ]
+            planificador = PlanificadorIA(
+                limite_rpm=120,
+                limite_tpm=200000,
+                archivo_checkpoint=os.path.join(directorio, "checkpoint.json")
+            )
+            salida = planificador.ejecutar(trabajos)
+            imprimir_reporte(salida['reporte'])
+
+            print("\n🔁 Relanzando el mismo lote (se reanuda desde el checkpoint)...")
+            imprimir_reporte(planificador.ejecutar(trabajos)['reporte'])
+    finally:
+        configurar_proveedor_llm()
+        configurar_cache_ia()
+        shutil.rmtree(directorio, ignore_errors=True)
@@ -0,0 +1,385 @@
+"""
+Pool de Navegadores SMV (sesiones calientes compartidas)
+========================================================
+Mantiene navegadores ya iniciados y con el formulario de la SMV cargado, para que
+las descargas de la app y de los procesos por lotes no paguen en cada acción el
+arranque de Chrome, la resolución del ChromeDriver y la primera carga de la página.
+
+Características:
+- Arrendamiento de sesiones (`with pool.arrendar(carpeta) as descargador:`), compartido
+  por todas las sesiones de Streamlit y tareas del proceso
+- Comprobación de salud al prestar: un navegador colgado se descarta y se reemplaza
+- Reinicio de la página al devolver (una pestaña, formulario vacío, estado limpio)
+- Desalojo de navegadores ociosos (conservando un mínimo caliente) y tope de navegadores
+- Precalentamiento en segundo plano y estadísticas de reutilización
+- Funciona con cualquier backend con la interfaz de DescargadorSMV (p. ej. DescargadorSMVHttp)
+"""
+
+import atexit
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+from descargador_smv import DescargadorSMV
+
+# Importar configuración de API (con valores por defecto si falta algún parámetro)
+try:
+    import config_api
+except ImportError:
+    config_api = None
+
+POOL_NAVEGADORES_MAX = getattr(config_api, 'POOL_NAVEGADORES_MAX', 4)                   # Navegadores abiertos como máximo
+POOL_NAVEGADORES_MIN_CALIENTES = getattr(config_api, 'POOL_NAVEGADORES_MIN_CALIENTES', 1)  # Se conservan aunque estén ociosos
+POOL_NAVEGADORES_INACTIVIDAD_MIN = getattr(config_api, 'POOL_NAVEGADORES_INACTIVIDAD_MIN', 10)  # Minutos ociosos antes de cerrar
+
+INTERVALO_LIMPIEZA = 30         # Segundos entre revisiones de navegadores ociosos
+TIMEOUT_ARRENDAMIENTO = 300     # Segundos máximos esperando un navegador libre
+
+
+class NavegadorPool:
+    """Un navegador del pool con sus metadatos"""
+
+    def __init__(self, identificador: int, descargador: Any, segundos_arranque: float):
+        self.identificador = identificador
+        self.descargador = descargador
+        self.creado = time.time()
+        self.ultimo_uso = time.time()
+        self.usos = 0
+        self.segundos_arranque = segundos_arranque
+
+
+class PoolNavegadores:
+    """Pool de navegadores con el formulario de la SMV listo para usar"""
+
+    def __init__(
+        self,
+        max_navegadores: int = POOL_NAVEGADORES_MAX,
+        min_calientes: int = POOL_NAVEGADORES_MIN_CALIENTES,
+        inactividad_minutos: float = POOL_NAVEGADORES_INACTIVIDAD_MIN,
+        headless: bool = True,
+        driver_path: str = None,
+        fabrica: Callable[..., Any] = DescargadorSMV
+    ):
+        """
+        Configura el pool (no abre ningún navegador hasta que se pida)
+
+        Args:
+            max_navegadores: Navegadores abiertos como máximo (prestados + libres)
+            min_calientes: Navegadores libres que se conservan aunque estén ociosos
+            inactividad_minutos: Minutos sin uso antes de cerrar un navegador libre
+            headless: Navegadores sin ventana
+            driver_path: Ruta del ChromeDriver (None = automático)
+            fabrica: Clase/función que crea cada descargador (DescargadorSMV por defecto)
+        """
+        self.max_navegadores = max(1, max_navegadores)
+        self.min_calientes = max(0, min(min_calientes, self.max_navegadores))
+        self.inactividad_segundos = inactividad_minutos * 60
+        self.headless = headless
+        self.driver_path = driver_path
+        self.fabrica = fabrica
+
+        self._condicion = threading.Condition()
+        self._libres: List[NavegadorPool] = []
+        self._prestados: Dict[int, NavegadorPool] = {}
+        self._creando = 0
+        self._siguiente_id = 0
+        self._cerrado = False
+        self._carpeta_base = os.path.join(os.getcwd(), "descargas", ".pool")
+        self.estadisticas = {
+            'creados': 0, 'reutilizados': 0, 'descartados': 0, 'desalojados': 0, 'fallos_arranque': 0,
+            'segundos_arranque': 0.0, 'segundos_espera': 0.0, 'arrendamientos': 0
+        }
+
+        self._detener = threading.Event()
+        self._hilo_limpieza = threading.Thread(target=self._limpiar_periodicamente, name="pool_navegadores", daemon=True)
+        self._hilo_limpieza.start()
+
+    # ===== CICLO DE VIDA DE CADA NAVEGADOR =====
+
+    def _crear(self) -> Optional[NavegadorPool]:
+        """Inicia un navegador nuevo (fuera del lock: tarda segundos)"""
+        with self._condicion:
+            identificador = self._siguiente_id
+            self._siguiente_id += 1
+
+        inicio = time.perf_counter()
+        descargador = self.fabrica(
+            download_dir=os.path.join(self._carpeta_base, str(identificador)),
+            driver_path=self.driver_path,
+            headless=self.headless,
+            usar_manifiesto=False
+        )
+        if not descargador.iniciar_navegador():
+            descargador.cerrar_navegador()
+            with self._condicion:
+                self.estadisticas['fallos_arranque'] += 1
+            return None
+        descargador.obtener_empresas_disponibles()
+        segundos = time.perf_counter() - inicio
+
+        with self._condicion:
+            self.estadisticas['creados'] += 1
+            self.estadisticas['segundos_arranque'] += segundos
+        return NavegadorPool(identificador, descargador, segundos)
+
+    def _descartar(self, navegador: NavegadorPool, motivo: str = 'descartados'):
+        """Cierra un navegador que ya no está en el pool"""
+        try:
+            navegador.descargador.cerrar_navegador()
+        except Exception:
+            pass
+        with self._condicion:
+            self.estadisticas[motivo] += 1
+
+    def _total(self) -> int:
+        return len(self._libres) + len(self._prestados) + self._creando
+
+    # ===== ARRENDAMIENTO =====
+
+    def tomar(self, download_dir: str = None, usar_manifiesto: bool = True, timeout: float = TIMEOUT_ARRENDAMIENTO) -> Any:
+        """
+        Presta un navegador listo (reutilizado si hay uno libre y sano, nuevo si no)
+
+        Args:
+            download_dir: Carpeta donde dejará las descargas (default: ./descargas)
+            usar_manifiesto: Activar el manifiesto de descargas en esa carpeta
+            timeout: Segundos máximos esperando que se libere un navegador
+
+        Returns:
+            Descargador con el navegador iniciado (devolver con devolver())
+
+        Raises:
+            TimeoutError: Si no hubo navegador disponible a tiempo
+            RuntimeError: Si el pool está cerrado o no se pudo iniciar el navegador
+        """
+        inicio = time.perf_counter()
+        limite = inicio + timeout
+
+        while True:
+            with self._condicion:
+                while True:
+                    if self._cerrado:
+                        raise RuntimeError("El pool de navegadores está cerrado")
+                    if self._libres:
+                        # El más recientemente usado: su página suele seguir caliente
+                        navegador = self._libres.pop()
+                        nuevo = False
+                        break
+                    if self._total() < self.max_navegadores:
+                        self._creando += 1
+                        navegador = None
+                        nuevo = True
+                        break
+                    restante = limite - time.perf_counter()
+                    if restante <= 0:
+                        raise TimeoutError("No hay navegadores libres en el pool")
+                    self._condicion.wait(restante)
+
+            if nuevo:
+                try:
+                    navegador = self._crear()
+                finally:
+                    with self._condicion:
+                        self._creando -= 1
+                        self._condicion.notify_all()
+                if navegador is None:
+                    raise RuntimeError("No se pudo iniciar el navegador")
+            elif not navegador.descargador.saludable():
+                # ✨ Comprobación de salud: un navegador colgado no se presta
+                self._descartar(navegador)
+                continue
+
+            with self._condicion:
+                navegador.usos += 1
+                self._prestados[id(navegador.descargador)] = navegador
+                self.estadisticas['arrendamientos'] += 1
+                self.estadisticas['segundos_espera'] += time.perf_counter() - inicio
+                if not nuevo:
+                    self.estadisticas['reutilizados'] += 1
+
+            try:
+                navegador.descargador.cambiar_carpeta_descargas(
+                    download_dir or os.path.join(os.getcwd(), "descargas"), usar_manifiesto=usar_manifiesto
+                )
+            except BaseException:
+                # Sin devolverlo, el préstamo quedaría ocupando un cupo del pool para siempre
+                self.devolver(navegador.descargador, descartar=True)
+                raise
+            return navegador.descargador
+
+    def devolver(self, descargador: Any, descartar: bool = False):
+        """
+        Devuelve un navegador prestado al pool
+
+        Args:
+            descargador: El objeto recibido de tomar()
+            descartar: True si la tarea falló y el navegador puede haber quedado en mal estado
+        """
+        with self._condicion:
+            navegador = self._prestados.pop(id(descargador), None)
+        if navegador is None:
+            return
+
+        # ✨ Reinicio de la página: la siguiente tarea empieza con el formulario vacío
+        if descartar or self._cerrado or not descargador.reiniciar_pagina():
+            self._descartar(navegador)
+        else:
+            descargador.cambiar_carpeta_descargas(os.path.join(self._carpeta_base, str(navegador.identificador)), usar_manifiesto=False)
+            with self._condicion:
+                navegador.ultimo_uso = time.time()
+                self._libres.append(navegador)
+
+        with self._condicion:
+            self._condicion.notify_all()
+
+    @contextmanager
+    def arrendar(self, download_dir: str = None, usar_manifiesto: bool = True, timeout: float = TIMEOUT_ARRENDAMIENTO):
+        """
+        Context manager de tomar()/devolver(); si el bloque lanza una excepción el navegador se descarta
+
+        Ejemplo:
+            with obtener_pool_navegadores().arrendar(carpeta) as descargador:
+                descargador.proceso_completo("SAN JUAN", 2024, 2020)
+        """
+        descargador = self.tomar(download_dir, usar_manifiesto, timeout)
+        try:
+            yield descargador
+        except BaseException:
+            self.devolver(descargador, descartar=True)
+            raise
+        else:
+            self.devolver(descargador)
+
+    # ===== MANTENIMIENTO =====
+
+    def precalentar(self, cantidad: int = 1, en_segundo_plano: bool = True):
+        """
+        Inicia navegadores por adelantado hasta tener `cantidad` libres
+
+        Args:
+            cantidad: Navegadores libres deseados
+            en_segundo_plano: No bloquear mientras arrancan
+        """
+        def calentar():
+            while True:
+                with self._condicion:
+                    if self._cerrado or len(self._libres) + self._creando >= cantidad or self._total() >= self.max_navegadores:
+                        return
+                    self._creando += 1
+                try:
+                    navegador = self._crear()
+                finally:
+                    with self._condicion:
+                        self._creando -= 1
+                if navegador is None:
+                    return
+                with self._condicion:
+                    self._libres.append(navegador)
+                    self._condicion.notify_all()
+
+        if en_segundo_plano:
+            threading.Thread(target=calentar, name="pool_navegadores_precalentar", daemon=True).start()
+        else:
+            calentar()
+
+    def desalojar_ociosos(self) -> int:
+        """Cierra los navegadores libres que superan el tiempo de inactividad (conservando el mínimo caliente)"""
+        ahora = time.time()
+        with self._condicion:
+            # Los libres están ordenados del menos al más recientemente usado
+            sobrantes = max(0, len(self._libres) - self.min_calientes)
+            ociosos = [n for n in self._libres[:sobrantes] if ahora - n.ultimo_uso > self.inactividad_segundos]
+            for navegador in ociosos:
+                self._libres.remove(navegador)
+        for navegador in ociosos:
+            self._descartar(navegador, 'desalojados')
+        return len(ociosos)
+
+    def _limpiar_periodicamente(self):
+        while not self._detener.wait(INTERVALO_LIMPIEZA):
+            try:
+                self.desalojar_ociosos()
+            except Exception as e:
+                print(f"⚠️ Error al limpiar el pool de navegadores: {str(e)}")
+
+    def cerrar(self):
+        """Cierra todos los navegadores libres (los prestados se cierran al devolverse)"""
+        with self._condicion:
+            self._cerrado = True
+            libres, self._libres = self._libres, []
+            self._condicion.notify_all()
+        self._detener.set()
+        for navegador in libres:
+            self._descartar(navegador, 'desalojados')
+
+    def reporte(self) -> Dict[str, Any]:
+        """Estado y estadísticas del pool"""
+        with self._condicion:
+            creados = self.estadisticas['creados']
+            arrendamientos = self.estadisticas['arrendamientos']
+            return {
+                'libres': len(self._libres),
+                'prestados': len(self._prestados),
+                'max_navegadores': self.max_navegadores,
+                **self.estadisticas,
+                'arranque_medio_s': self.estadisticas['segundos_arranque'] / creados if creados else 0.0,
+                'espera_media_s': self.estadisticas['segundos_espera'] / arrendamientos if arrendamientos else 0.0,
+                'tasa_reutilizacion': self.estadisticas['reutilizados'] / arrendamientos if arrendamientos else 0.0
+            }
+
+
+_pool: Optional[PoolNavegadores] = None
+_lock_pool = threading.Lock()
+
+
+def obtener_pool_navegadores() -> PoolNavegadores:
+    """Pool compartido por todo el proceso (se crea al primer uso)"""
+    global _pool
+    with _lock_pool:
+        if _pool is None:
+            _pool = PoolNavegadores()
+        return _pool
+
+
+def configurar_pool_navegadores(**parametros) -> PoolNavegadores:
+    """
+    Reemplaza el pool compartido (cierra los navegadores del anterior)
+
+    Args:
+        **parametros: Argumentos de PoolNavegadores (límites, headless, fábrica...)
+
+    Returns:
+        El nuevo pool
+    """
+    global _pool
+    with _lock_pool:
+        if _pool is not None:
+            _pool.cerrar()
+        _pool = PoolNavegadores(**parametros)
+        return _pool
+
+
+@atexit.register
+def _cerrar_pool_al_salir():
+    if _pool is not None:
+        _pool.cerrar()
+
+
+if __name__ == "__main__":
+    print("=" * 70)
+    print("POOL DE NAVEGADORES SMV")
+    print("=" * 70)
+
+    pool = obtener_pool_navegadores()
+    for intento in range(1, 4):
+        inicio = time.perf_counter()
+        with pool.arrendar() as descargador:
+            empresa = descargador.buscar_empresa("SAN JUAN")
+            print(f"🔁 Arrendamiento {intento}: {time.perf_counter() - inicio:.2f} s → {empresa['text'] if empresa else 'sin resultado'}")
+
+    reporte = pool.reporte()
+    print(f"\n📊 Creados: {reporte['creados']} (arranque medio {reporte['arranque_medio_s']:.2f} s), "
+          f"reutilizados: {reporte['reutilizados']}, espera media: {reporte['espera_media_s']:.2f} s")
+    pool.cerrar()
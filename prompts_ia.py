@@ -0,0 +1,283 @@
+"""
+Constructor de Prompts del Análisis con IA
+==========================================
+Arma los prompts de las 3 fases del análisis de ratios de forma compacta y con
+un presupuesto de tokens por fase.
+
+Características:
+- Valores redondeados: ratios en veces con 2 decimales, rentabilidades como % con 1 decimal
+- Tablas compactas (una fila por año, encabezado una sola vez) en lugar de viñetas por ratio
+- Estimación de tokens de cada solicitud (sistema + prompt)
+- Presupuesto por fase: en historiales largos (15+ años) los años más antiguos se
+  resumen en una fila de promedios, conservando siempre el detalle de los más recientes
+"""
+
+import math
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# Importar configuración de API (con valores por defecto si falta algún parámetro)
+try:
+    import config_api
+except ImportError:
+    config_api = None
+
+GROQ_MAX_TOKENS_FASE1 = getattr(config_api, 'GROQ_MAX_TOKENS_FASE1', 2500)
+GROQ_MAX_TOKENS_FASE2 = getattr(config_api, 'GROQ_MAX_TOKENS_FASE2', 2800)
+GROQ_MAX_TOKENS_FASE3 = getattr(config_api, 'GROQ_MAX_TOKENS_FASE3', 2500)
+IA_PRESUPUESTO_PROMPT = getattr(config_api, 'IA_PRESUPUESTO_PROMPT', 550)   # Tokens de entrada por fase
+IA_MIN_AÑOS_DETALLE = getattr(config_api, 'IA_MIN_AÑOS_DETALLE', 5)        # Años recientes que nunca se resumen
+
+CARACTERES_POR_TOKEN = 3.5   # Español con cifras y Markdown: ~3.5 caracteres por token
+TEXTO_NO_DISPONIBLE = "N/A"
+
+# Ratios expresados como fracción (se muestran en %)
+RATIOS_PORCENTAJE = {'margen_neto', 'roa', 'roe'}
+
+# Mensajes de sistema de cada fase
+SISTEMA_FASE1 = "Eres un analista financiero experto en análisis de liquidez y endeudamiento. Proporciona análisis DETALLADOS y específicos centrados ÚNICAMENTE en estos aspectos. Explica causas, consecuencias y contexto."
+SISTEMA_FASE2 = "Eres un analista financiero experto en rentabilidad y eficiencia operativa. Proporciona análisis DETALLADOS y específicos centrados ÚNICAMENTE en estos aspectos. Explica causas, impactos y comparaciones."
+SISTEMA_FASE3 = "Eres un analista financiero senior que integra todos los aspectos financieros para dar un diagnóstico completo y recomendaciones estratégicas. Proporciona análisis PROFUNDO con visión holística y recomendaciones priorizadas."
+
+INSTRUCCIONES_FASE1 = """**INSTRUCCIONES:**
+- Analiza SOLO liquidez y endeudamiento (NO menciones rentabilidad ni actividad)
+- Sé específico con los números y proporciona análisis DETALLADO
+- Identifica tendencias, alertas y explica sus causas probables
+- Proporciona contexto comparativo entre años
+- Máximo 15-18 líneas
+
+**ESTRUCTURA:**
+1. **LIQUIDEZ** (8-9 líneas): Analiza Liquidez Corriente y Prueba Ácida. ¿Puede pagar obligaciones a corto plazo? ¿Cómo ha evolucionado? ¿Qué significa cada cambio? ¿Es saludable para la industria?
+2. **ENDEUDAMIENTO** (7-9 líneas): Analiza Razón Deuda Total y Deuda/Patrimonio. ¿Nivel de riesgo? ¿Apalancamiento adecuado? ¿Tendencia? ¿Cómo afecta la capacidad de endeudamiento futuro? ¿Alertas específicas?
+"""
+
+INSTRUCCIONES_FASE2 = """**INSTRUCCIONES:**
+- Analiza SOLO rentabilidad y actividad (NO menciones liquidez ni endeudamiento)
+- Sé específico con los números y proporciona análisis DETALLADO
+- Identifica si genera valor para accionistas y explica por qué
+- Compara entre años y explica cambios significativos
+- Máximo 18-20 líneas
+
+**ESTRUCTURA:**
+1. **RENTABILIDAD** (9-10 líneas): Analiza Margen Neto, ROA y ROE. ¿Genera ganancias suficientes? ¿Cómo ha evolucionado cada indicador? ¿El retorno es adecuado para los accionistas? ¿Qué factores pueden estar influyendo? ¿Comparación con tendencias del sector?
+2. **EFICIENCIA OPERATIVA** (9-10 líneas): Analiza rotaciones de activos, CxC e inventarios. ¿Uso eficiente de recursos? ¿Qué indican las rotaciones sobre la gestión operativa? ¿Problemas de cobranza o inventarios obsoletos? ¿Tendencia de mejora o deterioro?
+"""
+
+INSTRUCCIONES_FASE3 = """**INSTRUCCIONES:**
+- Integra TODOS los aspectos: liquidez, endeudamiento, rentabilidad y eficiencia
+- Identifica el PATRÓN GENERAL entre años con análisis PROFUNDO
+- Evalúa salud financiera GLOBAL y perspectivas futuras
+- Proporciona 3-4 RECOMENDACIONES específicas, accionables y priorizadas
+- Máximo 15-18 líneas
+
+**ESTRUCTURA:**
+1. **DIAGNÓSTICO INTEGRAL** (6-7 líneas): ¿Cómo está la empresa en general? ¿Fortalezas principales? ¿Debilidades críticas? ¿Balance entre liquidez, rentabilidad y eficiencia? ¿Posición competitiva probable?
+2. **TENDENCIA GLOBAL** (4-5 líneas): ¿Mejorando o deteriorándose? ¿Sostenible a mediano plazo? ¿Riesgos principales? ¿Oportunidades visibles?
+3. **RECOMENDACIONES ESTRATÉGICAS** (5-6 líneas): 3-4 acciones concretas prioritarias con justificación breve. ¿Qué hacer primero? ¿Qué evitar?
+"""
+
+# Definición de las fases (orden del informe); 'ratios' = columnas (clave, etiqueta) de la tabla
+FASES_IA = [
+    {
+        'id': 'liquidez_endeudamiento',
+        'titulo': "📊 PARTE 1: ANÁLISIS DE LIQUIDEZ Y ENDEUDAMIENTO",
+        'sistema': SISTEMA_FASE1,
+        'encabezado': "Analiza ÚNICAMENTE los ratios de LIQUIDEZ y ENDEUDAMIENTO de {empresa}.",
+        'seccion_datos': "DATOS DE LIQUIDEZ Y ENDEUDAMIENTO",
+        'ratios': [
+            ('liquidez_corriente', 'Liquidez Corriente'),
+            ('prueba_acida', 'Prueba Ácida'),
+            ('razon_deuda_total', 'Deuda Total'),
+            ('razon_deuda_patrimonio', 'Deuda/Patrimonio')
+        ],
+        'instrucciones': INSTRUCCIONES_FASE1,
+        'max_tokens': GROQ_MAX_TOKENS_FASE1
+    },
+    {
+        'id': 'rentabilidad_actividad',
+        'titulo': "💰 PARTE 2: ANÁLISIS DE RENTABILIDAD Y EFICIENCIA",
+        'sistema': SISTEMA_FASE2,
+        'encabezado': "Analiza ÚNICAMENTE los ratios de RENTABILIDAD y ACTIVIDAD de {empresa}.",
+        'seccion_datos': "DATOS DE RENTABILIDAD Y ACTIVIDAD",
+        'ratios': [
+            ('margen_neto', 'Margen Neto'),
+            ('roa', 'ROA'),
+            ('roe', 'ROE'),
+            ('rotacion_activos_totales', 'Rot. Activos'),
+            ('rotacion_cuentas_cobrar', 'Rot. CxC'),
+            ('rotacion_inventarios', 'Rot. Inventarios')
+        ],
+        'instrucciones': INSTRUCCIONES_FASE2,
+        'max_tokens': GROQ_MAX_TOKENS_FASE2
+    },
+    {
+        'id': 'conclusion',
+        'titulo': "🎯 PARTE 3: CONCLUSIÓN GENERAL Y RECOMENDACIONES",
+        'sistema': SISTEMA_FASE3,
+        'encabezado': "Genera una CONCLUSIÓN GENERAL integradora sobre {empresa}.",
+        'seccion_datos': "RESUMEN DE RATIOS CLAVE",
+        'ratios': [
+            ('liquidez_corriente', 'Liquidez'),
+            ('razon_deuda_total', 'Deuda'),
+            ('roe', 'ROE'),
+            ('rotacion_activos_totales', 'Rotación')
+        ],
+        'instrucciones': INSTRUCCIONES_FASE3,
+        'max_tokens': GROQ_MAX_TOKENS_FASE3
+    }
+]
+
+
+def estimar_tokens(texto: str) -> int:
+    """Estimación rápida de tokens de un texto (sin tokenizador)"""
+    return math.ceil(len(texto) / CARACTERES_POR_TOKEN)
+
+
+def formatear_valor_ratio(clave: str, valor: Any) -> str:
+    """
+    Formatea un ratio de forma compacta para el prompt
+
+    Args:
+        clave: Clave del ratio (define si se muestra en %)
+        valor: Valor del ratio (fracción para rentabilidades, veces para el resto)
+
+    Returns:
+        '1.23', '12.3%' o 'N/A'
+    """
+    if valor is None:
+        return TEXTO_NO_DISPONIBLE
+    try:
+        numero = float(valor)
+    except (TypeError, ValueError):
+        return TEXTO_NO_DISPONIBLE
+    if math.isnan(numero) or math.isinf(numero):
+        return TEXTO_NO_DISPONIBLE
+    if clave in RATIOS_PORCENTAJE:
+        return f"{numero * 100:.1f}%"
+    return f"{numero:.2f}"
+
+
+def formatear_años(años: Sequence[int]) -> str:
+    """'2019-2024' si los años son consecutivos; si no, la lista separada por comas"""
+    if not años:
+        return ""
+    if len(años) > 2 and list(años) == list(range(años[0], años[-1] + 1)):
+        return f"{años[0]}-{años[-1]}"
+    return ", ".join(map(str, años))
+
+
+def _promedio(valores: List[Any]) -> Optional[float]:
+    """Promedio de los valores numéricos válidos (None si no hay ninguno)"""
+    numeros = []
+    for valor in valores:
+        try:
+            numero = float(valor)
+        except (TypeError, ValueError):
+            continue
+        if not (math.isnan(numero) or math.isinf(numero)):
+            numeros.append(numero)
+    return sum(numeros) / len(numeros) if numeros else None
+
+
+def tabla_ratios(
+    ratios_por_año: Dict[int, Dict[str, Any]],
+    años_detalle: Sequence[int],
+    años_resumidos: Sequence[int],
+    ratios: Sequence[Tuple[str, str]]
+) -> str:
+    """
+    Tabla compacta de ratios: una fila por año y una fila de promedios para los años resumidos
+
+    Args:
+        ratios_por_año: {año: {clave_ratio: valor}}
+        años_detalle: Años con fila propia (orden ascendente)
+        años_resumidos: Años antiguos que se condensan en una fila de promedios
+        ratios: (clave, etiqueta) de las columnas
+
+    Returns:
+        Tabla en texto (filas separadas por salto de línea)
+    """
+    filas = ["Año | " + " | ".join(etiqueta for _, etiqueta in ratios)]
+    if años_resumidos:
+        promedios = [
+            formatear_valor_ratio(clave, _promedio([ratios_por_año[año].get(clave) for año in años_resumidos]))
+            for clave, _ in ratios
+        ]
+        filas.append(f"{formatear_años(años_resumidos)} (promedio) | " + " | ".join(promedios))
+    for año in años_detalle:
+        valores = [formatear_valor_ratio(clave, ratios_por_año[año].get(clave)) for clave, _ in ratios]
+        filas.append(f"{año} | " + " | ".join(valores))
+    return "\n".join(filas)
+
+
+def _armar_prompt(
+    definicion: Dict[str, Any],
+    empresa: str,
+    años: Sequence[int],
+    ratios_por_año: Dict[int, Dict[str, Any]],
+    años_detalle: Sequence[int],
+    años_resumidos: Sequence[int]
+) -> str:
+    """Compone el prompt de una fase"""
+    nota_resumen = ""
+    if años_resumidos:
+        nota_resumen = f"\n(Años {formatear_años(años_resumidos)} resumidos como promedio; detalle anual desde {años_detalle[0]})"
+    return (
+        definicion['encabezado'].format(empresa=empresa)
+        + f"\n\n**EMPRESA:** {empresa}\n**AÑOS:** {formatear_años(años)}\n\n"
+        + f"**{definicion['seccion_datos']}:**\n"
+        + tabla_ratios(ratios_por_año, años_detalle, años_resumidos, definicion['ratios'])
+        + nota_resumen
+        + "\n\n"
+        + definicion['instrucciones']
+    )
+
+
+def construir_fases_ia(
+    resultados_ratios: Dict[str, Any],
+    empresa: str,
+    presupuesto_tokens: int = IA_PRESUPUESTO_PROMPT,
+    min_años_detalle: int = IA_MIN_AÑOS_DETALLE
+) -> List[Dict[str, Any]]:
+    """
+    Construye las 3 solicitudes del análisis (prompt, mensaje de sistema y parámetros)
+
+    Si el prompt de una fase supera el presupuesto, los años más antiguos pasan
+    uno a uno a la fila de promedios hasta respetarlo (sin bajar de
+    `min_años_detalle` años con detalle).
+
+    Args:
+        resultados_ratios: Diccionario con los ratios calculados
+        empresa: Nombre de la empresa
+        presupuesto_tokens: Tokens de entrada (sistema + prompt) permitidos por fase
+        min_años_detalle: Años recientes que siempre conservan su fila
+
+    Returns:
+        Lista de fases: {'id', 'titulo', 'sistema', 'prompt', 'max_tokens',
+        'tokens_estimados', 'años_resumidos'}
+    """
+    años = sorted(resultados_ratios['años'])
+    ratios_por_año = resultados_ratios['ratios_por_año']
+
+    fases = []
+    for definicion in FASES_IA:
+        años_detalle = list(años)
+        años_resumidos: List[int] = []
+        prompt = _armar_prompt(definicion, empresa, años, ratios_por_año, años_detalle, años_resumidos)
+        tokens = estimar_tokens(definicion['sistema']) + estimar_tokens(prompt)
+
+        while tokens > presupuesto_tokens and len(años_detalle) > max(1, min_años_detalle):
+            años_resumidos.append(años_detalle.pop(0))
+            prompt = _armar_prompt(definicion, empresa, años, ratios_por_año, años_detalle, años_resumidos)
+            tokens = estimar_tokens(definicion['sistema']) + estimar_tokens(prompt)
+
+        fases.append({
+            'id': definicion['id'],
+            'titulo': definicion['titulo'],
+            'sistema': definicion['sistema'],
+            'prompt': prompt,
+            'max_tokens': definicion['max_tokens'],
+            'tokens_estimados': tokens,
+            'años_resumidos': años_resumidos
+        })
+
+    return fases
@@ -21,19 +21,64 @@ Ratios implementados (10 total):
   * Rotación de Activos Totales: Ingresos de Actividades Ordinarias / Total Activos
   * Rotación de Cuentas por Cobrar: Ingresos Ordinarios / Promedio Cuentas por Cobrar
   * Rotación de Inventarios: Costo de Ventas / Promedio Inventarios
+
+Se calculan ratios para todas las columnas de cada archivo (año actual y comparativo);
+un año presente en dos archivos se concilia con RATIOS_CONCILIACION. Los promedios de
+CxC e Inventarios usan el saldo conciliado de cada año, que puede venir de otro archivo
+que el año anterior (ver motor_ratios.promedio_con_año_anterior).
 """
 
-import pandas as pd
 import plotly.graph_objects as go
 from typing import Dict, List, Any, Optional
 import re
+from exportador_excel import (
+    LibroExcelStreaming, formatos_columnas,
+    FORMATO_RATIO, FORMATO_RATIO_PORCENTAJE, FORMATO_RATIO_PRECISO
+)
+from motor_ratios import (
+    CONCILIACIONES, PanelPartidas, calcular_ratios, ratios_empresa, ratios_a_dataframe, resumen_por_empresa
+)
+
+# Importar configuración de API (con valores por defecto si falta algún parámetro)
+try:
+    import config_api
+except ImportError:
+    config_api = None
+
+# Año presente en varios archivos (el actual de uno y el comparativo del siguiente):
+# 'reciente' usa el archivo más nuevo (cifras reexpresadas), 'original' el primero que lo publicó
+RATIOS_CONCILIACION = getattr(config_api, 'RATIOS_CONCILIACION', 'reciente')
+
+
+# Columnas de la exportación a Excel: (clave del ratio, título, formato numérico)
+COLUMNAS_RATIOS_EXCEL = [
+    ('liquidez_corriente', 'Liquidez Corriente', FORMATO_RATIO),
+    ('prueba_acida', 'Prueba Ácida', FORMATO_RATIO),
+    ('razon_deuda_total', 'Razón Deuda Total', FORMATO_RATIO),
+    ('razon_deuda_patrimonio', 'Razón Deuda/Patrimonio', FORMATO_RATIO),
+    ('margen_neto', 'Margen Neto', FORMATO_RATIO_PORCENTAJE),
+    ('roa', 'ROA', FORMATO_RATIO_PORCENTAJE),
+    ('roe', 'ROE', FORMATO_RATIO_PORCENTAJE),
+    ('rotacion_activos_totales', 'Rotación Activos Totales', FORMATO_RATIO),
+    ('rotacion_cuentas_cobrar', 'Rotación CxC', FORMATO_RATIO),
+    ('rotacion_inventarios', 'Rotación Inventarios', FORMATO_RATIO)
+]
 
 
 class CalculadorRatiosFinancieros:
     """Clase para calcular ratios financieros desde el Estado de Situación Financiera"""
     
-    def __init__(self):
+    def __init__(self, conciliacion: str = RATIOS_CONCILIACION):
+        """
+        Args:
+            conciliacion: Valor que se usa si un año aparece en varios archivos:
+                          'reciente' (el archivo más nuevo, cifras reexpresadas) u 'original'
+        """
         self.ratios_calculados = {}
+        if conciliacion not in CONCILIACIONES:
+            print(f"⚠️ RATIOS_CONCILIACION desconocida ({conciliacion}); se usa 'reciente'")
+            conciliacion = 'reciente'
+        self.conciliacion = conciliacion
     
     def calcular_ratios_desde_extractor(
         self, 
@@ -67,79 +112,148 @@ class CalculadorRatiosFinancieros:
             'resumen': {}
         }
         
-        # Calcular ratios para cada año
-        for archivo in archivos_post_2010:
-            año = archivo['año_documento']
+        # ✨ Partidas de TODAS las columnas de cada archivo → panel de la empresa → motor vectorizado
+        # (cada archivo trae el año actual y el anterior: la historia se duplica con los mismos archivos)
+        empresa = resultados['empresa']
+        registros = self._registros_empresa(empresa, archivos_post_2010)
+        
+        if registros:
+            panel = PanelPartidas.desde_registros(registros, self.conciliacion)
+            resultados['ratios_por_año'] = ratios_empresa(panel, calcular_ratios(panel), empresa)
+            resultados['años'] = list(resultados['ratios_por_año'])
+            resultados['conciliacion'] = self.conciliacion
+        
+        # Generar resumen
+        if resultados['ratios_por_año']:
+            resultados['resumen'] = self._generar_resumen(resultados['ratios_por_año'])
+        
+        return resultados
+    
+    def construir_panel(self, resultados_por_empresa: Dict[str, List[Dict]], detalle: bool = False) -> PanelPartidas:
+        """
+        Clasifica las partidas de varias empresas en un solo panel para el motor vectorizado
+        
+        Args:
+            resultados_por_empresa: Dict {empresa: lista de resultados del extractor}
+            detalle: Imprimir el detalle de los saldos promediados
+        
+        Returns:
+            PanelPartidas (empresas × años de todas las columnas de los archivos POST-2010)
+        """
+        registros = []
+        for empresa, resultados_extractor_list in resultados_por_empresa.items():
+            archivos = [r for r in resultados_extractor_list if r.get('año_documento', 0) >= 2010]
+            registros.extend(self._registros_empresa(empresa, archivos, detalle))
+        return PanelPartidas.desde_registros(registros, self.conciliacion)
+    
+    def calcular_ratios_panel(self, resultados_por_empresa: Dict[str, List[Dict]]) -> Dict[str, Any]:
+        """
+        Ratios de muchas empresas a la vez (p. ej. para filtrar emisores)
+        
+        Args:
+            resultados_por_empresa: Dict {empresa: lista de resultados del extractor}
+        
+        Returns:
+            Dict con 'ratios' (DataFrame empresa × año) y 'resumen' (DataFrame por empresa)
+        """
+        panel = self.construir_panel(resultados_por_empresa)
+        ratios = calcular_ratios(panel)
+        return {
+            'ratios': ratios_a_dataframe(panel, ratios),
+            'resumen': resumen_por_empresa(panel, ratios)
+        }
+    
+    def _registros_empresa(self, empresa: str, archivos: List[Dict], detalle: bool = True) -> List[Dict[str, Any]]:
+        """
+        Un registro de partidas por cada columna (año) de cada archivo con balance
+        
+        Args:
+            empresa: Empresa de los archivos
+            archivos: Resultados del extractor de la empresa
+            detalle: Imprimir el detalle de los saldos promediados
+        
+        Returns:
+            Lista de {'empresa', 'año', 'año_documento', partida: valor}; los años repetidos
+            entre archivos los concilia PanelPartidas.desde_registros
+        """
+        registros = []
+        for archivo in archivos:
+            estados = archivo.get('estados', {})
             
             # Verificar que tenga estado de situación financiera
-            if 'balance' not in archivo.get('estados', {}):
+            if 'balance' not in estados:
                 continue
             
-            balance = archivo['estados']['balance']
+            balance = estados['balance']
             
             # Obtener estado de resultados si existe (necesario para ratios de rentabilidad)
-            resultados_estado = archivo['estados'].get('resultados', None)
-            
-            # Calcular ratios para este año
-            ratios_año = self._calcular_ratios_año(balance, resultados_estado, año)
+            resultados_estado = estados.get('resultados', None)
             
-            if ratios_año:
-                resultados['ratios_por_año'][año] = ratios_año
-                resultados['años'].append(año)
-        
-        # Generar resumen
-        if resultados['ratios_por_año']:
-            resultados['resumen'] = self._generar_resumen(resultados['ratios_por_año'])
-        
-        return resultados
+            año_documento = archivo['año_documento']
+            for año in balance['años'] or [año_documento]:
+                partidas = self._partidas_año(balance, resultados_estado, año, detalle)
+                registros.append({'empresa': empresa, 'año': año, 'año_documento': año_documento, **partidas})
+        return registros
     
-    def _calcular_ratios_año(self, balance: Dict, resultados_estado: Optional[Dict], año: int) -> Optional[Dict[str, float]]:
+    def _partidas_año(self, balance: Dict, resultados_estado: Optional[Dict], año: int,
+                      detalle: bool = True) -> Dict[str, Optional[float]]:
         """
-        Calcula todos los ratios para un año específico
+        Extrae las partidas que alimentan los ratios de una columna (año) de un archivo
         
         Args:
             balance: Dict con el estado de situación financiera
             resultados_estado: Dict con el estado de resultados (opcional)
-            año: Año del análisis
+            año: Año de la columna
+            detalle: Imprimir el detalle de los saldos promediados
         
         Returns:
-            Dict con ratios calculados o None si faltan datos
+            Dict {partida: valor} con las partidas de motor_ratios.PARTIDAS
+            (balance y saldos: 0 si no se encontraron; resultados: None)
         """
         cuentas = balance['cuentas']
-        años_disponibles = balance['años']
-        
-        # Usar el año más reciente disponible
-        año_analisis = años_disponibles[0] if años_disponibles else año
         
         # Buscar valores necesarios del balance
-        valores = self._extraer_valores_balance(cuentas, año_analisis)
+        partidas = dict(self._extraer_valores_balance(cuentas, año))
         
         # Buscar valores necesarios del estado de resultados
-        valores_resultados = {}
+        partidas.update({'ganancia_neta': None, 'ingresos_ordinarios': None, 'costo_ventas': None})
         if resultados_estado:
-            valores_resultados = self._extraer_valores_resultados(
-                resultados_estado['cuentas'], 
-                año_analisis
-            )
+            partidas.update(self._extraer_valores_resultados(resultados_estado['cuentas'], año))
         
+        # Saldos que el motor promedia con los del año anterior (ratios de actividad)
+        partidas.update(self._extraer_saldos_promedio(cuentas, año, detalle and bool(partidas['ingresos_ordinarios'])))
+        
+        return partidas
+    
+    def _ratios_desde_partidas(self, partidas: Dict[str, Optional[float]]) -> Optional[Dict[str, float]]:
+        """
+        Reglas escalares de los ratios de un año (referencia del motor vectorizado)
+        
+        Args:
+            partidas: Dict {partida: valor} como el de _partidas_año, con los promedios ya
+                      calculados en 'promedio_cuentas_cobrar' y 'promedio_inventarios'
+        
+        Returns:
+            Dict con ratios calculados o None si faltan datos
+        """
         # Verificar que tengamos los valores mínimos necesarios
-        if not valores.get('total_activos') or not valores.get('total_pasivos'):
+        if not partidas.get('total_activos') or not partidas.get('total_pasivos'):
             return None
         
         ratios = {}
         
         # RATIOS DE LIQUIDEZ
-        if valores.get('activos_corrientes') and valores.get('pasivos_corrientes'):
-            if valores['pasivos_corrientes'] != 0:
-                ratios['liquidez_corriente'] = valores['activos_corrientes'] / valores['pasivos_corrientes']
+        if partidas.get('activos_corrientes') and partidas.get('pasivos_corrientes'):
+            if partidas['pasivos_corrientes'] != 0:
+                ratios['liquidez_corriente'] = partidas['activos_corrientes'] / partidas['pasivos_corrientes']
             else:
                 ratios['liquidez_corriente'] = None
             
             # Prueba Ácida
-            if valores.get('inventarios') is not None:
-                activos_sin_inventarios = valores['activos_corrientes'] - valores['inventarios']
-                if valores['pasivos_corrientes'] != 0:
-                    ratios['prueba_acida'] = activos_sin_inventarios / valores['pasivos_corrientes']
+            if partidas.get('inventarios') is not None:
+                activos_sin_inventarios = partidas['activos_corrientes'] - partidas['inventarios']
+                if partidas['pasivos_corrientes'] != 0:
+                    ratios['prueba_acida'] = activos_sin_inventarios / partidas['pasivos_corrientes']
                 else:
                     ratios['prueba_acida'] = None
             else:
@@ -149,35 +263,35 @@ class CalculadorRatiosFinancieros:
             ratios['prueba_acida'] = None
         
         # RATIOS DE ENDEUDAMIENTO
-        if valores['total_activos'] != 0:
-            ratios['razon_deuda_total'] = valores['total_pasivos'] / valores['total_activos']
+        if partidas['total_activos'] != 0:
+            ratios['razon_deuda_total'] = partidas['total_pasivos'] / partidas['total_activos']
         else:
             ratios['razon_deuda_total'] = None
         
-        if valores.get('total_patrimonio') and valores['total_patrimonio'] != 0:
-            ratios['razon_deuda_patrimonio'] = valores['total_pasivos'] / valores['total_patrimonio']
+        if partidas.get('total_patrimonio') and partidas['total_patrimonio'] != 0:
+            ratios['razon_deuda_patrimonio'] = partidas['total_pasivos'] / partidas['total_patrimonio']
         else:
             ratios['razon_deuda_patrimonio'] = None
         
         # ✨ NUEVOS: RATIOS DE RENTABILIDAD
-        if valores_resultados.get('ganancia_neta') is not None:
-            ganancia_neta = valores_resultados['ganancia_neta']
+        if partidas.get('ganancia_neta') is not None:
+            ganancia_neta = partidas['ganancia_neta']
             
             # Margen Neto
-            if valores_resultados.get('ingresos_ordinarios') and valores_resultados['ingresos_ordinarios'] != 0:
-                ratios['margen_neto'] = ganancia_neta / valores_resultados['ingresos_ordinarios']
+            if partidas.get('ingresos_ordinarios') and partidas['ingresos_ordinarios'] != 0:
+                ratios['margen_neto'] = ganancia_neta / partidas['ingresos_ordinarios']
             else:
                 ratios['margen_neto'] = None
             
             # ROA (Return on Assets)
-            if valores['total_activos'] != 0:
-                ratios['roa'] = ganancia_neta / valores['total_activos']
+            if partidas['total_activos'] != 0:
+                ratios['roa'] = ganancia_neta / partidas['total_activos']
             else:
                 ratios['roa'] = None
             
             # ROE (Return on Equity)
-            if valores.get('total_patrimonio') and valores['total_patrimonio'] != 0:
-                ratios['roe'] = ganancia_neta / valores['total_patrimonio']
+            if partidas.get('total_patrimonio') and partidas['total_patrimonio'] != 0:
+                ratios['roe'] = ganancia_neta / partidas['total_patrimonio']
             else:
                 ratios['roe'] = None
         else:
@@ -187,27 +301,26 @@ class CalculadorRatiosFinancieros:
         
         # ✨ NUEVOS: RATIOS DE ACTIVIDAD
         # Necesitamos tanto el balance como el estado de resultados para estos ratios
-        if valores_resultados.get('ingresos_ordinarios'):
-            ingresos_ordinarios = valores_resultados['ingresos_ordinarios']
+        if partidas.get('ingresos_ordinarios'):
+            ingresos_ordinarios = partidas['ingresos_ordinarios']
             
             # 1. Rotación de Activos Totales = Ingresos Ordinarios / Total Activos
-            if valores['total_activos'] != 0:
-                ratios['rotacion_activos_totales'] = ingresos_ordinarios / valores['total_activos']
+            if partidas['total_activos'] != 0:
+                ratios['rotacion_activos_totales'] = ingresos_ordinarios / partidas['total_activos']
             else:
                 ratios['rotacion_activos_totales'] = None
             
             # 2. Rotación de Cuentas por Cobrar = Ingresos Ordinarios / Promedio CxC
-            valores_multianio = self._extraer_valores_multianio(cuentas, año_analisis, años_disponibles)
-            if valores_multianio.get('promedio_cuentas_cobrar') and valores_multianio['promedio_cuentas_cobrar'] != 0:
-                ratios['rotacion_cuentas_cobrar'] = ingresos_ordinarios / valores_multianio['promedio_cuentas_cobrar']
+            if partidas.get('promedio_cuentas_cobrar') and partidas['promedio_cuentas_cobrar'] != 0:
+                ratios['rotacion_cuentas_cobrar'] = ingresos_ordinarios / partidas['promedio_cuentas_cobrar']
             else:
                 ratios['rotacion_cuentas_cobrar'] = None
             
             # 3. Rotación de Inventarios = Costo de Ventas / Promedio Inventarios
-            if (valores_resultados.get('costo_ventas') and 
-                valores_multianio.get('promedio_inventarios') and 
-                valores_multianio['promedio_inventarios'] != 0):
-                ratios['rotacion_inventarios'] = valores_resultados['costo_ventas'] / valores_multianio['promedio_inventarios']
+            if (partidas.get('costo_ventas') and 
+                partidas.get('promedio_inventarios') and 
+                partidas['promedio_inventarios'] != 0):
+                ratios['rotacion_inventarios'] = partidas['costo_ventas'] / partidas['promedio_inventarios']
             else:
                 ratios['rotacion_inventarios'] = None
         else:
@@ -282,147 +395,60 @@ class CalculadorRatiosFinancieros:
         
         return valores
     
-    def _extraer_valores_multianio(self, cuentas: List[Dict], año_actual: int, años_disponibles: List[int]) -> Dict[str, float]:
+    def _extraer_saldos_promedio(self, cuentas: List[Dict], año: int, detalle: bool = True) -> Dict[str, float]:
         """
-        Extrae valores de múltiples años para calcular promedios (Cuentas por Cobrar e Inventarios)
-        FÓRMULA CORREGIDA: K + F + K' + F' / 2
-        Donde K y F son las DOS PARTES de "Cuentas por Cobrar Comerciales y Otras Cuentas por Cobrar"
+        Extrae los saldos de un año que se promedian con el año anterior (Cuentas por Cobrar e Inventarios)
+        FÓRMULA CORREGIDA: Promedio CxC = (K + F + K' + F') / 2
+        Donde K y F son las DOS PARTES de "Cuentas por Cobrar Comerciales y Otras Cuentas por Cobrar";
+        aquí se obtiene K + F de un año y el motor de ratios lo suma con el del año anterior
         
         Args:
             cuentas: Lista de cuentas del balance
-            año_actual: Año actual a analizar
-            años_disponibles: Lista de años disponibles en los datos
+            año: Año (columna) a extraer
+            detalle: Imprimir el detalle de las partes encontradas
         
         Returns:
-            Dict con promedios calculados según fórmula (K + F + K' + F') / 2
+            Dict con 'cuentas_cobrar' (K + F) e 'inventarios_total' (suma de subdivisiones)
         """
-        valores = {
-            'promedio_cuentas_cobrar': None,
-            'promedio_inventarios': None
-        }
-        
-        # Buscar el año anterior
-        año_anterior = None
-        for año in sorted(años_disponibles, reverse=True):
-            if año < año_actual:
-                año_anterior = año
-                break
-        
-        if año_anterior is None:
-            return valores  # No hay año anterior, no se pueden calcular promedios
-        
-        # ✨ NUEVO: Variables para implementar fórmula K + F + K' + F' / 2
-        K_actual = 0    # Primera parte año actual
-        F_actual = 0    # Segunda parte año actual  
-        K_anterior = 0  # Primera parte año anterior
-        F_anterior = 0  # Segunda parte año anterior
-        
-        inv_actual_total = 0
-        inv_anterior_total = 0
-        
-        # Contadores para debug
+        log = print if detalle else (lambda *args, **kwargs: None)
         partes_cxc_encontradas = []
-        inv_subdivisiones_encontradas = 0
+        inventarios_total = 0
         
-        # ✨ DETECCIÓN EXACTA: Buscar las DOS apariciones de "Cuentas por Cobrar" en orden de aparición
+        # ✨ DETECCIÓN EXACTA: Buscar las apariciones de "Cuentas por Cobrar" en orden de aparición
         for cuenta in cuentas:
             nombre_upper = cuenta['nombre'].upper()
             # Obtener valores, probando tanto con int como con str 
-            valor_actual = cuenta['valores'].get(año_actual) or cuenta['valores'].get(str(año_actual)) or 0
-            valor_anterior = cuenta['valores'].get(año_anterior) or cuenta['valores'].get(str(año_anterior)) or 0
+            valor = cuenta['valores'].get(año) or cuenta['valores'].get(str(año)) or 0
             
-            # Detectar si es una aparición de "Cuentas por Cobrar Comerciales y Otras Cuentas por Cobrar"
             if self._es_cuentas_por_cobrar(nombre_upper):
-                # Convertir valores a números absolutos
-                val_actual = abs(float(valor_actual)) if valor_actual else 0
-                val_anterior = abs(float(valor_anterior)) if valor_anterior else 0
-                
-                # Guardar esta aparición con su orden
                 partes_cxc_encontradas.append({
                     'nombre': cuenta['nombre'],
-                    'valor_actual': val_actual,
-                    'valor_anterior': val_anterior
+                    'valor': abs(float(valor)) if valor else 0
                 })
-                
-                print(f"📋 Parte CxC #{len(partes_cxc_encontradas)}: {cuenta['nombre']}")
-                print(f"    {año_actual}: {val_actual:,.0f} | {año_anterior}: {val_anterior:,.0f}")
             
-            # Inventarios (mantener lógica existente)
+            # Inventarios: todas las subdivisiones
             elif self._es_inventarios(nombre_upper):
-                inv_actual_total += abs(valor_actual)
-                inv_anterior_total += abs(valor_anterior)
-                inv_subdivisiones_encontradas += 1
-                
-                if valor_actual > 0 or valor_anterior > 0:
-                    print(f"   � Inventarios Subdivisión {inv_subdivisiones_encontradas}: {cuenta['nombre']}")
-                    print(f"      {año_actual}: {valor_actual:,.0f} | {año_anterior}: {valor_anterior:,.0f}")
-        
-        # ✨ CORRECCIÓN: K = Primera aparición, F = Última aparición de "Cuentas por Cobrar Comerciales y Otras Cuentas por Cobrar"
-        # Filtrar solo las apariciones completas (que contienen "Y OTRAS")
-        partes_completas = [p for p in partes_cxc_encontradas if "Y OTRAS" in p['nombre'].upper()]
+                inventarios_total += abs(valor)
         
+        # ✨ CORRECCIÓN: K = Primera aparición, F = Última aparición completa (que contiene "Y OTRAS");
+        # con una sola aparición completa F = 0; sin apariciones completas, primera y segunda aparición general
+        partes_completas = [p for p in partes_cxc_encontradas if "Y OTRAS" in p['nombre'].upper()]
         if len(partes_completas) >= 2:
-            # K = Primera aparición completa, F = Última aparición completa
-            K_actual = partes_completas[0]['valor_actual']
-            K_anterior = partes_completas[0]['valor_anterior']
-            
-            # F = Última aparición completa (no segunda)
-            F_actual = partes_completas[-1]['valor_actual']
-            F_anterior = partes_completas[-1]['valor_anterior']
-            
-            print(f"📋 Parte K (Primera completa): {partes_completas[0]['nombre']}")
-            print(f"    {año_actual}: {K_actual:,.0f} | {año_anterior}: {K_anterior:,.0f}")
-            print(f"📋 Parte F (Última completa): {partes_completas[-1]['nombre']}")
-            print(f"    {año_actual}: {F_actual:,.0f} | {año_anterior}: {F_anterior:,.0f}")
-            
+            partes = [partes_completas[0], partes_completas[-1]]
         elif len(partes_completas) == 1:
-            # Solo una aparición completa - usar como K, F = 0
-            K_actual = partes_completas[0]['valor_actual']
-            K_anterior = partes_completas[0]['valor_anterior']
-            F_actual = 0
-            F_anterior = 0
-            
-            print(f"⚠️ Solo 1 aparición completa CxC: {partes_completas[0]['nombre']}")
-            print(f"    K: {K_actual:,.0f} | K': {K_anterior:,.0f}, F = F' = 0")
-            
-        elif len(partes_cxc_encontradas) >= 2:
-            # Fallback: usar primera y segunda aparición general
-            K_actual = partes_cxc_encontradas[0]['valor_actual']
-            K_anterior = partes_cxc_encontradas[0]['valor_anterior']
-            F_actual = partes_cxc_encontradas[1]['valor_actual']
-            F_anterior = partes_cxc_encontradas[1]['valor_anterior']
-            
-            print(f"📋 Fallback K (Primera general): {partes_cxc_encontradas[0]['nombre']}")
-            print(f"    {año_actual}: {K_actual:,.0f} | {año_anterior}: {K_anterior:,.0f}")
-            print(f"📋 Fallback F (Segunda general): {partes_cxc_encontradas[1]['nombre']}")
-            print(f"    {año_actual}: {F_actual:,.0f} | {año_anterior}: {F_anterior:,.0f}")
-            
-        elif len(partes_cxc_encontradas) == 1:
-            # Solo una aparición encontrada - usar como K, F = 0
-            K_actual = partes_cxc_encontradas[0]['valor_actual']
-            K_anterior = partes_cxc_encontradas[0]['valor_anterior']
-            F_actual = 0
-            F_anterior = 0
-            
-            print(f"   � Solo Parte K encontrada: {partes_cxc_encontradas[0]['nombre']}")
-            print(f"      {año_actual}: {K_actual:,.0f} | {año_anterior}: {K_anterior:,.0f}")
-        
-        # ✨ NUEVO: Aplicar fórmula correcta (K + F + K' + F') / 2
-        if K_actual > 0 or F_actual > 0 or K_anterior > 0 or F_anterior > 0:
-            suma_total = K_actual + F_actual + K_anterior + F_anterior
-            valores['promedio_cuentas_cobrar'] = suma_total / 2
-            
-            print(f"   ✅ FÓRMULA: (K + F + K' + F') / 2")
-            print(f"   ✅ CÁLCULO: ({K_actual:,.0f} + {F_actual:,.0f} + {K_anterior:,.0f} + {F_anterior:,.0f}) / 2")
-            print(f"   ✅ RESULTADO: {suma_total:,.0f} / 2 = {valores['promedio_cuentas_cobrar']:,.0f}")
+            partes = partes_completas
+        else:
+            partes = partes_cxc_encontradas[:2]
         
-        # Inventarios (mantener cálculo existente)
-        if inv_actual_total > 0 or inv_anterior_total > 0:
-            valores['promedio_inventarios'] = (inv_actual_total + inv_anterior_total) / 2
-            print(f"   ✅ Inventarios Total: {año_actual}={inv_actual_total:,.0f}, {año_anterior}={inv_anterior_total:,.0f}")
-            print(f"   ✅ Inventarios Promedio: {valores['promedio_inventarios']:,.0f}")
+        for etiqueta, parte in zip(('K', 'F'), partes):
+            log(f"📋 Parte {etiqueta} {año}: {parte['nombre']} = {parte['valor']:,.0f}")
+        if inventarios_total:
+            log(f"   ✅ Inventarios Total {año}: {inventarios_total:,.0f}")
         
-        return valores
+        return {
+            'cuentas_cobrar': sum(parte['valor'] for parte in partes),
+            'inventarios_total': inventarios_total
+        }
     
     def _es_cuentas_por_cobrar(self, nombre: str) -> bool:
         """Detecta si es Cuentas por Cobrar"""
@@ -974,57 +1000,61 @@ class CalculadorRatiosFinancieros:
         
         return figuras
     
-    def exportar_ratios_excel(self, resultados: Dict[str, Any], archivo_salida: str):
+    def exportar_ratios_excel(self, resultados: Dict[str, Any], archivo_salida: Optional[str] = None) -> Optional[bytes]:
         """
-        Exporta ratios financieros a Excel
+        Exporta ratios financieros a Excel (en memoria, con formatos numéricos nativos)
         
         Args:
             resultados: Dict con ratios calculados
-            archivo_salida: Nombre del archivo Excel de salida
+            archivo_salida: Nombre del archivo Excel de salida (opcional)
+        
+        Returns:
+            Contenido del libro en bytes (para st.download_button) o None si no hay ratios
         """
         if not resultados.get('ratios_por_año'):
             print("⚠️ No hay ratios para exportar")
-            return
+            return None
+        
+        libro = LibroExcelStreaming()
+        self.escribir_hojas_ratios(libro, resultados)
+        contenido = libro.finalizar(archivo_salida)
         
-        # Crear DataFrame
+        if archivo_salida:
+            print(f"✅ Ratios financieros exportados a: {archivo_salida}")
+        return contenido
+    
+    def escribir_hojas_ratios(self, libro: LibroExcelStreaming, resultados: Dict[str, Any], prefijo: str = ''):
+        """
+        Escribe las hojas de ratios y resumen en un libro en streaming
+        
+        Args:
+            libro: Libro destino
+            resultados: Dict con ratios calculados
+            prefijo: Texto antepuesto al nombre de cada hoja
+        """
         años = sorted(resultados['años'])
         ratios_por_año = resultados['ratios_por_año']
         
-        data = {
-            'Año': años,
-            'Liquidez Corriente': [ratios_por_año[año].get('liquidez_corriente') for año in años],
-            'Prueba Ácida': [ratios_por_año[año].get('prueba_acida') for año in años],
-            'Razón Deuda Total': [ratios_por_año[año].get('razon_deuda_total') for año in años],
-            'Razón Deuda/Patrimonio': [ratios_por_año[año].get('razon_deuda_patrimonio') for año in años],
-            'Margen Neto': [ratios_por_año[año].get('margen_neto') for año in años],
-            'ROA': [ratios_por_año[año].get('roa') for año in años],
-            'ROE': [ratios_por_año[año].get('roe') for año in años],
-            'Rotación Activos Totales': [ratios_por_año[año].get('rotacion_activos_totales') for año in años],
-            'Rotación CxC': [ratios_por_año[año].get('rotacion_cuentas_cobrar') for año in años],
-            'Rotación Inventarios': [ratios_por_año[año].get('rotacion_inventarios') for año in años]
-        }
-        
-        df = pd.DataFrame(data)
+        columnas = ['Año'] + [titulo for _, titulo, _ in COLUMNAS_RATIOS_EXCEL]
+        formatos = {titulo: formato for _, titulo, formato in COLUMNAS_RATIOS_EXCEL}
+        filas = (
+            [año] + [ratios_por_año[año].get(clave) for clave, _, _ in COLUMNAS_RATIOS_EXCEL]
+            for año in años
+        )
+        libro.agregar_hoja(f'{prefijo}Ratios Financieros', columnas, filas, formatos)
         
-        # Exportar a Excel
-        with pd.ExcelWriter(archivo_salida, engine='openpyxl') as writer:
-            df.to_excel(writer, sheet_name='Ratios Financieros', index=False)
-            
-            # Agregar hoja de resumen
-            if resultados.get('resumen'):
-                resumen_data = []
-                for ratio_nombre, stats in resultados['resumen'].items():
-                    resumen_data.append({
-                        'Ratio': ratio_nombre.replace('_', ' ').title(),
-                        'Mínimo': stats.get('min'),
-                        'Máximo': stats.get('max'),
-                        'Promedio': stats.get('promedio')
-                    })
-                
-                df_resumen = pd.DataFrame(resumen_data)
-                df_resumen.to_excel(writer, sheet_name='Resumen', index=False)
-        
-        print(f"✅ Ratios financieros exportados a: {archivo_salida}")
+        # Agregar hoja de resumen (mezcla ratios en veces y fracciones: 4 decimales)
+        if resultados.get('resumen'):
+            filas_resumen = (
+                [ratio_nombre.replace('_', ' ').title(), stats.get('min'), stats.get('max'), stats.get('promedio')]
+                for ratio_nombre, stats in resultados['resumen'].items()
+            )
+            libro.agregar_hoja(
+                f'{prefijo}Resumen',
+                ['Ratio', 'Mínimo', 'Máximo', 'Promedio'],
+                filas_resumen,
+                formatos_columnas(['Mínimo', 'Máximo', 'Promedio'], FORMATO_RATIO_PRECISO)
+            )
 
 
 # Función de prueba
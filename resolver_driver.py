@@ -0,0 +1,260 @@
+"""
+Resolución de ChromeDriver sin red (caché por versión de Chrome)
+================================================================
+Decide qué ChromeDriver usar al iniciar un navegador sin llamar a
+`ChromeDriverManager().install()` en cada arranque (descubrimiento de versiones y
+posibles consultas por red cada vez).
+
+Características:
+- Ruta resuelta fijada por versión mayor de Chrome en un JSON local
+- Orden: ruta indicada → caché → carpeta drivers/ incluida → webdriver-manager (solo
+  la primera vez para una versión nueva de Chrome; el resultado queda en caché)
+- Un driver incluido con otra versión mayor se usa solo como último recurso
+- Memoria en el proceso: los arranques siguientes no repiten ninguna comprobación,
+  tampoco cuando no se encontró driver (resultado negativo recordado DRIVER_TTL_NEGATIVO_S)
+- webdriver-manager se intenta como mucho una vez por proceso y nunca al reintentar un
+  arranque fallido (olvidar()): si falla, se delega en Selenium Manager
+- Resolución anticipada en segundo plano y tiempos medidos por fuente
+"""
+
+import json
+import os
+import re
+import subprocess
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+# Importar configuración de API (con valores por defecto si falta algún parámetro)
+try:
+    import config_api
+except ImportError:
+    config_api = None
+
+DRIVER_CACHE_ARCHIVO = getattr(
+    config_api, 'DRIVER_CACHE_ARCHIVO',
+    os.path.join(tempfile.gettempdir(), "analizador_financiero_chromedriver.json")
+)
+DRIVER_PERMITIR_DESCARGA = getattr(config_api, 'DRIVER_PERMITIR_DESCARGA', True)  # Usar webdriver-manager si no hay driver local
+DRIVER_TTL_NEGATIVO_S = getattr(config_api, 'DRIVER_TTL_NEGATIVO_S', 600)         # Cuánto se recuerda que no hay driver
+
+CARPETA_DRIVERS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "drivers")
+NOMBRES_DRIVER = ("chromedriver.exe", "chromedriver")
+TIMEOUT_VERSION = 5             # Segundos máximos para preguntar la versión a un ejecutable
+
+
+def version_mayor(texto: Optional[str]) -> Optional[str]:
+    """Versión mayor de un texto de versión ("Google Chrome 120.0.6099.109" → "120")"""
+    coincidencia = re.search(r'(\d+)\.\d+', texto or '')
+    return coincidencia.group(1) if coincidencia else None
+
+
+def version_chrome() -> Optional[str]:
+    """Versión del Chrome instalado (consulta local: registro de Windows o `--version`)"""
+    try:
+        from webdriver_manager.core.os_manager import ChromeType, OperationSystemManager
+        return OperationSystemManager().get_browser_version_from_os(ChromeType.GOOGLE)
+    except Exception:
+        return None
+
+
+def version_driver(ruta: str) -> Optional[str]:
+    """Versión de un ChromeDriver ("ChromeDriver 120.0.6099.109 (...)" → "120.0.6099.109")"""
+    try:
+        salida = subprocess.run(
+            [ruta, "--version"], capture_output=True, text=True, timeout=TIMEOUT_VERSION
+        ).stdout
+    except (OSError, subprocess.SubprocessError):
+        return None
+    coincidencia = re.search(r'(\d+(?:\.\d+)+)', salida)
+    return coincidencia.group(1) if coincidencia else None
+
+
+def drivers_incluidos(carpeta: str = CARPETA_DRIVERS) -> List[str]:
+    """Ejecutables de ChromeDriver dentro de la carpeta drivers/ (incluidas subcarpetas)"""
+    encontrados = []
+    for raiz, _, nombres in os.walk(carpeta):
+        for nombre in nombres:
+            if nombre in NOMBRES_DRIVER:
+                encontrados.append(os.path.join(raiz, nombre))
+    # En Windows solo sirve el .exe; en Linux/Mac solo el binario sin extensión
+    extension = ".exe" if os.name == 'nt' else ""
+    return sorted(r for r in encontrados if os.path.splitext(r)[1] == extension)
+
+
+class ResolvedorDriver:
+    """Resuelve y recuerda la ruta de ChromeDriver para la versión de Chrome instalada"""
+
+    def __init__(
+        self,
+        archivo: str = DRIVER_CACHE_ARCHIVO,
+        carpeta_drivers: str = CARPETA_DRIVERS,
+        permitir_descarga: bool = DRIVER_PERMITIR_DESCARGA
+    ):
+        """
+        Configura el resolvedor (no consulta nada hasta que se pida un driver)
+
+        Args:
+            archivo: JSON donde se fija la ruta por versión de Chrome
+            carpeta_drivers: Carpeta con drivers incluidos en el proyecto
+            permitir_descarga: Recurrir a webdriver-manager (red) si no hay driver local válido
+        """
+        self.archivo = archivo
+        self.carpeta_drivers = carpeta_drivers
+        self.permitir_descarga = permitir_descarga
+        self._lock = threading.Lock()
+        self._resuelto: Optional[Dict[str, Any]] = None
+        self._negativo_hasta = 0.0          # ✨ Hasta cuándo se recuerda que no hay driver (monotonic)
+        self._descarga_agotada = False      # ✨ webdriver-manager ya falló o estamos reintentando: no se vuelve a llamar
+        self.estadisticas = {'resoluciones': 0, 'en_memoria': 0, 'segundos': 0.0, 'ultima_fuente': None}
+
+    # ===== PERSISTENCIA =====
+
+    def _cargar(self) -> Dict[str, Any]:
+        try:
+            with open(self.archivo, 'r', encoding='utf-8') as f:
+                return json.load(f).get('versiones', {})
+        except (OSError, ValueError):
+            return {}
+
+    def _guardar(self, versiones: Dict[str, Any]):
+        try:
+            temporal = f"{self.archivo}.tmp"
+            with open(temporal, 'w', encoding='utf-8') as f:
+                json.dump({'version': 1, 'versiones': versiones}, f, ensure_ascii=False, indent=1)
+            os.replace(temporal, self.archivo)
+        except OSError as e:
+            print(f"⚠️ No se pudo guardar la caché del ChromeDriver: {str(e)}")
+
+    def _fijar(self, mayor: str, entrada: Dict[str, Any]):
+        versiones = self._cargar()
+        versiones[mayor] = entrada
+        self._guardar(versiones)
+
+    # ===== RESOLUCIÓN =====
+
+    def resolver(self, driver_path: str = None) -> Optional[str]:
+        """
+        Ruta del ChromeDriver a usar
+
+        Args:
+            driver_path: Ruta indicada por el usuario (tiene prioridad si existe)
+
+        Returns:
+            Ruta del ejecutable, o None si no hay ninguno (Selenium Manager decidirá)
+        """
+        if driver_path and os.path.isfile(driver_path):
+            return driver_path
+
+        with self._lock:
+            if self._resuelto and os.path.isfile(self._resuelto['ruta']):
+                self.estadisticas['en_memoria'] += 1
+                return self._resuelto['ruta']
+            if self._resuelto is None and time.monotonic() < self._negativo_hasta:
+                # Ya se buscó hace poco y no había driver: no se repite la búsqueda (ni la red)
+                self.estadisticas['en_memoria'] += 1
+                return None
+
+            inicio = time.perf_counter()
+            entrada = self._resolver()
+            segundos = time.perf_counter() - inicio
+            self.estadisticas['resoluciones'] += 1
+            self.estadisticas['segundos'] += segundos
+            self.estadisticas['ultima_fuente'] = entrada['fuente'] if entrada else None
+            self._resuelto = entrada
+            self._negativo_hasta = 0.0 if entrada else time.monotonic() + DRIVER_TTL_NEGATIVO_S
+
+        if entrada:
+            print(f"🧭 ChromeDriver {entrada.get('version_driver') or ''} ({entrada['fuente']}) resuelto en {segundos:.2f} s")
+            return entrada['ruta']
+        print("⚠️ No se encontró ChromeDriver local; se delega en Selenium Manager")
+        return None
+
+    def _resolver(self) -> Optional[Dict[str, Any]]:
+        version = version_chrome()
+        mayor = version_mayor(version) or "desconocida"
+
+        # 1. Ruta ya fijada para esta versión de Chrome
+        fijada = self._cargar().get(mayor)
+        if fijada and os.path.isfile(fijada['ruta']):
+            return {**fijada, 'fuente': 'caché'}
+
+        # 2. Driver incluido en drivers/ con la misma versión mayor
+        incluidos = [(ruta, version_driver(ruta)) for ruta in drivers_incluidos(self.carpeta_drivers)]
+        for ruta, version_incluida in incluidos:
+            if mayor == "desconocida" or version_mayor(version_incluida) == mayor:
+                entrada = {'ruta': ruta, 'version_driver': version_incluida, 'version_chrome': version, 'resuelto': time.time()}
+                self._fijar(mayor, {**entrada, 'origen': 'incluido'})
+                return {**entrada, 'fuente': 'incluido'}
+
+        # 3. webdriver-manager (consulta por red una sola vez por versión de Chrome y por proceso)
+        if self.permitir_descarga and not self._descarga_agotada:
+            try:
+                from webdriver_manager.chrome import ChromeDriverManager
+                ruta = ChromeDriverManager().install()
+                entrada = {'ruta': ruta, 'version_driver': version_driver(ruta), 'version_chrome': version, 'resuelto': time.time()}
+                self._fijar(mayor, {**entrada, 'origen': 'webdriver-manager'})
+                return {**entrada, 'fuente': 'webdriver-manager'}
+            except Exception as e:
+                self._descarga_agotada = True
+                print(f"⚠️ webdriver-manager no pudo resolver el driver: {str(e)}")
+
+        # 4. Último recurso: un driver incluido aunque sea de otra versión (no se fija)
+        if incluidos:
+            ruta, version_incluida = incluidos[0]
+            return {'ruta': ruta, 'version_driver': version_incluida, 'version_chrome': version, 'fuente': 'incluido (otra versión)'}
+        return None
+
+    def olvidar(self):
+        """
+        Descarta la ruta resuelta (p. ej. si Chrome no arrancó con ella: Chrome pudo actualizarse)
+
+        La siguiente resolución es un reintento: revisa caché y drivers/ pero no llama a
+        webdriver-manager. Un resultado negativo recordado se mantiene hasta que caduque.
+        """
+        with self._lock:
+            resuelto, self._resuelto = self._resuelto, None
+            self._descarga_agotada = True
+        if resuelto:
+            versiones = self._cargar()
+            fijadas = {mayor: e for mayor, e in versiones.items() if e['ruta'] != resuelto['ruta']}
+            if len(fijadas) != len(versiones):
+                self._guardar(fijadas)
+
+    def precalentar(self):
+        """Resuelve el driver en segundo plano para que el primer navegador no espere"""
+        threading.Thread(target=self.resolver, name="resolver_driver", daemon=True).start()
+
+
+_resolvedor: Optional[ResolvedorDriver] = None
+_lock_resolvedor = threading.Lock()
+
+
+def obtener_resolvedor_driver() -> ResolvedorDriver:
+    """Resolvedor compartido por todo el proceso"""
+    global _resolvedor
+    with _lock_resolvedor:
+        if _resolvedor is None:
+            _resolvedor = ResolvedorDriver()
+        return _resolvedor
+
+
+def resolver_chromedriver(driver_path: str = None) -> Optional[str]:
+    """Atajo: ruta del ChromeDriver a usar (ver ResolvedorDriver.resolver)"""
+    return obtener_resolvedor_driver().resolver(driver_path)
+
+
+if __name__ == "__main__":
+    print("=" * 70)
+    print("RESOLUCIÓN DE CHROMEDRIVER")
+    print("=" * 70)
+
+    print(f"🌐 Chrome instalado: {version_chrome() or 'no detectado'}")
+    print(f"📂 Drivers incluidos: {drivers_incluidos() or 'ninguno'}")
+    resolvedor = obtener_resolvedor_driver()
+    for intento in range(1, 3):
+        inicio = time.perf_counter()
+        ruta = resolvedor.resolver()
+        print(f"🔁 Resolución {intento}: {ruta} ({time.perf_counter() - inicio:.3f} s)")
+    print(f"📊 {resolvedor.estadisticas}")
@@ -0,0 +1,300 @@
+"""
+Servidor LLM Simulado
+=====================
+Servidor HTTP local compatible con el endpoint de chat completions de Groq/OpenAI,
+para medir y probar la etapa de IA sin consumir tokens ni depender de la API real.
+
+Características:
+- Respuestas deterministas: el texto depende solo del prompt (mismo prompt = misma respuesta)
+- Latencia base + variación (jitter) configurables, reproducibles con una semilla
+- Respuestas en streaming (SSE) con pausa configurable entre fragmentos
+- Errores 429 (límite de solicitudes) simulados con una tasa configurable
+- Contadores: solicitudes, limitadas, concurrencia máxima observada, conexiones nuevas
+- Arranque en un hilo (puerto libre automático), utilizable como context manager
+
+Uso:
+    with ServidorLLMSimulado(latencia=0.5) as servidor:
+        configurar_proveedor_llm(api_key="simulado", base_url=servidor.url)
+        analizar_ratios_con_ia(resultados_ratios, empresa)
+"""
+
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+
+
+# Rutas aceptadas (el SDK de Groq usa /openai/v1, el de OpenAI /v1)
+RUTAS_CHAT = ('/openai/v1/chat/completions', '/v1/chat/completions')
+
+PALABRAS_RESPUESTA = (
+    "la", "empresa", "muestra", "liquidez", "adecuada", "con", "tendencia", "estable",
+    "el", "endeudamiento", "se", "mantiene", "controlado", "y", "la", "rentabilidad",
+    "mejora", "respecto", "al", "año", "anterior", "se", "recomienda", "optimizar",
+    "la", "rotación", "de", "inventarios", "y", "cuentas", "por", "cobrar"
+)
+
+
+def texto_simulado(prompt: str, palabras: int) -> str:
+    """
+    Genera una respuesta determinista para un prompt
+
+    Args:
+        prompt: Mensaje del usuario
+        palabras: Número de palabras de la respuesta
+
+    Returns:
+        Texto que depende únicamente del prompt
+    """
+    semilla = int(hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:16], 16)
+    generador = random.Random(semilla)
+    cuerpo = " ".join(generador.choice(PALABRAS_RESPUESTA) for _ in range(palabras))
+    return f"Respuesta simulada {semilla % 10000:04d}: {cuerpo}."
+
+
+class ServidorLLMSimulado:
+    """Servidor local de chat completions con latencia y límites simulados"""
+
+    def __init__(
+        self,
+        latencia: float = 0.5,
+        jitter: float = 0.1,
+        tasa_limite: float = 0.0,
+        pausa_fragmento: float = 0.01,
+        palabras: int = 120,
+        semilla: int = 42,
+        puerto: int = 0
+    ):
+        """
+        Configura el servidor (no arranca hasta llamar a iniciar())
+
+        Args:
+            latencia: Segundos hasta la respuesta (o hasta el primer fragmento en streaming)
+            jitter: Variación máxima (±) de la latencia en segundos
+            tasa_limite: Probabilidad (0-1) de responder 429 a una solicitud
+            pausa_fragmento: Segundos entre fragmentos en streaming
+            palabras: Palabras por respuesta
+            semilla: Semilla del generador de jitter y errores (reproducible)
+            puerto: Puerto local (0 = uno libre)
+        """
+        self.latencia = latencia
+        self.jitter = jitter
+        self.tasa_limite = tasa_limite
+        self.pausa_fragmento = pausa_fragmento
+        self.palabras = palabras
+        self.puerto = puerto
+
+        self._azar = random.Random(semilla)
+        self._lock = threading.Lock()
+        self._servidor: Optional[ThreadingHTTPServer] = None
+        self._hilo: Optional[threading.Thread] = None
+        self._conexiones = set()
+
+        self.estadisticas = {
+            'solicitudes': 0,
+            'completadas': 0,
+            'limitadas': 0,
+            'streaming': 0,
+            'activas': 0,
+            'max_concurrentes': 0,
+            'conexiones': 0,
+            'tokens_entrada': 0,
+            'tokens_salida': 0
+        }
+
+    # ===== CICLO DE VIDA =====
+
+    def iniciar(self) -> "ServidorLLMSimulado":
+        """Arranca el servidor en un hilo de fondo"""
+        servidor_simulado = self
+
+        class Manejador(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'   # Keep-alive: permite medir la reutilización de conexiones
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                servidor_simulado._atender(self)
+
+        self._servidor = ThreadingHTTPServer(('127.0.0.1', self.puerto), Manejador)
+        self._servidor.daemon_threads = True
+        self.puerto = self._servidor.server_port
+        self._hilo = threading.Thread(target=self._servidor.serve_forever, name="llm_simulado", daemon=True)
+        self._hilo.start()
+        return self
+
+    def detener(self):
+        """Detiene el servidor"""
+        if self._servidor is not None:
+            self._servidor.shutdown()
+            self._servidor.server_close()
+            self._servidor = None
+
+    def __enter__(self) -> "ServidorLLMSimulado":
+        return self.iniciar()
+
+    def __exit__(self, *args):
+        self.detener()
+
+    @property
+    def url(self) -> str:
+        """URL base para el cliente (GROQ_BASE_URL / configurar_proveedor_llm)"""
+        return f"http://127.0.0.1:{self.puerto}"
+
+    def reporte(self) -> Dict[str, Any]:
+        """Copia de los contadores del servidor"""
+        with self._lock:
+            return dict(self.estadisticas)
+
+    def reiniciar_estadisticas(self):
+        """Pone los contadores en cero (entre escenarios de un benchmark)"""
+        with self._lock:
+            for clave in self.estadisticas:
+                if clave != 'activas':
+                    self.estadisticas[clave] = 0
+            self._conexiones.clear()
+
+    # ===== ATENCIÓN DE SOLICITUDES =====
+
+    def _atender(self, manejador: BaseHTTPRequestHandler):
+        """Procesa una solicitud de chat completions"""
+        longitud = int(manejador.headers.get('Content-Length', 0))
+        cuerpo = manejador.rfile.read(longitud) if longitud else b''
+
+        if manejador.path not in RUTAS_CHAT:
+            self._responder_json(manejador, 404, {'error': {'message': f"Ruta no soportada: {manejador.path}"}})
+            return
+
+        try:
+            solicitud = json.loads(cuerpo or b'{}')
+        except ValueError:
+            self._responder_json(manejador, 400, {'error': {'message': "JSON inválido"}})
+            return
+
+        with self._lock:
+            self.estadisticas['solicitudes'] += 1
+            if manejador.client_address not in self._conexiones:
+                self._conexiones.add(manejador.client_address)
+                self.estadisticas['conexiones'] += 1
+            limitada = self._azar.random() < self.tasa_limite
+            espera = max(0.0, self.latencia + self._azar.uniform(-self.jitter, self.jitter))
+
+        if limitada:
+            with self._lock:
+                self.estadisticas['limitadas'] += 1
+            self._responder_json(
+                manejador, 429,
+                {'error': {'message': "Rate limit reached (simulado)", 'type': 'rate_limit_exceeded', 'code': 'rate_limit_exceeded'}},
+                {'retry-after': '0.2'}
+            )
+            return
+
+        mensajes = solicitud.get('messages', [])
+        prompt = mensajes[-1].get('content', '') if mensajes else ''
+        texto = texto_simulado(prompt, self.palabras)
+        tokens_entrada = sum(len(str(m.get('content', ''))) for m in mensajes) // 4
+        tokens_salida = len(texto) // 4
+        modelo = solicitud.get('model', 'simulado')
+
+        with self._lock:
+            self.estadisticas['activas'] += 1
+            self.estadisticas['max_concurrentes'] = max(self.estadisticas['max_concurrentes'], self.estadisticas['activas'])
+            self.estadisticas['tokens_entrada'] += tokens_entrada
+            self.estadisticas['tokens_salida'] += tokens_salida
+        try:
+            time.sleep(espera)
+            if solicitud.get('stream'):
+                self._responder_stream(manejador, modelo, texto)
+            else:
+                self._responder_json(manejador, 200, {
+                    'id': f"chatcmpl-sim-{self.estadisticas['solicitudes']}",
+                    'object': 'chat.completion',
+                    'created': int(time.time()),
+                    'model': modelo,
+                    'choices': [{
+                        'index': 0,
+                        'message': {'role': 'assistant', 'content': texto},
+                        'finish_reason': 'stop'
+                    }],
+                    'usage': {
+                        'prompt_tokens': tokens_entrada,
+                        'completion_tokens': tokens_salida,
+                        'total_tokens': tokens_entrada + tokens_salida
+                    }
+                })
+        finally:
+            with self._lock:
+                self.estadisticas['activas'] -= 1
+                self.estadisticas['completadas'] += 1
+
+    def _responder_json(self, manejador: BaseHTTPRequestHandler, estado: int, datos: Dict, cabeceras: Dict[str, str] = None):
+        """Envía una respuesta JSON completa"""
+        contenido = json.dumps(datos, ensure_ascii=False).encode('utf-8')
+        manejador.send_response(estado)
+        manejador.send_header('Content-Type', 'application/json')
+        manejador.send_header('Content-Length', str(len(contenido)))
+        for nombre, valor in (cabeceras or {}).items():
+            manejador.send_header(nombre, valor)
+        manejador.end_headers()
+        manejador.wfile.write(contenido)
+
+    def _responder_stream(self, manejador: BaseHTTPRequestHandler, modelo: str, texto: str):
+        """Envía la respuesta como eventos SSE, palabra por palabra"""
+        with self._lock:
+            self.estadisticas['streaming'] += 1
+
+        manejador.send_response(200)
+        manejador.send_header('Content-Type', 'text/event-stream')
+        manejador.send_header('Transfer-Encoding', 'chunked')
+        manejador.end_headers()
+
+        def enviar(datos: str):
+            contenido = f"data: {datos}\n\n".encode('utf-8')
+            manejador.wfile.write(f"{len(contenido):X}\r\n".encode('ascii') + contenido + b"\r\n")
+            manejador.wfile.flush()
+
+        palabras = texto.split(' ')
+        for i, palabra in enumerate(palabras):
+            fragmento = palabra if i == 0 else f" {palabra}"
+            enviar(json.dumps({
+                'id': 'chatcmpl-sim',
+                'object': 'chat.completion.chunk',
+                'created': int(time.time()),
+                'model': modelo,
+                'choices': [{'index': 0, 'delta': {'content': fragmento}, 'finish_reason': None}]
+            }, ensure_ascii=False))
+            if self.pausa_fragmento:
+                time.sleep(self.pausa_fragmento)
+
+        enviar(json.dumps({
+            'id': 'chatcmpl-sim',
+            'object': 'chat.completion.chunk',
+            'created': int(time.time()),
+            'model': modelo,
+            'choices': [{'index': 0, 'delta': {}, 'finish_reason': 'stop'}]
+        }))
+        enviar("[DONE]")
+        manejador.wfile.write(b"0\r\n\r\n")
+        manejador.wfile.flush()
+
+
+if __name__ == "__main__":
+    print("=" * 70)
+    print("SERVIDOR LLM SIMULADO")
+    print("=" * 70)
+
+    servidor = ServidorLLMSimulado(latencia=0.5, jitter=0.1).iniciar()
+    print(f"\n🚀 Escuchando en {servidor.url}")
+    print(f"   Configura GROQ_BASE_URL = \"{servidor.url}\" en config_api.py para usarlo desde la app")
+    print("   Ctrl+C para detener\n")
+    try:
+        while True:
+            time.sleep(5)
+            print(f"📊 {servidor.reporte()}")
+    except KeyboardInterrupt:
+        servidor.detener()
+        print("\n🛑 Servidor detenido")
@@ -0,0 +1,414 @@
+"""
+Servidor SMV Simulado
+=====================
+Servidor HTTP local que reproduce el formulario `Frm_InformacionFinanciera` de la SMV
+con los mismos IDs de controles, para probar y medir los descargadores (navegador y
+HTTP directo) sin depender del portal real.
+
+Características:
+- Formulario estilo ASP.NET: __VIEWSTATE, __doPostBack, combo de empresas con
+  AutoPostBack, radios de periodo, combo de años, botón Buscar y modal myLoading
+- Grilla de resultados (MainContent_grdInfoFinanciera) con el enlace "Ver detalle de
+  Estados Financieros" que abre la página de detalle en otra pestaña
+- Botón cbExcel que entrega como adjunto el reporte real de la carpeta ejemplos/
+  (empresa y año se leen de la cabecera de cada reporte)
+- Años sin reporte: la grilla no trae la fila de Estados Financieros, como en la SMV
+- Empresas de relleno para que el combo tenga un tamaño realista
+- Latencia de páginas y de exportación + variación (jitter) y errores 500 configurables,
+  reproducibles con una semilla
+- Sin estado en el servidor (todo viaja en __VIEWSTATE): admite sesiones simultáneas
+- Contadores: páginas, postbacks, búsquedas, descargas, bytes enviados, concurrencia máxima
+
+Uso:
+    with ServidorSMVSimulado(latencia=0.2) as servidor:
+        descargador = DescargadorSMVHttp(download_dir="descargas", url_smv=servidor.url)
+        descargador.proceso_completo("PACASMAYO", 2024, 2022)
+"""
+
+import base64
+import glob
+import html
+import json
+import os
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlencode, urlparse
+
+from descargador_smv_http import (
+    ID_BOTON_BUSCAR, ID_BOTON_EXCEL, ID_COMBO_AÑO, ID_COMBO_EMPRESA, ID_GRILLA, NOMBRE_ARCHIVO_DEFECTO
+)
+
+CARPETA_EJEMPLOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ejemplos")
+RUTA_FORMULARIO = "/SIMV/Frm_InformacionFinanciera"
+RUTA_DETALLE = "/SIMV/Frm_DetalleInformacionFinanciera"
+
+# Nombres ASP.NET de los controles (el atributo name que viaja en el POST)
+CAMPO_EMPRESA = "ctl00$MainContent$cboDenominacionSocial"
+CAMPO_PERIODO = "ctl00$MainContent$cboPeriodo"
+CAMPO_AÑO = "ctl00$MainContent$cboAnio"
+CAMPO_BUSCAR = "ctl00$MainContent$cbBuscar"
+
+PATRON_AÑO = re.compile(r"A.o:\s*(\d{4})")
+PATRON_EMPRESA = re.compile(r"Empresa:\s*([^<]+)<")
+
+
+def reportes_ejemplo(carpeta: str = CARPETA_EJEMPLOS) -> Dict[Tuple[str, int], str]:
+    """
+    Reportes de la SMV disponibles en una carpeta, indexados por empresa y año
+
+    Args:
+        carpeta: Carpeta con reportes exportados de la SMV (.html / .xls)
+
+    Returns:
+        Dict {(empresa, año): ruta}; si hay dos reportes del mismo par se usa el primero
+    """
+    reportes: Dict[Tuple[str, int], str] = {}
+    rutas = glob.glob(os.path.join(carpeta, "*.htm*")) + glob.glob(os.path.join(carpeta, "*.xls"))
+    for ruta in sorted(rutas):
+        try:
+            with open(ruta, 'r', encoding='latin-1') as f:
+                cabecera = f.read(8000)   # Empresa y año están al inicio del reporte
+        except OSError:
+            continue
+        año = PATRON_AÑO.search(cabecera)
+        empresa = PATRON_EMPRESA.search(cabecera)
+        if año and empresa:
+            reportes.setdefault((html.unescape(empresa.group(1)).strip(), int(año.group(1))), ruta)
+    return reportes
+
+
+class ServidorSMVSimulado:
+    """Formulario de información financiera de la SMV servido localmente"""
+
+    def __init__(
+        self,
+        latencia: float = 0.2,
+        jitter: float = 0.05,
+        latencia_descarga: float = 0.5,
+        tasa_error: float = 0.0,
+        empresas_relleno: int = 200,
+        carpeta_reportes: str = CARPETA_EJEMPLOS,
+        semilla: int = 42,
+        puerto: int = 0
+    ):
+        """
+        Configura el servidor (no arranca hasta llamar a iniciar())
+
+        Args:
+            latencia: Segundos de respuesta de cada página o postback
+            jitter: Variación máxima (±) de las latencias en segundos
+            latencia_descarga: Segundos de respuesta de la exportación Excel
+            tasa_error: Probabilidad (0-1) de responder 500 a una solicitud
+            empresas_relleno: Empresas adicionales sin reportes en el combo
+            carpeta_reportes: Carpeta con los reportes que se entregan como Excel
+            semilla: Semilla del generador de jitter y errores (reproducible)
+            puerto: Puerto local (0 = uno libre)
+        """
+        self.latencia = latencia
+        self.jitter = jitter
+        self.latencia_descarga = latencia_descarga
+        self.tasa_error = tasa_error
+        self.puerto = puerto
+
+        self.reportes = reportes_ejemplo(carpeta_reportes)
+        nombres = sorted({empresa for empresa, _ in self.reportes})
+        nombres += [f"EMPRESA SIMULADA {i:03d} S.A." for i in range(1, empresas_relleno + 1)]
+        # Códigos estables como los de la SMV; el combo se muestra ordenado por nombre
+        self.empresas: Dict[str, str] = {f"{10000 + i}": nombre for i, nombre in enumerate(nombres)}
+        años = [año for _, año in self.reportes] or [time.localtime().tm_year - 1]
+        self.años: List[int] = list(range(max(años), min(años) - 1, -1))
+
+        self._azar = random.Random(semilla)
+        self._lock = threading.Lock()
+        self._contenidos: Dict[str, bytes] = {}
+        self._servidor: Optional[ThreadingHTTPServer] = None
+        self._hilo: Optional[threading.Thread] = None
+
+        self.estadisticas = {
+            'solicitudes': 0,
+            'paginas': 0,
+            'postbacks': 0,
+            'busquedas': 0,
+            'sin_reporte': 0,
+            'detalles': 0,
+            'descargas': 0,
+            'bytes_enviados': 0,
+            'errores': 0,
+            'activas': 0,
+            'max_concurrentes': 0
+        }
+
+    # ===== CICLO DE VIDA =====
+
+    def iniciar(self) -> "ServidorSMVSimulado":
+        """Arranca el servidor en un hilo de fondo"""
+        servidor_simulado = self
+
+        class Manejador(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'   # Keep-alive, como el portal real
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                servidor_simulado._atender(self)
+
+            def do_POST(self):
+                servidor_simulado._atender(self)
+
+        self._servidor = ThreadingHTTPServer(('127.0.0.1', self.puerto), Manejador)
+        self._servidor.daemon_threads = True
+        self.puerto = self._servidor.server_port
+        self._hilo = threading.Thread(target=self._servidor.serve_forever, name="smv_simulado", daemon=True)
+        self._hilo.start()
+        return self
+
+    def detener(self):
+        """Detiene el servidor"""
+        if self._servidor is not None:
+            self._servidor.shutdown()
+            self._servidor.server_close()
+            self._servidor = None
+
+    def __enter__(self) -> "ServidorSMVSimulado":
+        return self.iniciar()
+
+    def __exit__(self, *args):
+        self.detener()
+
+    @property
+    def url(self) -> str:
+        """URL del formulario (URL_SMV de DescargadorSMV / url_smv de DescargadorSMVHttp)"""
+        return f"http://127.0.0.1:{self.puerto}{RUTA_FORMULARIO}?data=SIMULADO"
+
+    def empresas_con_reportes(self) -> Dict[str, List[int]]:
+        """Empresas que tienen reportes descargables y sus años (del más reciente al más antiguo)"""
+        resultado: Dict[str, List[int]] = {}
+        for empresa, año in self.reportes:
+            resultado.setdefault(empresa, []).append(año)
+        return {empresa: sorted(años, reverse=True) for empresa, años in sorted(resultado.items())}
+
+    def reporte(self) -> Dict[str, Any]:
+        """Copia de los contadores del servidor"""
+        with self._lock:
+            return dict(self.estadisticas)
+
+    def reiniciar_estadisticas(self):
+        """Pone los contadores en cero (entre escenarios de un benchmark)"""
+        with self._lock:
+            for clave in self.estadisticas:
+                if clave != 'activas':
+                    self.estadisticas[clave] = 0
+
+    # ===== ATENCIÓN DE SOLICITUDES =====
+
+    def _atender(self, manejador: BaseHTTPRequestHandler):
+        """Enruta una solicitud GET/POST al formulario, al detalle o a la exportación"""
+        longitud = int(manejador.headers.get('Content-Length', 0))
+        cuerpo = manejador.rfile.read(longitud).decode('utf-8', errors='replace') if longitud else ''
+        datos = {clave: valores[0] for clave, valores in parse_qs(cuerpo, keep_blank_values=True).items()}
+        url = urlparse(manejador.path)
+        consulta = {clave: valores[0] for clave, valores in parse_qs(url.query).items()}
+
+        with self._lock:
+            self.estadisticas['solicitudes'] += 1
+            self.estadisticas['activas'] += 1
+            self.estadisticas['max_concurrentes'] = max(self.estadisticas['max_concurrentes'], self.estadisticas['activas'])
+            fallar = self._azar.random() < self.tasa_error
+            exportar = url.path == RUTA_DETALLE and ID_BOTON_EXCEL in datos
+            base = self.latencia_descarga if exportar else self.latencia
+            espera = max(0.0, base + self._azar.uniform(-self.jitter, self.jitter))
+
+        try:
+            time.sleep(espera)
+            if fallar:
+                with self._lock:
+                    self.estadisticas['errores'] += 1
+                self._responder(manejador, 500, "<html><body>Error simulado del servidor</body></html>")
+            elif url.path == RUTA_FORMULARIO:
+                self._formulario(manejador, datos)
+            elif url.path == RUTA_DETALLE:
+                self._detalle(manejador, consulta, exportar)
+            else:
+                self._responder(manejador, 404, "<html><body>No encontrado</body></html>")
+        finally:
+            with self._lock:
+                self.estadisticas['activas'] -= 1
+
+    def _formulario(self, manejador: BaseHTTPRequestHandler, datos: Dict[str, str]):
+        """Página principal: carga inicial (GET) o postback (POST)"""
+        estado = self._leer_estado(datos.get('__VIEWSTATE'))
+        grilla = ''
+        if datos:
+            estado['empresa'] = datos.get(CAMPO_EMPRESA, estado.get('empresa'))
+            estado['periodo'] = datos.get(CAMPO_PERIODO, estado.get('periodo'))
+            estado['año'] = datos.get(CAMPO_AÑO, estado.get('año'))
+            if CAMPO_BUSCAR in datos:
+                grilla = self._grilla(estado)
+            else:
+                with self._lock:
+                    self.estadisticas['postbacks'] += 1
+        with self._lock:
+            self.estadisticas['paginas'] += 1
+        self._responder(manejador, 200, self._pagina_formulario(estado, grilla))
+
+    def _grilla(self, estado: Dict[str, Any]) -> str:
+        """Grilla de resultados de una búsqueda (sin fila de Estados Financieros si no hay reporte)"""
+        empresa = self.empresas.get(estado.get('empresa') or '')
+        año = int(estado['año']) if str(estado.get('año') or '').isdigit() else None
+        filas = ['<tr class="item-grid"><td>1</td><td>Memoria Anual</td>'
+                 '<td><a title="Ver detalle" href="#">Ver</a></td></tr>']
+
+        if estado.get('periodo') == 'A' and (empresa, año) in self.reportes:
+            destino = f"{RUTA_DETALLE}?{urlencode({'data': self._codificar({'empresa': estado['empresa'], 'año': año})})}"
+            filas.append(
+                '<tr class="item-grid"><td>2</td><td>Estado Financiero Auditado</td>'
+                f'<td><a title="Ver detalle de Estados Financieros" href="{html.escape(destino)}" target="_blank">Ver</a></td></tr>'
+            )
+            sin_reporte = 0
+        else:
+            sin_reporte = 1
+
+        with self._lock:
+            self.estadisticas['busquedas'] += 1
+            self.estadisticas['sin_reporte'] += sin_reporte
+        return (f'<table id="{ID_GRILLA}" class="grid"><tr><th>N°</th><th>Documento</th><th>Detalle</th></tr>'
+                f'{"".join(filas)}</table>')
+
+    def _detalle(self, manejador: BaseHTTPRequestHandler, consulta: Dict[str, str], exportar: bool):
+        """Página de detalle (GET) o exportación Excel (POST con cbExcel)"""
+        solicitud = self._leer_estado(consulta.get('data'))
+        empresa = self.empresas.get(solicitud.get('empresa') or '')
+        ruta = self.reportes.get((empresa, solicitud.get('año')))
+        if ruta is None:
+            self._responder(manejador, 404, "<html><body>Reporte no disponible</body></html>")
+            return
+
+        if not exportar:
+            with self._lock:
+                self.estadisticas['detalles'] += 1
+            accion = f"{RUTA_DETALLE}?{urlencode({'data': consulta['data']})}"
+            self._responder(manejador, 200, (
+                f'<html><head><title>Detalle de Información Financiera</title></head><body>'
+                f'<form method="post" action="{html.escape(accion)}" id="form1">'
+                f'<input type="hidden" name="__VIEWSTATE" id="__VIEWSTATE" value="detalle"/>'
+                f'<h3>{html.escape(empresa)} - {solicitud["año"]}</h3>'
+                f'<input type="submit" name="{ID_BOTON_EXCEL}" value="Exportar a Excel" id="{ID_BOTON_EXCEL}"/>'
+                f'</form></body></html>'
+            ))
+            return
+
+        contenido = self._contenido(ruta)
+        with self._lock:
+            self.estadisticas['descargas'] += 1
+        self._responder(manejador, 200, contenido, 'application/vnd.ms-excel', {
+            'Content-Disposition': f'attachment; filename="{NOMBRE_ARCHIVO_DEFECTO}"'
+        })
+
+    def _contenido(self, ruta: str) -> bytes:
+        """Bytes de un reporte (se leen del disco una sola vez)"""
+        with self._lock:
+            contenido = self._contenidos.get(ruta)
+        if contenido is None:
+            with open(ruta, 'rb') as f:
+                contenido = f.read()
+            with self._lock:
+                self._contenidos[ruta] = contenido
+        return contenido
+
+    # ===== HTML DEL FORMULARIO =====
+
+    def _pagina_formulario(self, estado: Dict[str, Any], grilla: str) -> str:
+        """HTML del formulario con el estado actual (selecciones y __VIEWSTATE)"""
+        def postback(target: str) -> str:
+            return f"javascript:setTimeout(&#39;__doPostBack(\\&#39;{target}\\&#39;,\\&#39;\\&#39;)&#39;, 0)"
+
+        opciones_empresa = ''.join(
+            f'<option{" selected" if estado.get("empresa") == codigo else ""} value="{codigo}">{html.escape(nombre)}</option>'
+            for codigo, nombre in sorted(self.empresas.items(), key=lambda par: par[1])
+        )
+        radios = ''.join(
+            f'<input id="MainContent_cboPeriodo_{i}" type="radio" name="{CAMPO_PERIODO}" value="{valor}"'
+            f'{" checked" if estado.get("periodo") == valor else ""} onclick="{postback(f"{CAMPO_PERIODO}${i}")}"/>'
+            f'<label for="MainContent_cboPeriodo_{i}">{etiqueta}</label>'
+            for i, (valor, etiqueta) in enumerate((('T', 'Trimestral'), ('A', 'Anual')))
+        )
+        opciones_año = ''.join(
+            f'<option{" selected" if str(estado.get("año")) == str(año) else ""} value="{año}">{año}</option>'
+            for año in self.años
+        ) if estado.get('periodo') == 'A' else ''
+
+        return f'''<!DOCTYPE html>
+<html><head><title>SMV - Información Financiera (simulado)</title></head><body>
+<form method="post" action="{RUTA_FORMULARIO}?data=SIMULADO" id="form1">
+<input type="hidden" name="__EVENTTARGET" id="__EVENTTARGET" value=""/>
+<input type="hidden" name="__EVENTARGUMENT" id="__EVENTARGUMENT" value=""/>
+<input type="hidden" name="__VIEWSTATE" id="__VIEWSTATE" value="{self._codificar(estado)}"/>
+<input type="hidden" name="__EVENTVALIDATION" id="__EVENTVALIDATION" value="simulado"/>
+<script type="text/javascript">
+var theForm = document.forms['form1'];
+function __doPostBack(eventTarget, eventArgument) {{
+    document.getElementById('myLoading').style.display = 'block';
+    theForm.__EVENTTARGET.value = eventTarget;
+    theForm.__EVENTARGUMENT.value = eventArgument;
+    theForm.submit();
+}}
+</script>
+<div id="myLoading" style="display:none">Cargando...</div>
+<select name="{CAMPO_EMPRESA}" id="{ID_COMBO_EMPRESA}" onchange="{postback(CAMPO_EMPRESA)}">
+<option value="0">Seleccione</option>{opciones_empresa}</select>
+{radios}
+<select name="{CAMPO_AÑO}" id="{ID_COMBO_AÑO}">{opciones_año}</select>
+<input type="submit" name="{CAMPO_BUSCAR}" value="Buscar" id="{ID_BOTON_BUSCAR}"/>
+{grilla}
+</form></body></html>'''
+
+    # ===== UTILIDADES =====
+
+    @staticmethod
+    def _codificar(datos: Dict[str, Any]) -> str:
+        return base64.urlsafe_b64encode(json.dumps(datos).encode('utf-8')).decode('ascii')
+
+    @staticmethod
+    def _leer_estado(valor: Optional[str]) -> Dict[str, Any]:
+        try:
+            return json.loads(base64.urlsafe_b64decode((valor or '').encode('ascii')))
+        except ValueError:
+            return {}
+
+    def _responder(self, manejador: BaseHTTPRequestHandler, estado: int, contenido: Any,
+                   tipo: str = 'text/html; charset=utf-8', cabeceras: Dict[str, str] = None):
+        """Envía una respuesta completa"""
+        cuerpo = contenido.encode('utf-8') if isinstance(contenido, str) else contenido
+        manejador.send_response(estado)
+        manejador.send_header('Content-Type', tipo)
+        manejador.send_header('Content-Length', str(len(cuerpo)))
+        for nombre, valor in (cabeceras or {}).items():
+            manejador.send_header(nombre, valor)
+        manejador.end_headers()
+        manejador.wfile.write(cuerpo)
+        with self._lock:
+            self.estadisticas['bytes_enviados'] += len(cuerpo)
+
+
+if __name__ == "__main__":
+    print("=" * 70)
+    print("SERVIDOR SMV SIMULADO")
+    print("=" * 70)
+
+    servidor = ServidorSMVSimulado(latencia=0.2, jitter=0.05).iniciar()
+    print(f"\n🚀 Formulario en {servidor.url}")
+    for empresa, años in servidor.empresas_con_reportes().items():
+        print(f"   🏢 {empresa}: {', '.join(str(año) for año in años)}")
+    print("   Ctrl+C para detener\n")
+    try:
+        while True:
+            time.sleep(5)
+            print(f"📊 {servidor.reporte()}")
+    except KeyboardInterrupt:
+        servidor.detener()
+        print("\n🛑 Servidor detenido")
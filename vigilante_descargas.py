@@ -0,0 +1,380 @@
+"""
+Vigilante de Descargas (detección por eventos del sistema de archivos)
+======================================================================
+Detecta cuándo termina una descarga del navegador escuchando los eventos de la
+carpeta de descargas (watchdog: inotify en Linux, FSEvents en macOS,
+ReadDirectoryChangesW en Windows), sin esperas fijas ni sondeo de la carpeta.
+
+Características:
+- Cada descarga se "arma" antes del clic con su empresa y año: el siguiente archivo
+  completo que aparezca en la carpeta se asigna a esa espera (orden FIFO)
+- Ignora archivos parciales (.crdownload, .tmp, .part...) pero los cuenta como
+  actividad: una descarga lenta no agota el tiempo mientras siga avanzando
+- Un archivo se da por completo al cerrarse / renombrarse a su nombre final, o
+  cuando su tamaño deja de cambiar durante un breve intervalo
+- Los archivos que ya existían antes de armar la espera nunca se asignan; al borrarse
+  o moverse fuera de la carpeta, su nombre vuelve a estar libre para otra descarga
+- Si watchdog no está instalado, usa un sondeo ligero como respaldo
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+    WATCHDOG_DISPONIBLE = True
+except ImportError:
+    FileSystemEventHandler = object
+    Observer = None
+    WATCHDOG_DISPONIBLE = False
+
+
+EXTENSIONES_DESCARGA = ('.xls', '.xlsx')
+EXTENSIONES_PARCIALES = ('.crdownload', '.tmp', '.part', '.partial', '.download')
+
+ESTABILIDAD_SEGUNDOS = 0.3      # Tamaño sin cambios para dar un archivo por completo
+TIMEOUT_INACTIVIDAD = 15.0      # Sin ninguna actividad en la carpeta → la descarga no llegó
+TIMEOUT_TOTAL = 120.0           # Tope absoluto por descarga
+INTERVALO_SONDEO = 0.25         # Solo en el respaldo sin watchdog
+
+
+def es_parcial(nombre: str) -> bool:
+    """True si el archivo es una descarga en curso (o un temporal del navegador)"""
+    nombre = nombre.lower()
+    return nombre.endswith(EXTENSIONES_PARCIALES) or nombre.startswith('.com.google.chrome')
+
+
+def es_descarga(nombre: str) -> bool:
+    """True si el archivo tiene la extensión de una exportación de la SMV"""
+    return nombre.lower().endswith(EXTENSIONES_DESCARGA) and not es_parcial(nombre)
+
+
+class EsperaDescarga:
+    """Descarga esperada de una empresa y un año; recibe el próximo archivo completo"""
+
+    def __init__(self, vigilante: "VigilanteDescargas", empresa: Optional[str], año: Optional[int]):
+        self.empresa = empresa
+        self.año = año
+        self.inicio = time.perf_counter()
+        self.descarga: Optional[Dict[str, Any]] = None
+        self._vigilante = vigilante
+
+    def resultado(
+        self,
+        timeout_inactividad: float = TIMEOUT_INACTIVIDAD,
+        timeout_total: float = TIMEOUT_TOTAL
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Espera a que la descarga termine
+
+        Args:
+            timeout_inactividad: Segundos sin actividad en la carpeta antes de rendirse
+            timeout_total: Tope absoluto de espera
+
+        Returns:
+            Dict con 'archivo', 'ruta', 'empresa', 'año', 'bytes' y 'segundos', o None si no llegó
+        """
+        return self._vigilante._esperar(self, timeout_inactividad, timeout_total)
+
+    def cancelar(self):
+        """Retira la espera (p. ej. si el clic de descarga falló)"""
+        self._vigilante._retirar(self)
+
+
+class _ManejadorEventos(FileSystemEventHandler):
+    """Traduce los eventos de watchdog a notificaciones del vigilante"""
+
+    def __init__(self, vigilante: "VigilanteDescargas"):
+        super().__init__()
+        self._vigilante = vigilante
+
+    def on_created(self, event):
+        if not event.is_directory:
+            self._vigilante._notificar(event.src_path)
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self._vigilante._notificar(event.src_path)
+
+    def on_closed(self, event):
+        if not event.is_directory:
+            self._vigilante._notificar(event.src_path, cerrado=True)
+
+    def on_moved(self, event):
+        # Chrome renombra "archivo.xls.crdownload" → "archivo.xls" al terminar
+        if not event.is_directory:
+            self._vigilante._notificar(event.src_path, eliminado=True)
+            self._vigilante._notificar(event.dest_path, cerrado=True)
+
+    def on_deleted(self, event):
+        if not event.is_directory:
+            self._vigilante._notificar(event.src_path, eliminado=True)
+
+
+class VigilanteDescargas:
+    """Observa una carpeta de descargas y asigna cada archivo nuevo a su empresa y año"""
+
+    def __init__(self, directorio: str, estabilidad: float = ESTABILIDAD_SEGUNDOS, usar_watchdog: bool = True):
+        """
+        Configura el vigilante (no empieza a observar hasta iniciar())
+
+        Args:
+            directorio: Carpeta de descargas a observar
+            estabilidad: Segundos sin cambios de tamaño para dar un archivo por completo
+            usar_watchdog: False fuerza el respaldo por sondeo
+        """
+        self.directorio = os.path.abspath(directorio)
+        self.estabilidad = estabilidad
+        self.usar_watchdog = usar_watchdog and WATCHDOG_DISPONIBLE
+
+        self._condicion = threading.Condition()
+        self._pendientes: Deque[EsperaDescarga] = deque()
+        self._conocidos = set()          # Archivos completos que no deben asignarse
+        self._candidatos: Dict[str, Dict[str, Any]] = {}   # nombre → tamaño, último evento, cerrado
+        self._parciales = set()
+        self._ultima_actividad = time.perf_counter()
+
+        self._observador = None
+        self._hilo_sondeo = None
+        self._detener = threading.Event()
+        self.estadisticas = {'eventos': 0, 'asignadas': 0, 'huerfanas': 0, 'agotadas': 0}
+
+    # ===== CICLO DE VIDA =====
+
+    def iniciar(self) -> "VigilanteDescargas":
+        """Toma una foto de la carpeta y empieza a observarla"""
+        os.makedirs(self.directorio, exist_ok=True)
+        with self._condicion:
+            self._conocidos = {nombre for nombre in os.listdir(self.directorio) if es_descarga(nombre)}
+        self._detener.clear()
+
+        if self.usar_watchdog:
+            self._observador = Observer()
+            self._observador.schedule(_ManejadorEventos(self), self.directorio, recursive=False)
+            self._observador.daemon = True
+            self._observador.start()
+        else:
+            self._hilo_sondeo = threading.Thread(target=self._sondear, name="vigilante_descargas", daemon=True)
+            self._hilo_sondeo.start()
+        return self
+
+    def detener(self):
+        """Deja de observar la carpeta"""
+        self._detener.set()
+        if self._observador is not None:
+            self._observador.stop()
+            self._observador.join(timeout=2)
+            self._observador = None
+        if self._hilo_sondeo is not None:
+            self._hilo_sondeo.join(timeout=2)
+            self._hilo_sondeo = None
+
+    @property
+    def activo(self) -> bool:
+        return self._observador is not None or self._hilo_sondeo is not None
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, *args):
+        self.detener()
+
+    # ===== API PÚBLICA =====
+
+    def esperar(self, empresa: str = None, año: int = None) -> EsperaDescarga:
+        """
+        Arma una espera ANTES de disparar la descarga
+
+        Args:
+            empresa: Empresa que se está descargando
+            año: Año que se está descargando
+
+        Returns:
+            EsperaDescarga: llamar a .resultado() después del clic
+        """
+        with self._condicion:
+            espera = EsperaDescarga(self, empresa, año)
+            self._pendientes.append(espera)
+            self._ultima_actividad = time.perf_counter()
+            return espera
+
+    def reporte(self) -> Dict[str, Any]:
+        """Estadísticas del vigilante"""
+        with self._condicion:
+            return {
+                **self.estadisticas,
+                'modo': 'watchdog' if self.usar_watchdog else 'sondeo',
+                'pendientes': len(self._pendientes),
+                'parciales': len(self._parciales)
+            }
+
+    # ===== EVENTOS =====
+
+    def _notificar(self, ruta: str, cerrado: bool = False, eliminado: bool = False):
+        """Registra un evento de la carpeta (llamado desde watchdog o el sondeo)"""
+        if os.path.dirname(os.path.abspath(ruta)) != self.directorio:
+            return
+        nombre = os.path.basename(ruta)
+        ahora = time.perf_counter()
+
+        with self._condicion:
+            self.estadisticas['eventos'] += 1
+            if es_parcial(nombre):
+                if eliminado:
+                    self._parciales.discard(nombre)
+                else:
+                    self._parciales.add(nombre)
+                self._ultima_actividad = ahora
+            elif es_descarga(nombre) and eliminado:
+                # Borrado o movido fuera (p. ej. al manifiesto): el mismo nombre puede
+                # volver a llegar con la descarga del año siguiente
+                self._conocidos.discard(nombre)
+                self._candidatos.pop(nombre, None)
+            elif es_descarga(nombre) and nombre not in self._conocidos:
+                candidato = self._candidatos.setdefault(nombre, {'orden': (self._mtime(ruta), ahora), 'cerrado': False})
+                candidato['ultimo_evento'] = ahora
+                candidato['cerrado'] = candidato['cerrado'] or cerrado
+                self._ultima_actividad = ahora
+            else:
+                return
+            self._condicion.notify_all()
+
+    @staticmethod
+    def _mtime(ruta: str) -> float:
+        # Orden real de llegada aunque varios archivos se detecten en el mismo evento/sondeo
+        try:
+            return os.path.getmtime(ruta)
+        except OSError:
+            return float('inf')
+
+    def _confirmar_candidatos(self):
+        """Asigna los archivos completos a las esperas pendientes (con el lock tomado)"""
+        ahora = time.perf_counter()
+        for nombre in sorted(self._candidatos, key=lambda n: self._candidatos[n]['orden']):
+            candidato = self._candidatos[nombre]
+            ruta = os.path.join(self.directorio, nombre)
+            try:
+                tamaño = os.path.getsize(ruta)
+            except OSError:
+                self._candidatos.pop(nombre)
+                continue
+
+            # Completo: cerrado/renombrado por quien escribe, o tamaño estable
+            if tamaño != candidato.get('tamaño'):
+                candidato['tamaño'] = tamaño
+                if not candidato['cerrado']:
+                    candidato['ultimo_evento'] = ahora
+            completo = tamaño > 0 and (candidato['cerrado'] or ahora - candidato['ultimo_evento'] >= self.estabilidad)
+            if not completo:
+                continue
+
+            self._candidatos.pop(nombre)
+            self._conocidos.add(nombre)
+            if not self._pendientes:
+                # Llegó sin espera armada (p. ej. después de un timeout): no se asigna a otro año
+                self.estadisticas['huerfanas'] += 1
+                continue
+
+            espera = self._pendientes.popleft()
+            espera.descarga = {
+                'archivo': nombre,
+                'ruta': ruta,
+                'empresa': espera.empresa,
+                'año': espera.año,
+                'bytes': tamaño,
+                'segundos': ahora - espera.inicio
+            }
+            self.estadisticas['asignadas'] += 1
+
+    def _esperar(self, espera: EsperaDescarga, timeout_inactividad: float, timeout_total: float) -> Optional[Dict[str, Any]]:
+        """Bloquea hasta que la espera reciba su archivo o se agote el tiempo"""
+        with self._condicion:
+            while espera.descarga is None:
+                self._confirmar_candidatos()
+                if espera.descarga is not None:
+                    break
+
+                ahora = time.perf_counter()
+                inactivo = ahora - max(self._ultima_actividad, espera.inicio)
+                if ahora - espera.inicio >= timeout_total or (inactivo >= timeout_inactividad and not self._parciales):
+                    if espera in self._pendientes:
+                        self._pendientes.remove(espera)
+                    self.estadisticas['agotadas'] += 1
+                    return None
+
+                # Los candidatos aún no estables se revisan tras el intervalo de estabilidad
+                espera_maxima = self.estabilidad if self._candidatos else min(timeout_inactividad - inactivo, 1.0)
+                self._condicion.wait(max(0.01, espera_maxima))
+            return espera.descarga
+
+    def _retirar(self, espera: EsperaDescarga):
+        with self._condicion:
+            if espera in self._pendientes:
+                self._pendientes.remove(espera)
+
+    # ===== RESPALDO SIN WATCHDOG =====
+
+    def _sondear(self):
+        """Genera los mismos eventos que watchdog comparando fotos de la carpeta"""
+        anterior: Dict[str, float] = {}
+        while not self._detener.is_set():
+            try:
+                actual = {}
+                with os.scandir(self.directorio) as entradas:
+                    for entrada in entradas:
+                        if entrada.is_file():
+                            estado = entrada.stat()
+                            actual[entrada.name] = (estado.st_ino, estado.st_size, estado.st_mtime)
+            except OSError:
+                actual = anterior
+            for nombre, firma in actual.items():
+                previa = anterior.get(nombre)
+                if previa is not None and previa[0] != firma[0]:
+                    # Movido fuera y vuelto a descargar con el mismo nombre entre dos sondeos
+                    self._notificar(os.path.join(self.directorio, nombre), eliminado=True)
+                if previa != firma:
+                    self._notificar(os.path.join(self.directorio, nombre))
+            for nombre in set(anterior) - set(actual):
+                self._notificar(os.path.join(self.directorio, nombre), eliminado=True)
+            anterior = actual
+            self._detener.wait(INTERVALO_SONDEO)
+
+
+if __name__ == "__main__":
+    import shutil
+    import tempfile
+
+    from manifiesto_descargas import ManifiestoDescargas
+
+    print("=" * 70)
+    print("VIGILANTE DE DESCARGAS - MISMO NOMBRE EN AÑOS SEGUIDOS")
+    print("=" * 70)
+
+    def _simular_descarga(carpeta: str, nombre: str, contenido: bytes):
+        # Igual que Chrome: escribe el .crdownload y lo renombra al terminar
+        parcial = os.path.join(carpeta, nombre + ".crdownload")
+        with open(parcial, "wb") as archivo:
+            archivo.write(contenido)
+        os.replace(parcial, os.path.join(carpeta, nombre))
+
+    modos = [True, False] if WATCHDOG_DISPONIBLE else [False]
+    for usar_watchdog in modos:
+        carpeta = tempfile.mkdtemp(prefix="vigilante_")
+        manifiesto = ManifiestoDescargas(carpeta)
+        with VigilanteDescargas(carpeta, usar_watchdog=usar_watchdog) as vigilante:
+            for año in (2022, 2023, 2024):
+                espera = vigilante.esperar("EMPRESA", año)
+                _simular_descarga(carpeta, "ReporteDetalleInformacionFinanciero.xls", f"año {año}".encode() * 100)
+                descarga = espera.resultado(timeout_inactividad=5)
+                if descarga is None:
+                    print(f"❌ {año}: la descarga no se detectó")
+                    continue
+                # El manifiesto mueve el archivo a <EMPRESA>/ y libera el nombre en la carpeta vigilada
+                entrada = manifiesto.registrar(descarga['ruta'], "00000", "EMPRESA", año)
+                print(f"✅ {año}: {descarga['archivo']} → {entrada['ruta']} ({descarga['segundos']:.2f} s)")
+            print(f"📊 {vigilante.reporte()}")
+        shutil.rmtree(carpeta, ignore_errors=True)